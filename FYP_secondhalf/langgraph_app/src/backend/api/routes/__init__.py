@@ -1,9 +1,13 @@
 from fastapi import FastAPI
-from . import health, start, export_pdf
+from . import health, start, export_pdf, threads, metrics, search, references
 # from . import health, start, artifacts, agents, hitl
 
 def register_routes(app: FastAPI):
     app.include_router(health.router, )
     app.include_router(start.router)
     app.include_router(export_pdf.router)
+    app.include_router(threads.router)
+    app.include_router(metrics.router)
+    app.include_router(search.router)
+    app.include_router(references.router)
 
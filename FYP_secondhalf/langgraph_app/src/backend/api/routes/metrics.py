@@ -0,0 +1,35 @@
+"""
+metrics.py
+
+Runtime metrics of this worker as JSON (streaming queues, background runs, ...).
+
+Every entry of `shared_resources` that has a stats() method is reported under its key,
+so new components only need to register themselves in lifespan to show up here.
+"""
+
+import sys
+import os
+
+from fastapi import APIRouter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from backend.core.startup import shared_resources
+
+router = APIRouter()
+
+
+@router.get("/metrics", tags=["Health"])
+async def get_metrics():
+    """
+    Metrics endpoint.
+
+    Returns:
+        {"pid": ..., "<resource name>": {...stats...}, ...}
+    """
+    metrics = {"pid": os.getpid()}
+    for name, resource in shared_resources.items():
+        stats = getattr(resource, "stats", None)
+        if callable(stats):
+            metrics[name] = stats()
+    return metrics
@@ -0,0 +1,76 @@
+"""
+references.py
+
+Reference documents the Archivist retrieves from (db/reference_ingest.py): upload a text,
+Markdown or PDF file, list the documents, read one's chunks (what a "<document_id>#<n>"
+citation in an SRS points to), remove one.
+"""
+
+import asyncio
+import sys
+import os
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from backend.db import db_utils
+from backend.db.reference_ingest import DocumentIdConflict, UploadTooLarge, aingest_stream
+from backend.path_global_file import REFERENCE_MAX_UPLOAD_BYTES
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/references")
+async def upload_reference(request: Request, filename: str, document_id: Optional[str] = None,
+                           title: Optional[str] = None, thread_id: Optional[str] = None):
+    """
+    Ingest the request body (the raw file, e.g. `curl --data-binary @oel.pdf
+    "/references?filename=oel.pdf"`) as a reference document.
+
+    `document_id` defaults to one made from the filename; uploading to an existing id
+    replaces that document. With `thread_id` the document is only retrieved for that thread.
+    Re-uploading a document unchanged (or, without `document_id`, a file already indexed
+    under another name) returns status "unchanged".
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > REFERENCE_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Reference documents are limited to {REFERENCE_MAX_UPLOAD_BYTES} bytes")
+    try:
+        return await aingest_stream(db_utils.artifact_vector_index, request.stream(), filename,
+                                    document_id=document_id, title=title, thread_id=thread_id)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except DocumentIdConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/references")
+async def list_references(thread_id: Optional[str] = None):
+    """The shared reference documents, and the thread's own with `thread_id`"""
+    return {"documents": await db_utils.artifact_vector_index.adocuments(thread_id)}
+
+
+@router.get("/references/{document_id}")
+async def get_reference(document_id: str):
+    """A reference document's record and its chunks, in order"""
+    index = db_utils.artifact_vector_index
+    document = await asyncio.to_thread(index.document, document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail=f"Reference document {document_id} not found")
+    return {**document, "items": await asyncio.to_thread(index.document_chunks, document_id)}
+
+
+@router.delete("/references/{document_id}")
+async def delete_reference(document_id: str):
+    index = db_utils.artifact_vector_index
+    if await asyncio.to_thread(index.document, document_id) is None:
+        raise HTTPException(status_code=404, detail=f"Reference document {document_id} not found")
+    await asyncio.to_thread(index.remove_source, document_id)
+    return {"deleted": document_id}
@@ -0,0 +1,50 @@
+"""
+search.py
+
+Full-text search across the latest artifacts of all threads (db/search_index.py):
+requirements, SRS sections and UML source, ranked, with a snippet of each match.
+"""
+
+import sys
+import os
+import time
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from backend.db import db_utils
+from backend.path_global_file import SEARCH_MAX_RESULTS, SEARCH_RESULTS_LIMIT
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/search")
+async def search_artifacts(
+    q: Optional[str] = None,
+    requirement_id: Optional[str] = None,
+    thread_id: Optional[str] = None,
+    artifact_type: Optional[str] = None,
+    limit: int = Query(default=SEARCH_RESULTS_LIMIT, ge=1, le=SEARCH_MAX_RESULTS),
+):
+    """
+    Search requirements and SRS / UML text.
+
+    `q` matches sections containing all its words ("quoted phrases" must occur as written,
+    a trailing * matches a prefix: `offline "sync conflict" notif*`). `requirement_id` finds
+    the requirement with that id, alone or combined with `q`. Hits are best first; matched
+    words are **bold** in the snippet. Use thread_id / artifact_id to fetch the artifact.
+    """
+    started = time.perf_counter()
+    try:
+        hits = await db_utils.artifact_search_index.asearch(q, thread_id, artifact_type, requirement_id, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Search for %r failed: %s", q, e)
+        raise HTTPException(status_code=503, detail="Search is not available")
+    return {"query": q, "hits": hits, "took_ms": round((time.perf_counter() - started) * 1000, 2)}
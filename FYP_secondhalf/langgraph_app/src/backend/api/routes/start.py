@@ -3,12 +3,14 @@
 import os
 import sys
 import json
+import socket
 import time
 import uuid
 import asyncio
 from datetime import datetime, timezone
 from enum import Enum
-from typing import Optional
+from functools import partial
+from typing import Optional, Tuple
 from uuid import uuid4
 import logging 
 
@@ -27,6 +29,16 @@ from pydantic import BaseModel, Field, ValidationError
 
 # --- Project-specific imports ---
 from backend.core.startup import shared_resources  # Key import
+from backend.core.event_bus import BusEvent, SubscriberOverflow
+from backend.core.admission import (
+    AdmissionRejected,
+    AdmissionTimeout,
+    PRIORITY_NEW_RUN,
+    PRIORITY_RESUME,
+)
+from backend.core.run_supervisor import ThreadQueueFull
+from backend.core.recovery import AWAITING_INPUT, INTERRUPTED, ResumableThread, describe_thread
+from backend.core.logging_config import bind_log_context
 from backend.graph_logic.state import (
     ArtifactState,
     ResumeInput,
@@ -39,12 +51,29 @@ from backend.graph_logic.state import (
     GraphResponse,
 )
 from backend.utils.main_utils import load_prompts
-from backend.path_global_file import OUTPUT_DIR
+from backend.utils.artifact_utils import (
+    build_artifact_payload,
+    serialize_artifact_content,
+    to_event_payload,
+    EVENT_MODE_DELTA,
+    VALID_EVENT_MODES,
+)
+from backend.utils.artifact_delta import find_previous_version, to_delta_event_payload
+from backend.path_global_file import (
+    OUTPUT_DIR,
+    ARTIFACT_EVENT_MODE,
+    ARTIFACT_SNAPSHOT_INTERVAL,
+    MULTIPLEX_MAX_THREADS,
+    SUBSCRIBER_QUEUE_SIZE,
+    SSE_PING_SECONDS,
+    ADMISSION_DEFAULT_RETRY_AFTER_SECONDS,
+    CLIENT_REQUEST_TTL_SECONDS,
+)
 from backend.db.db_utils import (
-    save_artifact_to_db,
-    save_conversation_to_db,
-    create_indexes
+    asave_artifact_to_db,
+    asave_conversation_to_db,
 )
+from backend.db.run_config_store import create_run_config_store
 
 # --- LangGraph / LangChain ---
 from langgraph.graph import StateGraph, Graph
@@ -55,8 +84,32 @@ from langchain.schema import HumanMessage, SystemMessage, AIMessage
 router = APIRouter()
 shared_resources_start = {}
 
-# Track the threads with their configurations
-run_configs = {}
+# Track the threads with their configurations (shared between workers, see run_config_store.py)
+run_configs = create_run_config_store("run_configs")
+
+# Client request ids already handled, so a retried or double-clicked request is applied once
+client_requests = create_run_config_store("client_requests", ttl_seconds=CLIENT_REQUEST_TTL_SECONDS)
+
+
+def _store_run_config(thread_id: str, run_config: dict, run_id: Optional[str] = None) -> dict:
+    """Store a pending run; its run_id lets repeated streams of the same run subscribe instead of re-running it"""
+    run_data = {**run_config, "run_id": run_id or uuid4().hex}
+    run_configs.put(thread_id, run_data)
+    return run_data
+
+
+def _register_client_request(key: str, value: dict) -> Optional[dict]:
+    """
+    Record a client request id (atomic across workers).
+
+    Returns:
+        None for a new request, otherwise what the earlier request with this id recorded
+    """
+    existing = client_requests.add(key, value)
+    if existing is not None:
+        logger.info("Duplicate client request %s, reusing %s", key, existing)
+    return existing
+
 
 # Enhanced Pydantic models for resume functionality
 class ResumeType(str, Enum):
@@ -76,6 +129,8 @@ class EnhancedResumeRequest(BaseModel):
     artifact_id: Optional[str] = None    # For artifact feedback
     artifact_action: Optional[str] = None  # "accept" or "feedback"
     artifact_feedback: Optional[str] = None  # Feedback text for artifacts
+    # Idempotency key: a resend with the same id (retry, double click) is not applied twice
+    client_request_id: Optional[str] = None
 
 # Valid routing choices
 VALID_ROUTING_CHOICES = {
@@ -91,13 +146,49 @@ VALID_ROUTING_CHOICES = {
 VALID_ARTIFACT_ACTIONS = {"accept", "feedback"}
 
 
+def _create_new_thread(request: InitialInput) -> Tuple[str, Optional[str], bool]:
+    """
+    Pick the thread of a create request and store its first run (unless it is a duplicate).
+
+    Returns:
+        (thread_id, run_id, duplicate)
+    """
+    thread_id, run_id = str(uuid4()), uuid4().hex
+    if request.client_request_id:
+        existing = _register_client_request(
+            f"create:{request.client_request_id}", {"thread_id": thread_id, "run_id": run_id}
+        )
+        if existing is not None:
+            return existing["thread_id"], existing.get("run_id"), True
+    _store_run_config(thread_id, {"type": "start", "human_request": request.human_request}, run_id)
+    return thread_id, run_id, False
+
+
+def _store_resume(request: EnhancedResumeRequest, run_config: dict) -> Tuple[str, bool]:
+    """
+    Store a resume of the request's thread (unless it is a duplicate).
+
+    Returns:
+        (run_id, duplicate)
+    """
+    run_id = uuid4().hex
+    if request.client_request_id:
+        existing = _register_client_request(
+            f"resume:{request.thread_id}:{request.client_request_id}", {"run_id": run_id}
+        )
+        if existing is not None:
+            return existing["run_id"], True
+    _store_run_config(request.thread_id, run_config, run_id)
+    return run_id, False
+
+
 try:
     from backend.graph_logic.flow import process_artifact_feedback_direct
-    print("SUCCESS: process_artifact_feedback_direct imported successfully")
+    logger.debug("SUCCESS: process_artifact_feedback_direct imported successfully")
 except ImportError as e:
-    print(f"IMPORT ERROR: {e}")
+    logger.error("IMPORT ERROR: %s", e)
 except Exception as e:
-    print(f"OTHER IMPORT ERROR: {e}")
+    logger.error("OTHER IMPORT ERROR: %s", e)
 
 
 @router.get("/")
@@ -115,6 +206,7 @@ def health_check():
             "graph": shared_resources.get('graph') is not None,
             "checkpointer": shared_resources.get('checkpointer') is not None,
             "db_connection": shared_resources.get('db_connection') is not None,
+            "run_supervisor": shared_resources.get('run_supervisor') is not None,
         },
         "shared_resources_count": len(shared_resources)
     }
@@ -133,27 +225,37 @@ def health_check():
     
     return health_status
 
+def _check_run_capacity() -> None:
+    """Raise 429 (with Retry-After) when the run queue is already full"""
+    admission = shared_resources.get('admission')
+    if admission is not None and not admission.has_capacity():
+        retry_after = admission.retry_after()
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many runs in progress, retry after {retry_after}s",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
 @router.post("/graph/stream/create", response_model=GraphResponse)
 def create_graph_streaming(request: InitialInput):
-    print(f"DEBUG: Successfully received validated request: {request}")
-    print(f"DEBUG: human_request: {request.human_request}")
+    logger.debug("Successfully received validated request: %s", request)
+    logger.debug("human_request: %s", request.human_request)
     
     # Check if graph is available before creating thread
     if 'graph' not in shared_resources or shared_resources['graph'] is None:
-        print("ERROR: Graph not initialized or not available")
+        logger.error("Graph not initialized or not available")
         raise HTTPException(
             status_code=503, 
             detail="The graph application is not available or has not been initialized."
         )
     
-    print(f"DEBUG: Graph is available: {shared_resources['graph'] is not None}")
-    
-    thread_id = str(uuid4())
+    logger.debug("Graph is available: %s", shared_resources['graph'] is not None)
+
+    # Turn new work away early when the run queue is already full
+    _check_run_capacity()
     
-    run_configs[thread_id] = {
-        "type": "start",
-        "human_request": request.human_request
-    }
+    thread_id, _, _ = _create_new_thread(request)
     
     try:
         response = GraphResponse(
@@ -161,31 +263,28 @@ def create_graph_streaming(request: InitialInput):
             run_status="pending",
             assistant_response=None
         )
-        print(f"DEBUG: Successfully created response: {response}")
+        logger.debug("Successfully created response: %s", response)
         return response
     except ValidationError as e:
-        print(f"DEBUG: Response validation error: {e.errors()}")
+        logger.debug("Response validation error: %s", e.errors())
         raise HTTPException(status_code=500, detail=f"Response validation failed: {str(e)}")
 
-# Enhanced resume endpoint that handles feedback, routing choices, and artifact feedback
-@router.post("/graph/stream/resume", response_model=GraphResponse)
-def resume_graph_streaming(request: EnhancedResumeRequest):
+def _resume_run_config(request: EnhancedResumeRequest) -> dict:
+    """
+    Validate a resume request and build its run config.
+
+    Raises:
+        HTTPException: 400 if the fields do not match the resume type
+    """
     thread_id = request.thread_id
-    
-    # Check if graph is available
-    if 'graph' not in shared_resources or shared_resources['graph'] is None:
-        raise HTTPException(
-            status_code=503, 
-            detail="The graph application is not available or has not been initialized."
-        )
-    
+
     # Handle enhanced resume request if it has the new fields
     resume_type = request.resume_type or ResumeType.FEEDBACK
     user_choice = request.user_choice or None
     artifact_id = request.artifact_id or None
     artifact_action = request.artifact_action or None
     
-    print(f"DEBUG: Resuming graph for thread_id={thread_id}, type={resume_type}")
+    logger.debug("Resuming graph for thread_id=%s, type=%s", thread_id, resume_type)
     
     # Handle different types of resume requests
     if resume_type == ResumeType.ARTIFACT_FEEDBACK or artifact_id:
@@ -202,10 +301,10 @@ def resume_graph_streaming(request: EnhancedResumeRequest):
                 detail=f"Invalid artifact_action. Must be one of: {list(VALID_ARTIFACT_ACTIONS)}"
             )
         
-        print(f"DEBUG: Processing artifact feedback: {artifact_action} for artifact {artifact_id}")
+        logger.debug("Processing artifact feedback: %s for artifact %s", artifact_action, artifact_id)
         
-        # Store artifact feedback configuration
-        run_configs[thread_id] = {
+        # Artifact feedback configuration
+        return {
             "type": "artifact_feedback",
             "artifact_id": artifact_id,
             "artifact_action": artifact_action,
@@ -227,10 +326,10 @@ def resume_graph_streaming(request: EnhancedResumeRequest):
                 detail=f"Invalid user_choice. Must be one of: {list(VALID_ROUTING_CHOICES)}"
             )
         
-        print(f"DEBUG: Processing routing choice: {user_choice}")
+        logger.debug("Processing routing choice: %s", user_choice)
         
-        # Store routing choice configuration
-        run_configs[thread_id] = {
+        # Routing choice configuration
+        return {
             "type": "routing_choice",
             "user_choice": user_choice,
             "resume_type": resume_type.value if isinstance(resume_type, ResumeType) else resume_type
@@ -248,15 +347,30 @@ def resume_graph_streaming(request: EnhancedResumeRequest):
                     detail="review_action is required for feedback resume type"
                 )
         
-        print(f"DEBUG: Processing feedback resumption: {request.review_action}")
+        logger.debug("Processing feedback resumption: %s", request.review_action)
         
-        # Store feedback configuration (original logic)
-        run_configs[thread_id] = {
+        # Feedback configuration (original logic)
+        return {
             "type": "resume",
             "review_action": request.review_action,
             "human_comment": request.human_comment,
             "resume_type": resume_type.value if isinstance(resume_type, ResumeType) else "feedback"
         }
+
+
+# Enhanced resume endpoint that handles feedback, routing choices, and artifact feedback
+@router.post("/graph/stream/resume", response_model=GraphResponse)
+def resume_graph_streaming(request: EnhancedResumeRequest):
+    thread_id = request.thread_id
+    
+    # Check if graph is available
+    if 'graph' not in shared_resources or shared_resources['graph'] is None:
+        raise HTTPException(
+            status_code=503, 
+            detail="The graph application is not available or has not been initialized."
+        )
+
+    _store_resume(request, _resume_run_config(request))
     
     return GraphResponse(
         thread_id=thread_id,
@@ -282,390 +396,363 @@ import asyncio
 from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 
-@router.get("/graph/stream/{thread_id}")
-async def stream_graph(request: Request, thread_id: str):
-    # Add immediate logging
-    print(f"=== SSE REQUEST START for thread_id: {thread_id} ===")
-    print(f"Request headers: {dict(request.headers)}")
-    print(f"Request method: {request.method}")
-    print(f"Request URL: {request.url}")
-    
-    # Check if graph is available
-    if 'graph' not in shared_resources or shared_resources['graph'] is None:
-        print("ERROR: Graph not available in shared_resources")
-        raise HTTPException(
-            status_code=503, 
-            detail="The graph application is not available or has not been initialized."
+
+def _artifact_event(thread_id: str, artifact_payload_dict: dict, artifact: Artifact, state_artifacts: list, event_mode: str) -> str:
+    """Serialize an artifact event for the requested event mode ("full", "lite" or "delta")"""
+    if event_mode == EVENT_MODE_DELTA:
+        # Patch against the previous version of the same content_type found in the graph state
+        previous = find_previous_version(state_artifacts or [], artifact)
+        payload = to_delta_event_payload(
+            artifact_payload_dict,
+            previous.id if previous else None,
+            serialize_artifact_content(previous.content) if previous else None,
+            ARTIFACT_SNAPSHOT_INTERVAL,
         )
-    
-    # Check if thread exists
-    if thread_id not in run_configs:
-        print(f"ERROR: Thread {thread_id} not found in run_configs")
-        print(f"Available threads: {list(run_configs.keys())}")
-        raise HTTPException(status_code=404, detail="Thread not found")
-    
-    print(f"Thread found: {run_configs[thread_id]}")
-    
-    graph = shared_resources['graph']
-    run_data = run_configs[thread_id]
+    else:
+        payload = to_event_payload(thread_id, artifact_payload_dict, event_mode)
+    return json.dumps(payload)
+
+
+def _artifact_bus_event(thread_id: str, artifact_payload_dict: dict, artifact: Artifact, state_artifacts: list) -> BusEvent:
+    """Artifact event rendered once per event mode, for whichever modes the subscribers use"""
+    return BusEvent(
+        json.dumps(artifact_payload_dict),
+        render=partial(_artifact_event, thread_id, artifact_payload_dict, artifact, state_artifacts),
+    )
+
+
+async def _persist_conversation(thread_id: str, conversation_payload_dict: dict) -> None:
+    """Queue a conversation for MongoDB (write-behind), without blocking the event loop"""
+    persistence_queue = shared_resources.get('persistence_queue')
+    if persistence_queue is not None:
+        await persistence_queue.enqueue_conversation(thread_id, conversation_payload_dict)
+    else:
+        await asave_conversation_to_db(thread_id, conversation_payload_dict)
+
+
+async def _persist_artifact(thread_id: str, artifact_payload_dict: dict) -> None:
+    """Queue an artifact for MongoDB (write-behind), without blocking the event loop"""
+    persistence_queue = shared_resources.get('persistence_queue')
+    if persistence_queue is not None:
+        await persistence_queue.enqueue_artifact(thread_id, artifact_payload_dict)
+    else:
+        await asave_artifact_to_db(thread_id, artifact_payload_dict)
+
+
+def _prompt_payloads(resumable: ResumableThread) -> list:
+    """The events a run sends when it stops for user input, rebuilt for a thread awaiting input"""
+    timestamp = datetime.now(timezone.utc).isoformat()
+    if resumable.pending_artifact_id:
+        return [json.dumps({
+            "chat_type": "artifact_feedback_required",
+            "status": "artifact_feedback_required",
+            "pending_artifact_id": resumable.pending_artifact_id,
+            "thread_id": resumable.thread_id,
+            "timestamp": timestamp
+        })]
+    return [json.dumps({
+        "chat_type": "interrupt",
+        "status": "waiting_for_user_input",
+        "message": "Please choose the next action: classify_user_requirements, write_system_requirement, build_requirement_model, write_req_specs, revise_req_specs, or no",
+        "thread_id": resumable.thread_id,
+        "timestamp": timestamp
+    })]
+
+
+async def produce_run_events(graph, thread_id: str, run_data: dict, claim_owner: str):
+    """
+    Execute one pending run of a thread and yield its serialized events.
+
+    Runs as a background task under the RunSupervisor rather than inside the SSE response,
+    so it keeps going when clients disconnect; stream_graph subscribes to its events.
+
+    Args:
+        graph: Compiled graph from shared_resources
+        thread_id: Thread to run
+        run_data: The claimed run config (see the create / resume endpoints)
+        claim_owner: Owner of the run config claim, released when the run pauses for input
+    """
     config = {"configurable": {"thread_id": thread_id}}
-    
-    # NEW: Thread ID consistency checks
-    print(f"DEBUG: ===== THREAD ID CONSISTENCY CHECK =====")
-    print(f"DEBUG: URL thread_id: '{thread_id}'")
-    print(f"DEBUG: Config thread_id: '{config['configurable']['thread_id']}'")
-    print(f"DEBUG: Run_data keys: {list(run_data.keys())}")
-    
-    # Check if run_data has its own thread_id
-    if 'thread_id' in run_data:
-        print(f"DEBUG: Run_data thread_id: '{run_data['thread_id']}'")
-        if run_data['thread_id'] != thread_id:
-            print(f"WARNING: Thread ID mismatch in run_data!")
-    
-    # Check current graph state for this thread
-    try:
-        current_state = await graph.aget_state(config)
-        if current_state and current_state.values:
-            state_artifacts = current_state.values.get('artifacts', [])
-            print(f"DEBUG: Current graph state has {len(state_artifacts)} artifacts")
-            for i, art in enumerate(state_artifacts):
-                art_thread_id = getattr(art, 'thread_id', 'NO_THREAD_ID')
-                print(f"DEBUG: State artifact {i}: ID='{art.id}', thread_id='{art_thread_id}'")
-                if art_thread_id != thread_id:
-                    print(f"WARNING: Artifact {art.id} has different thread_id!")
-        else:
-            print(f"DEBUG: No current state found for thread {thread_id}")
-    except Exception as e:
-        print(f"ERROR: Failed to get current state: {e}")
-    
-    print(f"DEBUG: ===== END CONSISTENCY CHECK =====")
+    admission = shared_resources.get('admission')
+    ticket = None
+    should_cleanup_thread = True  # Flag to control thread cleanup
+    awaiting_input = False        # The run ended at a feedback / routing prompt
+    graph_streaming = False       # graph.astream has started (a cancelled run is continued, not re-run)
+    # The run has its own task, so this tags every log line of the run (graph nodes included)
+    bind_log_context(thread_id=thread_id)
 
-    async def event_generator():
-        try:
-            print("=== STARTING EVENT GENERATOR ===")
+    try:
+        logger.debug("=== STARTING GRAPH RUN ===")
+
+        # Send initial ping to test connection
+        initial_payload = json.dumps({
+            "status": "connected",
+            "thread_id": thread_id,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        })
+        logger.debug("Sending initial payload: %s", initial_payload)
+        yield initial_payload
+
+        # Wait for a run slot while the worker is at its concurrency cap
+        # (resumes go ahead of new runs)
+        if admission is not None:
+            priority = PRIORITY_NEW_RUN if run_data.get("type") == "start" else PRIORITY_RESUME
+            ticket = admission.admit(thread_id, priority)
+            async for position in admission.wait_turn(ticket):
+                yield json.dumps({
+                    "status": "queued",
+                    "queue_position": position,
+                    "thread_id": thread_id,
+                    "timestamp": datetime.now(timezone.utc).isoformat()
+                })
+       
+        input_state = None
+
+        if run_data["type"] == "start":
+            # A start config left over from a run a crash cut off: continue from its checkpoint
+            # (or re-send its prompt) instead of feeding the request to the graph twice
+            resumable = describe_thread(thread_id, await graph.aget_state(config))
+            if resumable is not None:
+                logger.info("Thread %s already has checkpointed progress, recovering it", thread_id)
+                run_data = {**run_data, "type": "recover" if resumable.status == INTERRUPTED else "awaiting_input"}
+        
+        # Initialize event_type of different types of events
+        if run_data["type"] == "start":
+            event_type = "start"
+            input_state = {"human_request": run_data["human_request"]}
+
+        elif run_data["type"] == "awaiting_input":
+            # The run already ended at a prompt (e.g. streamed again after a restart): re-send it
+            resumable = describe_thread(thread_id, await graph.aget_state(config))
+            if resumable is None or resumable.status != AWAITING_INPUT:
+                yield json.dumps({
+                    "status": "finished",
+                    "thread_id": thread_id,
+                    "timestamp": datetime.now(timezone.utc).isoformat()
+                })
+                return
+            for payload in _prompt_payloads(resumable):
+                yield payload
+            should_cleanup_thread = False
+            awaiting_input = True
+            return
+
+        elif run_data["type"] == "recover":
+            # A run cut off by a restart or crash: continue from the last checkpoint
+            event_type = "recover"
+            input_state = None
+        
+        elif run_data["type"] == "routing_choice":
+            event_type = "resume_routing"
+            user_choice = run_data.get("user_choice")
+            logger.debug("===== ROUTING CHOICE FLOW =====")
+            logger.debug("Resuming with routing choice: %s", user_choice)
+
+            # Check state BEFORE updating (debug only: costs a checkpoint read)
+            if logger.isEnabledFor(logging.DEBUG):
+                pre_routing_state = await graph.aget_state(config)
+                logger.debug("BEFORE routing - state.next = %s", pre_routing_state.next)
 
-            # Create indexes (idempotent operation, now database-wide)
-            create_indexes()
+            updated_values = {
+                "next_routing_node": user_choice,
+                "human_request": user_choice
+            }
+            logger.debug("Updating state with: %s", updated_values)
+            await graph.aupdate_state(config, updated_values)
 
-            # Send initial ping to test connection
-            initial_payload = json.dumps({
-                "status": "connected",
-                "thread_id": thread_id,
-                "timestamp": datetime.now(timezone.utc).isoformat()
-            })
-            print(f"Sending initial payload: {initial_payload}")
-            yield initial_payload
+            # Check state AFTER updating
+            if logger.isEnabledFor(logging.DEBUG):
+                post_routing_state = await graph.aget_state(config)
+                logger.debug("AFTER routing - state.next = %s", post_routing_state.next)
+                logger.debug("AFTER routing - next_routing_node = %s", post_routing_state.values.get('next_routing_node', 'None'))
 
-            # Small delay to ensure connection is established
-            await asyncio.sleep(0.1)
-           
             input_state = None
-            should_cleanup_thread = True  # Flag to control thread cleanup
+            logger.debug("Set input_state = None to continue from checkpoint")
+            
+        elif run_data["type"] == "artifact_feedback":
+            event_type = "resume_artifact_feedback"
             
-            # Initialize event_type of different types of events
-            if run_data["type"] == "start":
-                event_type = "start"
-                input_state = {"human_request": run_data["human_request"]}
+            # Handle artifact feedback processing
+            artifact_id = run_data.get("artifact_id")
+            artifact_action = run_data.get("artifact_action")
+            artifact_feedback = run_data.get("artifact_feedback")
             
-            elif run_data["type"] == "routing_choice":
-                event_type = "resume_routing"
-                user_choice = run_data.get("user_choice")
-                print(f"DEBUG: ===== ROUTING CHOICE FLOW =====")
-                print(f"DEBUG: Resuming with routing choice: {user_choice}")
+            logger.debug("Starting artifact feedback processing")
+            logger.debug("artifact_id=%s", artifact_id)
+            logger.debug("artifact_action=%s", artifact_action)
+            logger.debug("artifact_feedback=%s", artifact_feedback)
+            
+            if artifact_action == "accept":
+                logger.debug("===== ARTIFACT ACCEPTANCE FLOW =====")
+                logger.debug("Artifact %s accepted, continuing workflow", artifact_id)
 
                 # Check state BEFORE updating
-                pre_routing_state = await graph.aget_state(config)
-                print(f"DEBUG: BEFORE routing - state.next = {pre_routing_state.next}")
-
-                updated_values = {
-                    "next_routing_node": user_choice,
-                    "human_request": user_choice
-                }
-                print(f"DEBUG: Updating state with: {updated_values}")
-                await graph.aupdate_state(config, updated_values)
+                if logger.isEnabledFor(logging.DEBUG):
+                    pre_accept_state = await graph.aget_state(config)
+                    logger.debug("BEFORE acceptance - state.next = %s", pre_accept_state.next)
+
+                # Send acceptance confirmation to frontend
+                acceptance_payload = json.dumps({
+                    "chat_type": "conversation",
+                    "content": f"✅ Artifact {artifact_id} has been accepted. Continuing with workflow...",
+                    "node": "artifact_feedback_processor",
+                    "agent": "System",
+                    "artifact_id": artifact_id,
+                    "timestamp": datetime.now(timezone.utc).isoformat()
+                })
+                yield acceptance_payload
+
+                # Clear ALL feedback-related state and set continuation flag
+                logger.debug("Updating state to clear feedback flags and set continuation flag...")
+                await graph.aupdate_state(config, {
+                    "paused_for_feedback": False,
+                    "artifact_feedback_id": None,
+                    "artifact_feedback_action": None,
+                    "artifact_feedback_text": None,
+                    "continuing_after_feedback": True  # NEW: Flag to indicate continuation
+                })
 
                 # Check state AFTER updating
-                post_routing_state = await graph.aget_state(config)
-                print(f"DEBUG: AFTER routing - state.next = {post_routing_state.next}")
-                print(f"DEBUG: AFTER routing - next_routing_node = {post_routing_state.values.get('next_routing_node', 'None')}")
-
-                input_state = None
-                print(f"DEBUG: Set input_state = None to continue from checkpoint")
-                
-            elif run_data["type"] == "artifact_feedback":
-                event_type = "resume_artifact_feedback"
-                
-                # Handle artifact feedback processing
-                artifact_id = run_data.get("artifact_id")
-                artifact_action = run_data.get("artifact_action")
-                artifact_feedback = run_data.get("artifact_feedback")
+                post_accept_state = await graph.aget_state(config)
+                logger.debug("AFTER state update - state.next = %s", post_accept_state.next)
+                logger.debug("AFTER state update - continuing_after_feedback = %s", post_accept_state.values.get('continuing_after_feedback', False))
+
+                # CRITICAL: Check if artifact is from revise_req_specs and graph is at interrupt point
+                is_from_revise_req_specs = artifact_id.startswith("software_requirement_specs_")
+                is_at_interrupt = post_accept_state.next and 'handle_routing_decision' in post_accept_state.next
+
+                logger.debug("Artifact from revise_req_specs? %s", is_from_revise_req_specs)
+                logger.debug("Graph at interrupt point? %s", is_at_interrupt)
+
+                if is_from_revise_req_specs and is_at_interrupt:
+                    logger.debug("Graph is ALREADY at interrupt point - sending interrupt notification")
+                    logger.debug("NOT calling astream - waiting for user routing choice")
+
+                    # Send interrupt notification to frontend
+                    interrupt_payload = json.dumps({
+                        "chat_type": "interrupt",
+                        "status": "waiting_for_user_input",
+                        "message": "Please choose the next action: classify_user_requirements, write_system_requirement, build_requirement_model, write_req_specs, revise_req_specs, or no",
+                        "thread_id": thread_id,
+                        "timestamp": datetime.now(timezone.utc).isoformat()
+                    })
+                    logger.debug("Sending interrupt payload to frontend: %s", interrupt_payload)
+                    yield interrupt_payload
+                    logger.debug("Interrupt payload sent successfully")
+
+                    # Keep thread alive for routing choice
+                    should_cleanup_thread = False
+                    awaiting_input = True
+                    logger.debug("Ending run, waiting for routing choice")
+                    return  # Exit without streaming - graph is already interrupted
+                else:
+                    logger.debug("Artifact not from revise_req_specs or no interrupt - continuing normally")
+                    # CRITICAL: Set input_state to None to continue from checkpoint
+                    input_state = None  # This tells LangGraph to continue from current state
+                    logger.debug("Set input_state = None to continue from checkpoint")
+                    # Fall through to graph streaming section
                 
-                print(f"DEBUG: Starting artifact feedback processing")
-                print(f"DEBUG: artifact_id={artifact_id}")
-                print(f"DEBUG: artifact_action={artifact_action}")
-                print(f"DEBUG: artifact_feedback={artifact_feedback}")
+            elif artifact_action == "feedback":
+                logger.debug("Processing feedback for artifact %s", artifact_id)
                 
-                if artifact_action == "accept":
-                    print(f"DEBUG: ===== ARTIFACT ACCEPTANCE FLOW =====")
-                    print(f"DEBUG: Artifact {artifact_id} accepted, continuing workflow")
-
-                    # Check state BEFORE updating
-                    pre_accept_state = await graph.aget_state(config)
-                    print(f"DEBUG: BEFORE acceptance - state.next = {pre_accept_state.next}")
-
-                    # Send acceptance confirmation to frontend
-                    acceptance_payload = json.dumps({
+                try:
+                    # Get current state
+                    current_state = await graph.aget_state(config)
+                    logger.debug("Retrieved current state: %s", type(current_state))
+                    logger.debug("State values keys: %s", list(current_state.values.keys()) if current_state.values else 'No values')
+                    
+                    # Send feedback processing notification
+                    processing_payload = json.dumps({
                         "chat_type": "conversation",
-                        "content": f"✅ Artifact {artifact_id} has been accepted. Continuing with workflow...",
+                        "content": f"🔄 Processing your feedback for artifact {artifact_id}: '{artifact_feedback}'",
                         "node": "artifact_feedback_processor",
                         "agent": "System",
                         "artifact_id": artifact_id,
                         "timestamp": datetime.now(timezone.utc).isoformat()
                     })
-                    yield acceptance_payload
-
-                    # Clear ALL feedback-related state and set continuation flag
-                    print(f"DEBUG: Updating state to clear feedback flags and set continuation flag...")
-                    await graph.aupdate_state(config, {
-                        "paused_for_feedback": False,
-                        "artifact_feedback_id": None,
-                        "artifact_feedback_action": None,
-                        "artifact_feedback_text": None,
-                        "continuing_after_feedback": True  # NEW: Flag to indicate continuation
-                    })
-
-                    # Check state AFTER updating
-                    post_accept_state = await graph.aget_state(config)
-                    print(f"DEBUG: AFTER state update - state.next = {post_accept_state.next}")
-                    print(f"DEBUG: AFTER state update - continuing_after_feedback = {post_accept_state.values.get('continuing_after_feedback', False)}")
-
-                    # CRITICAL: Check if artifact is from revise_req_specs and graph is at interrupt point
-                    is_from_revise_req_specs = artifact_id.startswith("software_requirement_specs_")
-                    is_at_interrupt = post_accept_state.next and 'handle_routing_decision' in post_accept_state.next
-
-                    print(f"DEBUG: Artifact from revise_req_specs? {is_from_revise_req_specs}")
-                    print(f"DEBUG: Graph at interrupt point? {is_at_interrupt}")
-
-                    if is_from_revise_req_specs and is_at_interrupt:
-                        print(f"DEBUG: Graph is ALREADY at interrupt point - sending interrupt notification")
-                        print(f"DEBUG: NOT calling astream - waiting for user routing choice")
-
-                        # Send interrupt notification to frontend
-                        interrupt_payload = json.dumps({
-                            "chat_type": "interrupt",
-                            "status": "waiting_for_user_input",
-                            "message": "Please choose the next action: classify_user_requirements, write_system_requirement, build_requirement_model, write_req_specs, revise_req_specs, or no",
-                            "thread_id": thread_id,
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        })
-                        print(f"DEBUG: Sending interrupt payload to frontend: {interrupt_payload}")
-                        yield interrupt_payload
-                        print(f"DEBUG: Interrupt payload sent successfully")
-
-                        # Keep thread alive for routing choice
-                        should_cleanup_thread = False
-                        print(f"DEBUG: Exiting event_generator, waiting for routing choice")
-                        return  # Exit without streaming - graph is already interrupted
-                    else:
-                        print(f"DEBUG: Artifact not from revise_req_specs or no interrupt - continuing normally")
-                        # CRITICAL: Set input_state to None to continue from checkpoint
-                        input_state = None  # This tells LangGraph to continue from current state
-                        print(f"DEBUG: Set input_state = None to continue from checkpoint")
-                        # Fall through to graph streaming section
-                    
-                elif artifact_action == "feedback":
-                    print(f"DEBUG: Processing feedback for artifact {artifact_id}")
+                    yield processing_payload
                     
+                    # Try to import the feedback processor
                     try:
-                        # Get current state
-                        current_state = await graph.aget_state(config)
-                        print(f"DEBUG: Retrieved current state: {type(current_state)}")
-                        print(f"DEBUG: State values keys: {list(current_state.values.keys()) if current_state.values else 'No values'}")
-                        
-                        # Send feedback processing notification
-                        processing_payload = json.dumps({
-                            "chat_type": "conversation",
-                            "content": f"🔄 Processing your feedback for artifact {artifact_id}: '{artifact_feedback}'",
+                        from backend.graph_logic.flow import process_artifact_feedback_direct
+                        logger.debug("Successfully imported process_artifact_feedback_direct")
+                    except ImportError as e:
+                        logger.error("Failed to import process_artifact_feedback_direct: %s", e)
+                        error_payload = json.dumps({
+                            "chat_type": "error",
+                            "content": f"Failed to import feedback processor: {str(e)}",
                             "node": "artifact_feedback_processor",
-                            "agent": "System",
-                            "artifact_id": artifact_id,
-                            "timestamp": datetime.now(timezone.utc).isoformat()
+                            "agent": "System"
                         })
-                        yield processing_payload
-                        
-                        # Try to import the feedback processor
-                        try:
-                            from backend.graph_logic.flow import process_artifact_feedback_direct
-                            print("DEBUG: Successfully imported process_artifact_feedback_direct")
-                        except ImportError as e:
-                            print(f"ERROR: Failed to import process_artifact_feedback_direct: {e}")
-                            error_payload = json.dumps({
-                                "chat_type": "error",
-                                "content": f"Failed to import feedback processor: {str(e)}",
-                                "node": "artifact_feedback_processor",
-                                "agent": "System"
-                            })
-                            yield error_payload
-                            return
-                        
-                        # Prepare feedback input
-                        feedback_input = {
-                            **current_state.values,
-                            'artifact_feedback_id': artifact_id,
-                            'artifact_feedback_action': artifact_action,
-                            'artifact_feedback_text': artifact_feedback
-                        }
-                        
-                        print(f"DEBUG: Calling process_artifact_feedback_direct with input keys: {list(feedback_input.keys())}")
-                        
-                        # IMPORTANT: Check if the function is async or sync
-                        import inspect
-                        if inspect.iscoroutinefunction(process_artifact_feedback_direct):
-                            print("DEBUG: Function is async, calling with await")
-                            feedback_result = await process_artifact_feedback_direct(feedback_input)
-                        else:
-                            print("DEBUG: Function is sync, calling directly")
-                            feedback_result = process_artifact_feedback_direct(feedback_input)
-                        
-                        print(f"DEBUG: Feedback processing completed")
-                        print(f"DEBUG: Result type: {type(feedback_result)}")
-                        print(f"DEBUG: Result keys: {list(feedback_result.keys()) if feedback_result else 'No result'}")
-                        
-                        # DETAILED DEBUGGING: Print the actual content
-                        if feedback_result:
-                            for key, value in feedback_result.items():
-                                print(f"DEBUG: {key} = {type(value)} with length {len(value) if hasattr(value, '__len__') else 'N/A'}")
-                                if key == "conversations" and value:
-                                    print(f"DEBUG: First conversation: {value[0] if value else 'None'}")
-                                if key == "artifacts" and value:
-                                    print(f"DEBUG: First artifact: {value[0].id if value else 'None'}")
-                                # NEW: Print error details
-                                if key == "errors" and value:
-                                    print(f"DEBUG: Error content: {value}")
-                                    for i, error in enumerate(value):
-                                        print(f"DEBUG: Error {i}: {error}")
-                        
-                        # Check if there are errors and handle them
-                        if feedback_result and feedback_result.get("errors"):
-                            error_messages = feedback_result["errors"]
-                            print(f"ERROR: process_artifact_feedback_direct returned errors: {error_messages}")
-                            
-                            # Send the actual errors to the frontend
-                            for error_msg in error_messages:
-                                error_payload = json.dumps({
-                                    "chat_type": "error",
-                                    "content": f"Feedback processing error: {error_msg}",
-                                    "node": "artifact_feedback_processor",
-                                    "agent": "System"
-                                })
-                                yield error_payload
-                            
-                            # Keep thread alive so user can try again
-                            should_cleanup_thread = False
-                            print(f"DEBUG: Keeping thread {thread_id} alive due to processing errors")
-                            return
+                        yield error_payload
+                        return
+                    
+                    # Prepare feedback input
+                    feedback_input = {
+                        **current_state.values,
+                        'artifact_feedback_id': artifact_id,
+                        'artifact_feedback_action': artifact_action,
+                        'artifact_feedback_text': artifact_feedback
+                    }
+                    
+                    logger.debug("Calling process_artifact_feedback_direct with input keys: %s", list(feedback_input.keys()))
+                    
+                    # IMPORTANT: Check if the function is async or sync
+                    import inspect
+                    if inspect.iscoroutinefunction(process_artifact_feedback_direct):
+                        logger.debug("Function is async, calling with await")
+                        feedback_result = await process_artifact_feedback_direct(feedback_input)
+                    else:
+                        logger.debug("Function is sync, calling directly")
+                        feedback_result = process_artifact_feedback_direct(feedback_input)
+                    
+                    logger.debug("Feedback processing completed")
+                    logger.debug("Result type: %s", type(feedback_result))
+                    logger.debug("Result keys: %s", list(feedback_result.keys()) if feedback_result else 'No result')
+                    
+                    # DETAILED DEBUGGING: Print the actual content
+                    if feedback_result and logger.isEnabledFor(logging.DEBUG):
+                        for key, value in feedback_result.items():
+                            logger.debug("%s = %s with length %s", key, type(value), len(value) if hasattr(value, '__len__') else 'N/A')
+                            if key == "conversations" and value:
+                                logger.debug("First conversation: %s", value[0] if value else 'None')
+                            if key == "artifacts" and value:
+                                logger.debug("First artifact: %s", value[0].id if value else 'None')
+                            # NEW: Print error details
+                            if key == "errors" and value:
+                                logger.debug("Error content: %s", value)
+                                for i, error in enumerate(value):
+                                    logger.debug("Error %s: %s", i, error)
+                    
+                    # Check if there are errors and handle them
+                    if feedback_result and feedback_result.get("errors"):
+                        error_messages = feedback_result["errors"]
+                        logger.error("process_artifact_feedback_direct returned errors: %s", error_messages)
                         
-                        # Check if the function actually processed the feedback successfully
-                        if not feedback_result or (
-                            not feedback_result.get("conversations") and 
-                            not feedback_result.get("artifacts")
-                        ):
-                            print("ERROR: process_artifact_feedback_direct returned no conversations or artifacts")
+                        # Send the actual errors to the frontend
+                        for error_msg in error_messages:
                             error_payload = json.dumps({
                                 "chat_type": "error",
-                                "content": "The feedback processing function did not generate any revised artifacts. This might be a problem with the function implementation, or your feedback might need to be more specific.",
+                                "content": f"Feedback processing error: {error_msg}",
                                 "node": "artifact_feedback_processor",
                                 "agent": "System"
                             })
                             yield error_payload
-                            
-                            # Keep thread alive so user can try again
-                            should_cleanup_thread = False
-                            print(f"DEBUG: Keeping thread {thread_id} alive for retry")
-                            return
                         
-                        # Send conversation updates
-                        if "conversations" in feedback_result and feedback_result["conversations"]:
-                            print(f"DEBUG: Sending {len(feedback_result['conversations'])} conversation updates")
-                            for conv in feedback_result["conversations"]:
-                                conv_payload_dict = {
-                                    "chat_type": "conversation",
-                                    "content": conv.content,
-                                    "node": "artifact_feedback_processor",
-                                    "agent": conv.agent.value if hasattr(conv.agent, 'value') else str(conv.agent),
-                                    "artifact_id": getattr(conv, 'artifact_id', None),
-                                    "timestamp": conv.timestamp.isoformat() if hasattr(conv, 'timestamp') else datetime.now(timezone.utc).isoformat()
-                                }
-                                conv_payload = json.dumps(conv_payload_dict)
-                                yield conv_payload
-
-                                # Save conversation to MongoDB
-                                save_conversation_to_db(thread_id, conv_payload_dict)
-                        else:
-                            print("DEBUG: No conversations in feedback result")
-                        
-                        # Send revised artifacts and require feedback again
-                        if "artifacts" in feedback_result and feedback_result["artifacts"]:
-                            print(f"DEBUG: Sending {len(feedback_result['artifacts'])} revised artifacts")
-                            for art in feedback_result["artifacts"]:
-                                print(f"DEBUG STREAM: Sending revised artifact {art.id}, version: {art.version}")
-
-                                # Serialize content
-                                content_data = None
-                                if art.content:
-                                    if hasattr(art.content, 'model_dump'):
-                                        content_data = art.content.model_dump()
-                                    else:
-                                        content_data = str(art.content)
-
-                                # Send the revised artifact
-                                art_payload_dict = {
-                                    "chat_type": "artifact",
-                                    "artifact_id": art.id,
-                                    "artifact_type": art.content_type.value if hasattr(art.content_type, 'value') else str(art.content_type),
-                                    "agent": art.created_by.value if hasattr(art.created_by, 'value') else str(art.created_by),
-                                    "content": content_data,
-                                    "node": "artifact_feedback_processor",
-                                    "version": art.version,
-                                    "timestamp": art.timestamp.isoformat() if hasattr(art.timestamp, 'isoformat') else str(art.timestamp),
-                                    "status": "completed"
-                                }
-                                art_payload = json.dumps(art_payload_dict)
-                                yield art_payload
-
-                                # Save artifact to MongoDB
-                                save_artifact_to_db(thread_id, art_payload_dict)
-                                
-                                # Immediately require feedback for the revised artifact
-                                print(f"DEBUG: Requiring feedback for revised artifact {art.id}")
-                                feedback_required_payload = json.dumps({
-                                    "chat_type": "artifact_feedback_required",
-                                    "status": "artifact_feedback_required", 
-                                    "pending_artifact_id": art.id,
-                                    "thread_id": thread_id,
-                                    "timestamp": datetime.now(timezone.utc).isoformat()
-                                })
-                                yield feedback_required_payload
-                        
-                        # Update graph state with results
-                        print(f"DEBUG: Updating graph state with feedback results")
-                        await graph.aupdate_state(config, feedback_result)
-                        
-                        # Keep paused for the next feedback cycle
-                        await graph.aupdate_state(config, {"paused_for_feedback": True})
-                        
-                        # DON'T delete the thread - we need it for the next feedback cycle
+                        # Keep thread alive so user can try again
                         should_cleanup_thread = False
-                        print(f"DEBUG: Keeping thread {thread_id} alive for next feedback cycle")
-                        
-                    except Exception as e:
-                        print(f"ERROR: Failed to process artifact feedback: {str(e)}")
-                        import traceback
-                        print(f"ERROR: Full traceback: {traceback.format_exc()}")
-                        
+                        logger.debug("Keeping thread %s alive due to processing errors", thread_id)
+                        return
+                    
+                    # Check if the function actually processed the feedback successfully
+                    if not feedback_result or (
+                        not feedback_result.get("conversations") and 
+                        not feedback_result.get("artifacts")
+                    ):
+                        logger.error("process_artifact_feedback_direct returned no conversations or artifacts")
                         error_payload = json.dumps({
                             "chat_type": "error",
-                            "content": f"Failed to process feedback: {str(e)}",
+                            "content": "The feedback processing function did not generate any revised artifacts. This might be a problem with the function implementation, or your feedback might need to be more specific.",
                             "node": "artifact_feedback_processor",
                             "agent": "System"
                         })
@@ -673,304 +760,684 @@ async def stream_graph(request: Request, thread_id: str):
                         
                         # Keep thread alive so user can try again
                         should_cleanup_thread = False
-                        print(f"DEBUG: Keeping thread {thread_id} alive after exception")
+                        logger.debug("Keeping thread %s alive for retry", thread_id)
+                        return
                     
-                    # Exit and wait for next user action (accept or more feedback)
-                    return
+                    # Send conversation updates
+                    if "conversations" in feedback_result and feedback_result["conversations"]:
+                        logger.debug("Sending %s conversation updates", len(feedback_result['conversations']))
+                        for conv in feedback_result["conversations"]:
+                            conv_payload_dict = {
+                                "chat_type": "conversation",
+                                "content": conv.content,
+                                "node": "artifact_feedback_processor",
+                                "agent": conv.agent.value if hasattr(conv.agent, 'value') else str(conv.agent),
+                                "artifact_id": getattr(conv, 'artifact_id', None),
+                                "timestamp": conv.timestamp.isoformat() if hasattr(conv, 'timestamp') else datetime.now(timezone.utc).isoformat()
+                            }
+                            conv_payload = json.dumps(conv_payload_dict)
+                            yield conv_payload
 
-                # For artifact acceptance, we DON'T return here - let the graph continue
-                input_state = None
-            else:
-                # Original feedback resume logic
-                event_type = "resume"
-                state_update = {"status": run_data["review_action"]}
-                if run_data.get("human_comment") is not None:
-                    state_update["human_comment"] = run_data["human_comment"]
-                await graph.aupdate_state(config, state_update)
-                input_state = None
-
-            # Send event type confirmation
-            event_payload = json.dumps({
-                "status": "processing", 
-                "event_type": event_type,
-                "thread_id": thread_id
-            })
-            print(f"Sending event type: {event_payload}")
-            yield event_payload
+                            # Save conversation to MongoDB
+                            await _persist_conversation(thread_id, conv_payload_dict)
+                    else:
+                        logger.debug("No conversations in feedback result")
+                    
+                    # Send revised artifacts and require feedback again
+                    if "artifacts" in feedback_result and feedback_result["artifacts"]:
+                        logger.debug("Sending %s revised artifacts", len(feedback_result['artifacts']))
+                        for art in feedback_result["artifacts"]:
+                            logger.debug("Sending revised artifact %s, version: %s", art.id, art.version)
+
+                            # Send the revised artifact (content only embedded in "full" event mode)
+                            art_payload_dict = build_artifact_payload(art, "artifact_feedback_processor")
+                            yield _artifact_bus_event(
+                                thread_id, art_payload_dict, art, current_state.values.get('artifacts', [])
+                            )
+
+                            # Save artifact to MongoDB
+                            await _persist_artifact(thread_id, art_payload_dict)
+                            
+                            # Immediately require feedback for the revised artifact
+                            logger.debug("Requiring feedback for revised artifact %s", art.id)
+                            feedback_required_payload = json.dumps({
+                                "chat_type": "artifact_feedback_required",
+                                "status": "artifact_feedback_required", 
+                                "pending_artifact_id": art.id,
+                                "thread_id": thread_id,
+                                "timestamp": datetime.now(timezone.utc).isoformat()
+                            })
+                            yield feedback_required_payload
+                    
+                    # Update graph state with results
+                    logger.debug("Updating graph state with feedback results")
+                    await graph.aupdate_state(config, feedback_result)
+                    
+                    # Keep paused for the next feedback cycle
+                    await graph.aupdate_state(config, {"paused_for_feedback": True})
+                    
+                    # DON'T delete the thread - we need it for the next feedback cycle
+                    should_cleanup_thread = False
+                    awaiting_input = True
+                    logger.debug("Keeping thread %s alive for next feedback cycle", thread_id)
+                    
+                except Exception as e:
+                    logger.exception("Failed to process artifact feedback: %s", e)
+                    
+                    error_payload = json.dumps({
+                        "chat_type": "error",
+                        "content": f"Failed to process feedback: {str(e)}",
+                        "node": "artifact_feedback_processor",
+                        "agent": "System"
+                    })
+                    yield error_payload
+                    
+                    # Keep thread alive so user can try again
+                    should_cleanup_thread = False
+                    logger.debug("Keeping thread %s alive after exception", thread_id)
+                
+                # Exit and wait for next user action (accept or more feedback)
+                return
+
+            # For artifact acceptance, we DON'T return here - let the graph continue
+            input_state = None
+        else:
+            # Original feedback resume logic
+            event_type = "resume"
+            state_update = {"status": run_data["review_action"]}
+            if run_data.get("human_comment") is not None:
+                state_update["human_comment"] = run_data["human_comment"]
+            await graph.aupdate_state(config, state_update)
+            input_state = None
+
+        # Send event type confirmation
+        event_payload = json.dumps({
+            "status": "processing", 
+            "event_type": event_type,
+            "thread_id": thread_id
+        })
+        logger.debug("Sending event type: %s", event_payload)
+        yield event_payload
+        
+        # Regular graph streaming - now includes continuation after artifact acceptance
+        # After artifact acceptance, we need to continue the graph to reach any pending routing interrupts
+        needs_graph_streaming = (
+            run_data["type"] == "start" or
+            run_data["type"] == "routing_choice" or
+            run_data["type"] == "recover" or
+            (run_data["type"] == "artifact_feedback" and run_data.get("artifact_action") == "accept") or
+            input_state is not None
+        )
+        
+        logger.debug("needs_graph_streaming=%s, run_data type=%s", needs_graph_streaming, run_data['type'])
+        
+        if needs_graph_streaming:
             
-            # Regular graph streaming - now includes continuation after artifact acceptance
-            # After artifact acceptance, we need to continue the graph to reach any pending routing interrupts
-            needs_graph_streaming = (
-                run_data["type"] == "start" or
-                run_data["type"] == "routing_choice" or
-                (run_data["type"] == "artifact_feedback" and run_data.get("artifact_action") == "accept") or
-                input_state is not None
-            )
+            logger.debug("Starting graph streaming for continuation after artifact acceptance")
             
-            print(f"DEBUG: needs_graph_streaming={needs_graph_streaming}, run_data type={run_data['type']}")
+            # For artifact acceptance continuation, we need to resume the graph 
+            # from where it was paused (None input means continue from current state)
+            stream_input = input_state
             
-            if needs_graph_streaming:
-                
-                print(f"Starting graph streaming for continuation after artifact acceptance")
-                
-                # For artifact acceptance continuation, we need to resume the graph 
-                # from where it was paused (None input means continue from current state)
-                stream_input = input_state
-                
-                # Use stream_mode="updates" to get state changes after each node
-                print(f"DEBUG: ===== STARTING astream LOOP =====")
-                print(f"DEBUG: stream_input = {stream_input}")
-                print(f"DEBUG: config = {config}")
-                print(f"DEBUG: Checking state BEFORE astream...")
+            # Use stream_mode="updates" to get state changes after each node
+            logger.debug("===== STARTING astream LOOP =====")
+            logger.debug("stream_input = %s", stream_input)
+            logger.debug("config = %s", config)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Checking state BEFORE astream...")
                 pre_stream_state = await graph.aget_state(config)
                 if pre_stream_state:
-                    print(f"DEBUG: Pre-stream state.next = {pre_stream_state.next}")
-                    print(f"DEBUG: Pre-stream state.values keys = {list(pre_stream_state.values.keys()) if pre_stream_state.values else 'None'}")
+                    logger.debug("Pre-stream state.next = %s", pre_stream_state.next)
+                    logger.debug("Pre-stream state.values keys = %s", list(pre_stream_state.values.keys()) if pre_stream_state.values else 'None')
                     if pre_stream_state.values:
-                        print(f"DEBUG: continuing_after_feedback = {pre_stream_state.values.get('continuing_after_feedback', False)}")
-                        print(f"DEBUG: paused_for_feedback = {pre_stream_state.values.get('paused_for_feedback', False)}")
-                        print(f"DEBUG: next_routing_node = {pre_stream_state.values.get('next_routing_node', 'None')}")
-
-                node_count = 0
-                async for state_update in graph.astream(stream_input, config, stream_mode="updates"):
-                    node_count += 1
-                    print(f"DEBUG: astream yielded update #{node_count}: {list(state_update.keys())}")
-
-                    # CHECK FOR INTERRUPTS FIRST - this should now work after artifact acceptance
-                    if "__interrupt__" in state_update:
-                        print(f"DEBUG: Graph interrupted at thread_id={thread_id}")
-                    
-                        # Send interrupt status to frontend
-                        interrupt_payload = json.dumps({
-                            "chat_type": "interrupt",
-                            "status": "waiting_for_user_input",
-                            "message": "Please choose the next action: classify_user_requirements, write_system_requirement, build_requirement_model, write_req_specs, or revise_req_specs",
-                            "thread_id": thread_id,
-                            "timestamp": datetime.now(timezone.utc).isoformat()
-                        })
-                        yield interrupt_payload
+                        logger.debug("continuing_after_feedback = %s", pre_stream_state.values.get('continuing_after_feedback', False))
+                        logger.debug("paused_for_feedback = %s", pre_stream_state.values.get('paused_for_feedback', False))
+                        logger.debug("next_routing_node = %s", pre_stream_state.values.get('next_routing_node', 'None'))
+
+            node_count = 0
+            graph_streaming = True
+            async for state_update in graph.astream(stream_input, config, stream_mode="updates"):
+                node_count += 1
+                logger.debug("astream yielded update #%s: %s", node_count, list(state_update.keys()))
+
+                # CHECK FOR INTERRUPTS FIRST - this should now work after artifact acceptance
+                if "__interrupt__" in state_update:
+                    logger.debug("Graph interrupted at thread_id=%s", thread_id)
+                
+                    # Send interrupt status to frontend
+                    interrupt_payload = json.dumps({
+                        "chat_type": "interrupt",
+                        "status": "waiting_for_user_input",
+                        "message": "Please choose the next action: classify_user_requirements, write_system_requirement, build_requirement_model, write_req_specs, or revise_req_specs",
+                        "thread_id": thread_id,
+                        "timestamp": datetime.now(timezone.utc).isoformat()
+                    })
+                    yield interrupt_payload
 
-                        # Store the current state for resumption
-                        current_state = await graph.aget_state(config)
-                        print(f"DEBUG: Stored interrupted state for thread_id={thread_id}")
-                        
-                        # DON'T delete the thread - we need it for resumption
-                        should_cleanup_thread = False
-                        # Exit the generator - frontend will need to make a new request to continue
-                        return
+                    # Store the current state for resumption
+                    current_state = await graph.aget_state(config)
+                    logger.debug("Stored interrupted state for thread_id=%s", thread_id)
+                    
+                    # DON'T delete the thread - we need it for resumption
+                    should_cleanup_thread = False
+                    awaiting_input = True
+                    # End the run - frontend will need to make a new request to continue
+                    return
 
-                    for node_name, updates in state_update.items():
-                        print(f"DEBUG: Node '{node_name}' completed with updates: {list(updates.keys())}")
-                        
-                        # NEW: Debug the actual state after node completion
-                        print(f"DEBUG: Testing immediate state persistence after {node_name}...")
+                for node_name, updates in state_update.items():
+                    logger.debug("Node '%s' completed with updates: %s", node_name, list(updates.keys()))
+                    
+                    # NEW: Debug the actual state after node completion (an extra checkpoint read per node, debug only)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Testing immediate state persistence after %s...", node_name)
                         current_state_check = await graph.aget_state(config)
                         if current_state_check and current_state_check.values:
                             artifacts_in_state = current_state_check.values.get('artifacts', [])
                             conversations_in_state = current_state_check.values.get('conversations', [])
                             continuing_after_feedback = current_state_check.values.get('continuing_after_feedback', False)
-                            print(f"DEBUG: After {node_name}, state now has {len(artifacts_in_state)} artifacts and {len(conversations_in_state)} conversations")
-                            print(f"DEBUG: continuing_after_feedback flag: {continuing_after_feedback}")
-                            
-                            for i, art in enumerate(artifacts_in_state):
-                                print(f"  Artifact {i}: {art.id} (thread: {getattr(art, 'thread_id', 'NO_THREAD')})")
-                        else:
-                            print(f"DEBUG: CRITICAL - After {node_name}, state is empty or has no values!")
+                            logger.debug("After %s, state now has %s artifacts and %s conversations", node_name, len(artifacts_in_state), len(conversations_in_state))
+                            logger.debug("continuing_after_feedback flag: %s", continuing_after_feedback)
                         
-                        # This is for node routing before reaching END node
-                        if "next_routing_node" in updates:
-                            routing_payload = json.dumps({
-                                "chat_type": "routing_decision",
-                                "content": f"Routing to: {updates['next_routing_node']}",
-                                "node": node_name,
-                                "agent": node_to_agent_map.get(node_name, "Assistant"),
-                                "next_node": updates["next_routing_node"],
-                                "timestamp": datetime.now(timezone.utc).isoformat()
-                            })
-                            yield routing_payload
-
-                        # Handle new conversations - only from this node's update
-                        # IMPORTANT: Routing nodes return full state, which includes accumulated conversations
-                        # We need to skip those since routing nodes don't produce new conversations
-                        # (routing messages are sent via routing_decision payload instead)
-                        if node_name == "handle_routing_decision":
-                            new_conversations = []
-                            print(f"DEBUG: Skipping accumulated conversations for routing node '{node_name}'")
+                            for i, art in enumerate(artifacts_in_state):
+                                logger.debug("  Artifact %s: %s (thread: %s)", i, art.id, getattr(art, 'thread_id', 'NO_THREAD'))
                         else:
-                            new_conversations = updates.get("conversations", [])
-                            print(f"DEBUG: Node {node_name} returned {len(new_conversations)} new conversations from its update")
+                            logger.debug("CRITICAL - After %s, state is empty or has no values!", node_name)
+                    
+                    # This is for node routing before reaching END node
+                    if "next_routing_node" in updates:
+                        routing_payload = json.dumps({
+                            "chat_type": "routing_decision",
+                            "content": f"Routing to: {updates['next_routing_node']}",
+                            "node": node_name,
+                            "agent": node_to_agent_map.get(node_name, "Assistant"),
+                            "next_node": updates["next_routing_node"],
+                            "timestamp": datetime.now(timezone.utc).isoformat()
+                        })
+                        yield routing_payload
+
+                    # Handle new conversations - only from this node's update
+                    # IMPORTANT: Routing nodes return full state, which includes accumulated conversations
+                    # We need to skip those since routing nodes don't produce new conversations
+                    # (routing messages are sent via routing_decision payload instead)
+                    if node_name == "handle_routing_decision":
+                        new_conversations = []
+                        logger.debug("Skipping accumulated conversations for routing node '%s'", node_name)
+                    else:
+                        new_conversations = updates.get("conversations", [])
+                        logger.debug("Node %s returned %s new conversations from its update", node_name, len(new_conversations))
 
-                        # Only send conversations that were actually returned by this node
-                        # (not the accumulated state conversations)
-                        for conversation in new_conversations:
-                            conversation_payload_dict = {
-                                "chat_type": "conversation",
-                                "content": conversation.content,
-                                "node": node_name,
-                                "agent": conversation.agent.value,
-                                "artifact_id": conversation.artifact_id,
-                                "timestamp": conversation.timestamp.isoformat()
-                            }
-                            conversation_payload = json.dumps(conversation_payload_dict)
-                            yield conversation_payload
+                    # Only send conversations that were actually returned by this node
+                    # (not the accumulated state conversations)
+                    for conversation in new_conversations:
+                        conversation_payload_dict = {
+                            "chat_type": "conversation",
+                            "content": conversation.content,
+                            "node": node_name,
+                            "agent": conversation.agent.value,
+                            "artifact_id": conversation.artifact_id,
+                            "timestamp": conversation.timestamp.isoformat()
+                        }
+                        conversation_payload = json.dumps(conversation_payload_dict)
+                        yield conversation_payload
 
-                            # Save conversation to MongoDB
-                            save_conversation_to_db(thread_id, conversation_payload_dict)
+                        # Save conversation to MongoDB
+                        await _persist_conversation(thread_id, conversation_payload_dict)
 
-                        # MODIFIED: Handle new artifacts with continuation logic
-                        # Skip artifact processing for routing nodes
-                        if node_name == "handle_routing_decision":
-                            print(f"DEBUG: Skipping artifact processing for routing node '{node_name}'")
-                        else:
-                            new_artifacts = updates.get("artifacts", [])
-                            print(f"DEBUG: Node {node_name} returned {len(new_artifacts)} new artifacts")
-                            for artifact in new_artifacts:
-                                print(f"DEBUG: Processing artifact from node update: {artifact.id} (thread: {getattr(artifact, 'thread_id', 'NO_THREAD')})")
-
-                                # Serialize Pydantic model content properly
-                                content_data = None
-                                if artifact.content:
-                                    if hasattr(artifact.content, 'model_dump'):  # Pydantic v2
-                                        content_data = artifact.content.model_dump()
-                                    else:
-                                        content_data = str(artifact.content)  # Fallback for strings
-
-                                artifact_payload_dict = {
-                                    "chat_type": "artifact",
-                                    "artifact_id": artifact.id,
-                                    "artifact_type": artifact.content_type.value,
-                                    "agent": artifact.created_by.value if hasattr(artifact.created_by, 'value') else str(artifact.created_by),
-                                    "content": content_data,  # Now properly serialized
-                                    "node": node_name,
-                                    "version": artifact.version,
-                                    "timestamp": artifact.timestamp.isoformat(),  # Use artifact's own timestamp
-                                    "status": "completed"
-                                }
-                                artifact_payload = json.dumps(artifact_payload_dict)
-                                yield artifact_payload
-
-                                # Save artifact to MongoDB
-                                save_artifact_to_db(thread_id, artifact_payload_dict)
-
-                                # CRITICAL CHANGE: Check if we're continuing after feedback acceptance
-                                current_state = await graph.aget_state(config)
-                                continuing_after_feedback = current_state.values.get("continuing_after_feedback", False)
-
-                                if artifact.id and artifact.content:
-                                    if not continuing_after_feedback:
-                                        # This is a NEW artifact - require feedback and exit
-                                        print(f"DEBUG: NEW artifact {artifact.id} (version {artifact.version}) completed, requiring feedback")
-
-                                        # CRITICAL DEBUG: Check state right before requiring feedback
+                    # MODIFIED: Handle new artifacts with continuation logic
+                    # Skip artifact processing for routing nodes
+                    if node_name == "handle_routing_decision":
+                        logger.debug("Skipping artifact processing for routing node '%s'", node_name)
+                    else:
+                        new_artifacts = updates.get("artifacts", [])
+                        logger.debug("Node %s returned %s new artifacts", node_name, len(new_artifacts))
+                        for artifact in new_artifacts:
+                            logger.debug("Processing artifact from node update: %s (thread: %s)", artifact.id, getattr(artifact, 'thread_id', 'NO_THREAD'))
+
+                            # Serialize Pydantic model content properly (full payload is what gets saved)
+                            artifact_payload_dict = build_artifact_payload(artifact, node_name)
+                            current_state = await graph.aget_state(config)
+                            yield _artifact_bus_event(
+                                thread_id, artifact_payload_dict, artifact, current_state.values.get('artifacts', [])
+                            )
+
+                            # Save artifact to MongoDB
+                            await _persist_artifact(thread_id, artifact_payload_dict)
+
+                            # CRITICAL CHANGE: Check if we're continuing after feedback acceptance
+                            continuing_after_feedback = current_state.values.get("continuing_after_feedback", False)
+
+                            if artifact.id and artifact.content:
+                                if not continuing_after_feedback:
+                                    # This is a NEW artifact - require feedback and exit
+                                    logger.debug("NEW artifact %s (version %s) completed, requiring feedback", artifact.id, artifact.version)
+
+                                    # CRITICAL DEBUG: Check state right before requiring feedback
+                                    if logger.isEnabledFor(logging.DEBUG):
                                         final_state_check = await graph.aget_state(config)
                                         if final_state_check and final_state_check.values:
                                             final_artifacts = final_state_check.values.get('artifacts', [])
-                                            print(f"DEBUG: FINAL CHECK - State has {len(final_artifacts)} artifacts before requiring feedback")
+                                            logger.debug("FINAL CHECK - State has %s artifacts before requiring feedback", len(final_artifacts))
                                             for i, art in enumerate(final_artifacts):
-                                                print(f"  Final artifact {i}: {art.id} (thread: {getattr(art, 'thread_id', 'NO_THREAD')})")
+                                                logger.debug("  Final artifact %s: %s (thread: %s)", i, art.id, getattr(art, 'thread_id', 'NO_THREAD'))
                                         else:
-                                            print(f"DEBUG: CRITICAL ERROR - Final state check shows empty state before requiring feedback!")
-
-                                        # Send artifact feedback requirement
-                                        feedback_required_payload = json.dumps({
-                                            "chat_type": "artifact_feedback_required",
-                                            "status": "artifact_feedback_required",
-                                            "pending_artifact_id": artifact.id,
-                                            "thread_id": thread_id,
-                                            "timestamp": datetime.now(timezone.utc).isoformat()
-                                        })
-                                        yield feedback_required_payload
-
-                                        # Store the current graph state to prevent race conditions
-                                        await graph.aupdate_state(config, {"paused_for_feedback": True})
-
-                                        # DON'T delete the thread - we need it for feedback
-                                        should_cleanup_thread = False
-                                        # Exit the generator - frontend will need to provide feedback
-                                        return
-                                    else:
-                                        # We're continuing after feedback acceptance - don't require feedback again
-                                        print(f"DEBUG: Continuing after feedback acceptance for artifact {artifact.id}, NOT requiring feedback again")
-                                        # Clear the continuation flag so future artifacts will require feedback
-                                        await graph.aupdate_state(config, {"continuing_after_feedback": False})
-                                        # Continue processing - let the graph flow to the routing interrupt
-
-                        # Handle errors
-                        new_errors = updates.get("errors", [])
-                        for error in new_errors:
-                            error_payload = json.dumps({
-                                "chat_type": "error",
-                                "content": error,
-                                "node": node_name,
-                                "agent": node_to_agent_map.get(node_name, "Assistant")
-                            })
-                            yield error_payload
+                                            logger.debug("CRITICAL ERROR - Final state check shows empty state before requiring feedback!")
+
+                                    # Send artifact feedback requirement
+                                    feedback_required_payload = json.dumps({
+                                        "chat_type": "artifact_feedback_required",
+                                        "status": "artifact_feedback_required",
+                                        "pending_artifact_id": artifact.id,
+                                        "thread_id": thread_id,
+                                        "timestamp": datetime.now(timezone.utc).isoformat()
+                                    })
+                                    yield feedback_required_payload
+
+                                    # Store the current graph state to prevent race conditions
+                                    await graph.aupdate_state(config, {"paused_for_feedback": True})
+
+                                    # DON'T delete the thread - we need it for feedback
+                                    should_cleanup_thread = False
+                                    awaiting_input = True
+                                    # End the run - frontend will need to provide feedback
+                                    return
+                                else:
+                                    # We're continuing after feedback acceptance - don't require feedback again
+                                    logger.debug("Continuing after feedback acceptance for artifact %s, NOT requiring feedback again", artifact.id)
+                                    # Clear the continuation flag so future artifacts will require feedback
+                                    await graph.aupdate_state(config, {"continuing_after_feedback": False})
+                                    # Continue processing - let the graph flow to the routing interrupt
+
+                    # Handle errors
+                    new_errors = updates.get("errors", [])
+                    for error in new_errors:
+                        error_payload = json.dumps({
+                            "chat_type": "error",
+                            "content": error,
+                            "node": node_name,
+                            "agent": node_to_agent_map.get(node_name, "Assistant")
+                        })
+                        yield error_payload
 
-                # # Check if graph is interrupted (not actually completed)
-                # print(f"DEBUG: ===== ASTREAM LOOP COMPLETED =====")
-                # print(f"DEBUG: Total nodes processed in loop: {node_count}")
-                # print(f"DEBUG: Checking final state to detect interrupt...")
-                # final_state = await graph.aget_state(config)
-
-                # print(f"DEBUG: final_state type: {type(final_state)}")
-                # print(f"DEBUG: final_state.next: {final_state.next}")
-                # print(f"DEBUG: final_state.values keys: {list(final_state.values.keys()) if final_state.values else 'None'}")
-
-                # if final_state.next:  # If there are pending next nodes, we're interrupted
-                #     print(f"DEBUG: ✓ INTERRUPT DETECTED! Next nodes to execute: {final_state.next}")
-                #     print(f"DEBUG: Graph is waiting at an interrupt point, not completed!")
-                #     interrupt_payload = json.dumps({
-                #         "chat_type": "interrupt",
-                #         "status": "waiting_for_user_input",
-                #         "message": "Please choose the next action: ...",
-                #         "thread_id": thread_id,
-                #         "timestamp": datetime.now(timezone.utc).isoformat()
-                #     })
-                #     yield interrupt_payload
-                #     should_cleanup_thread = False
-                #     print(f"DEBUG: Returning early from event_generator due to interrupt")
-                #     return  # Don't send completion
-                # else:
-                #     print(f"DEBUG: ✗ NO INTERRUPT - final_state.next is empty/None")
-                #     print(f"DEBUG: Graph has completed normally, sending completion message")
-
-                # Final completion message - use "finished" to distinguish from artifact "completed"
-                print(f"DEBUG: Sending 'finished' status for thread {thread_id}")
-                completion_payload = json.dumps({
-                    "status": "finished",
+            # # Check if graph is interrupted (not actually completed)
+            # print(f"DEBUG: ===== ASTREAM LOOP COMPLETED =====")
+            # print(f"DEBUG: Total nodes processed in loop: {node_count}")
+            # print(f"DEBUG: Checking final state to detect interrupt...")
+            # final_state = await graph.aget_state(config)
+
+            # print(f"DEBUG: final_state type: {type(final_state)}")
+            # print(f"DEBUG: final_state.next: {final_state.next}")
+            # print(f"DEBUG: final_state.values keys: {list(final_state.values.keys()) if final_state.values else 'None'}")
+
+            # if final_state.next:  # If there are pending next nodes, we're interrupted
+            #     print(f"DEBUG: ✓ INTERRUPT DETECTED! Next nodes to execute: {final_state.next}")
+            #     print(f"DEBUG: Graph is waiting at an interrupt point, not completed!")
+            #     interrupt_payload = json.dumps({
+            #         "chat_type": "interrupt",
+            #         "status": "waiting_for_user_input",
+            #         "message": "Please choose the next action: ...",
+            #         "thread_id": thread_id,
+            #         "timestamp": datetime.now(timezone.utc).isoformat()
+            #     })
+            #     yield interrupt_payload
+            #     should_cleanup_thread = False
+            #     print(f"DEBUG: Ending run early due to interrupt")
+            #     return  # Don't send completion
+            # else:
+            #     print(f"DEBUG: ✗ NO INTERRUPT - final_state.next is empty/None")
+            #     print(f"DEBUG: Graph has completed normally, sending completion message")
+
+            # Final completion message - use "finished" to distinguish from artifact "completed"
+            logger.debug("Sending 'finished' status for thread %s", thread_id)
+            completion_payload = json.dumps({
+                "status": "finished",
+                "thread_id": thread_id,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            })
+            yield completion_payload
+            logger.debug("'finished' status sent successfully")
+
+    except asyncio.CancelledError:
+        logger.info("Run cancelled for thread %s", thread_id)
+        should_cleanup_thread = False  # Don't cleanup on cancellation
+        raise
+    except (AdmissionRejected, AdmissionTimeout) as e:
+        should_cleanup_thread = False  # the run never started: keep it pending so the client can retry
+        yield json.dumps({
+            "status": "error",
+            "error": f"The server is busy, please try again later ({e})",
+            "thread_id": thread_id,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        })
+    except Exception as e:
+        logger.exception("Error in graph run for thread %s: %s", thread_id, e)
+        
+        # Send error to frontend
+        error_payload = json.dumps({
+            "status": "error",
+            "error": str(e),
+            "thread_id": thread_id,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        })
+        yield error_payload
+    finally:
+        logger.debug("=== GRAPH RUN FINISHED for thread %s ===", thread_id)
+        if ticket is not None:
+            admission.release(ticket)
+        resumable_threads = shared_resources.get('resumable_threads')
+        # Only cleanup thread if we should (i.e., not waiting for feedback/routing)
+        if should_cleanup_thread:
+            logger.debug("Cleaning up thread_id=%s from run_configs", thread_id)
+            # Only while still claimed by this run: a resume stored meanwhile must survive
+            await asyncio.to_thread(run_configs.delete, thread_id, claim_owner)
+            if resumable_threads is not None:
+                resumable_threads.discard(thread_id)
+        elif awaiting_input:
+            # Same run_id (tabs on this worker keep replaying the run), but streaming it again
+            # elsewhere (another worker, after a restart) re-sends the prompt instead of re-running it
+            logger.debug("Keeping thread_id=%s alive for future requests", thread_id)
+            await asyncio.to_thread(
+                run_configs.release, thread_id, claim_owner, {"type": "awaiting_input", "run_id": run_data.get("run_id")}
+            )
+            if resumable_threads is not None:
+                resumable_threads.record(ResumableThread(thread_id, AWAITING_INPUT))
+        elif graph_streaming:
+            # Cut off mid-graph (shutdown): the next stream continues from the checkpoint
+            logger.info("Run of thread %s stopped mid-graph, next stream recovers it", thread_id)
+            await asyncio.to_thread(run_configs.release, thread_id, claim_owner, {"type": "recover", "run_id": uuid4().hex})
+            if resumable_threads is not None:
+                resumable_threads.record(ResumableThread(thread_id, INTERRUPTED))
+        else:
+            logger.debug("Keeping thread_id=%s alive for future requests", thread_id)
+            await asyncio.to_thread(run_configs.release, thread_id, claim_owner)
+
+
+@router.get("/graph/stream/{thread_id}")
+async def stream_graph(request: Request, thread_id: str, event_mode: str = ARTIFACT_EVENT_MODE):
+    # Add immediate logging
+    logger.debug("=== SSE REQUEST START for thread_id: %s ===", thread_id)
+    logger.debug("Request headers: %s", request.headers)
+    logger.debug("Request method: %s", request.method)
+    logger.debug("Request URL: %s", request.url)
+    
+    # Check if graph (and the background run supervisor) is available
+    if shared_resources.get('graph') is None or shared_resources.get('run_supervisor') is None:
+        logger.error("Graph not available in shared_resources")
+        raise HTTPException(
+            status_code=503, 
+            detail="The graph application is not available or has not been initialized."
+        )
+    
+    # Check if thread exists (the config may have been stored by another worker)
+    run_data = await asyncio.to_thread(run_configs.get, thread_id)
+    if run_data is None:
+        logger.error("Thread %s not found in run_configs", thread_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Available threads: %s", run_configs.keys())
+        raise HTTPException(status_code=404, detail="Thread not found")
+    
+    logger.debug("Thread found: %s", run_data)
+
+    _check_event_mode(event_mode)
+
+    graph = shared_resources['graph']
+    config = {"configurable": {"thread_id": thread_id}}
+    
+    # NEW: Thread ID consistency checks (debug only: reads the checkpoint)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("===== THREAD ID CONSISTENCY CHECK =====")
+        logger.debug("URL thread_id: '%s'", thread_id)
+        logger.debug("Config thread_id: '%s'", config['configurable']['thread_id'])
+        logger.debug("Run_data keys: %s", list(run_data.keys()))
+    
+        # Check if run_data has its own thread_id
+        if 'thread_id' in run_data:
+            logger.debug("Run_data thread_id: '%s'", run_data['thread_id'])
+            if run_data['thread_id'] != thread_id:
+                logger.warning("Thread ID mismatch in run_data!")
+    
+        # Check current graph state for this thread
+        try:
+            current_state = await graph.aget_state(config)
+            if current_state and current_state.values:
+                state_artifacts = current_state.values.get('artifacts', [])
+                logger.debug("Current graph state has %s artifacts", len(state_artifacts))
+                for i, art in enumerate(state_artifacts):
+                    art_thread_id = getattr(art, 'thread_id', 'NO_THREAD_ID')
+                    logger.debug("State artifact %s: ID='%s', thread_id='%s'", i, art.id, art_thread_id)
+                    if art_thread_id != thread_id:
+                        logger.warning("Artifact %s has different thread_id!", art.id)
+            else:
+                logger.debug("No current state found for thread %s", thread_id)
+        except Exception as e:
+            logger.error("Failed to get current state: %s", e)
+    
+        logger.debug("===== END CONSISTENCY CHECK =====")
+
+    # EventSource sends Last-Event-ID when it reconnects: only replay what the client missed
+    last_event_id = request.headers.get("last-event-id", "")
+    after_seq = int(last_event_id) if last_event_id.isdigit() else None
+
+    return await _start_or_subscribe(thread_id, run_data, event_mode, after_seq)
+
+
+def _check_event_mode(event_mode: str) -> None:
+    # "full" embeds artifact content in the event, "lite" only sends a reference to fetch it from,
+    # "delta" sends a JSON Patch against the previous version of the same artifact type
+    if event_mode not in VALID_EVENT_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid event_mode. Must be one of: {sorted(VALID_EVENT_MODES)}"
+        )
+
+
+async def _start_or_subscribe(thread_id: str, run_data: dict, event_mode: str, after_seq: Optional[int] = None,
+                              headers: Optional[dict] = None, subscribe_only: bool = False) -> EventSourceResponse:
+    """
+    Stream the thread's pending run: claim it and hand it to the run supervisor (which runs it
+    now, or after the thread's current run) unless this worker already has it, then subscribe
+    this response to its events.
+
+    Args:
+        thread_id: Thread to stream
+        run_data: Its pending run config (carries the run_id)
+        event_mode: Artifact event mode of this subscriber
+        after_seq: Only replay events after this sequence number (Last-Event-ID)
+        headers: Extra response headers
+        subscribe_only: A duplicate request attaching to an earlier one: start no run but this one
+    """
+    graph = shared_resources['graph']
+    event_bus = shared_resources['event_bus']
+    run_supervisor = shared_resources['run_supervisor']
+    run_id = run_data.get("run_id")
+
+    def is_current_run(channel) -> bool:
+        return channel is not None and run_id is not None and channel.run_id == run_id
+
+    runs_ahead = 0
+    if is_current_run(event_bus.channel(thread_id)):
+        # This run is already executing (or just finished) on this worker: subscribe only
+        logger.debug("Subscribing to existing run %s of thread %s", run_id, thread_id)
+    elif run_supervisor.is_pending(thread_id, run_id):
+        # Queued behind the thread's current run on this worker: wait for it
+        runs_ahead = run_supervisor.pending_runs(thread_id).index(run_id) + 1
+    else:
+        if run_supervisor.draining:
+            # Shutting down: the client retries, and the run is picked up by the next worker
+            raise HTTPException(
+                status_code=503,
+                detail="The server is restarting, please retry",
+                headers={"Retry-After": str(ADMISSION_DEFAULT_RETRY_AFTER_SECONDS)}
+            )
+        # Reject early (before claiming) when the worker's run queue is full
+        _check_run_capacity()
+
+        # Claim the run config so no other request/worker executes the same pending run
+        claim_owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        claimed_run_data = await asyncio.to_thread(run_configs.claim, thread_id, claim_owner)
+        if claimed_run_data is not None and subscribe_only and claimed_run_data.get("run_id") != run_id:
+            # A duplicate request only ever starts its own run, never a newer one
+            await asyncio.to_thread(run_configs.release, thread_id, claim_owner)
+            claimed_run_data = None
+
+        if claimed_run_data is not None:
+            # Runs of a thread are serialised: this one starts now or after the thread's current run
+            run_id = claimed_run_data.get("run_id", run_id)
+            try:
+                runs_ahead = run_supervisor.submit(
+                    thread_id, produce_run_events(graph, thread_id, claimed_run_data, claim_owner), run_id=run_id,
+                    on_discard=lambda: asyncio.to_thread(run_configs.release, thread_id, claim_owner)
+                )
+            except ThreadQueueFull as e:
+                await asyncio.to_thread(run_configs.release, thread_id, claim_owner)
+                raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(ADMISSION_DEFAULT_RETRY_AFTER_SECONDS)})
+            after_seq = None  # a Last-Event-ID from an earlier run does not apply to this one
+        elif run_supervisor.is_pending(thread_id, run_id):
+            runs_ahead = run_supervisor.pending_runs(thread_id).index(run_id) + 1
+        elif not is_current_run(event_bus.channel(thread_id)):
+            raise HTTPException(status_code=409, detail="Thread is already being streamed by another request")
+
+    async def event_generator():
+        # Only a subscription: disconnecting cancels this generator, never the run
+        try:
+            if runs_ahead:
+                yield {"data": json.dumps({
+                    "status": "queued",
+                    "reason": "thread_busy",
+                    "runs_ahead": runs_ahead,
                     "thread_id": thread_id,
                     "timestamp": datetime.now(timezone.utc).isoformat()
-                })
-                yield completion_payload
-                print(f"DEBUG: 'finished' status sent successfully")
+                })}
+            async for event in event_bus.subscribe(thread_id, after_seq, run_id=run_id):
+                yield {"id": str(event.seq), "data": event.for_mode(event_mode)}
+        except SubscriberOverflow:
+            # Client fell too far behind: end the stream, it reconnects with Last-Event-ID and catches up
+            logger.warning("Slow client on thread %s disconnected (queue overflow)", thread_id)
 
-        except asyncio.CancelledError:
-            print(f"Stream cancelled for thread {thread_id}")
-            should_cleanup_thread = False  # Don't cleanup on cancellation
-            raise
-        except Exception as e:
-            print(f"ERROR in event_generator: {str(e)}")
-            import traceback
-            print(f"Full traceback: {traceback.format_exc()}")
-            
-            # Send error to frontend
-            error_payload = json.dumps({
-                "status": "error",
-                "error": str(e),
-                "thread_id": thread_id,
+    # Return EventSourceResponse with proper headers
+    return EventSourceResponse(
+        event_generator(),
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Headers": "Cache-Control",
+            **(headers or {}),
+        },
+        ping=SSE_PING_SECONDS,
+    )
+
+
+# ==================== Single round-trip streaming ====================
+# POST the request and read the SSE stream from the same response, instead of
+# POST /graph/stream/create|resume followed by GET /graph/stream/{thread_id}.
+# The run config is stored and claimed within this request, so it cannot expire or be
+# picked up by another worker in between. A dropped stream can still be reattached with
+# GET /graph/stream/{thread_id} (and Last-Event-ID) while the run is replayable.
+
+def _require_streaming_resources() -> None:
+    if shared_resources.get('graph') is None or shared_resources.get('run_supervisor') is None:
+        raise HTTPException(
+            status_code=503,
+            detail="The graph application is not available or has not been initialized."
+        )
+
+
+@router.post("/graph/run")
+async def start_graph_run(request: InitialInput, event_mode: str = ARTIFACT_EVENT_MODE):
+    """
+    Start a new thread and stream its run.
+
+    The new thread id is in the X-Thread-Id header and in the first ("connected") event.
+    """
+    _require_streaming_resources()
+    _check_event_mode(event_mode)
+    _check_run_capacity()
+
+    thread_id, run_id, duplicate = await asyncio.to_thread(_create_new_thread, request)
+    run_data = {"run_id": run_id} if duplicate else await asyncio.to_thread(run_configs.get, thread_id)
+    return await _start_or_subscribe(
+        thread_id, run_data or {"run_id": run_id}, event_mode,
+        headers={"X-Thread-Id": thread_id}, subscribe_only=duplicate
+    )
+
+
+@router.post("/graph/run/resume")
+async def resume_graph_run(request: EnhancedResumeRequest, event_mode: str = ARTIFACT_EVENT_MODE):
+    """Resume a thread (feedback, routing choice or artifact feedback) and stream the run"""
+    _require_streaming_resources()
+    _check_event_mode(event_mode)
+
+    thread_id = request.thread_id
+    run_config = _resume_run_config(request)
+    run_id, duplicate = await asyncio.to_thread(_store_resume, request, run_config)
+    return await _start_or_subscribe(
+        thread_id, {**run_config, "run_id": run_id}, event_mode,
+        headers={"X-Thread-Id": thread_id}, subscribe_only=duplicate
+    )
+
+
+def _tag_thread_event(thread_id: str, run_id: Optional[str], seq: int, data: str) -> str:
+    """Wrap an already-serialized event with its thread (string concat, the payload is not re-parsed)"""
+    return f'{{"thread_id":{json.dumps(thread_id)},"run_id":{json.dumps(run_id)},"seq":{seq},"event":{data}}}'
+
+
+@router.get("/graph/stream")
+async def stream_threads(thread_ids: str, event_mode: str = ARTIFACT_EVENT_MODE, replay: bool = True):
+    """
+    Watch many threads over one SSE connection.
+
+    Every message is {"thread_id", "run_id", "seq", "event"} where "event" is the payload
+    /graph/stream/{thread_id} would have sent. This only subscribes to runs (started via
+    the per-thread stream), so any number of dashboards share the same graph execution.
+
+    Args:
+        thread_ids: Comma-separated thread ids
+        event_mode: "full", "lite" or "delta" for artifact events
+        replay: Start with the buffered events of each thread's current run
+    """
+    ids = list(dict.fromkeys(tid.strip() for tid in thread_ids.split(",") if tid.strip()))
+    if not ids:
+        raise HTTPException(status_code=400, detail="thread_ids must list at least one thread id")
+    if len(ids) > MULTIPLEX_MAX_THREADS:
+        raise HTTPException(status_code=400, detail=f"At most {MULTIPLEX_MAX_THREADS} thread ids per stream")
+    _check_event_mode(event_mode)
+
+    event_bus = shared_resources.get('event_bus')
+    if event_bus is None:
+        raise HTTPException(
+            status_code=503,
+            detail="The graph application is not available or has not been initialized."
+        )
+
+    async def event_generator():
+        # Bounded: when the client is slow the forwarders wait, and the per-thread queues apply the overflow policy
+        merged: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+        async def forward(thread_id: str):
+            try:
+                async for run_id, event in event_bus.watch(thread_id, replay=replay):
+                    await merged.put(_tag_thread_event(thread_id, run_id, event.seq, event.for_mode(event_mode)))
+            except SubscriberOverflow:
+                await merged.put(None)
+
+        forwarders = [asyncio.create_task(forward(thread_id)) for thread_id in ids]
+        try:
+            yield json.dumps({
+                "status": "connected",
+                "thread_ids": ids,
                 "timestamp": datetime.now(timezone.utc).isoformat()
             })
-            yield error_payload
+            while True:
+                data = await merged.get()
+                if data is None:
+                    logger.warning("Slow multiplexed client disconnected (queue overflow)")
+                    return
+                yield data
         finally:
-            print(f"=== EVENT GENERATOR FINISHED for thread {thread_id} ===")
-            # Only cleanup thread if we should (i.e., not waiting for feedback/routing)
-            if should_cleanup_thread and thread_id in run_configs:
-                print(f"DEBUG: Cleaning up thread_id={thread_id} from run_configs")
-                del run_configs[thread_id]
-            else:
-                print(f"DEBUG: Keeping thread_id={thread_id} alive for future requests")
+            for task in forwarders:
+                task.cancel()
+            await asyncio.gather(*forwarders, return_exceptions=True)
 
-    # Return EventSourceResponse with proper headers
     return EventSourceResponse(
         event_generator(),
         headers={
@@ -978,5 +1445,6 @@ async def stream_graph(request: Request, thread_id: str):
             "Connection": "keep-alive",
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Headers": "Cache-Control"
-        }
-    )
\ No newline at end of file
+        },
+        ping=SSE_PING_SECONDS,
+    )
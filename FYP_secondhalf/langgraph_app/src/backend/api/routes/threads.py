@@ -0,0 +1,195 @@
+# src/backend/api/routes/threads.py
+
+import os
+import sys
+import logging
+from dataclasses import asdict
+from typing import List, Optional
+
+# --- Path setup ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+# --- FastAPI ---
+from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi.responses import Response
+
+# --- Project-specific imports ---
+from backend.core.startup import shared_resources
+from backend.db.db_utils import (
+    ARTIFACT_METADATA_FIELDS,
+    CONVERSATION_METADATA_FIELDS,
+    aget_artifact_from_db,
+    aget_artifacts_page,
+    aget_conversations_page,
+)
+from backend.path_global_file import HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE
+from backend.utils.artifact_utils import canonical_json, content_hash, serialize_artifact_content
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against our ETag (weak comparison, as RFC 9110 requires for GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+async def _find_artifact_content(thread_id: str, artifact_id: str):
+    """
+    Look up the serialized content of an artifact.
+
+    The graph state is checked first (it holds artifacts that may not be saved yet),
+    then MongoDB for artifacts that are no longer in the checkpoint.
+
+    Returns:
+        Tuple of (found, metadata dict, content data)
+    """
+    graph = shared_resources.get('graph')
+    if graph is not None:
+        config = {"configurable": {"thread_id": thread_id}}
+        current_state = await graph.aget_state(config)
+        if current_state and current_state.values:
+            for artifact in current_state.values.get('artifacts', []):
+                if artifact.id == artifact_id:
+                    metadata = {
+                        "artifact_type": artifact.content_type.value if hasattr(artifact.content_type, 'value') else str(artifact.content_type),
+                        "version": artifact.version,
+                    }
+                    return True, metadata, serialize_artifact_content(artifact.content)
+
+    artifact_doc = await aget_artifact_from_db(thread_id, artifact_id)
+    if artifact_doc:
+        metadata = {
+            "artifact_type": artifact_doc.get("artifact_type"),
+            "version": artifact_doc.get("version"),
+        }
+        return True, metadata, artifact_doc.get("content")
+
+    return False, {}, None
+
+
+@router.get("/threads/resumable")
+async def list_resumable_threads(status: Optional[str] = None):
+    """
+    List the threads that can be picked up again (most recently active first).
+
+    "awaiting_input" threads wait for artifact feedback or a routing choice; "interrupted"
+    ones were cut off mid-run by a restart and continue when streamed.
+    """
+    registry = shared_resources.get('resumable_threads')
+    if registry is None:
+        raise HTTPException(status_code=503, detail="Thread recovery is not available")
+    return {"threads": [asdict(entry) for entry in registry.list(status)]}
+
+
+async def _ensure_hot(thread_id: str) -> None:
+    """Restore the thread if the archival job moved it out of MongoDB (the graph paths do this themselves)"""
+    archive = shared_resources.get('thread_archive')
+    if archive is not None:
+        await archive.ensure_hot(thread_id)
+
+
+def _requested_fields(fields: str, metadata_fields: List[str]) -> Optional[List[str]]:
+    """Field list of a `fields` query parameter: "metadata", "all" or comma-separated names"""
+    if fields == "all":
+        return None
+    if fields == "metadata":
+        return list(metadata_fields)
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+@router.get("/threads/{thread_id}/artifacts")
+async def list_artifacts(
+    thread_id: str,
+    fields: str = "metadata",
+    artifact_type: Optional[str] = None,
+    limit: int = Query(default=HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    """
+    One page of the thread's saved artifacts, newest first.
+
+    `fields` is "metadata" (the default: no content, the bodies are fetched one at a time
+    from /threads/{thread_id}/artifacts/{artifact_id}), "all", or comma-separated field
+    names. Pass the returned next_cursor as `cursor` for the next page.
+    """
+    try:
+        await _ensure_hot(thread_id)
+        page = await aget_artifacts_page(
+            thread_id, artifact_type, _requested_fields(fields, ARTIFACT_METADATA_FIELDS), limit, cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Failed to list artifacts of thread %s: %s", thread_id, e)
+        raise HTTPException(status_code=503, detail="Artifact history is not available")
+    return {"thread_id": thread_id, **page}
+
+
+@router.get("/threads/{thread_id}/conversations")
+async def list_conversations(
+    thread_id: str,
+    fields: str = "all",
+    limit: int = Query(default=HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    order: str = Query(default="asc", pattern="^(asc|desc)$"),
+):
+    """
+    One page of the thread's conversation messages, oldest first ("desc": newest first).
+
+    `fields` and `cursor` work as for the artifact list; a cursor continues in the order
+    it was returned for.
+    """
+    try:
+        await _ensure_hot(thread_id)
+        page = await aget_conversations_page(
+            thread_id, _requested_fields(fields, CONVERSATION_METADATA_FIELDS), limit, cursor, order == "desc",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Failed to list conversations of thread %s: %s", thread_id, e)
+        raise HTTPException(status_code=503, detail="Conversation history is not available")
+    return {"thread_id": thread_id, **page}
+
+
+@router.get("/threads/{thread_id}/artifacts/{artifact_id}")
+async def get_artifact_content(
+    thread_id: str,
+    artifact_id: str,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """
+    Return the body (content) of an artifact.
+
+    Used together with "lite" artifact events: the event carries the content hash,
+    and the strong ETag of this response is that same hash (weakened to W/"..." when
+    the response is compressed), so clients can cache bodies and revalidate them with
+    If-None-Match (304 when unchanged).
+    """
+    found, metadata, content_data = await _find_artifact_content(thread_id, artifact_id)
+    if not found:
+        raise HTTPException(status_code=404, detail=f"Artifact {artifact_id} not found in thread {thread_id}")
+
+    etag = f'"{content_hash(content_data)}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "X-Artifact-Type": str(metadata.get("artifact_type")),
+        "X-Artifact-Version": str(metadata.get("version")),
+    }
+
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(
+        content=canonical_json(content_data).encode("utf-8"),
+        media_type="application/json",
+        headers=headers,
+    )
@@ -0,0 +1,197 @@
+"""
+admission.py
+
+Admission control for graph runs.
+
+At most RUN_MAX_CONCURRENT runs execute at once on this worker; further runs wait in a
+bounded queue (RUN_MAX_QUEUED), ordered by priority and then arrival (or arrival only
+with ADMISSION_QUEUE_POLICY = "fifo"). Resumes default to a higher priority than new
+runs, so conversations already in progress are not stuck behind a burst of new ones.
+
+A full queue rejects the run straight away (429 with a Retry-After estimated from recent
+run durations), and a run that waits longer than RUN_MAX_QUEUE_WAIT_SECONDS gives up,
+so under overload latency stays bounded instead of every run timing out together.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+
+from backend.path_global_file import (
+    RUN_MAX_CONCURRENT,
+    RUN_MAX_QUEUED,
+    RUN_MAX_QUEUE_WAIT_SECONDS,
+    ADMISSION_QUEUE_POLICY,
+    ADMISSION_DEFAULT_RETRY_AFTER_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+PRIORITY_RESUME = 0
+PRIORITY_NEW_RUN = 10
+
+
+class AdmissionRejected(Exception):
+    """The wait queue is full; the client should retry after `retry_after` seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Run queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionTimeout(Exception):
+    """A queued run waited longer than the queue wait limit"""
+
+
+@dataclass(order=True)
+class Ticket:
+    priority: int
+    seq: int
+    thread_id: str = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+    started_at: Optional[float] = field(compare=False, default=None)
+
+
+class AdmissionController:
+    """
+    Caps concurrent graph runs and queues the rest.
+
+    Args:
+        max_running: Runs executing at once
+        max_waiting: Runs allowed to wait for a slot (more are rejected)
+        max_wait: Seconds a run may wait before giving up
+        policy: "priority" (priority, then arrival) or "fifo" (arrival only)
+    """
+
+    def __init__(
+        self,
+        max_running: int = RUN_MAX_CONCURRENT,
+        max_waiting: int = RUN_MAX_QUEUED,
+        max_wait: float = RUN_MAX_QUEUE_WAIT_SECONDS,
+        policy: str = ADMISSION_QUEUE_POLICY,
+    ):
+        if policy not in ("priority", "fifo"):
+            raise ValueError(f"Unknown admission queue policy: {policy}")
+        self.max_running = max(1, max_running)
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.policy = policy
+        self._seq = itertools.count()
+        self._waiting: List[Ticket] = []
+        self._running: Dict[int, Ticket] = {}  # by seq
+        self._changed = asyncio.Event()
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_wait_seconds = 0.0
+        self._avg_run_seconds: Optional[float] = None
+
+    def has_capacity(self) -> bool:
+        """Whether a new run would be accepted (run now or queued)"""
+        return len(self._waiting) < self.max_waiting or (len(self._running) < self.max_running and not self._waiting)
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up"""
+        if self._avg_run_seconds is None:
+            return ADMISSION_DEFAULT_RETRY_AFTER_SECONDS
+        estimate = self._avg_run_seconds * (len(self._waiting) + 1) / self.max_running
+        return max(1, min(math.ceil(estimate), math.ceil(self.max_wait)))
+
+    def admit(self, thread_id: str, priority: int = PRIORITY_NEW_RUN) -> Ticket:
+        """
+        Take a slot for the thread's run, or a place in the queue.
+
+        Returns:
+            The ticket to wait on (wait_turn) and to release when the run ends
+
+        Raises:
+            AdmissionRejected: If the queue is full
+        """
+        ticket = Ticket(priority if self.policy == "priority" else 0, next(self._seq), thread_id)
+        if len(self._running) < self.max_running and not self._waiting:
+            self._start(ticket)
+            return ticket
+        if len(self._waiting) >= self.max_waiting:
+            self.rejected += 1
+            logger.warning("Run queue full (%d waiting), rejecting run for thread %s", len(self._waiting), thread_id)
+            raise AdmissionRejected(self.retry_after())
+        heapq.heappush(self._waiting, ticket)
+        self.queued += 1
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """1-based position of a queued ticket (0 once it runs)"""
+        if ticket.started_at is not None:
+            return 0
+        return 1 + sum(1 for other in self._waiting if other < ticket)
+
+    async def wait_turn(self, ticket: Ticket) -> AsyncIterator[int]:
+        """
+        Yield the ticket's queue position whenever it changes, until the run may start.
+
+        Raises:
+            AdmissionTimeout: After waiting max_wait seconds (the ticket leaves the queue)
+        """
+        deadline = ticket.enqueued_at + self.max_wait
+        last_position = None
+        while ticket.started_at is None:
+            position = self.position(ticket)
+            if position != last_position:
+                last_position = position
+                yield position
+            changed = self._changed
+            try:
+                await asyncio.wait_for(changed.wait(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                if ticket.started_at is None:
+                    self.timed_out += 1
+                    logger.warning("Run for thread %s gave up after %.0fs in the queue", ticket.thread_id, self.max_wait)
+                    self.release(ticket)
+                    raise AdmissionTimeout(f"Run for thread {ticket.thread_id} waited more than {self.max_wait}s")
+
+    def release(self, ticket: Ticket) -> None:
+        """Free the ticket's slot (or queue place) and start the next queued runs"""
+        if ticket.seq in self._running:
+            del self._running[ticket.seq]
+            duration = time.monotonic() - ticket.started_at
+            self._avg_run_seconds = duration if self._avg_run_seconds is None else 0.8 * self._avg_run_seconds + 0.2 * duration
+        elif ticket in self._waiting:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+        else:
+            return
+        while self._waiting and len(self._running) < self.max_running:
+            self._start(heapq.heappop(self._waiting))
+        self._notify()
+
+    def _start(self, ticket: Ticket) -> None:
+        ticket.started_at = time.monotonic()
+        self.max_wait_seconds = max(self.max_wait_seconds, ticket.started_at - ticket.enqueued_at)
+        self._running[ticket.seq] = ticket
+        self.admitted += 1
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "max_running": self.max_running,
+            "running": len(self._running),
+            "waiting": len(self._waiting),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "avg_run_seconds": round(self._avg_run_seconds, 3) if self._avg_run_seconds is not None else None,
+            "retry_after": self.retry_after(),
+        }
@@ -0,0 +1,134 @@
+"""
+Benchmark: bytes on the wire for a typical full run, with and without compression.
+
+Replays the events of one full workflow run (classification -> system requirements ->
+requirements model with diagram -> SRS, plus one feedback revision) through
+CompressionMiddleware on a real EventSourceResponse, then a Mongo-style history
+JSON response and a PDF export, and reports the bytes sent per encoding.
+
+Usage:
+    python -m backend.core.bench_compression
+"""
+
+import sys
+import os
+import json
+import asyncio
+import base64
+from datetime import datetime, timezone
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from sse_starlette.sse import EventSourceResponse
+from starlette.responses import JSONResponse, Response
+
+from backend.core.compression import CompressionMiddleware, brotli
+from backend.path_global_file import BASE_DIR, COMPRESSION_MINIMUM_SIZE
+
+SAMPLE_DIAGRAM = BASE_DIR / "output" / "diagram_20251008_142729.png"
+SAMPLE_PDF = BASE_DIR / "output" / "pdf samples" / "software_requirement_specs_Archivist_v1.3.pdf"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _requirements(n: int, key: str) -> list:
+    features = ["food diary", "meal recommendations", "community reviews", "delivery integration", "offline mode"]
+    return [
+        {
+            "requirement_id": f"R{i + 1}",
+            key: f"The system shall support {features[i % len(features)]} so that users can log meals, "
+                 f"track dietary habits and receive personalised insights (item {i + 1}).",
+            "category": "Functional" if i % 3 else "Non-functional",
+            "priority": ["High", "Medium", "Low"][i % 3],
+        }
+        for i in range(n)
+    ]
+
+
+def typical_run_events() -> list:
+    """The JSON payloads of one full run, in the order the stream sends them"""
+    diagram_b64 = base64.b64encode(SAMPLE_DIAGRAM.read_bytes()).decode("utf-8") if SAMPLE_DIAGRAM.exists() else "A" * 60000
+    srs_section = "The Food Diary & Recommendation System lets users log meals and get recommendations. " * 40
+
+    artifacts = [
+        ("requirements_classification", "Analyst", {"req_class_id": _requirements(20, "requirement_text")}),
+        ("system_requirements", "Analyst", {"srl": _requirements(30, "requirement_statement")}),
+        ("requirements_model", "Analyst", {"diagram_base64": diagram_b64, "diagram_path": "/tmp/diagram.png",
+                                           "uml_fmt_content": "@startuml\nactor User\n" + "usecase UC\n" * 40 + "@enduml"}),
+        ("software_requirement_specs", "Archivist", {"brief_introduction": srs_section, "product_description": srs_section,
+                                                     "functional_requirements": srs_section, "non_functional_requirements": srs_section,
+                                                     "reference_documents_id": ["system_requirements_Analyst_v1.0"], "references": srs_section}),
+    ]
+
+    events = [{"status": "connected", "thread_id": "bench", "timestamp": _now()},
+              {"status": "processing", "event_type": "start", "thread_id": "bench"}]
+    for version in ("1.0", "1.1"):
+        for artifact_type, agent, content in artifacts:
+            artifact_id = f"{artifact_type}_{agent}_v{version}"
+            events.append({"chat_type": "conversation", "content": f"{agent} produced {artifact_type} v{version}.",
+                           "node": artifact_type, "agent": agent, "artifact_id": artifact_id, "timestamp": _now()})
+            events.append({"chat_type": "artifact", "artifact_id": artifact_id, "artifact_type": artifact_type, "agent": agent,
+                           "content": content, "node": artifact_type, "version": version, "timestamp": _now(), "status": "completed"})
+            events.append({"chat_type": "artifact_feedback_required", "status": "artifact_feedback_required",
+                           "pending_artifact_id": artifact_id, "thread_id": "bench", "timestamp": _now()})
+    events.append({"status": "finished", "thread_id": "bench", "timestamp": _now()})
+    return events
+
+
+async def _wire_bytes(response_factory, accept_encoding: str) -> tuple:
+    """Run one request through the middleware and count (body bytes sent, number of body messages)"""
+    sent = {"bytes": 0, "messages": 0}
+
+    async def app(scope, receive, send):
+        await response_factory()(scope, receive, send)
+
+    middleware = CompressionMiddleware(app, minimum_size=COMPRESSION_MINIMUM_SIZE)
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+
+    async def receive():
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            sent["bytes"] += len(message.get("body", b""))
+            sent["messages"] += 1
+
+    await middleware(scope, receive, send)
+    return sent["bytes"], sent["messages"]
+
+
+async def main():
+    events = typical_run_events()
+    history = [event for event in events if event.get("chat_type") in ("artifact", "conversation")]
+    pdf_bytes = SAMPLE_PDF.read_bytes() if SAMPLE_PDF.exists() else b"%PDF-1.4\n" + b"0" * 20000
+
+    async def sse_events():
+        for event in events:
+            yield json.dumps(event)
+
+    cases = {
+        "SSE full run": lambda: EventSourceResponse(sse_events(), ping=3600),
+        "history JSON": lambda: JSONResponse(history),
+        "PDF export": lambda: Response(pdf_bytes, media_type="application/pdf"),
+    }
+    encodings = [("identity", "identity"), ("gzip", "gzip")]
+    if brotli is not None:
+        encodings.append(("br", "br"))
+    else:
+        print("(brotli not installed - only gzip is benchmarked)")
+
+    print(f"{'response':<16}{'encoding':<10}{'bytes':>12}{'ratio':>8}{'chunks':>8}")
+    for name, factory in cases.items():
+        baseline = None
+        for label, accept in encodings:
+            size, messages = await _wire_bytes(factory, accept)
+            baseline = baseline or size
+            print(f"{name:<16}{label:<10}{size:>12,}{size / baseline:>8.2f}{messages:>8}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Benchmark: cost of one hot-path diagnostic line per node update.
+
+Compares the old unconditional print(f"...") with the leveled logger call that replaced
+it, with DEBUG disabled (the production default), enabled, and enabled with sampling.
+Each op formats a node update the way the streaming loop does (node name, thread id
+and the keys of the state update).
+
+Usage:
+    python -m backend.core.bench_logging
+"""
+
+import sys
+import os
+import io
+import time
+import logging
+import contextlib
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from backend.core.logging_config import ContextFilter, DebugSampler, KeyValueFormatter, bind_log_context
+
+ITERATIONS = 100_000
+
+NODE_UPDATE = {
+    "messages": ["..."] * 12,
+    "artifacts": [{"id": f"system_requirements_Analyst_v1.{i}"} for i in range(6)],
+    "conversations": ["..."] * 8,
+    "current_agent": "Analyst",
+    "pending_artifact_id": "system_requirements_Analyst_v1.5",
+}
+
+
+def _bench_logger(level: int, sample_every: int = 1) -> logging.Logger:
+    logger = logging.getLogger("backend.bench_logging")
+    logger.handlers.clear()
+    logger.propagate = False
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(KeyValueFormatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s'))
+    handler.addFilter(ContextFilter())
+    handler.addFilter(DebugSampler(sample_every))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return logger
+
+
+def _per_op_us(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def main():
+    node_name, thread_id = "write_system_requirement", "3f2c9a"
+    bind_log_context(thread_id=thread_id)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        old_print = _per_op_us(
+            lambda: print(f"DEBUG: Processing node '{node_name}' for thread {thread_id}, update keys: {list(NODE_UPDATE.keys())}, update: {NODE_UPDATE}")
+        )
+
+    cases = {"print f-string (old)": old_print}
+    for label, level, sample_every in [
+        ("logger.debug, DEBUG off", logging.INFO, 1),
+        ("logger.debug, DEBUG on", logging.DEBUG, 1),
+        ("logger.debug, DEBUG on, 1/100", logging.DEBUG, 100),
+    ]:
+        logger = _bench_logger(level, sample_every)
+        cases[label] = _per_op_us(
+            lambda: logger.debug("Processing node '%s', update keys: %s, update: %s", node_name, list(NODE_UPDATE.keys()), NODE_UPDATE)
+        )
+
+    print(f"{'call':<34}{'us/op':>10}{'vs old':>10}")
+    for label, us in cases.items():
+        print(f"{label:<34}{us:>10.3f}{us / old_print:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
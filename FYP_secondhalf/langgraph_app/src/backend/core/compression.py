@@ -0,0 +1,218 @@
+"""
+compression.py
+
+Negotiated gzip / brotli response compression that also works for SSE streams.
+
+Starlette's GZipMiddleware skips text/event-stream and buffers inside the compressor,
+which would hold artifact events back. Here every body message of a streaming
+response is compressed and sync-flushed on its own, so each SSE event reaches the
+client as soon as it is produced. Small non-streaming responses (below
+minimum_size) are sent uncompressed.
+
+Every response that could be encoded carries `Vary: Accept-Encoding` (whether or not this
+one was), and a strong ETag is weakened (W/"...") on encoded responses and on 304s to
+requests that accept an encoding: RFC 9110 requires strong validators to differ between
+content-codings, weak ones may be shared, and If-None-Match uses the weak comparison.
+
+Brotli is optional: if the `brotli` package is not installed only gzip is offered.
+"""
+
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is an optional dependency
+    brotli = None
+
+# Already-compressed formats gain nothing from another pass
+EXCLUDED_CONTENT_TYPE_PREFIXES = ("image/", "video/", "audio/", "application/zip", "application/gzip")
+
+
+class _GzipStream:
+    """Incremental gzip compressor (wbits=31 gives the gzip header and trailer)"""
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        output = self._compressor.compress(data)
+        if flush:
+            output += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return output
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    """Incremental brotli compressor"""
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality, mode=brotli.MODE_TEXT)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        output = self._compressor.process(data)
+        if flush:
+            output += self._compressor.flush()
+        return output
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+def weak_etag(etag: str) -> str:
+    """The weak form (W/"...") of an entity tag"""
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported content-coding from an Accept-Encoding header.
+
+    Returns:
+        "br", "gzip" or None (identity)
+    """
+    preferences = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        preferences[token] = quality
+
+    supported = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        quality = preferences.get(encoding, preferences.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with the encoding negotiated from Accept-Encoding.
+
+    Args:
+        app: The wrapped ASGI app
+        minimum_size: Non-streaming bodies smaller than this (bytes) are sent as-is
+        gzip_level: zlib compression level (1-9)
+        brotli_quality: brotli quality (0-11)
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        # Even without an acceptable encoding the response is wrapped, for its Vary header
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        responder = _CompressionResponder(send, encoding, self)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Per-request state: holds the response start until the first body chunk decides compression"""
+
+    def __init__(self, send: Send, encoding: Optional[str], middleware: CompressionMiddleware):
+        self._send = send
+        self._encoding = encoding
+        self._middleware = middleware
+        self._start_message: Optional[Message] = None
+        self._stream = None
+        self._passthrough = False
+
+    def _new_stream(self):
+        if self._encoding == "br":
+            return _BrotliStream(self._middleware.brotli_quality)
+        return _GzipStream(self._middleware.gzip_level)
+
+    @staticmethod
+    def _negotiable(headers: Headers) -> bool:
+        """Whether the response could be sent encoded (so its representation depends on Accept-Encoding)"""
+        if "content-encoding" in headers:
+            return False
+        return not headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPE_PREFIXES)
+
+    @staticmethod
+    def _weaken_etag(headers: MutableHeaders) -> None:
+        if "etag" in headers:
+            headers["ETag"] = weak_etag(headers["etag"])
+
+    def _start(self, message: Message) -> bool:
+        """Add the negotiation headers to the response start; False if the body passes through as-is"""
+        headers = MutableHeaders(raw=message["headers"])
+        if not self._negotiable(headers):
+            return False
+        headers.add_vary_header("Accept-Encoding")
+        if self._encoding is None:
+            return False
+        if message["status"] == 304:
+            # Validates the representation a 200 would have sent: the encoded one
+            self._weaken_etag(headers)
+        return message["status"] not in (204, 304)
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self._start_message = message
+            self._passthrough = not self._start(message)
+            if self._passthrough:
+                await self._send(message)
+            return
+
+        if message_type != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._stream is None:
+            if not more_body and len(body) < self._middleware.minimum_size:
+                # Small single-chunk response: not worth compressing
+                self._passthrough = True
+                await self._send(self._start_message)
+                await self._send(message)
+                return
+
+            self._stream = self._new_stream()
+            headers = MutableHeaders(raw=self._start_message["headers"])
+            headers["Content-Encoding"] = self._encoding
+            self._weaken_etag(headers)
+            if more_body:
+                # Streaming: length unknown, each chunk is flushed so SSE events are delivered immediately
+                del headers["Content-Length"]
+                await self._send(self._start_message)
+            else:
+                compressed = self._stream.finish(body)
+                headers["Content-Length"] = str(len(compressed))
+                await self._send(self._start_message)
+                await self._send({"type": "http.response.body", "body": compressed, "more_body": False})
+                return
+
+        if more_body:
+            chunk = self._stream.compress(body, flush=True)
+        else:
+            chunk = self._stream.finish(body)
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
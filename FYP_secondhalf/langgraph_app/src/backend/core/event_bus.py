@@ -0,0 +1,376 @@
+"""
+event_bus.py
+
+In-process pub/sub for graph run events, one channel per thread.
+
+A run (see run_supervisor.py) publishes already-serialized JSON strings to the
+channel of its thread; every SSE connection watching that thread subscribes to
+the channel. Events get an increasing sequence number (sent as the SSE `id`) and
+the channel keeps a replay buffer of the current run, so a tab that connects late,
+or reconnects with Last-Event-ID, receives what it missed without re-running the graph.
+watch() follows a thread across runs, for clients that observe many threads at once.
+
+Artifact events can be rendered differently per event mode ("full", "lite", "delta");
+the rendering is done at most once per mode and shared by all subscribers.
+
+Publishing never waits for subscribers. Each subscriber has a bounded queue; when a
+slow client lets it fill up, the overflow policy decides what happens:
+- "drop": discard queued status-only events (connected / processing)
+- "coalesce": like "drop", and also skip the oldest queued version of an artifact type
+  when a newer version arrives (the next version is then sent in full, not as a delta)
+- "disconnect": end the subscription right away
+If nothing can be discarded the subscriber is disconnected as well; it can reconnect
+with Last-Event-ID and catch up from the replay buffer.
+"""
+
+import asyncio
+import json
+import time
+import logging
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple, Union
+
+from backend.path_global_file import (
+    RUN_REPLAY_BUFFER_SIZE,
+    RUN_CHANNEL_RETENTION_SECONDS,
+    SUBSCRIBER_QUEUE_SIZE,
+    SUBSCRIBER_OVERFLOW_POLICY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BusEvent:
+    """
+    One published event.
+
+    Args:
+        data: The serialized JSON payload (the "full" form)
+        render: Optional callable(event_mode) -> str for events whose payload depends on the event mode
+    """
+
+    __slots__ = ("seq", "data", "_render", "_rendered", "_kind")
+
+    def __init__(self, data: str, render: Optional[Callable[[str], str]] = None):
+        self.seq = 0
+        self.data = data
+        self._render = render
+        self._rendered: Dict[str, str] = {}
+        self._kind = None
+
+    @property
+    def kind(self) -> Tuple[str, Optional[str]]:
+        """(event kind, coalesce key): only needed when a queue overflows, so parsed lazily"""
+        if self._kind is None:
+            try:
+                payload = json.loads(self.data)
+            except ValueError:
+                payload = {}
+            if not isinstance(payload, dict):
+                payload = {}
+            kind = payload.get("chat_type") or payload.get("status") or "unknown"
+            coalesce_key = f"artifact:{payload.get('artifact_type')}" if kind == "artifact" else None
+            self._kind = (kind, coalesce_key)
+        return self._kind
+
+    def for_mode(self, event_mode: str) -> str:
+        """Serialized payload for the subscriber's event mode (cached per mode)"""
+        if self._render is None:
+            return self.data
+        if event_mode not in self._rendered:
+            self._rendered[event_mode] = self._render(event_mode)
+        return self._rendered[event_mode]
+
+
+class Channel:
+    """Events and subscribers of the current run of one thread"""
+
+    def __init__(self, thread_id: str, run_id: Optional[str], replay_size: int):
+        self.thread_id = thread_id
+        self.run_id = run_id
+        self.events: deque = deque(maxlen=replay_size)
+        self.subscribers = set()
+        self.next_seq = 1
+        self.closed = False
+        self.closed_at: Optional[float] = None
+
+
+class ResyncedEvent:
+    """
+    An event delivered after a coalesced (skipped) version of the same artifact: in "delta"
+    mode the client no longer has the patch base, so it gets the full form instead.
+    """
+
+    __slots__ = ("event",)
+
+    def __init__(self, event: BusEvent):
+        self.event = event
+
+    @property
+    def seq(self) -> int:
+        return self.event.seq
+
+    @property
+    def data(self) -> str:
+        return self.event.data
+
+    def for_mode(self, event_mode: str) -> str:
+        return self.event.for_mode("full" if event_mode == "delta" else event_mode)
+
+
+class SubscriberOverflow(Exception):
+    """A subscriber fell too far behind and was disconnected"""
+
+
+OVERFLOW_POLICIES = {"drop", "coalesce", "disconnect"}
+
+# Status-only events a lagging subscriber can lose without missing state
+DROPPABLE_KINDS = {"connected", "processing"}
+
+
+class Subscription:
+    """Bounded event queue of one subscriber"""
+
+    def __init__(self, bus: "EventBus", max_size: int, policy: str):
+        self.bus = bus
+        self.max_size = max_size
+        self.policy = policy
+        self.queue: deque = deque()
+        self.resync_keys = set()
+        self.ended = False
+        self.overflowed = False
+        self._wakeup = asyncio.Event()
+
+    def offer(self, event: BusEvent) -> None:
+        """Queue an event (never blocks the publisher), applying the overflow policy when full"""
+        if self.ended:
+            return
+        if len(self.queue) >= self.max_size and not self._make_room(event):
+            self.overflowed = True
+            self.bus.overflow_disconnects += 1
+            logger.warning("Subscriber disconnected: queue full (%d events)", len(self.queue))
+            self.end()
+            return
+        self.queue.append(event)
+        self.bus.queue_high_watermark = max(self.bus.queue_high_watermark, len(self.queue))
+        self._wakeup.set()
+
+    def _make_room(self, incoming: BusEvent) -> bool:
+        if self.policy == "disconnect":
+            return False
+
+        for index, queued in enumerate(self.queue):
+            if queued.kind[0] in DROPPABLE_KINDS:
+                del self.queue[index]
+                self.bus.dropped_events += 1
+                return True
+
+        coalesce_key = incoming.kind[1]
+        if self.policy == "coalesce" and coalesce_key is not None:
+            for index, queued in enumerate(self.queue):
+                if queued.kind[1] == coalesce_key:
+                    del self.queue[index]
+                    self.resync_keys.add(coalesce_key)
+                    self.bus.coalesced_events += 1
+                    return True
+        return False
+
+    def end(self) -> None:
+        self.ended = True
+        self._wakeup.set()
+
+    async def get(self) -> Union[BusEvent, ResyncedEvent, None]:
+        """Next event, None once the run is over; raises SubscriberOverflow if disconnected"""
+        while True:
+            if self.overflowed:
+                raise SubscriberOverflow()
+            if self.queue:
+                event = self.queue.popleft()
+                coalesce_key = event.kind[1] if self.resync_keys else None
+                if coalesce_key in self.resync_keys:
+                    self.resync_keys.discard(coalesce_key)
+                    return ResyncedEvent(event)
+                return event
+            if self.ended:
+                return None
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+
+class EventBus:
+    """
+    Per-thread channels with replay.
+
+    Args:
+        replay_size: Events kept per channel for late/reconnecting subscribers
+        retention_seconds: How long a finished run's channel stays available for replay
+    """
+
+    def __init__(self, replay_size: int = RUN_REPLAY_BUFFER_SIZE, retention_seconds: float = RUN_CHANNEL_RETENTION_SECONDS,
+                 queue_size: int = SUBSCRIBER_QUEUE_SIZE, overflow_policy: str = SUBSCRIBER_OVERFLOW_POLICY):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.replay_size = replay_size
+        self.retention_seconds = retention_seconds
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self._channels: Dict[str, Channel] = {}
+        self._open_waiters: Dict[str, set] = {}
+
+        # Metrics (see stats())
+        self.published_events = 0
+        self.dropped_events = 0
+        self.coalesced_events = 0
+        self.overflow_disconnects = 0
+        self.queue_high_watermark = 0
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        expired = [
+            thread_id for thread_id, channel in self._channels.items()
+            if channel.closed and not channel.subscribers and now - channel.closed_at > self.retention_seconds
+        ]
+        for thread_id in expired:
+            del self._channels[thread_id]
+
+    def open(self, thread_id: str, run_id: Optional[str] = None) -> Channel:
+        """Start a fresh channel for a new run of the thread (ends the previous run's subscriptions)"""
+        self._purge_expired()
+        previous = self._channels.get(thread_id)
+        if previous is not None and not previous.closed:
+            self.close(thread_id)
+        channel = Channel(thread_id, run_id, self.replay_size)
+        self._channels[thread_id] = channel
+        for waiter in self._open_waiters.pop(thread_id, ()):
+            waiter.set()
+        return channel
+
+    def channel(self, thread_id: str) -> Optional[Channel]:
+        """The current (running or recently finished) channel of the thread, if any"""
+        self._purge_expired()
+        return self._channels.get(thread_id)
+
+    def publish(self, thread_id: str, event: Union[str, BusEvent]) -> BusEvent:
+        """Append an event to the thread's channel and hand it to every subscriber"""
+        channel = self._channels.get(thread_id)
+        if channel is None or channel.closed:
+            channel = self.open(thread_id)
+
+        if not isinstance(event, BusEvent):
+            event = BusEvent(event)
+        event.seq = channel.next_seq
+        channel.next_seq += 1
+        channel.events.append(event)
+        self.published_events += 1
+
+        for subscription in list(channel.subscribers):
+            subscription.offer(event)
+        return event
+
+    def close(self, thread_id: str) -> None:
+        """Mark the thread's run as finished; subscribers stop after the buffered events"""
+        channel = self._channels.get(thread_id)
+        if channel is None or channel.closed:
+            return
+        channel.closed = True
+        channel.closed_at = time.time()
+        for subscription in channel.subscribers:
+            subscription.end()
+
+    async def subscribe(self, thread_id: str, after_seq: Optional[int] = None,
+                        run_id: Optional[str] = None) -> AsyncIterator[BusEvent]:
+        """
+        Yield the thread's events: first the buffered ones (after `after_seq` if given), then live
+        ones until the run finishes. Cancelling the consumer only unsubscribes; the run is unaffected.
+
+        Args:
+            run_id: Subscribe to this run of the thread, waiting for its channel to open if it is
+                    queued behind the current run (the caller makes sure it will run)
+
+        Raises:
+            SubscriberOverflow: The consumer fell behind and its queue overflowed
+        """
+        channel = self.channel(thread_id)
+        while run_id is not None and (channel is None or channel.run_id != run_id):
+            await self._wait_for_open(thread_id)
+            channel = self._channels.get(thread_id)
+        if channel is None:
+            return
+        async for event in self._subscribe_channel(channel, after_seq):
+            yield event
+
+    async def watch(self, thread_id: str, replay: bool = True) -> AsyncIterator[Tuple[Optional[str], BusEvent]]:
+        """
+        Follow a thread across runs, yielding (run_id, event) until the consumer stops.
+
+        Args:
+            replay: Start with the buffered events of the current run; otherwise only
+                    events published from now on are yielded
+        """
+        last_channel = None
+        while True:
+            channel = self._channels.get(thread_id)
+            if channel is None or channel is last_channel:
+                await self._wait_for_open(thread_id)
+                continue
+
+            after_seq = channel.next_seq - 1 if last_channel is None and not replay else None
+            last_channel = channel
+            async for event in self._subscribe_channel(channel, after_seq):
+                yield channel.run_id, event
+
+    async def _wait_for_open(self, thread_id: str) -> None:
+        """Wait for the next run of this thread (no await before the waiter is registered)"""
+        waiter = asyncio.Event()
+        self._open_waiters.setdefault(thread_id, set()).add(waiter)
+        try:
+            await waiter.wait()
+        finally:
+            waiters = self._open_waiters.get(thread_id)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._open_waiters[thread_id]
+
+    async def _subscribe_channel(self, channel: Channel, after_seq: Optional[int]) -> AsyncIterator[BusEvent]:
+        thread_id = channel.thread_id
+
+        # No await between taking the backlog and registering the subscription, so nothing is missed.
+        # The backlog is bounded by the replay buffer and bypasses the queue limit.
+        backlog = [event for event in channel.events if after_seq is None or event.seq > after_seq]
+        subscription = Subscription(self, self.queue_size, self.overflow_policy)
+        if channel.closed:
+            subscription.end()
+        channel.subscribers.add(subscription)
+        logger.debug("Subscriber added to thread %s (%d subscribers)", thread_id, len(channel.subscribers))
+
+        try:
+            for event in backlog:
+                yield event
+            while True:
+                event = await subscription.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            channel.subscribers.discard(subscription)
+            logger.debug("Subscriber removed from thread %s (%d subscribers)", thread_id, len(channel.subscribers))
+
+    def stats(self) -> Dict[str, object]:
+        """Queue depth and drop counters for the metrics endpoint"""
+        subscriptions = [sub for channel in self._channels.values() for sub in channel.subscribers]
+        depths = [len(sub.queue) for sub in subscriptions]
+        return {
+            "channels": len(self._channels),
+            "running_channels": sum(1 for channel in self._channels.values() if not channel.closed),
+            "subscribers": len(subscriptions),
+            "queue_size": self.queue_size,
+            "overflow_policy": self.overflow_policy,
+            "queue_depth_max": max(depths, default=0),
+            "queue_depth_total": sum(depths),
+            "queue_high_watermark": self.queue_high_watermark,
+            "published_events": self.published_events,
+            "dropped_events": self.dropped_events,
+            "coalesced_events": self.coalesced_events,
+            "overflow_disconnects": self.overflow_disconnects,
+        }
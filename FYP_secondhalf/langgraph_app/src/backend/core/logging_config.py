@@ -0,0 +1,172 @@
+"""
+logging_config.py
+
+Logging setup for the backend.
+
+- Levels: the app ("backend.*") loggers log at DEBUG when DEBUG_MODE is on, LOG_LEVEL
+  otherwise; LOG_MODULE_LEVELS (or the LOG_MODULE_LEVELS env var,
+  "backend.graph_logic.flow=DEBUG,backend.db=WARNING") overrides single modules.
+- Lazy: call sites use logger.debug("... %s", value), so a disabled DEBUG line costs
+  one level check; expensive diagnostics are wrapped in logger.isEnabledFor(logging.DEBUG).
+- Structured: bind_log_context(thread_id=...) tags every record logged in the current
+  task (graph nodes included) and the fields are appended as key=value, or emitted as
+  JSON lines with LOG_FORMAT = "json".
+- Sampling: with LOG_DEBUG_SAMPLE_EVERY = N only every N-th DEBUG record per call site
+  is written (INFO and above are never sampled).
+"""
+
+import os
+import sys
+import json
+import logging
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from backend.path_global_file import (
+    DEBUG_MODE,
+    LOG_LEVEL,
+    LOG_MODULE_LEVELS,
+    LOG_DEBUG_SAMPLE_EVERY,
+    LOG_FORMAT,
+    LOG_FILE,
+)
+
+_log_context: ContextVar[Dict[str, object]] = ContextVar("log_context", default={})
+
+# Third-party loggers that are too chatty below these levels
+NOISY_LOGGERS = {
+    "langgraph_api": logging.CRITICAL,
+    "langgraph_runtime_inmem": logging.CRITICAL,
+    "langgraph.runtime": logging.CRITICAL,
+    "langgraph.server": logging.CRITICAL,
+    "watchfiles": logging.CRITICAL,
+    "httpcore": logging.CRITICAL,
+    "httpx": logging.CRITICAL,
+    "urllib3": logging.CRITICAL,
+    "uvicorn": logging.CRITICAL,
+    "fastapi": logging.CRITICAL,
+    "langgraph": logging.WARNING,
+    "langchain": logging.WARNING,
+    "pymongo": logging.WARNING,
+}
+
+APP_LOGGERS = ("backend", "__main__")
+
+
+def bind_log_context(**fields) -> object:
+    """
+    Add fields (e.g. thread_id) to every record logged from the current task.
+
+    Returns:
+        A token for reset_log_context()
+    """
+    return _log_context.set({**_log_context.get(), **fields})
+
+
+def reset_log_context(token) -> None:
+    _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the bound context onto the record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _log_context.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps one in `every` DEBUG records per call site"""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, int(every))
+        self._counts: Dict[tuple, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno > logging.DEBUG:
+            return True
+        site = (record.pathname, record.lineno)
+        count = self._counts.get(site, 0)
+        self._counts[site] = count + 1
+        return count % self.every == 0
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Plain text line with the bound context appended as key=value pairs"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = getattr(record, "context", None)
+        if context:
+            line += " " + " ".join(f"{key}={value}" for key, value in context.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", None) or {})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """Parse "module=LEVEL,module=LEVEL" (as used by the LOG_MODULE_LEVELS env var)"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(
+    debug_mode: bool = DEBUG_MODE,
+    level: str = LOG_LEVEL,
+    module_levels: Optional[Dict[str, str]] = None,
+    sample_every: int = LOG_DEBUG_SAMPLE_EVERY,
+    log_format: str = LOG_FORMAT,
+    log_file: Optional[str] = LOG_FILE,
+) -> None:
+    """
+    Configure root handlers and the levels of the app and third-party loggers.
+
+    Environment variables LOG_LEVEL, LOG_MODULE_LEVELS and LOG_FORMAT override the config values.
+    """
+    level = os.getenv("LOG_LEVEL", level).upper()
+    log_format = os.getenv("LOG_FORMAT", log_format)
+    levels = dict(LOG_MODULE_LEVELS if module_levels is None else module_levels)
+    levels.update(parse_module_levels(os.getenv("LOG_MODULE_LEVELS", "")))
+
+    formatter = (
+        JsonFormatter() if log_format == "json"
+        else KeyValueFormatter('%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+    )
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, mode='w'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        handler.addFilter(ContextFilter())
+        handler.addFilter(DebugSampler(sample_every))
+
+    logging.basicConfig(level=logging.WARNING, handlers=handlers, force=True)
+
+    for name, noisy_level in NOISY_LOGGERS.items():
+        logging.getLogger(name).setLevel(noisy_level)
+
+    app_level = logging.DEBUG if debug_mode else level
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(app_level)
+
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level)
@@ -0,0 +1,149 @@
+"""
+recovery.py
+
+Registry of the threads a client can pick up again after a restart.
+
+Checkpoints are kept across restarts (CHECKPOINT_RESET_ON_STARTUP = False), so on boot the
+lifespan rebuilds this registry from the checkpoint database:
+
+- "awaiting_input": the graph paused for artifact feedback (paused_for_feedback) or stopped
+  before a routing choice (interrupt_before handle_routing_decision). Streaming the thread
+  re-sends the prompt, and the usual resume requests continue it.
+- "interrupted": the graph still has `next` nodes but was waiting for nothing, i.e. its run
+  was cut off by a crash or shutdown. A "recover" run config is stored for it, so the next
+  stream of the thread continues from the last checkpoint instead of starting over.
+
+Runs keep the registry up to date while the app is up (record when a run pauses or is
+cancelled, discard when it finishes).
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+from uuid import uuid4
+
+from backend.path_global_file import RECOVERY_MAX_THREADS
+
+logger = logging.getLogger(__name__)
+
+AWAITING_INPUT = "awaiting_input"
+INTERRUPTED = "interrupted"
+
+# Node the graph is compiled to interrupt before (flow.py)
+ROUTING_INTERRUPT_NODE = "handle_routing_decision"
+
+
+@dataclass
+class ResumableThread:
+    thread_id: str
+    status: str  # AWAITING_INPUT or INTERRUPTED
+    next_nodes: List[str] = field(default_factory=list)
+    pending_artifact_id: Optional[str] = None
+    updated_at: float = field(default_factory=time.time)
+
+
+def describe_thread(thread_id: str, state) -> Optional[ResumableThread]:
+    """
+    Classify a thread from its checkpointed state (graph.aget_state).
+
+    Returns:
+        The registry entry, or None if the thread has finished (or never ran)
+    """
+    if state is None or not state.values:
+        return None
+    next_nodes = list(state.next or ())
+    if state.values.get("paused_for_feedback"):
+        artifacts = state.values.get("artifacts") or []
+        pending_artifact_id = artifacts[-1].id if artifacts else None
+        return ResumableThread(thread_id, AWAITING_INPUT, next_nodes, pending_artifact_id)
+    if ROUTING_INTERRUPT_NODE in next_nodes:
+        return ResumableThread(thread_id, AWAITING_INPUT, next_nodes)
+    if next_nodes:
+        return ResumableThread(thread_id, INTERRUPTED, next_nodes)
+    return None
+
+
+async def list_checkpoint_threads(conns: Sequence, limit: int = RECOVERY_MAX_THREADS) -> List[str]:
+    """Thread ids in the checkpoint databases (one connection per shard), most recently checkpointed first"""
+    latest = []
+    for conn in conns:
+        # Checkpoint ids are time-ordered (uuid6), so MAX() is the latest checkpoint of a thread
+        async with conn.execute(
+            "SELECT thread_id, MAX(checkpoint_id) AS latest FROM checkpoints WHERE checkpoint_ns = '' "
+            "GROUP BY thread_id ORDER BY latest DESC LIMIT ?",
+            (limit,),
+        ) as cursor:
+            latest += [tuple(row) async for row in cursor]
+    latest.sort(key=lambda row: row[1], reverse=True)
+    return [thread_id for thread_id, _ in latest[:limit]]
+
+
+class ResumableThreadRegistry:
+    """In-memory registry of resumable threads (rebuilt from the checkpoints on startup)"""
+
+    def __init__(self):
+        self._threads: Dict[str, ResumableThread] = {}
+        self.recovered_runs = 0
+
+    def __contains__(self, thread_id: str) -> bool:
+        return thread_id in self._threads
+
+    def __len__(self) -> int:
+        return len(self._threads)
+
+    def get(self, thread_id: str) -> Optional[ResumableThread]:
+        return self._threads.get(thread_id)
+
+    def list(self, status: Optional[str] = None) -> List[ResumableThread]:
+        threads = sorted(self._threads.values(), key=lambda entry: entry.updated_at, reverse=True)
+        return [entry for entry in threads if status is None or entry.status == status]
+
+    def record(self, entry: ResumableThread) -> None:
+        self._threads[entry.thread_id] = entry
+
+    def discard(self, thread_id: str) -> None:
+        self._threads.pop(thread_id, None)
+
+    async def rebuild(self, graph, conns: Sequence, run_configs=None, limit: int = RECOVERY_MAX_THREADS) -> int:
+        """
+        Scan the latest checkpoints and register the threads that can be resumed.
+
+        Args:
+            graph: Compiled graph (reads each thread's state through its checkpointer)
+            conns: aiosqlite connections of the checkpoint databases (one per shard)
+            run_configs: Run config store; interrupted runs get a "recover" config in it
+                (unless the thread already has a pending config)
+            limit: Most recently active threads to scan
+
+        Returns:
+            Number of resumable threads found
+        """
+        self._threads.clear()
+        for thread_id in await list_checkpoint_threads(conns, limit):
+            try:
+                state = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+            except Exception as e:
+                logger.warning("Could not read the checkpoint of thread %s: %s", thread_id, e)
+                continue
+            entry = describe_thread(thread_id, state)
+            if entry is None:
+                continue
+            self.record(entry)
+            if entry.status == INTERRUPTED and run_configs is not None:
+                if run_configs.add(thread_id, {"type": "recover", "run_id": uuid4().hex}) is None:
+                    self.recovered_runs += 1
+
+        logger.info(
+            "Recovered %d resumable threads (%d awaiting input, %d interrupted runs)",
+            len(self), len(self.list(AWAITING_INPUT)), len(self.list(INTERRUPTED)),
+        )
+        return len(self)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "resumable_threads": len(self),
+            "awaiting_input": len(self.list(AWAITING_INPUT)),
+            "interrupted": len(self.list(INTERRUPTED)),
+            "recovered_runs": self.recovered_runs,
+        }
@@ -0,0 +1,185 @@
+"""
+run_supervisor.py
+
+Runs graph executions as background asyncio tasks, detached from the HTTP request
+that asked for them.
+
+The task iterates the run's event producer and publishes every event to the
+thread's channel on the EventBus. SSE connections only subscribe to that channel,
+so a slow or disconnected client never stalls or cancels the run, and several
+tabs can watch one thread while the graph runs once.
+
+Runs of one thread are serialised: each thread has an ordered queue of pending runs
+(e.g. an artifact accept followed quickly by a routing choice) drained by a single task,
+so two runs never race on the thread's checkpoint (graph.astream / aupdate_state).
+Each thread has its own task, so runs of different threads are never serialised.
+
+On shutdown the supervisor drains: it stops taking new runs (`draining`), lets running
+ones finish for RUN_SHUTDOWN_TIMEOUT_SECONDS, then cancels the rest; queued runs that
+never started are handed back through their `on_discard` callback.
+"""
+
+import asyncio
+import inspect
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from backend.core.event_bus import BusEvent, EventBus
+from backend.path_global_file import RUN_SHUTDOWN_TIMEOUT_SECONDS, THREAD_MAX_PENDING_RUNS
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadQueueFull(Exception):
+    """Too many runs are already queued for the thread"""
+
+
+class RunSupervisor:
+    """
+    Owns the background run tasks of this worker (one task per busy thread).
+
+    Args:
+        event_bus: Bus the runs publish their events to
+        max_pending: Runs that may wait behind a thread's current run
+    """
+
+    def __init__(self, event_bus: EventBus, max_pending: int = THREAD_MAX_PENDING_RUNS):
+        self.event_bus = event_bus
+        self.max_pending = max_pending
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._pending: Dict[str, Deque[Tuple[Optional[str], AsyncIterator[Union[str, BusEvent]], Optional[Callable[[], None]]]]] = {}
+        self.draining = False
+        self.started_runs = 0
+        self.queued_runs = 0
+        self.failed_runs = 0
+        self.cancelled_runs = 0
+
+    def is_running(self, thread_id: str) -> bool:
+        task = self._tasks.get(thread_id)
+        return task is not None and not task.done()
+
+    def running_threads(self) -> list:
+        return [thread_id for thread_id in self._tasks if self.is_running(thread_id)]
+
+    def is_pending(self, thread_id: str, run_id: Optional[str]) -> bool:
+        """Whether the run is queued behind the thread's current run"""
+        return run_id is not None and any(pending_id == run_id for pending_id, _, _ in self._pending.get(thread_id, ()))
+
+    def pending_runs(self, thread_id: str) -> List[Optional[str]]:
+        return [run_id for run_id, _, _ in self._pending.get(thread_id, ())]
+
+    def start(self, thread_id: str, events: AsyncIterator[Union[str, BusEvent]], run_id: Optional[str] = None) -> bool:
+        """
+        Start publishing `events` (an async generator of serialized events) for an idle thread.
+
+        Returns:
+            False if a run for this thread is still in progress (nothing is started)
+        """
+        if self.is_running(thread_id):
+            return False
+        self.submit(thread_id, events, run_id)
+        return True
+
+    def submit(self, thread_id: str, events: AsyncIterator[Union[str, BusEvent]], run_id: Optional[str] = None,
+               on_discard: Optional[Callable[[], Any]] = None) -> int:
+        """
+        Run `events` after the thread's current and already queued runs.
+
+        An idle thread starts right away, with its channel opened before this returns, so a
+        subscriber attaching right after sees the run from its first event. `on_discard` is
+        called instead if a queued run is dropped by shutdown before it started (and awaited
+        if it returns an awaitable, e.g. asyncio.to_thread() of a blocking store call).
+
+        Returns:
+            Number of runs ahead of this one (0 if it started)
+
+        Raises:
+            ThreadQueueFull: If max_pending runs are already waiting for the thread
+        """
+        if not self.is_running(thread_id):
+            self.event_bus.open(thread_id, run_id)
+            self._pending[thread_id] = deque()
+            self._tasks[thread_id] = asyncio.create_task(
+                self._drain(thread_id, run_id, events), name=f"graph-run-{thread_id}"
+            )
+            return 0
+
+        pending = self._pending.setdefault(thread_id, deque())
+        if len(pending) >= self.max_pending:
+            raise ThreadQueueFull(f"{len(pending)} runs are already queued for thread {thread_id}")
+        pending.append((run_id, events, on_discard))
+        self.queued_runs += 1
+        logger.info("Queued run %s of thread %s behind %d runs", run_id, thread_id, len(pending))
+        return len(pending)
+
+    async def _drain(self, thread_id: str, run_id: Optional[str], events: AsyncIterator[Union[str, BusEvent]]) -> None:
+        """Run the thread's first run (its channel already open), then its queued runs in order"""
+        pending = self._pending[thread_id]
+        try:
+            self.started_runs += 1
+            await self._run(thread_id, events)
+            while pending:
+                run_id, events, _ = pending.popleft()
+                self.event_bus.open(thread_id, run_id)
+                self.started_runs += 1
+                await self._run(thread_id, events)
+        finally:
+            # Cancelled by shutdown: give back the runs that never started
+            while pending:
+                run_id, _, on_discard = pending.popleft()
+                logger.info("Dropping queued run %s of thread %s", run_id, thread_id)
+                if on_discard is not None:
+                    try:
+                        result = on_discard()
+                        if inspect.isawaitable(result):
+                            await result
+                    except Exception:
+                        logger.exception("Discard callback of run %s of thread %s failed", run_id, thread_id)
+            if self._pending.get(thread_id) is pending:
+                del self._pending[thread_id]
+            if self._tasks.get(thread_id) is asyncio.current_task():
+                del self._tasks[thread_id]
+
+    async def _run(self, thread_id: str, events: AsyncIterator[Union[str, BusEvent]]) -> None:
+        try:
+            async for event in events:
+                self.event_bus.publish(thread_id, event)
+        except asyncio.CancelledError:
+            logger.info("Run for thread %s cancelled", thread_id)
+            self.cancelled_runs += 1
+            raise
+        except Exception:
+            logger.exception("Run for thread %s failed", thread_id)
+            self.failed_runs += 1
+        finally:
+            self.event_bus.close(thread_id)
+
+    async def wait(self, thread_id: str) -> None:
+        """Wait for the thread's current and queued runs (if any) to finish"""
+        task = self._tasks.get(thread_id)
+        if task is not None:
+            await asyncio.shield(task)
+
+    async def shutdown(self, timeout: float = RUN_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Stop taking new runs, give running tasks `timeout` seconds to finish, then cancel the rest"""
+        self.draining = True
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        if not tasks:
+            return
+        logger.info("Waiting for %d running graph runs", len(tasks))
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "running_runs": len(self.running_threads()),
+            "pending_runs": sum(len(pending) for pending in self._pending.values()),
+            "started_runs": self.started_runs,
+            "queued_runs": self.queued_runs,
+            "failed_runs": self.failed_runs,
+            "cancelled_runs": self.cancelled_runs,
+        }
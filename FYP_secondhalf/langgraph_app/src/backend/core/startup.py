@@ -6,14 +6,26 @@
 """
 import sys
 import os
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 from backend.graph_logic.flow import setup_state_graph
-import aiosqlite
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
-from backend.path_global_file import SQLITE_DB
+from backend.path_global_file import SQLITE_DB, CHECKPOINT_RESET_ON_STARTUP, CHECKPOINT_SHARDS
+from backend.db.sharded_checkpointer import ShardedAsyncSqliteSaver, shard_paths
+from backend.core.event_bus import EventBus
+from backend.core.run_supervisor import RunSupervisor
+from backend.core.admission import AdmissionController
+from backend.core.recovery import ResumableThreadRegistry
+from backend.db.db_utils import (
+    acreate_indexes, artifact_search_index, artifact_vector_index, close_clients, latest_artifact_cache, open_async_client,
+)
+from backend.db.write_behind import WriteBehindQueue
+from backend.db.thread_archive import ThreadArchive
+from backend.db.reference_ingest import seed_default_documents
+import asyncio
 
+logger = logging.getLogger(__name__)
 
 shared_resources = {}
 CONN_STRING= SQLITE_DB
@@ -37,28 +49,24 @@ async def lifespan(app: FastAPI):
 
     print("--- Application starting up... ---")
 
-    # DELETE ALL SQLITE-RELATED FILES (including WAL files)
-    sqlite_files = [
-        CONN_STRING,
-        CONN_STRING + "-shm",
-        CONN_STRING + "-wal",
-        CONN_STRING + "-journal"
-    ]
-    
-    for file_path in sqlite_files:
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            print(f"✔️ Deleted: {os.path.basename(file_path)}")
-    
-    conn = await aiosqlite.connect(CONN_STRING)
-    # Set better connection settings to prevent corruption
-    await conn.execute("PRAGMA journal_mode = WAL;")
-    await conn.execute("PRAGMA synchronous = NORMAL;") 
-    await conn.execute("PRAGMA foreign_keys = ON;")
-    print(f"Database connection established to {CONN_STRING}")
+    # Checkpoints are kept across restarts so paused threads survive a deploy;
+    # CHECKPOINT_RESET_ON_STARTUP deletes all sqlite-related files (including WAL files) instead
+    if CHECKPOINT_RESET_ON_STARTUP:
+        sqlite_files = [
+            path + suffix
+            for path in shard_paths(CONN_STRING, CHECKPOINT_SHARDS)
+            for suffix in ("", "-shm", "-wal", "-journal")
+        ]
+
+        for file_path in sqlite_files:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+                print(f"✔️ Deleted: {os.path.basename(file_path)}")
     
-    memory = AsyncSqliteSaver(conn)
-    print("AsyncSqliteSaver initialized successfully")
+    # Threads are sharded over several SQLite files (one writer connection each, plus a
+    # reader pool), so checkpoint writes of concurrent runs do not queue behind one connection
+    memory = await ShardedAsyncSqliteSaver.open(CONN_STRING)
+    print(f"Checkpointer initialized with {len(memory.shards)} SQLite shards at {CONN_STRING}")
     
     # Setup the graph with the checkpointer
     Global_graph = await setup_state_graph(memory)
@@ -67,13 +75,66 @@ async def lifespan(app: FastAPI):
     # Store resources for access elsewhere
     shared_resources['checkpointer'] = memory
     shared_resources['graph'] = Global_graph
-    shared_resources['db_connection'] = conn
+    shared_resources['db_connection'] = memory.connections
+
+    # Graph runs execute in background tasks and publish to per-thread channels
+    event_bus = EventBus()
+    run_supervisor = RunSupervisor(event_bus)
+    shared_resources['event_bus'] = event_bus
+    shared_resources['run_supervisor'] = run_supervisor
+    # Caps concurrent runs; the rest queue (or get 429) instead of all starting at once
+    shared_resources['admission'] = AdmissionController()
+
+    # Threads paused for input (or cut off mid-run) before the restart, from the kept checkpoints
+    from backend.api.routes.start import run_configs  # here: the routes import this module
+    resumable_threads = ResumableThreadRegistry()
+    await resumable_threads.rebuild(Global_graph, memory.connections, run_configs)
+    shared_resources['resumable_threads'] = resumable_threads
+
+    # Async MongoDB client (pool settings in path_global_file.py), or the embedded SQLite store
+    # with PERSISTENCE_BACKEND = "sqlite". Saves from the stream loop are batched behind the
+    # runs; indexes are created in the background so an unreachable MongoDB does not hold up
+    # startup
+    shared_resources['mongo_client'] = await open_async_client()
+    index_task = asyncio.create_task(acreate_indexes())
+    persistence_queue = WriteBehindQueue()
+    persistence_queue.start()
+    shared_resources['persistence_queue'] = persistence_queue
+    # Latest-artifact read cache of db_utils (hit rate on /metrics)
+    shared_resources['artifact_cache'] = latest_artifact_cache
+    # Full-text index the artifact saves feed (GET /search)
+    shared_resources['search_index'] = artifact_search_index
+    # Chunk embeddings the Archivist retrieves reference material from, with the default
+    # operating environment list as a reference document on first start
+    shared_resources['vector_index'] = artifact_vector_index
+    try:
+        await asyncio.to_thread(seed_default_documents, artifact_vector_index)
+    except Exception:
+        logger.warning("Default reference documents not ingested", exc_info=True)
+    # Threads idle past THREAD_ARCHIVE_TTL_SECONDS move to compressed bundles on disk; the
+    # checkpointer restores one before any operation on it
+    thread_archive = ThreadArchive(
+        memory, is_busy=lambda thread_id: run_supervisor.is_running(thread_id) or bool(run_supervisor.pending_runs(thread_id)),
+    )
+    thread_archive.recover()
+    thread_archive.start()
+    shared_resources['thread_archive'] = thread_archive
     
     yield  # Application runs here
     
     print("--- Application shutting down... ---")
+
+    # Drain: no new runs, running graphs get to finish (the rest are cancelled and recovered
+    # by the next worker from their checkpoint) before the checkpointer goes away
+    await run_supervisor.shutdown()
+    await thread_archive.close()
+    # ...then write what they queued for MongoDB
+    await persistence_queue.close()
+    await index_task
+    await close_clients()
+    artifact_search_index.close()
+    artifact_vector_index.close()
+    latest_artifact_cache.close()
     
-    if hasattr(memory, 'aclose'):
-        await memory.aclose()
-    await conn.close()
+    await memory.aclose()
     print("Database connections closed cleanly.")
\ No newline at end of file
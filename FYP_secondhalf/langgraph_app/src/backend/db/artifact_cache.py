@@ -0,0 +1,297 @@
+"""
+artifact_cache.py
+
+Read-through cache of get_latest_artifact_version: the latest artifact of each
+(thread_id, artifact_type), kept in an in-process LRU so the export and UI paths that ask
+for the same latest SRS / requirement model again and again do not query MongoDB each time.
+
+Every artifact write in db_utils invalidates the keys it touches. With several API
+workers, the other processes hear about it through an invalidation channel:
+
+- "sqlite": an append-only log table in RUN_CONFIG_DB, polled by every worker at most
+  every ARTIFACT_CACHE_SYNC_SECONDS (a lightweight stand-in for a Redis pub/sub channel)
+- "memory": no channel, only correct with a single worker
+
+A lookup that races a write cannot put back what it read before the write: put() is
+ignored when an invalidation happened since the generation() taken before the read.
+"""
+
+import asyncio
+import copy
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend.path_global_file import (
+    ARTIFACT_CACHE_SIZE,
+    ARTIFACT_CACHE_INVALIDATION,
+    ARTIFACT_CACHE_SYNC_SECONDS,
+    RUN_CONFIG_DB,
+)
+
+logger = logging.getLogger(__name__)
+
+# (thread_id, artifact_type); an artifact_type of None stands for every type of the thread
+CacheKey = Tuple[str, Optional[str]]
+
+# Invalidation log rows older than this are pruned; a worker that slept through pruned
+# rows notices the gap and clears its whole cache
+INVALIDATION_RETENTION_SECONDS = 10 * 60
+
+
+class InvalidationChannel(ABC):
+    """Broadcasts invalidated keys to the caches of the other worker processes."""
+
+    @abstractmethod
+    def publish(self, keys: List[CacheKey]) -> None:
+        """Send the keys to the other processes."""
+
+    @abstractmethod
+    def poll(self) -> Optional[List[CacheKey]]:
+        """
+        Keys invalidated by other processes since the last poll.
+
+        Returns:
+            The keys, or None if some were missed (the cache must be cleared)
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteInvalidationChannel(InvalidationChannel):
+    """Invalidation log in a SQLite (WAL) file shared by all worker processes on the host."""
+
+    def __init__(self, db_path: str = RUN_CONFIG_DB, channel: str = "latest_artifacts"):
+        self.channel = channel
+        self.origin = uuid.uuid4().hex  # our own rows are skipped: they were applied locally
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL;")
+        self._conn.execute("PRAGMA synchronous = NORMAL;")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_invalidations (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                origin TEXT NOT NULL,
+                keys TEXT NOT NULL,
+                published_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_invalidations_published ON cache_invalidations (published_at)")
+        self._last_seq = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidations").fetchone()[0]
+
+    def publish(self, keys):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO cache_invalidations (channel, origin, keys, published_at) VALUES (?, ?, ?, ?)",
+                (self.channel, self.origin, json.dumps(keys), now),
+            )
+            self._conn.execute(
+                "DELETE FROM cache_invalidations WHERE published_at < ?", (now - INVALIDATION_RETENTION_SECONDS,)
+            )
+
+    def poll(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, channel, origin, keys FROM cache_invalidations WHERE seq > ? ORDER BY seq",
+                (self._last_seq,),
+            ).fetchall()
+            if not rows:
+                return []
+            # AUTOINCREMENT never reuses a seq: a hole right after ours means pruned rows we never saw
+            missed = rows[0][0] > self._last_seq + 1
+            self._last_seq = rows[-1][0]
+        if missed:
+            return None
+        return [
+            (thread_id, artifact_type)
+            for _, channel, origin, keys in rows if channel == self.channel and origin != self.origin
+            for thread_id, artifact_type in json.loads(keys)
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_invalidation_channel(backend: str = ARTIFACT_CACHE_INVALIDATION) -> Optional[InvalidationChannel]:
+    """Invalidation channel of the configured backend ("sqlite" or "memory": none)."""
+    if backend == "sqlite":
+        return SqliteInvalidationChannel()
+    if backend == "memory":
+        return None
+    raise ValueError(f"Unknown ARTIFACT_CACHE_INVALIDATION backend: {backend!r}")
+
+
+class LatestArtifactCache:
+    """
+    LRU of latest-artifact documents keyed by (thread_id, artifact_type).
+
+    Safe to call from any thread (the write-behind workers write through db_utils too).
+    Documents are copied in and out, so callers may modify what they get.
+
+    Args:
+        capacity: Maximum number of entries, 0 disables caching
+        channel: Cross-worker invalidation channel, None for a single worker
+        sync_seconds: How often lookups poll the channel (the cross-worker staleness bound)
+    """
+
+    def __init__(self, capacity: int = ARTIFACT_CACHE_SIZE, channel: Optional[InvalidationChannel] = None,
+                 sync_seconds: float = ARTIFACT_CACHE_SYNC_SECONDS):
+        self.capacity = capacity
+        self.channel = channel
+        self.sync_seconds = sync_seconds
+        self._entries: "OrderedDict[CacheKey, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._last_sync = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+
+    def _sync_due(self) -> bool:
+        """Whether to poll the channel now (the next lookups skip it for sync_seconds)"""
+        if self.channel is None or time.monotonic() - self._last_sync < self.sync_seconds:
+            return False
+        self._last_sync = time.monotonic()
+        return True
+
+    def _poll(self) -> Optional[List[CacheKey]]:
+        try:
+            return self.channel.poll()
+        except Exception as e:
+            logger.warning("Could not poll artifact cache invalidations, clearing the cache: %s", e)
+            return None
+
+    def _apply(self, keys: Optional[List[CacheKey]]) -> None:
+        if keys is None:
+            self.clear()
+        elif keys:
+            self.remote_invalidations += len(keys)
+            self._drop(keys)
+
+    def _sync(self) -> None:
+        if self._sync_due():
+            self._apply(self._poll())
+
+    async def _async_sync(self) -> None:
+        if self._sync_due():
+            self._apply(await asyncio.to_thread(self._poll))
+
+    def get(self, thread_id: str, artifact_type: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        Returns:
+            Tuple of (hit, a copy of the cached document; None is a cached "no such artifact")
+        """
+        self._sync()
+        return self._lookup(thread_id, artifact_type)
+
+    async def aget(self, thread_id: str, artifact_type: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """get() for the event loop: the channel is polled from a worker thread"""
+        await self._async_sync()
+        return self._lookup(thread_id, artifact_type)
+
+    def _lookup(self, thread_id: str, artifact_type: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        with self._lock:
+            key = (thread_id, artifact_type)
+            if key not in self._entries:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, copy.deepcopy(self._entries[key])
+
+    def generation(self) -> int:
+        """Take before reading the database, pass to put()"""
+        with self._lock:
+            return self._generation
+
+    def put(self, thread_id: str, artifact_type: str, doc: Optional[Dict[str, Any]], generation: int) -> None:
+        """Cache a document read from the database, unless it was invalidated meanwhile"""
+        if self.capacity <= 0:
+            return
+        value = copy.deepcopy(doc)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[(thread_id, artifact_type)] = value
+            self._entries.move_to_end((thread_id, artifact_type))
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _drop(self, keys: Iterable[CacheKey]) -> None:
+        keys = list(keys)
+        thread_ids = {thread_id for thread_id, artifact_type in keys if artifact_type is None}
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+            if thread_ids:
+                for key in [key for key in self._entries if key[0] in thread_ids]:
+                    del self._entries[key]
+
+    def invalidate(self, keys: Iterable[CacheKey]) -> None:
+        """
+        Drop the keys here and broadcast them to the other workers.
+
+        Args:
+            keys: (thread_id, artifact_type) pairs, (thread_id, None) for every type of a thread
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return
+        self.invalidations += len(keys)
+        self._drop(keys)
+        if self.channel is not None:
+            try:
+                self.channel.publish(keys)
+            except Exception as e:
+                logger.error("Could not publish artifact cache invalidations %s: %s", keys, e)
+
+    async def ainvalidate(self, keys: Iterable[CacheKey]) -> None:
+        """invalidate() for the event loop: dropped here at once, published from a worker thread"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return
+        self.invalidations += len(keys)
+        self._drop(keys)
+        if self.channel is not None:
+            try:
+                await asyncio.to_thread(self.channel.publish, keys)
+            except Exception as e:
+                logger.error("Could not publish artifact cache invalidations %s: %s", keys, e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def close(self) -> None:
+        if self.channel is not None:
+            self.channel.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "remote_invalidations": self.remote_invalidations,
+        }
@@ -0,0 +1,119 @@
+"""
+Benchmark: artifact storage per thread with the "full", "delta" and "dedupe" storage modes.
+
+A repetitive workflow: every thread saves the four artifacts of a typical run
+(bench_compression.typical_run_events) and then goes through accept-without-change rounds
+that save new versions with identical bodies; a second set of threads are forks that
+save the same artifacts again. Stored bytes are the BSON sizes of the artifact and
+artifact-content documents (what MongoDB would store before compression), measured on the
+embedded store; "written" is the BSON size of the documents the saves sent.
+
+Usage:
+    python -m backend.db.bench_artifact_storage
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import bson
+
+from backend.core.bench_compression import typical_run_events
+from backend.db import db_utils
+from backend.db.embedded_store import EmbeddedCollection
+
+THREADS = 10
+ACCEPT_ROUNDS = 3
+FORKS = 10
+MODES = ["full", "delta", "dedupe"]
+
+
+def _artifacts():
+    seen, artifacts = set(), []
+    for event in typical_run_events():
+        if event.get("chat_type") == "artifact" and event["artifact_type"] not in seen:
+            seen.add(event["artifact_type"])
+            artifacts.append(event)
+    return artifacts
+
+
+def _versions(artifact):
+    # v1.0, then one identical version per accept-without-change round
+    for round_ in range(ACCEPT_ROUNDS + 1):
+        version = f"1.{round_}"
+        yield {**artifact, "version": version, "artifact_id": artifact["artifact_id"].rsplit("_v", 1)[0] + f"_v{version}"}
+
+
+def _stored_bytes() -> int:
+    db = db_utils.get_client()[db_utils.APP_DATABASE_NAME]
+    return sum(
+        len(bson.encode(doc))
+        for name in ("artifacts", db_utils.CONTENT_COLLECTION) for doc in db[name].find()
+    )
+
+
+def _bench_mode(directory: str, mode: str) -> dict:
+    asyncio.run(db_utils.close_clients())
+    db_utils.PERSISTENCE_BACKEND = "sqlite"
+    db_utils.EMBEDDED_DB = os.path.join(directory, f"{mode}.sqlite")
+    db_utils.ARTIFACT_STORAGE_MODE = mode
+    db_utils.create_indexes()
+
+    written = 0
+    original_replace, original_update = EmbeddedCollection._replace, EmbeddedCollection._update
+
+    def counting_replace(self, conn, filter, replacement, upsert):
+        nonlocal written
+        written += len(bson.encode(replacement))
+        return original_replace(self, conn, filter, replacement, upsert)
+
+    def counting_update(self, conn, filter, update, upsert):
+        nonlocal written
+        written += len(bson.encode(update))
+        return original_update(self, conn, filter, update, upsert)
+
+    EmbeddedCollection._replace, EmbeddedCollection._update = counting_replace, counting_update
+    artifacts = _artifacts()
+    started = time.perf_counter()
+    saves = 0
+    try:
+        for i in range(THREADS):
+            for artifact in artifacts:
+                for version in _versions(artifact):
+                    db_utils.save_artifact_to_db(f"thread-{i}", version)
+                    saves += 1
+        for i in range(FORKS):
+            for artifact in artifacts:
+                db_utils.save_artifact_to_db(f"fork-{i}", artifact)
+                saves += 1
+    finally:
+        EmbeddedCollection._replace, EmbeddedCollection._update = original_replace, original_update
+    elapsed = time.perf_counter() - started
+
+    threads = THREADS + FORKS
+    return {
+        "stored_kb_per_thread": _stored_bytes() / threads / 1024,
+        "written_kb_per_thread": written / threads / 1024,
+        "ms_per_save": elapsed / saves * 1000,
+    }
+
+
+def main():
+    db_utils.logger.setLevel("WARNING")
+    with tempfile.TemporaryDirectory() as directory:
+        results = {mode: _bench_mode(directory, mode) for mode in MODES}
+        asyncio.run(db_utils.close_clients())
+
+    print(f"{THREADS} threads x {ACCEPT_ROUNDS} accept rounds + {FORKS} forks, 4 artifacts each")
+    print(f"{'mode':<8}{'stored KB/thread':>18}{'written KB/thread':>19}{'ms/save':>9}")
+    for mode, result in results.items():
+        print(f"{mode:<8}{result['stored_kb_per_thread']:>18.1f}{result['written_kb_per_thread']:>19.1f}{result['ms_per_save']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
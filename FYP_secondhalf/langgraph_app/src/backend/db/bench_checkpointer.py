@@ -0,0 +1,96 @@
+"""
+Benchmark: checkpoint write throughput with concurrent threads, one SQLite file vs shards.
+
+Every thread runs a small graph whose nodes each add an artifact-sized chunk to the state,
+so every super-step writes a checkpoint (aput) and its task writes (aput_writes), like a
+real run. "1 file" is the previous setup (one AsyncSqliteSaver connection for everything);
+the sharded rows use ShardedAsyncSqliteSaver with a reader pool, and each row also times a
+burst of concurrent state reads (aget_state) issued while the writes are going on.
+
+Usage:
+    python -m backend.db.bench_checkpointer
+"""
+
+import sys
+import os
+import asyncio
+import operator
+import tempfile
+import time
+from typing import Annotated, List, TypedDict
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from langgraph.graph import END, START, StateGraph
+
+from backend.db.sharded_checkpointer import ShardedAsyncSqliteSaver
+
+NODES = 6
+CHUNK = "The system shall let users log meals and receive personalised recommendations. " * 60  # ~5 KB
+CASES = [  # (label, shards, readers per shard)
+    ("1 file", 1, 0),
+    ("4 shards", 4, 2),
+    ("8 shards", 8, 2),
+]
+CONCURRENCY = [1, 8, 32]
+
+
+class _State(TypedDict):
+    artifacts: Annotated[List[str], operator.add]
+
+
+def _graph(checkpointer):
+    workflow = StateGraph(_State)
+    previous = START
+    for index in range(NODES):
+        name = f"node_{index}"
+        workflow.add_node(name, lambda state, index=index: {"artifacts": [f"{index}:{CHUNK}"]})
+        workflow.add_edge(previous, name)
+        previous = name
+    workflow.add_edge(previous, END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+async def _run_case(directory: str, shards: int, readers: int, threads: int) -> tuple:
+    saver = await ShardedAsyncSqliteSaver.open(
+        os.path.join(directory, f"bench-{shards}-{threads}.sqlite"), num_shards=shards, readers_per_shard=readers
+    )
+    graph = _graph(saver)
+    configs = [{"configurable": {"thread_id": f"thread-{i}"}} for i in range(threads)]
+    read_latencies = []
+
+    async def reads():
+        # State reads (what the stream loop and /threads do) while the runs write
+        while True:
+            started = time.perf_counter()
+            await graph.aget_state(configs[len(read_latencies) % threads])
+            read_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0)
+
+    reader = asyncio.create_task(reads())
+    started = time.perf_counter()
+    await asyncio.gather(*(graph.ainvoke({"artifacts": []}, config) for config in configs))
+    elapsed = time.perf_counter() - started
+    reader.cancel()
+    await asyncio.gather(reader, return_exceptions=True)
+    await saver.aclose()
+
+    checkpoints = threads * (NODES + 2)  # input + one per node + end
+    read_p50 = sorted(read_latencies)[len(read_latencies) // 2] * 1000 if read_latencies else 0.0
+    return checkpoints / elapsed, read_p50
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'checkpointer':<12}{'threads':>8}{'checkpoints/s':>15}{'speedup':>9}{'read p50 ms':>13}")
+        baseline = {}
+        for label, shards, readers in CASES:
+            for threads in CONCURRENCY:
+                throughput, read_p50 = await _run_case(directory, shards, readers, threads)
+                baseline.setdefault(threads, throughput)
+                print(f"{label:<12}{threads:>8}{throughput:>15,.0f}{throughput / baseline[threads]:>9.2f}{read_p50:>13.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
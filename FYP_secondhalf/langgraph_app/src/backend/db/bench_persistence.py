@@ -0,0 +1,120 @@
+"""
+Benchmark: save / load latency of the persistence backends behind db_utils.
+
+Every thread saves the artifacts and conversations of a typical run (the artifact
+contents of bench_compression.typical_run_events, ~5-65 KB each) through the db_utils
+functions the app calls, then reads its history back. Each call is timed; the table shows
+p50 / p95 per call in ms. "sqlite" is the embedded store (PERSISTENCE_BACKEND = "sqlite",
+a temporary file); "mongo" is MONGODB_URI and is skipped when no server answers. The
+benchmark threads are deleted again afterwards.
+
+Usage:
+    python -m backend.db.bench_persistence
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from backend.core.bench_compression import typical_run_events
+from backend.db import db_utils
+
+THREADS = 20
+CONVERSATIONS_PER_ARTIFACT = 2
+OPERATIONS = [
+    "save_artifact", "save_conversation", "get_artifacts", "get_conversations", "get_latest", "get_artifact",
+]
+
+
+def _run_documents():
+    artifacts = [event for event in typical_run_events() if event.get("chat_type") == "artifact"]
+    conversations = [
+        {"content": f"{artifact['agent']} produced {artifact['artifact_type']} ({i}).", "agent": artifact["agent"],
+         "artifact_id": artifact["artifact_id"], "timestamp": artifact["timestamp"], "node": artifact["node"]}
+        for artifact in artifacts for i in range(CONVERSATIONS_PER_ARTIFACT)
+    ]
+    return artifacts, conversations
+
+
+def _mongo_reachable() -> bool:
+    if not db_utils.uri:
+        return False
+    try:
+        db_utils.get_client().admin.command("ping")
+        return True
+    except Exception:
+        return False
+
+
+def _use_backend(backend: str, embedded_db: str) -> None:
+    asyncio.run(db_utils.close_clients())
+    db_utils.PERSISTENCE_BACKEND = backend
+    db_utils.EMBEDDED_DB = embedded_db
+
+
+def _bench_backend() -> Dict[str, List[float]]:
+    artifacts, conversations = _run_documents()
+    latencies = defaultdict(list)
+
+    def timed(operation: str, call: Callable, *args):
+        started = time.perf_counter()
+        result = call(*args)
+        latencies[operation].append(time.perf_counter() - started)
+        return result
+
+    db_utils.create_indexes()
+    thread_ids = [f"bench-{uuid.uuid4().hex[:8]}-{i}" for i in range(THREADS)]
+    try:
+        for thread_id in thread_ids:
+            for artifact in artifacts:
+                timed("save_artifact", db_utils.save_artifact_to_db, thread_id, artifact)
+            for conversation in conversations:
+                timed("save_conversation", db_utils.save_conversation_to_db, thread_id, conversation)
+        for thread_id in thread_ids:
+            timed("get_artifacts", db_utils.get_artifacts_from_db, thread_id)
+            timed("get_conversations", db_utils.get_conversations_from_db, thread_id)
+            for artifact in artifacts[:4]:
+                timed("get_latest", db_utils.get_latest_artifact_version, thread_id, artifact["artifact_type"])
+                timed("get_artifact", db_utils.get_artifact_from_db, thread_id, artifact["artifact_id"])
+    finally:
+        for thread_id in thread_ids:
+            db_utils.delete_thread_data(thread_id)
+    return latencies
+
+
+def _percentile(latencies: List[float], q: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+
+
+def main():
+    # The per-call INFO logs of db_utils would dominate the timings
+    db_utils.logger.setLevel("WARNING")
+    with tempfile.TemporaryDirectory() as directory:
+        results = {}
+        _use_backend("sqlite", os.path.join(directory, "app_data.sqlite"))
+        results["sqlite"] = _bench_backend()
+        _use_backend("mongo", db_utils.EMBEDDED_DB)
+        if _mongo_reachable():
+            results["mongo"] = _bench_backend()
+        else:
+            print("mongo: skipped (no MongoDB server answering at MONGODB_URI)")
+        asyncio.run(db_utils.close_clients())
+
+    print(f"{THREADS} threads; latency per call in ms (p50 / p95)")
+    print(f"{'operation':<20}" + "".join(f"{backend:>18}" for backend in results))
+    for operation in OPERATIONS:
+        cells = [f"{_percentile(r[operation], 0.5):.2f} / {_percentile(r[operation], 0.95):.2f}" for r in results.values()]
+        print(f"{operation:<20}" + "".join(f"{cell:>18}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
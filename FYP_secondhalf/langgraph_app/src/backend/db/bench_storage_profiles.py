@@ -0,0 +1,174 @@
+"""
+Benchmark: checkpoint read / write latency percentiles per SQLite storage profile.
+
+A mock LLM drives the real state schema (ArtifactState) through the workflow's node
+sequence - process_user_input, classify_user_requirements, write_system_requirement,
+build_requirement_model (with its base64 diagram), write_req_specs - so checkpoints have
+realistic sizes and grow over the run (every checkpoint holds all artifacts so far).
+Several runs go concurrently; every aput / aput_writes is timed as a write, then
+random state reads (aget_state, what the stream loop and /threads do) are timed.
+
+Usage:
+    python -m backend.db.bench_storage_profiles
+"""
+
+import sys
+import os
+import asyncio
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from langgraph.graph import END, START, StateGraph
+
+from backend.core.bench_compression import typical_run_events
+from backend.db.sharded_checkpointer import ShardedAsyncSqliteSaver, shard_paths
+from backend.db.sqlite_profiles import STORAGE_PROFILES, profile_pragmas
+from backend.graph_logic.state import (
+    AgentType,
+    ArtifactState,
+    ArtifactType,
+    RequirementModel,
+    RequirementsClassificationList,
+    SoftwareRequirementSpecs,
+    SystemRequirementsList,
+    create_artifact,
+    create_conversation,
+)
+
+RUNS = 16        # concurrent threads
+READS = 2000     # state reads after the runs
+SHARDS = 4
+READERS_PER_SHARD = 2
+
+CONTENT_MODELS = {
+    ArtifactType.REQ_CLASS: RequirementsClassificationList,
+    ArtifactType.SYSTEM_REQ: SystemRequirementsList,
+    ArtifactType.REQ_MODEL: RequirementModel,
+    ArtifactType.SW_REQ_SPECS: SoftwareRequirementSpecs,
+}
+NODES = [  # (node, artifact type, agent) in workflow order
+    ("classify_user_requirements", ArtifactType.REQ_CLASS, AgentType.ANALYST),
+    ("write_system_requirement", ArtifactType.SYSTEM_REQ, AgentType.ANALYST),
+    ("build_requirement_model", ArtifactType.REQ_MODEL, AgentType.ANALYST),
+    ("write_req_specs", ArtifactType.SW_REQ_SPECS, AgentType.ARCHIVIST),
+]
+
+
+def _mock_llm_outputs() -> Dict[ArtifactType, object]:
+    """What the LLM nodes would return: the artifact contents of a typical run"""
+    contents = {}
+    for event in typical_run_events():
+        if event.get("chat_type") == "artifact":
+            artifact_type = ArtifactType(event["artifact_type"])
+            contents.setdefault(artifact_type, CONTENT_MODELS[artifact_type].model_validate(event["content"]))
+    return contents
+
+
+def _graph(checkpointer, outputs):
+    def process_user_input(state: ArtifactState):
+        return {"conversations": [create_conversation(AgentType.USER, None, state.human_request)]}
+
+    def llm_node(node, artifact_type, agent):
+        async def run(state: ArtifactState):
+            await asyncio.sleep(0)  # the LLM call
+            artifact = create_artifact(agent, artifact_type, outputs[artifact_type], thread_id="bench")
+            return {
+                "artifacts": [artifact],
+                "conversations": [create_conversation(agent, artifact.id, f"{agent.value} produced {artifact_type.value}.")],
+                "current_node": node,
+            }
+        return run
+
+    workflow = StateGraph(ArtifactState)
+    workflow.add_node("process_user_input", process_user_input)
+    workflow.add_edge(START, "process_user_input")
+    previous = "process_user_input"
+    for node, artifact_type, agent in NODES:
+        workflow.add_node(node, llm_node(node, artifact_type, agent))
+        workflow.add_edge(previous, node)
+        previous = node
+    workflow.add_edge(previous, END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+class _TimedSaver(ShardedAsyncSqliteSaver):
+    """Records the latency of every checkpoint write and read"""
+
+    write_latencies: List[float]
+    read_latencies: List[float]
+
+    async def aput(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().aput(*args, **kwargs)
+        finally:
+            self.write_latencies.append(time.perf_counter() - started)
+
+    async def aput_writes(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().aput_writes(*args, **kwargs)
+        finally:
+            self.write_latencies.append(time.perf_counter() - started)
+
+    async def aget_tuple(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().aget_tuple(*args, **kwargs)
+        finally:
+            self.read_latencies.append(time.perf_counter() - started)
+
+
+def _percentiles(latencies: List[float]) -> List[float]:
+    ordered = sorted(latencies)
+    return [ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000 for q in (0.5, 0.95, 0.99)]
+
+
+async def _bench_profile(directory: str, profile: str, outputs) -> dict:
+    base_path = os.path.join(directory, f"{profile}.sqlite")
+    saver = await _TimedSaver.open(base_path, SHARDS, READERS_PER_SHARD, profile_pragmas(profile, overrides={}))
+    saver.write_latencies, saver.read_latencies = [], []
+    graph = _graph(saver, outputs)
+    configs = [{"configurable": {"thread_id": f"bench-{i}"}} for i in range(RUNS)]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(graph.ainvoke({"human_request": "Food diary app"}, config) for config in configs))
+    run_seconds = time.perf_counter() - started
+
+    saver.read_latencies = []
+    rng = random.Random(0)
+    for _ in range(READS // 20):
+        await asyncio.gather(*(graph.aget_state(rng.choice(configs)) for _ in range(20)))
+
+    result = {
+        "write": _percentiles(saver.write_latencies),
+        "read": _percentiles(saver.read_latencies),
+        "runs_per_s": RUNS / run_seconds,
+        "size_mb": sum(
+            os.path.getsize(path + suffix)
+            for path in shard_paths(base_path, SHARDS) for suffix in ("", "-wal") if os.path.exists(path + suffix)
+        ) / 1024 / 1024,
+    }
+    await saver.aclose()
+    return result
+
+
+async def main():
+    outputs = _mock_llm_outputs()
+    print(f"{RUNS} concurrent runs, {len(NODES) + 1} nodes each, {SHARDS} shards; latencies in ms")
+    print(f"{'profile':<17}{'write p50':>10}{'p95':>8}{'p99':>8}{'read p50':>10}{'p95':>8}{'p99':>8}{'runs/s':>9}{'MB':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in STORAGE_PROFILES:
+            result = await _bench_profile(directory, profile, outputs)
+            write, read = result["write"], result["read"]
+            print(f"{profile:<17}{write[0]:>10.2f}{write[1]:>8.2f}{write[2]:>8.2f}"
+                  f"{read[0]:>10.2f}{read[1]:>8.2f}{read[2]:>8.2f}{result['runs_per_s']:>9.1f}{result['size_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
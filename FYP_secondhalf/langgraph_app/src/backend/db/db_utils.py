@@ -1,40 +1,174 @@
 import os
-from pymongo import MongoClient, ASCENDING
+import asyncio
+import base64
+from collections import defaultdict
+from bson import ObjectId, json_util
+from pymongo import AsyncMongoClient, MongoClient, ASCENDING, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from dotenv import load_dotenv
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import Iterable, List, Dict, Any, Optional, Tuple
 import logging
 
+from backend.path_global_file import (
+    ARTIFACT_STORAGE_MODE,
+    ARTIFACT_SNAPSHOT_INTERVAL,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS,
+    MONGO_READ_PREFERENCE,
+    PERSISTENCE_BACKEND,
+    EMBEDDED_DB,
+    HISTORY_PAGE_SIZE,
+)
+from backend.db.artifact_cache import LatestArtifactCache, create_invalidation_channel
+from backend.db.search_index import ArtifactSearchIndex
+from backend.db.vector_index import VectorIndex
+from backend.db.embedded_store import AsyncEmbeddedClient, EmbeddedClient
+from backend.db.run_config_store import create_run_config_store
+from backend.utils.artifact_utils import content_hash
+from backend.utils.artifact_delta import (
+    apply_delta,
+    is_snapshot_version,
+    make_verified_delta,
+    version_rank,
+)
+
 logger = logging.getLogger(__name__)
 
 load_dotenv(override=True)
 
 uri = os.getenv("MONGODB_URI")
-client = MongoClient(uri)
 
-SESSION_TO_THREAD_MAPPING = {}
+# Created on first use (scripts, the write-behind worker threads); the app's async client
+# is opened and closed by the lifespan (core/startup.py). With PERSISTENCE_BACKEND = "sqlite"
+# both are embedded SQLite stores with the same API (embedded_store.py)
+_client: Optional[MongoClient] = None
+_async_client: Optional[AsyncMongoClient] = None
+
+
+def mongo_client_options() -> Dict[str, Any]:
+    """Connection pool, timeout and read preference settings shared by both clients"""
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "readPreference": MONGO_READ_PREFERENCE,
+    }
+
+
+def _check_backend() -> None:
+    if PERSISTENCE_BACKEND not in ("mongo", "sqlite"):
+        raise ValueError(f"Unknown persistence backend: {PERSISTENCE_BACKEND}")
+
+
+def get_client() -> MongoClient:
+    """The blocking client, created on first use"""
+    global _client
+    if _client is None:
+        _check_backend()
+        if PERSISTENCE_BACKEND == "sqlite":
+            _client = EmbeddedClient(EMBEDDED_DB)
+        else:
+            _client = MongoClient(uri, **mongo_client_options())
+    return _client
+
+
+def get_async_client() -> AsyncMongoClient:
+    """The async client (opened by the lifespan, or on first use outside the app)"""
+    global _async_client
+    if _async_client is None:
+        _check_backend()
+        if PERSISTENCE_BACKEND == "sqlite":
+            _async_client = AsyncEmbeddedClient(EMBEDDED_DB)
+        else:
+            _async_client = AsyncMongoClient(uri, **mongo_client_options())
+    return _async_client
+
+
+async def open_async_client() -> AsyncMongoClient:
+    """Create the async client; connections are made on first use, within the pool limits"""
+    return get_async_client()
+
+
+async def close_clients() -> None:
+    """Close both clients and their connection pools (and drop what was cached from them)"""
+    global _client, _async_client
+    latest_artifact_cache.clear()
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
+
+# Shared between API workers (see run_config_store.py), session mappings do not expire
+SESSION_TO_THREAD_MAPPING = create_run_config_store("session_threads", ttl_seconds=None)
 
 # Use a single database for all threads
 APP_DATABASE_NAME = "langgraph_app"
 
+# get_latest_artifact_version results; every artifact write below invalidates what it touches
+latest_artifact_cache = LatestArtifactCache(channel=create_invalidation_channel())
+
+# Full-text index of the latest artifacts (search_index.py) and the Archivist's vector index
+# (vector_index.py), fed by the artifact writes below; a failure to index is logged, it does
+# not fail the save
+artifact_search_index = ArtifactSearchIndex()
+artifact_vector_index = VectorIndex()
+
+
+def _index_for_search(artifact_docs: List[Dict[str, Any]]) -> None:
+    for index in (artifact_search_index, artifact_vector_index):
+        try:
+            index.index_artifacts(artifact_docs)
+        except Exception as e:
+            logger.error("Failed to index artifacts in %s: %s", type(index).__name__, e)
+
+
+async def _aindex_for_search(artifact_docs: List[Dict[str, Any]]) -> None:
+    await asyncio.to_thread(_index_for_search, list(artifact_docs))
+
+
+def _unindex_thread(thread_id: str) -> None:
+    for index in (artifact_search_index, artifact_vector_index):
+        try:
+            index.remove_thread(thread_id)
+        except Exception as e:
+            logger.error("Failed to remove thread %s from %s: %s", thread_id, type(index).__name__, e)
+
+DUPLICATE_KEY_ERROR = 11000
+
 def save_session_thread_mapping(session_id: str, thread_id: str):
     """Saves the link between a user's session and a LangGraph thread."""
-    print(f"DATABASE: Mapping session '{session_id}' to thread '{thread_id}'")
-    SESSION_TO_THREAD_MAPPING[session_id] = thread_id
+    logger.debug("DATABASE: Mapping session '%s' to thread '%s'", session_id, thread_id)
+    SESSION_TO_THREAD_MAPPING.put(session_id, {"thread_id": thread_id})
 
-# the threads to and from DB are for interrutps!
-def save_threadID_to_db(session_id: str, thread_id: str) -> None:
-    db = client[APP_DATABASE_NAME]
-    collection = db["thread_mappings"]
 
-    # Upsert by replacing any existing document for this session
-    thread_schema = {
+def get_session_thread_mapping(session_id: str) -> Optional[str]:
+    """Returns the LangGraph thread linked to a user's session, if any."""
+    mapping = SESSION_TO_THREAD_MAPPING.get(session_id)
+    return mapping["thread_id"] if mapping else None
+
+def _thread_mapping_doc(session_id: str, thread_id: str) -> Dict[str, Any]:
+    return {
         "_id": session_id,
         "thread_id": str(thread_id),
         "updated_at": datetime.now(timezone.utc).isoformat()
     }
 
-    collection.replace_one({"_id": session_id}, thread_schema, upsert=True)
+
+# the threads to and from DB are for interrutps!
+def save_threadID_to_db(session_id: str, thread_id: str) -> None:
+    db = get_client()[APP_DATABASE_NAME]
+    collection = db["thread_mappings"]
+
+    # Upsert by replacing any existing document for this session
+    collection.replace_one({"_id": session_id}, _thread_mapping_doc(session_id, thread_id), upsert=True)
 
 
 # ==================== MongoDB Conversation & Artifact Storage ====================
@@ -43,7 +177,424 @@ def get_thread_db(thread_id: str):
     """Get the database for all app data (single database approach)."""
     # Note: thread_id is kept as parameter for backwards compatibility
     # but we now use a single database with thread_id as a document field
-    return client[APP_DATABASE_NAME]
+    return get_client()[APP_DATABASE_NAME]
+
+
+# ==================== Artifact delta encoding ====================
+# With ARTIFACT_STORAGE_MODE = "delta", each artifact version is stored as a JSON Patch
+# against the previous version of the same artifact_type, with a full snapshot every
+# ARTIFACT_SNAPSHOT_INTERVAL versions. Reads rebuild ("hydrate") the full content.
+# Documents carry a version_rank (artifact_delta.version_rank) so the previous version is
+# one indexed find_one; documents stored before it have none and are never picked as a
+# base (the next version is stored as a snapshot).
+
+def _artifact_key(thread_id: str, artifact_id: Optional[str]) -> str:
+    """_id of an artifact document: unique across threads"""
+    return f"{thread_id}_{artifact_id}"
+
+
+def _previous_version_query(thread_id: str, artifact_type: str, version: str) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+    """Filter and sort whose first document is the highest stored version below `version` (one index seek)"""
+    query = {"thread_id": thread_id, "artifact_type": artifact_type, "version_rank": {"$lt": version_rank(version)}}
+    return query, [("version_rank", -1)]
+
+
+def _find_previous_artifact_doc(collection, thread_id: str, artifact_type: str, version: str) -> Optional[Dict[str, Any]]:
+    """Find the stored artifact of the same type with the highest version below `version`."""
+    query, sort = _previous_version_query(thread_id, artifact_type, version)
+    return collection.find_one(query, sort=sort)
+
+
+def _missing_base(doc: Dict[str, Any]) -> ValueError:
+    return ValueError(f"Base artifact {doc.get('base_artifact_id')} of {doc.get('artifact_id')} not found")
+
+
+def _replay_delta(doc: Dict[str, Any], base_content: Any) -> Any:
+    """
+    Apply a delta-encoded document's patch to the content of its base.
+
+    Raises:
+        ValueError: If the patch does not apply or the result does not match the stored
+            content hash (the base was overwritten with other content after the delta was stored)
+    """
+    overwritten = f"base {doc.get('base_artifact_id')} was overwritten after the delta was stored"
+    try:
+        content = apply_delta(base_content, doc.get("content_patch"))
+    except Exception as e:
+        raise ValueError(f"Delta of {doc.get('artifact_id')} does not apply ({e}): {overwritten}") from e
+    if doc.get("content_hash") and content_hash(content) != doc["content_hash"]:
+        raise ValueError(f"Delta replay of {doc.get('artifact_id')} does not match its content hash: {overwritten}")
+    return content
+
+
+def _resolve_artifact_content(collection, doc: Dict[str, Any], loaded: Optional[Dict[str, Dict[str, Any]]] = None,
+                              contents: Optional[Dict[str, Any]] = None, chain: Optional[List[str]] = None) -> Any:
+    """
+    Rebuild the full content of a stored artifact document by replaying its delta chain
+    (or, for a deduplicated document, reading its body).
+
+    Args:
+        collection: The artifacts collection
+        doc: The stored artifact document
+        loaded: Optional {artifact_id: doc} of documents already fetched, to avoid re-reading bases
+        contents: Optional {content_hash: content} of bodies already fetched
+        chain: Optional list the artifact ids of the chain are appended to (for error reports)
+
+    Returns:
+        The full content
+
+    Raises:
+        ValueError: If a base or body is missing or the replayed content does not match the stored hash
+    """
+    if chain is not None:
+        chain.append(doc.get("artifact_id"))
+    if doc.get("content_encoding") == "ref":
+        if not contents or doc.get("content_hash") not in contents:
+            contents = _load_contents(collection, [doc])
+        return _referenced_content(doc, contents)
+    if doc.get("content_encoding") != "delta":
+        return doc.get("content")
+
+    base_doc = (loaded or {}).get(doc.get("base_artifact_id"))
+    if base_doc is None:
+        base_doc = collection.find_one({"_id": _artifact_key(doc["thread_id"], doc.get("base_artifact_id"))})
+    if base_doc is None:
+        raise _missing_base(doc)
+    return _replay_delta(doc, _resolve_artifact_content(collection, base_doc, loaded, contents, chain))
+
+
+def _needs_hydration(doc: Dict[str, Any]) -> bool:
+    return doc.get("content_encoding") in ("delta", "ref")
+
+
+def _unresolved_content(doc: Dict[str, Any], chain: List[str], error: Exception) -> None:
+    # The content is lost for readers: report the whole chain so the broken link can be found
+    logger.error("Failed to rebuild the content of artifact %s (delta chain %s): %s",
+                 doc.get('artifact_id'), " -> ".join(map(str, chain)), error)
+    doc["content"] = None
+
+
+def _drop_encoding_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
+    doc.pop("version_rank", None)
+    doc.pop("content_patch", None)
+    doc.pop("base_artifact_id", None)
+    doc.pop("content_encoding", None)
+    return doc
+
+
+def _hydrate_artifact_doc(collection, doc: Dict[str, Any], loaded: Optional[Dict[str, Dict[str, Any]]] = None,
+                          contents: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Replace delta-encoded or referenced content with the full content and drop the encoding fields."""
+    if _needs_hydration(doc):
+        chain = []
+        try:
+            doc["content"] = _resolve_artifact_content(collection, doc, loaded, contents, chain)
+        except Exception as e:
+            _unresolved_content(doc, chain, e)
+    return _drop_encoding_fields(doc)
+
+
+def _loaded_by_id(artifacts: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {artifact.get("artifact_id"): artifact for artifact in artifacts}
+
+
+def _hydrate_artifact_docs(collection, artifacts: List[Dict[str, Any]]) -> None:
+    """Hydrate documents read together: bases among them are not read again, bodies are read in one query"""
+    loaded = _loaded_by_id(artifacts)
+    contents = _load_contents(collection, artifacts)
+    for artifact in artifacts:
+        _hydrate_artifact_doc(collection, artifact, loaded, contents)
+
+
+def _snapshot_fields(artifact_doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {"content_encoding": "full", "content_hash": content_hash(artifact_doc.get("content"))}
+
+
+def _may_be_delta(artifact_doc: Dict[str, Any]) -> bool:
+    """Whether the version may be stored as a delta (it is not a snapshot version)"""
+    return not is_snapshot_version(artifact_doc.get("version"), ARTIFACT_SNAPSHOT_INTERVAL)
+
+
+def _delta_fields(artifact_doc: Dict[str, Any], previous_doc: Dict[str, Any], base_content: Any) -> Dict[str, Any]:
+    """The delta against the previous version, or the snapshot fields if no verified delta exists"""
+    snapshot_fields = _snapshot_fields(artifact_doc)
+    patch = make_verified_delta(base_content, artifact_doc.get("content"))
+    if patch is None:
+        return snapshot_fields
+    return {
+        "content": None,
+        "content_encoding": "delta",
+        "content_patch": patch,
+        "base_artifact_id": previous_doc.get("artifact_id"),
+        "content_hash": snapshot_fields["content_hash"],
+    }
+
+
+def _unusable_base(previous_doc: Dict[str, Any], error: Exception) -> None:
+    logger.warning("Storing snapshot, could not rebuild base %s: %s", previous_doc.get('artifact_id'), error)
+
+
+def _encode_artifact_content(collection, thread_id: str, artifact_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Decide how to store the artifact content: a full snapshot or a verified delta.
+
+    Returns:
+        The fields to merge into the artifact document
+    """
+    if not _may_be_delta(artifact_doc):
+        return _snapshot_fields(artifact_doc)
+
+    previous_doc = _find_previous_artifact_doc(
+        collection, thread_id, artifact_doc.get("artifact_type"), artifact_doc.get("version")
+    )
+    if previous_doc is None:
+        return _snapshot_fields(artifact_doc)
+
+    try:
+        base_content = _resolve_artifact_content(collection, previous_doc)
+    except Exception as e:
+        _unusable_base(previous_doc, e)
+        return _snapshot_fields(artifact_doc)
+    return _delta_fields(artifact_doc, previous_doc, base_content)
+
+
+# ==================== Artifact content dedupe ====================
+# With ARTIFACT_STORAGE_MODE = "dedupe", an artifact document keeps only the hash of its
+# content (content_encoding "ref") and every distinct body is stored once, in
+# artifact_contents under that hash, so accept-without-change versions and forked threads
+# share it. `refs` lists the _ids of the artifact documents using a body: adding one is
+# idempotent ($addToSet), so a retried batch cannot count twice, and a body is deleted
+# together with its last reference. A save first only adds its references; the bodies are
+# sent (upserted) only if one of them was not stored yet.
+
+CONTENT_COLLECTION = "artifact_contents"
+
+
+def _dedupe_artifact_docs(artifact_docs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Tuple[Any, List[str]]]]:
+    """
+    Split artifact documents into ref-encoded documents and their distinct bodies.
+
+    Returns:
+        (documents to store, {content_hash: (content, [_ids of the documents using it])})
+    """
+    stored_docs, bodies = [], {}
+    for artifact_doc in artifact_docs:
+        digest = content_hash(artifact_doc.get("content"))
+        bodies.setdefault(digest, (artifact_doc.get("content"), []))[1].append(artifact_doc["_id"])
+        stored_docs.append({**artifact_doc, "content": None, "content_encoding": "ref", "content_hash": digest})
+    return stored_docs, bodies
+
+
+def _content_requests(bodies: Dict[str, Tuple[Any, List[str]]], with_bodies: bool) -> List[UpdateOne]:
+    """Add the references to the bodies; `with_bodies` upserts the bodies that do not exist yet"""
+    saved_at = _now()
+    return [
+        UpdateOne(
+            {"_id": digest},
+            {"$addToSet": {"refs": {"$each": artifact_ids}},
+             **({"$setOnInsert": {"content": content, "saved_at": saved_at}} if with_bodies else {})},
+            upsert=with_bodies,
+        )
+        for digest, (content, artifact_ids) in bodies.items()
+    ]
+
+
+def _stale_content_refs(previous_docs: List[Dict[str, Any]], stored_docs: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """References {content_hash: [artifact _id]} dropped by replacing `previous_docs` with `stored_docs`"""
+    stored_hashes = {doc["_id"]: doc.get("content_hash") for doc in stored_docs if doc.get("content_encoding") == "ref"}
+    stale = {}
+    for previous in previous_docs:
+        if previous.get("content_encoding") == "ref" and stored_hashes.get(previous["_id"]) != previous.get("content_hash"):
+            stale.setdefault(previous["content_hash"], []).append(previous["_id"])
+    return stale
+
+
+def _release_requests(refs: Dict[str, List[str]]) -> List[UpdateOne]:
+    return [UpdateOne({"_id": digest}, {"$pull": {"refs": {"$in": artifact_ids}}}) for digest, artifact_ids in refs.items()]
+
+
+def _referenced_content(doc: Dict[str, Any], contents: Dict[str, Any]) -> Any:
+    if doc.get("content_hash") not in contents:
+        raise ValueError(f"Content {doc.get('content_hash')} of {doc.get('artifact_id')} not found")
+    return contents[doc["content_hash"]]
+
+
+def _contents_query(docs: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Filter of the bodies of the ref-encoded documents among `docs` (None: there are none)"""
+    digests = list({doc["content_hash"] for doc in docs if doc.get("content_encoding") == "ref"})
+    return {"_id": {"$in": digests}} if digests else None
+
+
+def _contents_by_hash(bodies: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    return {body["_id"]: body.get("content") for body in bodies}
+
+
+def _load_contents(collection, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Bodies {content_hash: content} of the ref-encoded documents among `docs`, in one query"""
+    query = _contents_query(docs)
+    if query is None:
+        return {}
+    return _contents_by_hash(collection.database[CONTENT_COLLECTION].find(query, {"content": 1}))
+
+
+def _replaced_docs_query(stored_docs: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Filter and projection of the documents a dedupe save replaces (for the references they drop)"""
+    return {"_id": {"$in": [doc["_id"] for doc in stored_docs]}}, {"content_hash": 1, "content_encoding": 1}
+
+
+def _replace_requests(docs: List[Dict[str, Any]]) -> List[ReplaceOne]:
+    """Upserts of whole documents by _id"""
+    return [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs]
+
+
+def _save_deduped_artifacts(db, artifact_docs: List[Dict[str, Any]]) -> None:
+    """Store the bodies (once per hash), then the documents referencing them, then drop the references they replaced"""
+    stored_docs, bodies = _dedupe_artifact_docs(artifact_docs)
+    collection = db["artifacts"]
+    previous_docs = list(collection.find(*_replaced_docs_query(stored_docs)))
+    contents = db[CONTENT_COLLECTION]
+    if contents.bulk_write(_content_requests(bodies, with_bodies=False), ordered=False).matched_count < len(bodies):
+        contents.bulk_write(_content_requests(bodies, with_bodies=True), ordered=False)
+    collection.bulk_write(_replace_requests(stored_docs), ordered=True)
+    _release_content_refs(db, _stale_content_refs(previous_docs, stored_docs))
+
+
+def _thread_refs_query(thread_id: str) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    return {"thread_id": thread_id, "content_encoding": "ref"}, {"content_hash": 1}
+
+
+def _refs_by_hash(docs: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+    refs = {}
+    for doc in docs:
+        refs.setdefault(doc["content_hash"], []).append(doc["_id"])
+    return refs
+
+
+def _thread_content_refs(db, thread_id: str) -> Dict[str, List[str]]:
+    return _refs_by_hash(db["artifacts"].find(*_thread_refs_query(thread_id)))
+
+
+def _unreferenced_contents_query(refs: Dict[str, List[str]]) -> Dict[str, Any]:
+    # Conditional: a body that gained a reference in the meantime stays
+    return {"_id": {"$in": list(refs)}, "refs": []}
+
+
+def _release_content_refs(db, refs: Dict[str, List[str]]) -> None:
+    """Drop references {content_hash: [artifact _id]} and delete the bodies left without any"""
+    if not refs:
+        return
+    contents = db[CONTENT_COLLECTION]
+    contents.bulk_write(_release_requests(refs), ordered=False)
+    contents.delete_many(_unreferenced_contents_query(refs))
+
+
+# ==================== Timestamps and conversation order ====================
+# timestamp and saved_at are stored as BSON datetimes (UTC, millisecond precision), so they
+# sort by time instead of by string collation. Conversations also get a per-thread `seq`
+# when written: their order, strictly increasing even within one millisecond. Read results
+# carry the times as ISO strings again. migrate_datetime_seq.py converts older documents.
+
+COUNTER_COLLECTION = "thread_counters"
+TIME_FIELDS = ("timestamp", "saved_at")
+
+
+def stored_datetime(value: Any) -> Optional[datetime]:
+    """A timestamp (ISO string or datetime, naive meaning UTC) as stored: UTC, whole milliseconds"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            logger.warning("Unparseable timestamp %r is stored as null", value)
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def iso_timestamp(value: Any) -> Any:
+    """A stored timestamp as read results carry it (pymongo returns naive UTC datetimes)"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+    return value
+
+
+def _now() -> datetime:
+    return stored_datetime(datetime.now(timezone.utc))
+
+
+def _output_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """A stored document as the read functions return it: without MongoDB's _id, with ISO times"""
+    doc.pop("_id", None)
+    for field in TIME_FIELDS:
+        if field in doc:
+            doc[field] = iso_timestamp(doc[field])
+    return doc
+
+
+def _unsequenced(conversation_docs: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Conversation documents without a seq yet, by thread (a retried batch keeps its numbers)"""
+    by_thread = defaultdict(list)
+    for doc in conversation_docs:
+        if doc.get("seq") is None:
+            by_thread[doc["thread_id"]].append(doc)
+    return by_thread
+
+
+def _seq_block(thread_id: str, count: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Filter and update reserving `count` numbers from the thread's counter"""
+    return {"_id": thread_id}, {"$inc": {"conversation_seq": count}}
+
+
+def _number_docs(docs: List[Dict[str, Any]], counter: Dict[str, Any]) -> None:
+    """Number the documents with the block ending at the counter's (updated) value"""
+    first = counter["conversation_seq"] - len(docs) + 1
+    for offset, doc in enumerate(docs):
+        doc["seq"] = first + offset
+
+
+def _assign_seqs(db, conversation_docs: List[Dict[str, Any]]) -> None:
+    """Number the documents in order, reserving one block per thread from its counter"""
+    for thread_id, docs in _unsequenced(conversation_docs).items():
+        counter = db[COUNTER_COLLECTION].find_one_and_update(
+            *_seq_block(thread_id, len(docs)), upsert=True, return_document=ReturnDocument.AFTER
+        )
+        _number_docs(docs, counter)
+
+
+def build_artifact_document(thread_id: str, artifact_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the stored artifact document (full content, before any delta encoding)."""
+    # Use composite _id with thread_id to ensure uniqueness across threads
+    return {
+        "_id": _artifact_key(thread_id, artifact_data.get("artifact_id")),
+        "artifact_id": artifact_data.get("artifact_id"),
+        "artifact_type": artifact_data.get("artifact_type"),
+        "agent": artifact_data.get("agent"),
+        "content": artifact_data.get("content"),
+        "version": artifact_data.get("version"),
+        "version_rank": version_rank(artifact_data.get("version")),
+        "timestamp": stored_datetime(artifact_data.get("timestamp")),
+        "node": artifact_data.get("node"),
+        "thread_id": thread_id,
+        "saved_at": _now()
+    }
+
+
+def _conversation_document(thread_id: str, conversation_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the stored conversation document."""
+    return {
+        "content": conversation_data.get("content"),
+        "agent": conversation_data.get("agent"),
+        "artifact_id": conversation_data.get("artifact_id"),
+        "timestamp": stored_datetime(conversation_data.get("timestamp")),
+        "node": conversation_data.get("node"),
+        "thread_id": thread_id,
+        "saved_at": _now()
+    }
 
 
 def save_artifact_to_db(thread_id: str, artifact_data: Dict[str, Any]) -> bool:
@@ -58,43 +609,41 @@ def save_artifact_to_db(thread_id: str, artifact_data: Dict[str, Any]) -> bool:
         bool: True if saved successfully, False otherwise
     """
     try:
-        db = client[APP_DATABASE_NAME]
+        db = get_client()[APP_DATABASE_NAME]
         collection = db["artifacts"]
 
         # Prepare the document for MongoDB
-        # Use composite _id with thread_id to ensure uniqueness across threads
-        composite_id = f"{thread_id}_{artifact_data.get('artifact_id')}"
-        artifact_doc = {
-            "_id": composite_id,
-            "artifact_id": artifact_data.get("artifact_id"),
-            "artifact_type": artifact_data.get("artifact_type"),
-            "agent": artifact_data.get("agent"),
-            "content": artifact_data.get("content"),
-            "version": artifact_data.get("version"),
-            "timestamp": artifact_data.get("timestamp"),
-            "node": artifact_data.get("node"),
-            "thread_id": thread_id,
-            "saved_at": datetime.now(timezone.utc).isoformat()
-        }
+        artifact_doc = build_artifact_document(thread_id, artifact_data)
+        indexed_doc = dict(artifact_doc)  # delta encoding replaces the content below
 
         # Handle base64 data - MongoDB can store strings up to 16MB
         # If content contains base64 data, it's already in the content dict
-        # No special handling needed unless you want to compress it
-
-        # Use upsert to handle versioning - newer versions will update the document
-        collection.replace_one(
-            {"_id": composite_id},
-            artifact_doc,
-            upsert=True
-        )
-
-        logger.info(f"Saved artifact {artifact_doc['_id']} to MongoDB for thread {thread_id}")
+        # In dedupe storage mode, the body goes to the content collection (once per hash)
+        if ARTIFACT_STORAGE_MODE == "dedupe":
+            _save_deduped_artifacts(db, [artifact_doc])
+        else:
+            # In delta storage mode, only the patch against the previous version is kept
+            if ARTIFACT_STORAGE_MODE == "delta":
+                artifact_doc.update(_encode_artifact_content(collection, thread_id, artifact_doc))
+
+            # Use upsert to handle versioning - newer versions will update the document
+            collection.replace_one(
+                {"_id": artifact_doc["_id"]},
+                artifact_doc,
+                upsert=True
+            )
+        _index_for_search([indexed_doc])
+
+        logger.info("Saved artifact %s to MongoDB for thread %s", artifact_doc['_id'], thread_id)
         return True
 
     except Exception as e:
-        logger.error(f"Failed to save artifact to MongoDB: {str(e)}")
+        logger.error("Failed to save artifact to MongoDB: %s", e)
         return False
 
+    finally:
+        latest_artifact_cache.invalidate([(thread_id, artifact_data.get("artifact_type"))])
+
 
 def save_conversation_to_db(thread_id: str, conversation_data: Dict[str, Any]) -> bool:
     """
@@ -108,31 +657,129 @@ def save_conversation_to_db(thread_id: str, conversation_data: Dict[str, Any]) -
         bool: True if saved successfully, False otherwise
     """
     try:
-        db = client[APP_DATABASE_NAME]
+        db = get_client()[APP_DATABASE_NAME]
         collection = db["conversations"]
 
-        # Prepare the document for MongoDB
-        conversation_doc = {
-            "content": conversation_data.get("content"),
-            "agent": conversation_data.get("agent"),
-            "artifact_id": conversation_data.get("artifact_id"),
-            "timestamp": conversation_data.get("timestamp"),
-            "node": conversation_data.get("node"),
-            "thread_id": thread_id,
-            "saved_at": datetime.now(timezone.utc).isoformat()
-        }
-
         # Insert the conversation (allow duplicates since conversations can have same content)
+        conversation_doc = _conversation_document(thread_id, conversation_data)
+        _assign_seqs(db, [conversation_doc])
         collection.insert_one(conversation_doc)
 
-        logger.info(f"Saved conversation to MongoDB for thread {thread_id}")
+        logger.info("Saved conversation to MongoDB for thread %s", thread_id)
         return True
 
     except Exception as e:
-        logger.error(f"Failed to save conversation to MongoDB: {str(e)}")
+        logger.error("Failed to save conversation to MongoDB: %s", e)
         return False
 
 
+# ==================== Batched writes (write_behind.py) ====================
+# Unlike the save_* functions these take prebuilt documents and raise on failure, so the
+# caller can retry the batch.
+
+def build_conversation_document(thread_id: str, conversation_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a conversation document with its _id assigned up front, so retrying a partially
+    written batch only hits duplicate key errors for the documents already stored.
+    """
+    return {"_id": ObjectId(), **_conversation_document(thread_id, conversation_data)}
+
+
+def save_conversations_bulk(conversation_docs: List[Dict[str, Any]]) -> int:
+    """
+    Insert conversation documents with one insert_many (duplicate _ids are ignored).
+
+    Documents without a seq are numbered first, in place, so a retried batch keeps its numbers.
+
+    Returns:
+        Number of conversations stored (including ones stored by an earlier attempt)
+    """
+    if not conversation_docs:
+        return 0
+    db = get_client()[APP_DATABASE_NAME]
+    _assign_seqs(db, conversation_docs)
+    try:
+        db["conversations"].insert_many(conversation_docs, ordered=False)
+    except BulkWriteError as e:
+        _raise_unless_duplicates(e)
+    return len(conversation_docs)
+
+
+def _raise_unless_duplicates(error: BulkWriteError) -> None:
+    """Re-raise a bulk insert error unless it only reports documents stored already"""
+    errors = error.details.get("writeErrors", [])
+    if any(e.get("code") != DUPLICATE_KEY_ERROR for e in errors) or error.details.get("writeConcernErrors"):
+        raise error
+
+
+def save_artifacts_bulk(artifact_docs: List[Dict[str, Any]]) -> int:
+    """
+    Upsert artifact documents, in order, with as few bulk_write calls as possible.
+
+    In delta storage mode a version is encoded against the previous version read back from
+    MongoDB, so the pending writes are sent before a later version of an artifact type they
+    contain is encoded.
+
+    In dedupe storage mode the bodies of the batch are written with one bulk_write, then the
+    documents referencing them with another.
+
+    Returns:
+        Number of artifacts stored
+    """
+    try:
+        stored = _save_artifacts_bulk(artifact_docs)
+        _index_for_search(artifact_docs)
+        return stored
+    finally:
+        latest_artifact_cache.invalidate(_latest_keys(artifact_docs))
+
+
+def _latest_keys(artifact_docs: List[Dict[str, Any]]) -> List[Tuple[str, Optional[str]]]:
+    return [_type_key(doc) for doc in artifact_docs]
+
+
+def _type_key(artifact_doc: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    return artifact_doc["thread_id"], artifact_doc.get("artifact_type")
+
+
+def _save_artifacts_bulk(artifact_docs: List[Dict[str, Any]]) -> int:
+    if ARTIFACT_STORAGE_MODE == "dedupe":
+        _save_deduped_artifacts(get_client()[APP_DATABASE_NAME], artifact_docs)
+        return len(artifact_docs)
+
+    collection = get_client()[APP_DATABASE_NAME]["artifacts"]
+    pending, pending_types = [], set()
+
+    def write_pending():
+        if pending:
+            collection.bulk_write(pending, ordered=True)
+            pending.clear()
+            pending_types.clear()
+
+    for artifact_doc in artifact_docs:
+        if ARTIFACT_STORAGE_MODE == "delta":
+            type_key = _type_key(artifact_doc)
+            if type_key in pending_types:
+                write_pending()
+            # Encode a copy: a retried batch must start again from the full content
+            artifact_doc = {**artifact_doc, **_encode_artifact_content(collection, artifact_doc["thread_id"], artifact_doc)}
+            pending_types.add(type_key)
+        pending.extend(_replace_requests([artifact_doc]))
+    write_pending()
+    return len(artifact_docs)
+
+
+# Newest first: by timestamp, then _id for artifacts saved at the same time
+ARTIFACT_ORDER = [("timestamp", -1), ("_id", -1)]
+
+
+def _thread_artifacts_query(thread_id: str, artifact_type: Optional[str] = None) -> Dict[str, Any]:
+    query = {"thread_id": thread_id}
+    if artifact_type:
+        query["artifact_type"] = artifact_type
+    return query
+
+
 def get_artifacts_from_db(thread_id: str, artifact_type: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Retrieve artifacts from MongoDB for a specific thread.
@@ -145,25 +792,22 @@ def get_artifacts_from_db(thread_id: str, artifact_type: Optional[str] = None) -
         List of artifact documents sorted by timestamp (newest first)
     """
     try:
-        db = client[APP_DATABASE_NAME]
+        db = get_client()[APP_DATABASE_NAME]
         collection = db["artifacts"]
 
-        query = {"thread_id": thread_id}
-        if artifact_type:
-            query["artifact_type"] = artifact_type
-
         # Sort by timestamp descending (newest first)
-        artifacts = list(collection.find(query).sort("timestamp", -1))
+        artifacts = list(collection.find(_thread_artifacts_query(thread_id, artifact_type)).sort(ARTIFACT_ORDER))
 
-        # Remove MongoDB's _id from the result for cleaner output
+        # Rebuild delta-encoded / referenced content, then remove MongoDB's _id from the result for cleaner output
+        _hydrate_artifact_docs(collection, artifacts)
         for artifact in artifacts:
-            artifact.pop("_id", None)
+            _output_doc(artifact)
 
-        logger.info(f"Retrieved {len(artifacts)} artifacts from MongoDB for thread {thread_id}")
+        logger.info("Retrieved %s artifacts from MongoDB for thread %s", len(artifacts), thread_id)
         return artifacts
 
     except Exception as e:
-        logger.error(f"Failed to retrieve artifacts from MongoDB: {str(e)}")
+        logger.error("Failed to retrieve artifacts from MongoDB: %s", e)
         return []
 
 
@@ -175,30 +819,59 @@ def get_conversations_from_db(thread_id: str) -> List[Dict[str, Any]]:
         thread_id: The thread ID to retrieve conversations for
 
     Returns:
-        List of conversation documents sorted by timestamp (oldest first)
+        List of conversation documents in the order they were saved (oldest first)
     """
     try:
-        db = client[APP_DATABASE_NAME]
+        db = get_client()[APP_DATABASE_NAME]
         collection = db["conversations"]
 
-        # Sort by timestamp ascending (oldest first) to maintain chronological order
-        conversations = list(collection.find({"thread_id": thread_id}).sort("timestamp", 1))
+        # Sort by seq ascending (oldest first) to maintain chronological order
+        conversations = list(collection.find({"thread_id": thread_id}).sort("seq", 1))
 
         # Remove MongoDB's _id from the result
         for conversation in conversations:
-            conversation.pop("_id", None)
+            _output_doc(conversation)
 
-        logger.info(f"Retrieved {len(conversations)} conversations from MongoDB for thread {thread_id}")
+        logger.info("Retrieved %s conversations from MongoDB for thread %s", len(conversations), thread_id)
         return conversations
 
     except Exception as e:
-        logger.error(f"Failed to retrieve conversations from MongoDB: {str(e)}")
+        logger.error("Failed to retrieve conversations from MongoDB: %s", e)
         return []
 
 
+def get_artifact_from_db(thread_id: str, artifact_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a single artifact by its ID.
+
+    Args:
+        thread_id: The thread ID
+        artifact_id: The artifact ID (includes the version, e.g. "requirements_model_Analyst_v1.1")
+
+    Returns:
+        The artifact document or None if not found
+    """
+    try:
+        db = get_client()[APP_DATABASE_NAME]
+        collection = db["artifacts"]
+
+        artifact = collection.find_one({"_id": _artifact_key(thread_id, artifact_id)})
+
+        if artifact:
+            _hydrate_artifact_doc(collection, artifact)
+            _output_doc(artifact)
+            logger.info("Retrieved artifact %s for thread %s", artifact_id, thread_id)
+
+        return artifact
+
+    except Exception as e:
+        logger.error("Failed to retrieve artifact from MongoDB: %s", e)
+        return None
+
+
 def get_latest_artifact_version(thread_id: str, artifact_type: str) -> Optional[Dict[str, Any]]:
     """
-    Get the latest version of a specific artifact type.
+    Get the latest version of a specific artifact type (served from latest_artifact_cache when cached).
 
     Args:
         thread_id: The thread ID
@@ -207,27 +880,40 @@ def get_latest_artifact_version(thread_id: str, artifact_type: str) -> Optional[
     Returns:
         The latest artifact document or None if not found
     """
+    hit, artifact = latest_artifact_cache.get(thread_id, artifact_type)
+    if hit:
+        return artifact
+
     try:
-        db = client[APP_DATABASE_NAME]
+        generation = latest_artifact_cache.generation()
+        db = get_client()[APP_DATABASE_NAME]
         collection = db["artifacts"]
 
-        # Find all artifacts of this type and sort by version
-        artifact = collection.find_one(
-            {"thread_id": thread_id, "artifact_type": artifact_type},
-            sort=[("timestamp", -1)]  # Get most recent by timestamp
-        )
+        # Get most recent of this type by timestamp
+        artifact = collection.find_one(_thread_artifacts_query(thread_id, artifact_type), sort=ARTIFACT_ORDER)
 
         if artifact:
-            artifact.pop("_id", None)
-            logger.info(f"Retrieved latest {artifact_type} artifact for thread {thread_id}")
+            _hydrate_artifact_doc(collection, artifact)
+            _output_doc(artifact)
+            logger.info("Retrieved latest %s artifact for thread %s", artifact_type, thread_id)
 
+        latest_artifact_cache.put(thread_id, artifact_type, artifact, generation)
         return artifact
 
     except Exception as e:
-        logger.error(f"Failed to retrieve latest artifact from MongoDB: {str(e)}")
+        logger.error("Failed to retrieve latest artifact from MongoDB: %s", e)
         return None
 
 
+def _thread_data_queries(thread_id: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """(collection, filter) of everything stored for a thread"""
+    return [
+        ("artifacts", {"thread_id": thread_id}),
+        ("conversations", {"thread_id": thread_id}),
+        (COUNTER_COLLECTION, {"_id": thread_id}),
+    ]
+
+
 def delete_thread_data(thread_id: str) -> bool:
     """
     Delete all data for a specific thread.
@@ -239,19 +925,205 @@ def delete_thread_data(thread_id: str) -> bool:
         bool: True if deleted successfully, False otherwise
     """
     try:
-        db = client[APP_DATABASE_NAME]
+        db = get_client()[APP_DATABASE_NAME]
 
-        # Delete all documents for this thread from all collections
-        db["artifacts"].delete_many({"thread_id": thread_id})
-        db["conversations"].delete_many({"thread_id": thread_id})
+        # Delete all documents for this thread from all collections, then release the
+        # deduplicated bodies they referenced
+        refs = _thread_content_refs(db, thread_id)
+        for collection_name, query in _thread_data_queries(thread_id):
+            db[collection_name].delete_many(query)
+        _release_content_refs(db, refs)
+        _unindex_thread(thread_id)
 
-        logger.info(f"Deleted all data for thread {thread_id}")
+        logger.info("Deleted all data for thread %s", thread_id)
         return True
 
     except Exception as e:
-        logger.error(f"Failed to delete thread data from MongoDB: {str(e)}")
+        logger.error("Failed to delete thread data from MongoDB: %s", e)
         return False
 
+    finally:
+        latest_artifact_cache.invalidate([(thread_id, None)])
+
+
+# ==================== Paginated history ====================
+# Listing endpoints read a thread's history a page at a time: keyset pagination on the
+# sort keys (artifacts: timestamp then _id, conversations: seq), so a page continues after
+# the last document of the previous one (the cursor) instead of skipping over everything
+# before it, and a projection so a sidebar only loads metadata, not the artifact bodies
+# (base64 diagrams included).
+
+ARTIFACT_METADATA_FIELDS = ["artifact_id", "artifact_type", "agent", "version", "timestamp", "node"]
+CONVERSATION_METADATA_FIELDS = ["seq", "agent", "artifact_id", "timestamp", "node"]
+ARTIFACT_FIELDS = {*ARTIFACT_METADATA_FIELDS, "content", "content_hash", "thread_id", "saved_at"}
+CONVERSATION_FIELDS = {*CONVERSATION_METADATA_FIELDS, "content", "thread_id", "saved_at"}
+ARTIFACT_PAGE_KEYS = ["timestamp", "_id"]
+CONVERSATION_PAGE_KEYS = ["seq"]
+# Read along with requested content: what rebuilding delta-encoded and deduplicated content needs
+_CONTENT_ENCODING_FIELDS = ["thread_id", "artifact_id", "content_encoding", "content_hash", "content_patch", "base_artifact_id"]
+
+
+def encode_page_cursor(doc: Dict[str, Any], keys: List[str]) -> str:
+    """Opaque cursor pointing just after `doc` (its values of the sort keys)"""
+    position = json_util.dumps([doc.get(key) for key in keys])
+    return base64.urlsafe_b64encode(position.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_page_cursor(cursor: str, keys: List[str]) -> List[Any]:
+    """
+    Position of a cursor made by encode_page_cursor.
+
+    Returns:
+        The values of the sort keys
+
+    Raises:
+        ValueError: If the cursor was not made by encode_page_cursor for these keys
+    """
+    try:
+        position = json_util.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+    if not isinstance(position, list) or len(position) != len(keys):
+        raise ValueError(f"Invalid page cursor: {cursor!r}")
+    return position
+
+
+def _history_query(thread_id: str, keys: List[str], cursor: Optional[str], newest_first: bool,
+                   **filters: Any) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+    """Filter and sort of one history page (a second key breaks ties of the first)"""
+    query = {"thread_id": thread_id, **{field: value for field, value in filters.items() if value is not None}}
+    if cursor:
+        values = decode_page_cursor(cursor, keys)
+        after = "$lt" if newest_first else "$gt"
+        if len(keys) == 1:
+            query[keys[0]] = {after: values[0]}
+        else:
+            query[keys[0]] = {"$lte" if newest_first else "$gte": values[0]}
+            query["$or"] = [{keys[0]: {after: values[0]}}, {keys[1]: {after: values[1]}}]
+    direction = -1 if newest_first else 1
+    return query, [(key, direction) for key in keys]
+
+
+def _history_projection(fields: Optional[List[str]], allowed: set, keys: List[str],
+                        content_encoded: bool = False) -> Optional[Dict[str, int]]:
+    """
+    Projection of the requested fields (None: whole documents). The sort keys are always
+    read for the cursor, and encoded artifact content needs its encoding fields.
+
+    Raises:
+        ValueError: If a field is not one of `allowed`
+    """
+    if fields is None:
+        return None
+    unknown = set(fields) - allowed
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    projection = {field: 1 for field in [*fields, *keys]}
+    if content_encoded and "content" in fields:
+        projection.update({field: 1 for field in _CONTENT_ENCODING_FIELDS})
+    return projection
+
+
+def _history_page(docs: List[Dict[str, Any]], limit: int, fields: Optional[List[str]], keys: List[str]) -> Dict[str, Any]:
+    """Page of `docs` (fetched with limit + 1 to know whether another page follows)"""
+    docs = docs[:limit + 1]
+    next_cursor = encode_page_cursor(docs[limit - 1], keys) if len(docs) > limit else None
+    items = []
+    for doc in docs[:limit]:
+        _output_doc(doc)
+        items.append(doc if fields is None else {field: doc[field] for field in fields if field in doc})
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _artifacts_page_query(thread_id: str, artifact_type: Optional[str], fields: Optional[List[str]],
+                          cursor: Optional[str]) -> Tuple[Dict[str, Any], Optional[Dict[str, int]], List[Tuple[str, int]]]:
+    """Filter, projection and sort of an artifacts page"""
+    projection = _history_projection(fields, ARTIFACT_FIELDS, ARTIFACT_PAGE_KEYS, content_encoded=True)
+    query, sort = _history_query(thread_id, ARTIFACT_PAGE_KEYS, cursor, newest_first=True, artifact_type=artifact_type)
+    return query, projection, sort
+
+
+def _conversations_page_query(thread_id: str, fields: Optional[List[str]], cursor: Optional[str],
+                              newest_first: bool) -> Tuple[Dict[str, Any], Optional[Dict[str, int]], List[Tuple[str, int]]]:
+    """Filter, projection and sort of a conversations page"""
+    projection = _history_projection(fields, CONVERSATION_FIELDS, CONVERSATION_PAGE_KEYS)
+    query, sort = _history_query(thread_id, CONVERSATION_PAGE_KEYS, cursor, newest_first)
+    return query, projection, sort
+
+
+def _reads_content(projection: Optional[Dict[str, int]]) -> bool:
+    return projection is None or "content" in projection
+
+
+def get_artifacts_page(thread_id: str, artifact_type: Optional[str] = None, fields: Optional[List[str]] = None,
+                       limit: int = HISTORY_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    One page of a thread's artifacts, newest first.
+
+    Args:
+        thread_id: The thread ID
+        artifact_type: Optional filter by artifact type
+        fields: Fields to return (e.g. ARTIFACT_METADATA_FIELDS), None for whole documents
+        limit: Page size
+        cursor: next_cursor of the previous page, None for the first page
+
+    Returns:
+        {"items": artifact documents, "next_cursor": cursor of the next page, None on the last page}
+
+    Raises:
+        ValueError: If the cursor or a field is invalid
+    """
+    query, projection, sort = _artifacts_page_query(thread_id, artifact_type, fields, cursor)
+    collection = get_client()[APP_DATABASE_NAME]["artifacts"]
+    artifacts = list(collection.find(query, projection).sort(sort).limit(limit + 1))
+
+    if _reads_content(projection):
+        _hydrate_artifact_docs(collection, artifacts)
+    return _history_page(artifacts, limit, fields, ARTIFACT_PAGE_KEYS)
+
+
+def get_conversations_page(thread_id: str, fields: Optional[List[str]] = None, limit: int = HISTORY_PAGE_SIZE,
+                           cursor: Optional[str] = None, newest_first: bool = False) -> Dict[str, Any]:
+    """
+    One page of a thread's conversations in saved (seq) order, oldest first unless newest_first.
+
+    Args:
+        thread_id: The thread ID
+        fields: Fields to return (e.g. CONVERSATION_METADATA_FIELDS), None for whole documents
+        limit: Page size
+        cursor: next_cursor of the previous page (read in the same order), None for the first page
+        newest_first: Page backwards from the most recent message
+
+    Returns:
+        {"items": conversation documents, "next_cursor": cursor of the next page, None on the last page}
+
+    Raises:
+        ValueError: If the cursor or a field is invalid
+    """
+    query, projection, sort = _conversations_page_query(thread_id, fields, cursor, newest_first)
+    collection = get_client()[APP_DATABASE_NAME]["conversations"]
+    conversations = list(collection.find(query, projection).sort(sort).limit(limit + 1))
+    return _history_page(conversations, limit, fields, CONVERSATION_PAGE_KEYS)
+
+
+# Indexes per collection, created at startup (create_indexes / acreate_indexes)
+MONGO_INDEXES = {
+    "artifacts": [
+        [("thread_id", ASCENDING), ("timestamp", -1), ("_id", -1)],
+        [("thread_id", ASCENDING), ("artifact_type", ASCENDING), ("timestamp", -1), ("_id", -1)],
+        # The previous version a delta is encoded against
+        [("thread_id", ASCENDING), ("artifact_type", ASCENDING), ("version_rank", -1)],
+        [("timestamp", -1)],
+    ],
+    "conversations": [
+        [("thread_id", ASCENDING), ("seq", ASCENDING)],
+        [("artifact_id", ASCENDING)],
+    ],
+    "thread_mappings": [
+        [("thread_id", ASCENDING)],
+    ],
+}
+
 
 def create_indexes():
     """
@@ -259,24 +1131,416 @@ def create_indexes():
     This should be called once at application startup.
     """
     try:
-        db = client[APP_DATABASE_NAME]
+        db = get_client()[APP_DATABASE_NAME]
+        for collection_name, indexes in MONGO_INDEXES.items():
+            for keys in indexes:
+                db[collection_name].create_index(keys)
+
+        logger.info("Created indexes for %s database", APP_DATABASE_NAME)
+
+    except Exception as e:
+        logger.error("Failed to create indexes: %s", e)
+
+
+# ==================== Async versions ====================
+# Same behaviour as the functions above, on the lifespan's AsyncMongoClient, for use from
+# the event loop (no blocking round-trips, no worker threads). Only the I/O differs: the
+# queries, encoding decisions and document shaping are the helpers above.
+
+async def asave_session_thread_mapping(session_id: str, thread_id: str):
+    """Save the link between a user's session and a LangGraph thread (see save_session_thread_mapping)."""
+    await asyncio.to_thread(save_session_thread_mapping, session_id, thread_id)
+
+
+async def aget_session_thread_mapping(session_id: str) -> Optional[str]:
+    """Return the LangGraph thread linked to a user's session, if any (see get_session_thread_mapping)."""
+    return await asyncio.to_thread(get_session_thread_mapping, session_id)
+
+
+async def asave_threadID_to_db(session_id: str, thread_id: str) -> None:
+    """Upsert the session's thread mapping document (see save_threadID_to_db)."""
+    await get_async_client()[APP_DATABASE_NAME]["thread_mappings"].replace_one(
+        {"_id": session_id}, _thread_mapping_doc(session_id, thread_id), upsert=True
+    )
+
+
+def get_async_thread_db(thread_id: str):
+    """Get the async database for all app data (single database approach)."""
+    return get_async_client()[APP_DATABASE_NAME]
+
+
+async def _afind_previous_artifact_doc(collection, thread_id: str, artifact_type: str, version: str) -> Optional[Dict[str, Any]]:
+    query, sort = _previous_version_query(thread_id, artifact_type, version)
+    return await collection.find_one(query, sort=sort)
+
+
+async def _aresolve_artifact_content(collection, doc: Dict[str, Any], loaded: Optional[Dict[str, Dict[str, Any]]] = None,
+                                     contents: Optional[Dict[str, Any]] = None, chain: Optional[List[str]] = None) -> Any:
+    if chain is not None:
+        chain.append(doc.get("artifact_id"))
+    if doc.get("content_encoding") == "ref":
+        if not contents or doc.get("content_hash") not in contents:
+            contents = await _aload_contents(collection, [doc])
+        return _referenced_content(doc, contents)
+    if doc.get("content_encoding") != "delta":
+        return doc.get("content")
+
+    base_doc = (loaded or {}).get(doc.get("base_artifact_id"))
+    if base_doc is None:
+        base_doc = await collection.find_one({"_id": _artifact_key(doc["thread_id"], doc.get("base_artifact_id"))})
+    if base_doc is None:
+        raise _missing_base(doc)
+    return _replay_delta(doc, await _aresolve_artifact_content(collection, base_doc, loaded, contents, chain))
+
+
+async def _ahydrate_artifact_doc(collection, doc: Dict[str, Any], loaded: Optional[Dict[str, Dict[str, Any]]] = None,
+                                 contents: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    if _needs_hydration(doc):
+        chain = []
+        try:
+            doc["content"] = await _aresolve_artifact_content(collection, doc, loaded, contents, chain)
+        except Exception as e:
+            _unresolved_content(doc, chain, e)
+    return _drop_encoding_fields(doc)
+
+
+async def _ahydrate_artifact_docs(collection, artifacts: List[Dict[str, Any]]) -> None:
+    loaded = _loaded_by_id(artifacts)
+    contents = await _aload_contents(collection, artifacts)
+    for artifact in artifacts:
+        await _ahydrate_artifact_doc(collection, artifact, loaded, contents)
+
+
+async def _aencode_artifact_content(collection, thread_id: str, artifact_doc: Dict[str, Any]) -> Dict[str, Any]:
+    if not _may_be_delta(artifact_doc):
+        return _snapshot_fields(artifact_doc)
+
+    previous_doc = await _afind_previous_artifact_doc(
+        collection, thread_id, artifact_doc.get("artifact_type"), artifact_doc.get("version")
+    )
+    if previous_doc is None:
+        return _snapshot_fields(artifact_doc)
+
+    try:
+        base_content = await _aresolve_artifact_content(collection, previous_doc)
+    except Exception as e:
+        _unusable_base(previous_doc, e)
+        return _snapshot_fields(artifact_doc)
+    return _delta_fields(artifact_doc, previous_doc, base_content)
+
+
+async def _aload_contents(collection, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    query = _contents_query(docs)
+    if query is None:
+        return {}
+    return _contents_by_hash(await collection.database[CONTENT_COLLECTION].find(query, {"content": 1}).to_list())
+
+
+async def _asave_deduped_artifacts(db, artifact_docs: List[Dict[str, Any]]) -> None:
+    stored_docs, bodies = _dedupe_artifact_docs(artifact_docs)
+    collection = db["artifacts"]
+    previous_docs = await collection.find(*_replaced_docs_query(stored_docs)).to_list()
+    contents = db[CONTENT_COLLECTION]
+    if (await contents.bulk_write(_content_requests(bodies, with_bodies=False), ordered=False)).matched_count < len(bodies):
+        await contents.bulk_write(_content_requests(bodies, with_bodies=True), ordered=False)
+    await collection.bulk_write(_replace_requests(stored_docs), ordered=True)
+    await _arelease_content_refs(db, _stale_content_refs(previous_docs, stored_docs))
+
+
+async def _athread_content_refs(db, thread_id: str) -> Dict[str, List[str]]:
+    return _refs_by_hash(await db["artifacts"].find(*_thread_refs_query(thread_id)).to_list())
+
+
+async def _arelease_content_refs(db, refs: Dict[str, List[str]]) -> None:
+    if not refs:
+        return
+    contents = db[CONTENT_COLLECTION]
+    await contents.bulk_write(_release_requests(refs), ordered=False)
+    await contents.delete_many(_unreferenced_contents_query(refs))
+
+
+async def asave_artifact_to_db(thread_id: str, artifact_data: Dict[str, Any]) -> bool:
+    """
+    Save an artifact to MongoDB (see save_artifact_to_db).
+
+    Returns:
+        bool: True if saved successfully, False otherwise
+    """
+    try:
+        db = get_async_client()[APP_DATABASE_NAME]
+        collection = db["artifacts"]
+        artifact_doc = build_artifact_document(thread_id, artifact_data)
+        indexed_doc = dict(artifact_doc)
+        if ARTIFACT_STORAGE_MODE == "dedupe":
+            await _asave_deduped_artifacts(db, [artifact_doc])
+        else:
+            if ARTIFACT_STORAGE_MODE == "delta":
+                artifact_doc.update(await _aencode_artifact_content(collection, thread_id, artifact_doc))
+
+            await collection.replace_one({"_id": artifact_doc["_id"]}, artifact_doc, upsert=True)
+        await _aindex_for_search([indexed_doc])
+
+        logger.info("Saved artifact %s to MongoDB for thread %s", artifact_doc['_id'], thread_id)
+        return True
+
+    except Exception as e:
+        logger.error("Failed to save artifact to MongoDB: %s", e)
+        return False
+
+    finally:
+        await latest_artifact_cache.ainvalidate([(thread_id, artifact_data.get("artifact_type"))])
+
+
+async def _aassign_seqs(db, conversation_docs: List[Dict[str, Any]]) -> None:
+    for thread_id, docs in _unsequenced(conversation_docs).items():
+        counter = await db[COUNTER_COLLECTION].find_one_and_update(
+            *_seq_block(thread_id, len(docs)), upsert=True, return_document=ReturnDocument.AFTER
+        )
+        _number_docs(docs, counter)
+
+
+async def asave_conversation_to_db(thread_id: str, conversation_data: Dict[str, Any]) -> bool:
+    """
+    Save a conversation entry to MongoDB (see save_conversation_to_db).
+
+    Returns:
+        bool: True if saved successfully, False otherwise
+    """
+    try:
+        db = get_async_client()[APP_DATABASE_NAME]
+        conversation_doc = _conversation_document(thread_id, conversation_data)
+        await _aassign_seqs(db, [conversation_doc])
+        await db["conversations"].insert_one(conversation_doc)
+
+        logger.info("Saved conversation to MongoDB for thread %s", thread_id)
+        return True
+
+    except Exception as e:
+        logger.error("Failed to save conversation to MongoDB: %s", e)
+        return False
+
+
+async def asave_conversations_bulk(conversation_docs: List[Dict[str, Any]]) -> int:
+    """
+    Insert conversation documents with one insert_many (see save_conversations_bulk).
+
+    Returns:
+        Number of conversations stored (including ones stored by an earlier attempt)
+    """
+    if not conversation_docs:
+        return 0
+    db = get_async_client()[APP_DATABASE_NAME]
+    await _aassign_seqs(db, conversation_docs)
+    try:
+        await db["conversations"].insert_many(conversation_docs, ordered=False)
+    except BulkWriteError as e:
+        _raise_unless_duplicates(e)
+    return len(conversation_docs)
+
+
+async def asave_artifacts_bulk(artifact_docs: List[Dict[str, Any]]) -> int:
+    """
+    Upsert artifact documents, in order, with as few bulk_write calls as possible (see save_artifacts_bulk).
+
+    Returns:
+        Number of artifacts stored
+    """
+    try:
+        stored = await _asave_artifacts_bulk(artifact_docs)
+        await _aindex_for_search(artifact_docs)
+        return stored
+    finally:
+        await latest_artifact_cache.ainvalidate(_latest_keys(artifact_docs))
+
+
+async def _asave_artifacts_bulk(artifact_docs: List[Dict[str, Any]]) -> int:
+    if ARTIFACT_STORAGE_MODE == "dedupe":
+        await _asave_deduped_artifacts(get_async_client()[APP_DATABASE_NAME], artifact_docs)
+        return len(artifact_docs)
+
+    collection = get_async_client()[APP_DATABASE_NAME]["artifacts"]
+    pending, pending_types = [], set()
+
+    async def write_pending():
+        if pending:
+            await collection.bulk_write(pending, ordered=True)
+            pending.clear()
+            pending_types.clear()
+
+    for artifact_doc in artifact_docs:
+        if ARTIFACT_STORAGE_MODE == "delta":
+            type_key = _type_key(artifact_doc)
+            if type_key in pending_types:
+                await write_pending()
+            artifact_doc = {**artifact_doc, **await _aencode_artifact_content(collection, artifact_doc["thread_id"], artifact_doc)}
+            pending_types.add(type_key)
+        pending.extend(_replace_requests([artifact_doc]))
+    await write_pending()
+    return len(artifact_docs)
+
+
+async def aget_artifacts_from_db(thread_id: str, artifact_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Retrieve artifacts from MongoDB for a specific thread (see get_artifacts_from_db).
+
+    Returns:
+        List of artifact documents sorted by timestamp (newest first)
+    """
+    try:
+        collection = get_async_client()[APP_DATABASE_NAME]["artifacts"]
+        artifacts = await collection.find(_thread_artifacts_query(thread_id, artifact_type)).sort(ARTIFACT_ORDER).to_list()
+
+        await _ahydrate_artifact_docs(collection, artifacts)
+        for artifact in artifacts:
+            _output_doc(artifact)
+
+        logger.info("Retrieved %s artifacts from MongoDB for thread %s", len(artifacts), thread_id)
+        return artifacts
+
+    except Exception as e:
+        logger.error("Failed to retrieve artifacts from MongoDB: %s", e)
+        return []
+
+
+async def aget_conversations_from_db(thread_id: str) -> List[Dict[str, Any]]:
+    """
+    Retrieve conversations from MongoDB for a specific thread (see get_conversations_from_db).
+
+    Returns:
+        List of conversation documents in the order they were saved (oldest first)
+    """
+    try:
+        collection = get_async_client()[APP_DATABASE_NAME]["conversations"]
+        conversations = await collection.find({"thread_id": thread_id}).sort("seq", 1).to_list()
+        for conversation in conversations:
+            _output_doc(conversation)
+
+        logger.info("Retrieved %s conversations from MongoDB for thread %s", len(conversations), thread_id)
+        return conversations
+
+    except Exception as e:
+        logger.error("Failed to retrieve conversations from MongoDB: %s", e)
+        return []
 
-        # Create indexes for artifacts
-        artifacts_collection = db["artifacts"]
-        artifacts_collection.create_index([("thread_id", ASCENDING), ("timestamp", -1)])
-        artifacts_collection.create_index([("thread_id", ASCENDING), ("artifact_type", ASCENDING)])
-        artifacts_collection.create_index([("timestamp", -1)])
 
-        # Create indexes for conversations
-        conversations_collection = db["conversations"]
-        conversations_collection.create_index([("thread_id", ASCENDING), ("timestamp", ASCENDING)])
-        conversations_collection.create_index([("artifact_id", ASCENDING)])
+async def aget_artifacts_page(thread_id: str, artifact_type: Optional[str] = None, fields: Optional[List[str]] = None,
+                              limit: int = HISTORY_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Return one page of a thread's artifacts, newest first (see get_artifacts_page).
+
+    Raises:
+        ValueError: If the cursor or a field is invalid
+    """
+    query, projection, sort = _artifacts_page_query(thread_id, artifact_type, fields, cursor)
+    collection = get_async_client()[APP_DATABASE_NAME]["artifacts"]
+    artifacts = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list()
 
-        # Create index for thread_mappings
-        thread_mappings_collection = db["thread_mappings"]
-        thread_mappings_collection.create_index([("thread_id", ASCENDING)])
+    if _reads_content(projection):
+        await _ahydrate_artifact_docs(collection, artifacts)
+    return _history_page(artifacts, limit, fields, ARTIFACT_PAGE_KEYS)
+
+
+async def aget_conversations_page(thread_id: str, fields: Optional[List[str]] = None, limit: int = HISTORY_PAGE_SIZE,
+                                  cursor: Optional[str] = None, newest_first: bool = False) -> Dict[str, Any]:
+    """
+    Return one page of a thread's conversations in saved (seq) order (see get_conversations_page).
+
+    Raises:
+        ValueError: If the cursor or a field is invalid
+    """
+    query, projection, sort = _conversations_page_query(thread_id, fields, cursor, newest_first)
+    collection = get_async_client()[APP_DATABASE_NAME]["conversations"]
+    conversations = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list()
+    return _history_page(conversations, limit, fields, CONVERSATION_PAGE_KEYS)
+
+
+async def aget_artifact_from_db(thread_id: str, artifact_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a single artifact by its ID (see get_artifact_from_db).
+
+    Returns:
+        The artifact document or None if not found
+    """
+    try:
+        collection = get_async_client()[APP_DATABASE_NAME]["artifacts"]
+        artifact = await collection.find_one({"_id": _artifact_key(thread_id, artifact_id)})
+
+        if artifact:
+            await _ahydrate_artifact_doc(collection, artifact)
+            _output_doc(artifact)
+            logger.info("Retrieved artifact %s for thread %s", artifact_id, thread_id)
+
+        return artifact
+
+    except Exception as e:
+        logger.error("Failed to retrieve artifact from MongoDB: %s", e)
+        return None
+
+
+async def aget_latest_artifact_version(thread_id: str, artifact_type: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the latest version of a specific artifact type (see get_latest_artifact_version).
+
+    Returns:
+        The latest artifact document or None if not found
+    """
+    hit, artifact = await latest_artifact_cache.aget(thread_id, artifact_type)
+    if hit:
+        return artifact
+
+    try:
+        generation = latest_artifact_cache.generation()
+        collection = get_async_client()[APP_DATABASE_NAME]["artifacts"]
+        artifact = await collection.find_one(_thread_artifacts_query(thread_id, artifact_type), sort=ARTIFACT_ORDER)
+
+        if artifact:
+            await _ahydrate_artifact_doc(collection, artifact)
+            _output_doc(artifact)
+            logger.info("Retrieved latest %s artifact for thread %s", artifact_type, thread_id)
+
+        latest_artifact_cache.put(thread_id, artifact_type, artifact, generation)
+        return artifact
+
+    except Exception as e:
+        logger.error("Failed to retrieve latest artifact from MongoDB: %s", e)
+        return None
+
+
+async def adelete_thread_data(thread_id: str) -> bool:
+    """
+    Delete all data for a specific thread (see delete_thread_data).
+
+    Returns:
+        bool: True if deleted successfully, False otherwise
+    """
+    try:
+        db = get_async_client()[APP_DATABASE_NAME]
+        refs = await _athread_content_refs(db, thread_id)
+        for collection_name, query in _thread_data_queries(thread_id):
+            await db[collection_name].delete_many(query)
+        await _arelease_content_refs(db, refs)
+        await asyncio.to_thread(_unindex_thread, thread_id)
+
+        logger.info("Deleted all data for thread %s", thread_id)
+        return True
+
+    except Exception as e:
+        logger.error("Failed to delete thread data from MongoDB: %s", e)
+        return False
+
+    finally:
+        await latest_artifact_cache.ainvalidate([(thread_id, None)])
+
+
+async def acreate_indexes():
+    """Create the MONGO_INDEXES (see create_indexes)."""
+    try:
+        db = get_async_client()[APP_DATABASE_NAME]
+        for collection_name, indexes in MONGO_INDEXES.items():
+            for keys in indexes:
+                await db[collection_name].create_index(keys)
 
-        logger.info(f"Created indexes for {APP_DATABASE_NAME} database")
+        logger.info("Created indexes for %s database", APP_DATABASE_NAME)
 
     except Exception as e:
-        logger.error(f"Failed to create indexes: {str(e)}")
+        logger.error("Failed to create indexes: %s", e)
@@ -0,0 +1,582 @@
+"""
+embedded_store.py
+
+Embedded SQLite document store speaking the part of the pymongo API that db_utils uses.
+
+For single-node and edge deployments (PERSISTENCE_BACKEND = "sqlite") the artifacts,
+conversations and thread_mappings collections live in one local SQLite file instead of
+MongoDB, so a save is a local transaction rather than a network round-trip. db_utils
+makes the same calls on it as on pymongo (client[db][collection].find / find_one /
+replace_one / find_one_and_replace / update_one / insert_many / bulk_write / delete_many /
+create_index) and gets the same pymongo result objects back, so everything built on top -
+delta encoding, content dedupe, hydration, the write-behind queue - is unchanged.
+
+Each collection is a table (_id TEXT PRIMARY KEY, doc TEXT) holding the rest of the
+document as JSON. create_index(keys) becomes an index on the json_extract() expressions of
+the keys, which SQLite uses for the same filters and sorts as MongoDB would. Filters
+support equality, $gt / $gte / $lt / $lte / $ne / $in on top-level fields and $or,
+projections are applied in SQL (fields holding null are left out of projected documents),
+updates support $set / $setOnInsert / $unset / $inc / $addToSet / $pull. Values are JSON types: ObjectIds
+and datetimes are stored (and returned) as strings, datetimes as fixed-width UTC ISO strings
+at MongoDB's millisecond precision (naive ones are UTC, as in pymongo), so they sort in
+time order.
+
+The file is shared by all worker processes on the host (WAL, the checkpoint storage
+profile's pragmas). The async client runs the same calls in a worker thread.
+"""
+
+import asyncio
+import copy
+import json
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from bson import ObjectId
+from pymongo import ASCENDING, InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from backend.db.sqlite_profiles import profile_pragmas
+from backend.path_global_file import EMBEDDED_DB
+
+DUPLICATE_KEY_ERROR = 11000
+
+_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_COMPARISONS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<=", "$ne": "IS NOT"}
+
+Filter = Optional[Dict[str, Any]]
+SortSpec = Union[str, Sequence[Tuple[str, int]]]
+
+
+def _check_name(name: str) -> str:
+    if not _NAME.match(name):
+        raise ValueError(f"Unsupported name in the embedded store: {name!r}")
+    return name
+
+
+def _column(field: str) -> str:
+    """SQL expression of a top-level field (the same text in queries and indexes)"""
+    if field == "_id":
+        return "_id"
+    return f"json_extract(doc, '$.{_check_name(field)}')"
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+    raise TypeError(f"Object of type {type(value).__name__} is not storable in the embedded store")
+
+
+def _param(value: Any) -> Any:
+    """A filter value as compared against json_extract() (true/false come back as 1/0)"""
+    if isinstance(value, (ObjectId, datetime)):
+        return _encode(value)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_encode)
+    return value
+
+
+def _conditions(filter: Filter) -> Tuple[List[str], List[Any]]:
+    clauses, params = [], []
+    for field, condition in (filter or {}).items():
+        if field == "$or":
+            branches = []
+            for branch in condition:
+                branch_clauses, branch_params = _conditions(branch)
+                branches.append("(" + (" AND ".join(branch_clauses) or "1") + ")")
+                params.extend(branch_params)
+            clauses.append("(" + (" OR ".join(branches) or "0") + ")")
+            continue
+        column = _column(field)
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            for operator, value in condition.items():
+                if operator == "$in":
+                    values = [_param(item) for item in value]
+                    clauses.append(f"{column} IN ({', '.join('?' * len(values))})" if values else "0")
+                    params.extend(values)
+                elif operator in _COMPARISONS:
+                    clauses.append(f"{column} {_COMPARISONS[operator]} ?")
+                    params.append(_param(value))
+                else:
+                    raise ValueError(f"Unsupported query operator in the embedded store: {operator}")
+        elif condition is None:
+            clauses.append(f"{column} IS NULL")
+        else:
+            clauses.append(f"{column} = ?")
+            params.append(_param(condition))
+    return clauses, params
+
+
+def _where(filter: Filter) -> Tuple[str, List[Any]]:
+    clauses, params = _conditions(filter)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _select(projection: Optional[Dict[str, Any]]) -> str:
+    """
+    SQL of the stored fields to read: with a projection only those leave SQLite, so a
+    listing does not parse the bodies it leaves out (json_patch drops null fields)
+    """
+    if not projection:
+        return "doc"
+    included = [field for field, keep in projection.items() if keep and field != "_id"]
+    if included:
+        members = ", ".join(f"'{_check_name(field)}', {_column(field)}" for field in included)
+        return f"json_patch('{{}}', json_object({members}))"
+    excluded = [f"'$.{_check_name(field)}'" for field in projection if field != "_id"]
+    return f"json_remove(doc, {', '.join(excluded)})" if excluded else "doc"
+
+
+def _order_by(sort: List[Tuple[str, int]]) -> str:
+    if not sort:
+        return " ORDER BY rowid"
+    # No rowid tie-break: it would make SQLite sort the ties of an indexed order in a temp
+    # B-tree (MongoDB does not order ties either)
+    return " ORDER BY " + ", ".join(
+        f"{_column(field)} {'DESC' if direction == -1 else 'ASC'}" for field, direction in sort
+    )
+
+
+def _sort_keys(key_or_list: SortSpec, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or ASCENDING)]
+    return [(field, order) for field, order in key_or_list]
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return doc
+    included = [field for field, keep in projection.items() if keep and field != "_id"]
+    if included:
+        projected = {"_id": doc["_id"]} if projection.get("_id", 1) else {}
+        projected.update({field: doc[field] for field in included if field in doc})
+        return projected
+    return {field: value for field, value in doc.items() if field not in projection}
+
+
+def _split(document: Dict[str, Any]) -> Tuple[str, str]:
+    """(_id, JSON of the other fields) of a document to store"""
+    _id = document["_id"]
+    body = {field: value for field, value in document.items() if field != "_id"}
+    return (_id if isinstance(_id, str) else _encode(_id)), json.dumps(body, default=_encode)
+
+
+class EmbeddedClient:
+    """
+    SQLite file standing in for a MongoClient: `client[database][collection]`.
+
+    Every method is safe to call from any thread (one connection behind a lock).
+
+    Args:
+        path: SQLite file (created on first use)
+        pragmas: Statements run on the connection (default: the checkpoint storage profile)
+    """
+
+    def __init__(self, path: str = EMBEDDED_DB, pragmas: Optional[Sequence[str]] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        # isolation_level=None: transactions are explicit (one per batch)
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        for pragma in profile_pragmas() if pragmas is None else pragmas:
+            self._conn.execute(pragma)
+        self._tables = set()
+
+    def __getitem__(self, name: str) -> "EmbeddedDatabase":
+        return EmbeddedDatabase(self, _check_name(name))
+
+    def _table(self, name: str) -> str:
+        with self._lock:
+            if name not in self._tables:
+                self._conn.execute(f"CREATE TABLE IF NOT EXISTS {name} (_id TEXT PRIMARY KEY, doc TEXT NOT NULL)")
+                self._tables.add(name)
+        return name
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddedDatabase:
+    def __init__(self, client: EmbeddedClient, name: str):
+        self.client = client
+        self.name = name
+
+    def __getitem__(self, name: str) -> "EmbeddedCollection":
+        return EmbeddedCollection(self, f"{self.name}_{_check_name(name)}")
+
+
+class EmbeddedCursor:
+    """Lazy query: sort / skip / limit chain like a pymongo cursor, the rows are read on iteration"""
+
+    def __init__(self, collection: "EmbeddedCollection", filter: Filter, projection: Optional[Dict[str, Any]]):
+        self._collection = collection
+        self._filter = filter
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list: SortSpec, direction: Optional[int] = None) -> "EmbeddedCursor":
+        self._sort.extend(_sort_keys(key_or_list, direction))
+        return self
+
+    def skip(self, count: int) -> "EmbeddedCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "EmbeddedCursor":
+        self._limit = count
+        return self
+
+    def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        if length:
+            self._limit = min(self._limit, length) if self._limit else length
+        return list(self)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        where, params = _where(self._filter)
+        sql = f"SELECT _id, {_select(self._projection)} FROM {self._collection.table}{where}{_order_by(self._sort)}"
+        if self._limit or self._skip:
+            sql += " LIMIT ? OFFSET ?"
+            params += [self._limit or -1, self._skip]
+        rows = self._collection.client.execute(sql, params).fetchall()
+        for _id, doc in rows:
+            yield _project({"_id": _id, **json.loads(doc)}, self._projection)
+
+
+def _is_operator_condition(condition: Any) -> bool:
+    return isinstance(condition, dict) and any(key.startswith("$") for key in condition)
+
+
+def _apply_update(document: Dict[str, Any], update: Dict[str, Any], inserting: bool) -> None:
+    """Apply $set / $setOnInsert / $unset / $inc / $addToSet / $pull to top-level fields"""
+    for operator, fields in update.items():
+        for field in fields:
+            _check_name(field)
+        if operator == "$set" or (operator == "$setOnInsert" and inserting):
+            document.update(fields)
+        elif operator == "$setOnInsert":
+            continue
+        elif operator == "$unset":
+            for field in fields:
+                document.pop(field, None)
+        elif operator == "$inc":
+            for field, amount in fields.items():
+                document[field] = document.get(field, 0) + amount
+        elif operator == "$addToSet":
+            for field, value in fields.items():
+                items = document.setdefault(field, [])
+                for item in value["$each"] if isinstance(value, dict) and "$each" in value else [value]:
+                    if item not in items:
+                        items.append(item)
+        elif operator == "$pull":
+            for field, condition in fields.items():
+                removed = condition["$in"] if isinstance(condition, dict) and "$in" in condition else [condition]
+                document[field] = [item for item in document.get(field, []) if item not in removed]
+        else:
+            raise ValueError(f"Unsupported update operator in the embedded store: {operator}")
+
+
+class EmbeddedCollection:
+    """One collection (table) of the embedded store"""
+
+    def __init__(self, database: "EmbeddedDatabase", table: str):
+        self.database = database
+        self.client = database.client
+        self.table = self.client._table(table)
+
+    def find(self, filter: Filter = None, projection: Optional[Dict[str, Any]] = None) -> EmbeddedCursor:
+        return EmbeddedCursor(self, filter, projection)
+
+    def find_one(self, filter: Filter = None, projection: Optional[Dict[str, Any]] = None,
+                 sort: Optional[SortSpec] = None) -> Optional[Dict[str, Any]]:
+        cursor = self.find(filter, projection).limit(1)
+        if sort:
+            cursor.sort(sort)
+        return next(iter(cursor), None)
+
+    def count_documents(self, filter: Filter = None) -> int:
+        where, params = _where(filter)
+        return self.client.execute(f"SELECT COUNT(*) FROM {self.table}{where}", params).fetchone()[0]
+
+    def _first(self, conn: sqlite3.Connection, filter: Filter) -> Optional[Dict[str, Any]]:
+        where, params = _where(filter)
+        row = conn.execute(f"SELECT _id, doc FROM {self.table}{where} LIMIT 1", params).fetchone()
+        return {"_id": row[0], **json.loads(row[1])} if row else None
+
+    def _insert(self, conn: sqlite3.Connection, document: Dict[str, Any]) -> None:
+        document.setdefault("_id", ObjectId())  # like pymongo, the caller's document gets its _id
+        conn.execute(f"INSERT INTO {self.table} (_id, doc) VALUES (?, ?)", _split(document))
+
+    def _write(self, conn: sqlite3.Connection, document: Dict[str, Any]) -> None:
+        conn.execute(
+            f"INSERT INTO {self.table} (_id, doc) VALUES (?, ?) ON CONFLICT (_id) DO UPDATE SET doc = excluded.doc",
+            _split(document),
+        )
+
+    def _replace(self, conn: sqlite3.Connection, filter: Filter, replacement: Dict[str, Any],
+                 upsert: bool) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """(previous document, raw update result)"""
+        previous = self._first(conn, filter)
+        if previous is None and not upsert:
+            return None, {"n": 0, "nModified": 0}
+        _id = previous["_id"] if previous else replacement.get("_id", (filter or {}).get("_id", ObjectId()))
+        self._write(conn, {**replacement, "_id": _id})
+        if previous is None:
+            return None, {"n": 1, "nModified": 0, "upserted": _id}
+        return previous, {"n": 1, "nModified": 1}
+
+    def _update(self, conn: sqlite3.Connection, filter: Filter, update: Dict[str, Any], upsert: bool) -> Dict[str, Any]:
+        document = self._first(conn, filter)
+        if document is None:
+            if not upsert:
+                return {"n": 0, "nModified": 0}
+            # Like MongoDB, the equality conditions of the filter seed the new document
+            document = {field: value for field, value in (filter or {}).items() if not _is_operator_condition(value)}
+            document.setdefault("_id", ObjectId())
+            _apply_update(document, update, inserting=True)
+            self._insert(conn, document)
+            return {"n": 1, "nModified": 0, "upserted": document["_id"]}
+        updated = copy.deepcopy(document)
+        _apply_update(updated, update, inserting=False)
+        if updated == document:
+            return {"n": 1, "nModified": 0}
+        self._write(conn, updated)
+        return {"n": 1, "nModified": 1}
+
+    def insert_one(self, document: Dict[str, Any]) -> InsertOneResult:
+        """
+        Raises:
+            DuplicateKeyError: If a document with the same _id exists
+        """
+        try:
+            with self.client.transaction() as conn:
+                self._insert(conn, document)
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e), DUPLICATE_KEY_ERROR) from e
+        return InsertOneResult(document["_id"], True)
+
+    def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True) -> InsertManyResult:
+        """
+        Insert the documents in one transaction.
+
+        Raises:
+            BulkWriteError: Duplicate _ids (code 11000), after inserting the other documents
+                (or, if ordered, the ones before the first duplicate)
+        """
+        errors, inserted_ids = [], []
+        with self.client.transaction() as conn:
+            for index, document in enumerate(documents):
+                try:
+                    self._insert(conn, document)
+                    inserted_ids.append(document["_id"])
+                except sqlite3.IntegrityError as e:
+                    errors.append({"index": index, "code": DUPLICATE_KEY_ERROR, "errmsg": str(e)})
+                    if ordered:
+                        break
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors, "writeConcernErrors": [], "nInserted": len(inserted_ids),
+                "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+            })
+        return InsertManyResult(inserted_ids, True)
+
+    def replace_one(self, filter: Filter, replacement: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        with self.client.transaction() as conn:
+            return UpdateResult(self._replace(conn, filter, replacement, upsert)[1], True)
+
+    def find_one_and_replace(self, filter: Filter, replacement: Dict[str, Any],
+                             projection: Optional[Dict[str, Any]] = None, upsert: bool = False) -> Optional[Dict[str, Any]]:
+        """Replace a document and return it as it was before (None if there was none)"""
+        with self.client.transaction() as conn:
+            previous, _ = self._replace(conn, filter, replacement, upsert)
+        return _project(previous, projection) if previous else None
+
+    def update_one(self, filter: Filter, update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        with self.client.transaction() as conn:
+            return UpdateResult(self._update(conn, filter, update, upsert), True)
+
+    def find_one_and_update(self, filter: Filter, update: Dict[str, Any], projection: Optional[Dict[str, Any]] = None,
+                            upsert: bool = False, return_document: bool = False) -> Optional[Dict[str, Any]]:
+        """Update a document and return it as it was before (ReturnDocument.AFTER: as updated)"""
+        with self.client.transaction() as conn:
+            previous = self._first(conn, filter)
+            raw = self._update(conn, filter, update, upsert)
+            document = previous
+            if return_document and raw["n"]:
+                document = self._first(conn, {"_id": raw["upserted"] if "upserted" in raw else previous["_id"]})
+        return _project(document, projection) if document else None
+
+    def bulk_write(self, requests: List[Union[ReplaceOne, UpdateOne, InsertOne]], ordered: bool = True) -> BulkWriteResult:
+        """Apply ReplaceOne / UpdateOne / InsertOne requests in one transaction (all or nothing)"""
+        counts = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0,
+                  "upserted": [], "writeErrors": [], "writeConcernErrors": []}
+        try:
+            with self.client.transaction() as conn:
+                for index, request in enumerate(requests):
+                    if isinstance(request, InsertOne):
+                        self._insert(conn, request._doc)
+                        counts["nInserted"] += 1
+                        continue
+                    if isinstance(request, ReplaceOne):
+                        raw = self._replace(conn, request._filter, request._doc, request._upsert)[1]
+                    elif isinstance(request, UpdateOne):
+                        raw = self._update(conn, request._filter, request._doc, request._upsert)
+                    else:
+                        raise TypeError(f"Unsupported bulk request in the embedded store: {type(request).__name__}")
+                    if "upserted" in raw:
+                        counts["nUpserted"] += 1
+                        counts["upserted"].append({"index": index, "_id": raw["upserted"]})
+                    else:
+                        counts["nMatched"] += raw["n"]
+                        counts["nModified"] += raw["nModified"]
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e), DUPLICATE_KEY_ERROR) from e
+        return BulkWriteResult(counts, True)
+
+    def delete_one(self, filter: Filter) -> DeleteResult:
+        where, params = _where(filter)
+        with self.client.transaction() as conn:
+            row = conn.execute(f"SELECT _id FROM {self.table}{where} LIMIT 1", params).fetchone()
+            if row is not None:
+                conn.execute(f"DELETE FROM {self.table} WHERE _id = ?", row)
+        return DeleteResult({"n": int(row is not None)}, True)
+
+    def delete_many(self, filter: Filter) -> DeleteResult:
+        where, params = _where(filter)
+        with self.client.transaction() as conn:
+            return DeleteResult({"n": conn.execute(f"DELETE FROM {self.table}{where}", params).rowcount}, True)
+
+    def create_index(self, keys: SortSpec, unique: bool = False, **kwargs) -> str:
+        """
+        Index the json_extract() expressions of `keys` (other pymongo options are ignored).
+
+        Returns:
+            The index name
+        """
+        keys = _sort_keys(keys)
+        name = "idx_" + "_".join([self.table] + [f"{field}{'_desc' if order == -1 else ''}" for field, order in keys])
+        columns = ", ".join(f"{_column(field)} {'DESC' if order == -1 else 'ASC'}" for field, order in keys)
+        self.client.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {self.table} ({columns})")
+        return name
+
+
+# ==================== Async versions ====================
+# Same calls as AsyncMongoClient, run in a worker thread
+
+class AsyncEmbeddedCursor:
+    def __init__(self, cursor: EmbeddedCursor):
+        self._cursor = cursor
+
+    def sort(self, key_or_list: SortSpec, direction: Optional[int] = None) -> "AsyncEmbeddedCursor":
+        self._cursor.sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int) -> "AsyncEmbeddedCursor":
+        self._cursor.skip(count)
+        return self
+
+    def limit(self, count: int) -> "AsyncEmbeddedCursor":
+        self._cursor.limit(count)
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._cursor.to_list, length)
+
+    async def __aiter__(self):
+        for document in await self.to_list():
+            yield document
+
+
+class AsyncEmbeddedCollection:
+    def __init__(self, database: "AsyncEmbeddedDatabase", collection: EmbeddedCollection):
+        self.database = database
+        self._collection = collection
+
+    def find(self, filter: Filter = None, projection: Optional[Dict[str, Any]] = None) -> AsyncEmbeddedCursor:
+        return AsyncEmbeddedCursor(self._collection.find(filter, projection))
+
+    async def find_one(self, filter: Filter = None, projection: Optional[Dict[str, Any]] = None,
+                       sort: Optional[SortSpec] = None) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._collection.find_one, filter, projection, sort)
+
+    async def count_documents(self, filter: Filter = None) -> int:
+        return await asyncio.to_thread(self._collection.count_documents, filter)
+
+    async def insert_one(self, document: Dict[str, Any]) -> InsertOneResult:
+        return await asyncio.to_thread(self._collection.insert_one, document)
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True) -> InsertManyResult:
+        return await asyncio.to_thread(self._collection.insert_many, documents, ordered)
+
+    async def replace_one(self, filter: Filter, replacement: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        return await asyncio.to_thread(self._collection.replace_one, filter, replacement, upsert)
+
+    async def find_one_and_replace(self, filter: Filter, replacement: Dict[str, Any],
+                                   projection: Optional[Dict[str, Any]] = None, upsert: bool = False) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._collection.find_one_and_replace, filter, replacement, projection, upsert)
+
+    async def update_one(self, filter: Filter, update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        return await asyncio.to_thread(self._collection.update_one, filter, update, upsert)
+
+    async def find_one_and_update(self, filter: Filter, update: Dict[str, Any], projection: Optional[Dict[str, Any]] = None,
+                                  upsert: bool = False, return_document: bool = False) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._collection.find_one_and_update, filter, update, projection, upsert, return_document)
+
+    async def bulk_write(self, requests: List[Union[ReplaceOne, UpdateOne, InsertOne]], ordered: bool = True) -> BulkWriteResult:
+        return await asyncio.to_thread(self._collection.bulk_write, requests, ordered)
+
+    async def delete_one(self, filter: Filter) -> DeleteResult:
+        return await asyncio.to_thread(self._collection.delete_one, filter)
+
+    async def delete_many(self, filter: Filter) -> DeleteResult:
+        return await asyncio.to_thread(self._collection.delete_many, filter)
+
+    async def create_index(self, keys: SortSpec, unique: bool = False, **kwargs) -> str:
+        return await asyncio.to_thread(self._collection.create_index, keys, unique)
+
+
+class AsyncEmbeddedDatabase:
+    def __init__(self, database: EmbeddedDatabase):
+        self._database = database
+
+    def __getitem__(self, name: str) -> AsyncEmbeddedCollection:
+        return AsyncEmbeddedCollection(self, self._database[name])
+
+
+class AsyncEmbeddedClient:
+    """EmbeddedClient standing in for an AsyncMongoClient"""
+
+    def __init__(self, path: str = EMBEDDED_DB, pragmas: Optional[Sequence[str]] = None):
+        self.sync = EmbeddedClient(path, pragmas)
+
+    def __getitem__(self, name: str) -> AsyncEmbeddedDatabase:
+        return AsyncEmbeddedDatabase(self.sync[name])
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self.sync.close)
@@ -0,0 +1,132 @@
+"""
+Migration: ISO-string timestamps to BSON datetimes, and conversation sequence numbers.
+
+Documents saved before db_utils stored `timestamp` / `saved_at` as datetimes hold ISO
+strings, and their conversations have no `seq`. This converts the times of the artifacts,
+conversations and artifact contents, numbers the conversations of every thread that has
+unnumbered ones (the unnumbered first, by timestamp then _id, followed by those already
+numbered, in their order), sets the thread counters db_utils reserves new numbers from, and
+creates the indexes of db_utils.MONGO_INDEXES.
+
+Runs against the configured backend (PERSISTENCE_BACKEND, MONGODB_URI / EMBEDDED_DB). Run
+it with the app stopped: renumbering races conversations saved meanwhile. Running it again
+changes nothing. Timestamps that cannot be parsed are left as they are and reported.
+On MongoDB, the conversations' former (thread_id, timestamp, _id) index is not used any
+more and can be dropped.
+
+Usage:
+    python -m backend.db.migrate_datetime_seq [--dry-run]
+"""
+
+import sys
+import os
+import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from pymongo import UpdateOne
+
+from backend.db import db_utils
+from backend.db.embedded_store import EmbeddedClient
+
+BATCH_SIZE = 500
+TIME_COLLECTIONS = ["artifacts", "conversations", db_utils.CONTENT_COLLECTION]
+
+
+def _time_changes(doc: Dict[str, Any], embedded: bool, unparseable: List[Any]) -> Dict[str, Any]:
+    """$set of the time fields of `doc` that are not stored datetimes yet"""
+    changes = {}
+    for field in db_utils.TIME_FIELDS:
+        value = doc.get(field)
+        if value is None or isinstance(value, datetime):
+            continue
+        converted = db_utils.stored_datetime(value)
+        if converted is None:
+            unparseable.append(doc["_id"])
+        # The embedded store keeps datetimes as strings: only ones in another format change
+        elif not embedded or value != db_utils.iso_timestamp(converted):
+            changes[field] = converted
+    return changes
+
+
+def _write(collection, requests: List[UpdateOne], dry_run: bool) -> None:
+    if requests and not dry_run:
+        collection.bulk_write(requests, ordered=False)
+    requests.clear()
+
+
+def migrate_times(db, embedded: bool, dry_run: bool) -> Dict[str, Dict[str, int]]:
+    """Convert the time fields of every document, per collection"""
+    results = {}
+    for name in TIME_COLLECTIONS:
+        collection = db[name]
+        requests, converted, unparseable = [], 0, []
+        for doc in collection.find({}, {field: 1 for field in db_utils.TIME_FIELDS}):
+            changes = _time_changes(doc, embedded, unparseable)
+            if changes:
+                requests.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+                converted += 1
+            if len(requests) >= BATCH_SIZE:
+                _write(collection, requests, dry_run)
+        _write(collection, requests, dry_run)
+        results[name] = {"converted": converted, "unparseable": len(unparseable)}
+    return results
+
+
+def _old_order(doc: Dict[str, Any]):
+    timestamp: Optional[datetime] = db_utils.stored_datetime(doc.get("timestamp"))
+    return timestamp or datetime.min.replace(tzinfo=timezone.utc), str(doc["_id"])
+
+
+def migrate_seqs(db, dry_run: bool) -> Dict[str, int]:
+    """Number the conversations of threads that have unnumbered ones, and set their counters"""
+    threads = defaultdict(list)
+    for doc in db["conversations"].find({}, {"thread_id": 1, "timestamp": 1, "seq": 1}):
+        threads[doc.get("thread_id")].append(doc)
+
+    renumbered_threads, renumbered = 0, 0
+    requests = []
+    for thread_id, docs in threads.items():
+        unnumbered = sorted((doc for doc in docs if doc.get("seq") is None), key=_old_order)
+        if not unnumbered:
+            continue
+        numbered = sorted((doc for doc in docs if doc.get("seq") is not None), key=lambda doc: doc["seq"])
+        for seq, doc in enumerate(unnumbered + numbered, start=1):
+            if doc.get("seq") != seq:
+                requests.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"seq": seq}}))
+                renumbered += 1
+            if len(requests) >= BATCH_SIZE:
+                _write(db["conversations"], requests, dry_run)
+        _write(db["conversations"], requests, dry_run)
+        if not dry_run:
+            db[db_utils.COUNTER_COLLECTION].update_one(
+                {"_id": thread_id}, {"$set": {"conversation_seq": len(docs)}}, upsert=True
+            )
+        renumbered_threads += 1
+    return {"threads": renumbered_threads, "conversations": renumbered}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="count what would change, write nothing")
+    args = parser.parse_args()
+
+    client = db_utils.get_client()
+    db = client[db_utils.APP_DATABASE_NAME]
+    times = migrate_times(db, isinstance(client, EmbeddedClient), args.dry_run)
+    seqs = migrate_seqs(db, args.dry_run)
+    if not args.dry_run:
+        db_utils.create_indexes()
+
+    prefix = "would convert" if args.dry_run else "converted"
+    for name, result in times.items():
+        print(f"{name}: {prefix} {result['converted']} documents ({result['unparseable']} unparseable timestamps left as they are)")
+    print(f"conversations: {'would renumber' if args.dry_run else 'renumbered'} {seqs['conversations']} in {seqs['threads']} threads")
+
+
+if __name__ == "__main__":
+    main()
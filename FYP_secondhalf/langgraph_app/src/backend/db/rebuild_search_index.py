@@ -0,0 +1,51 @@
+"""
+Rebuild the full-text search index (search_index.py) from the artifacts collection.
+
+The index is fed by the artifact writes; this fills it for artifacts saved before it
+existed, or after SEARCH_INDEX_DB was lost. It clears the index, then indexes the latest
+version of every (thread_id, artifact_type) of the configured backend (PERSISTENCE_BACKEND).
+Threads moved out of MongoDB by the archival job (thread_archive.py) are not in the
+collection and drop out of the index until they are restored and written again.
+
+Usage:
+    python -m backend.db.rebuild_search_index
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from backend.db import db_utils
+
+BATCH_SIZE = 200
+
+
+def rebuild(db) -> int:
+    """Clear the index and index the latest artifact of every (thread_id, artifact_type)"""
+    keys = {
+        (doc["thread_id"], doc.get("artifact_type"))
+        for doc in db["artifacts"].find({}, {"thread_id": 1, "artifact_type": 1})
+    }
+    db_utils.artifact_search_index.clear()
+    indexed, batch = 0, []
+    for thread_id, artifact_type in sorted(keys, key=str):
+        artifact = db_utils.get_latest_artifact_version(thread_id, artifact_type)
+        if artifact is not None:
+            batch.append(artifact)
+        if len(batch) >= BATCH_SIZE:
+            indexed += db_utils.artifact_search_index.index_artifacts(batch)
+            batch.clear()
+    return indexed + db_utils.artifact_search_index.index_artifacts(batch)
+
+
+def main():
+    started = time.perf_counter()
+    indexed = rebuild(db_utils.get_client()[db_utils.APP_DATABASE_NAME])
+    print(f"Indexed {indexed} artifacts into {db_utils.artifact_search_index.db_path} in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
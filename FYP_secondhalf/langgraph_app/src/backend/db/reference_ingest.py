@@ -0,0 +1,224 @@
+"""
+reference_ingest.py
+
+Reference documents for the Archivist: text, Markdown and PDF files are chunked into the
+vector index (db/vector_index.py, source_type "reference"), so that prompts cite compact
+"<document_id>#<n>" chunk ids and carry only the chunks they need, not whole documents.
+
+An upload is streamed to a temporary file while its SHA-256 is computed (both in a worker
+thread, REFERENCE_SPOOL_BUFFER_BYTES at a time); only
+REFERENCE_MAX_UPLOAD_BYTES bounds its size, not memory. If the document is re-uploaded
+unchanged, or a new upload without an explicit id is a file the index already has under
+another name, nothing is re-embedded. Otherwise the file is read piece by piece
+(REFERENCE_READ_BLOCK_BYTES of text, or one PDF page, at a time), chunked with
+IncrementalChunker and embedded REFERENCE_EMBED_BATCH_CHUNKS chunks at a time, so memory use
+does not grow with the document.
+
+PDF text extraction needs the optional `pypdf` package.
+"""
+
+import asyncio
+import codecs
+import hashlib
+import os
+import re
+import tempfile
+import logging
+from typing import Any, AsyncIterable, Dict, Iterator, List, Optional
+
+from backend.path_global_file import (
+    REFERENCE_MAX_UPLOAD_BYTES,
+    REFERENCE_READ_BLOCK_BYTES,
+    REFERENCE_SPOOL_BUFFER_BYTES,
+    REFERENCE_EMBED_BATCH_CHUNKS,
+    VECTOR_CHUNK_WORDS,
+    VECTOR_CHUNK_OVERLAP_WORDS,
+    OEL_REFERENCE_ID,
+    REFERENCE_DEFAULT_OEL_FILE,
+)
+from backend.db.vector_index import IncrementalChunker, VectorIndex
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {".txt": "text", ".text": "text", ".md": "markdown", ".markdown": "markdown", ".pdf": "pdf"}
+DOCUMENT_ID_MAX_LENGTH = 48
+
+
+class UploadTooLarge(Exception):
+    """The upload is over REFERENCE_MAX_UPLOAD_BYTES"""
+
+
+class DocumentIdConflict(Exception):
+    """The document id is taken by a document of another thread (or of every thread)"""
+
+
+def document_format(filename: str, head: bytes = b"") -> str:
+    """
+    "text", "markdown" or "pdf", from the file extension (or the %PDF- signature).
+
+    Raises:
+        ValueError: Not a supported format
+    """
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported reference document {filename!r}: upload {', '.join(sorted(FORMATS))} files")
+    return FORMATS[extension]
+
+
+def document_id_for(filename: str) -> str:
+    """Compact id from a file name ("Operating Environment v2.pdf" -> "operating-environment-v2")"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    slug = re.sub(r"[^a-z0-9]+", "-", stem.lower()).strip("-")[:DOCUMENT_ID_MAX_LENGTH].rstrip("-")
+    return slug or "document"
+
+
+def iter_text(path: str, block_bytes: int = REFERENCE_READ_BLOCK_BYTES) -> Iterator[str]:
+    """The text of a UTF-8 file in pieces (a character split between blocks is decoded whole)"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    with open(path, "rb") as f:
+        while block := f.read(block_bytes):
+            yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
+
+
+def iter_pdf_text(path: str) -> Iterator[str]:
+    """
+    The text of a PDF one page at a time (pypdf reads the pages from the file as they are asked for).
+
+    Raises:
+        ValueError: pypdf is not installed
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:  # pypdf is an optional dependency
+        raise ValueError("PDF reference documents need the pypdf package (pip install pypdf)")
+    for page in PdfReader(path).pages:
+        yield (page.extract_text() or "") + "\n"
+
+
+def iter_chunk_batches(pieces: Iterator[str], batch_size: int = REFERENCE_EMBED_BATCH_CHUNKS,
+                       words: int = VECTOR_CHUNK_WORDS, overlap: int = VECTOR_CHUNK_OVERLAP_WORDS) -> Iterator[List[str]]:
+    """Chunks of a text given in pieces, batch_size at a time"""
+    chunker = IncrementalChunker(words, overlap)
+    batch: List[str] = []
+    for piece in pieces:
+        batch += chunker.feed(piece)
+        while len(batch) >= batch_size:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
+    batch += chunker.finish()
+    for start in range(0, len(batch), batch_size):
+        yield batch[start:start + batch_size]
+
+
+def file_sha256(path: str, block_bytes: int = REFERENCE_READ_BLOCK_BYTES) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_bytes):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def ingest_file(index: VectorIndex, path: str, filename: Optional[str] = None, document_id: Optional[str] = None,
+                title: Optional[str] = None, thread_id: Optional[str] = None, sha256: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Chunk and embed a reference document file into the index, unless it is there already.
+
+    Args:
+        index: The vector index
+        path: The file
+        filename: Its name, for the format and the default id / title (default: the path's)
+        document_id: Id of the document; replaces the document with this id (only a document
+            stored under this id can make the upload "unchanged")
+        title: Shown with its chunks in prompts (default: the file name)
+        thread_id: Thread the document is for (None: every thread)
+        sha256: The file's hash if known (computed otherwise)
+
+    Returns:
+        {"document_id", "status": "ingested" / "unchanged", "chunks", "sha256", "bytes"};
+        "unchanged" with the id of the document already holding this content (a new document
+        without an explicit id may be another document with the same content)
+
+    Raises:
+        ValueError: Unsupported format, or a PDF without pypdf
+        DocumentIdConflict: The id belongs to a document of another thread
+    """
+    filename = filename or os.path.basename(path)
+    explicit_id = document_id is not None
+    document_id = document_id or document_id_for(filename)
+    sha256 = sha256 or file_sha256(path)
+    size = os.path.getsize(path)
+
+    existing = index.document(document_id)
+    if existing and existing["thread_id"] != thread_id:
+        raise DocumentIdConflict(f"Document id {document_id!r} is already used by another thread's or a shared document")
+    if existing:
+        # Changed content replaces the document, even if another document has the same content
+        duplicate = existing if existing["sha256"] == sha256 else None
+    else:
+        # An explicit id asks for that document; otherwise a copy under another name is not indexed twice
+        duplicate = None if explicit_id else index.find_document(sha256, thread_id)
+    if duplicate:
+        logger.info("Reference document %s is unchanged (%s), not re-indexed", document_id, duplicate["source_id"])
+        return {"document_id": duplicate["source_id"], "status": "unchanged", "chunks": duplicate["chunks"],
+                "sha256": sha256, "bytes": size}
+
+    with open(path, "rb") as f:
+        head = f.read(5)
+    pieces = iter_pdf_text(path) if document_format(filename, head) == "pdf" else iter_text(path)
+    chunks = index.add_document(document_id, iter_chunk_batches(pieces), sha256=sha256, size=size,
+                                title=title or filename, thread_id=thread_id)
+    logger.info("Ingested reference document %s (%d bytes) as %d chunks", document_id, size, chunks)
+    return {"document_id": document_id, "status": "ingested", "chunks": chunks, "sha256": sha256, "bytes": size}
+
+
+async def aingest_stream(index: VectorIndex, blocks: AsyncIterable[bytes], filename: str,
+                         max_bytes: int = REFERENCE_MAX_UPLOAD_BYTES, **kwargs) -> Dict[str, Any]:
+    """
+    ingest_file for an upload arriving as a stream of byte blocks (e.g. a request body):
+    spooled to a temporary file and hashed on the way, then ingested in a worker thread.
+    The blocks are gathered into REFERENCE_SPOOL_BUFFER_BYTES buffers, each written and
+    hashed in a worker thread, so the event loop never waits on the disk.
+
+    Args:
+        blocks: The file's bytes
+        filename: Its name
+        max_bytes: Largest upload accepted
+        **kwargs: document_id, title, thread_id (see ingest_file)
+
+    Raises:
+        UploadTooLarge: More than max_bytes were sent
+        ValueError, DocumentIdConflict: See ingest_file
+    """
+    document_format(filename)  # before receiving the whole upload
+    digest = hashlib.sha256()
+    size = 0
+    buffer = bytearray()
+
+    def spool(f, data: bytes) -> None:
+        digest.update(data)
+        f.write(data)
+
+    fd, path = tempfile.mkstemp(prefix="reference-", suffix=os.path.splitext(filename)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for block in blocks:
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Reference documents are limited to {max_bytes} bytes")
+                buffer += block
+                if len(buffer) >= REFERENCE_SPOOL_BUFFER_BYTES:
+                    await asyncio.to_thread(spool, f, bytes(buffer))
+                    buffer.clear()
+            await asyncio.to_thread(spool, f, bytes(buffer))
+        return await asyncio.to_thread(ingest_file, index, path, filename, sha256=digest.hexdigest(), **kwargs)
+    finally:
+        os.remove(path)
+
+
+def seed_default_documents(index: VectorIndex) -> None:
+    """Ingest REFERENCE_DEFAULT_OEL_FILE as OEL_REFERENCE_ID unless that document exists"""
+    if index.document(OEL_REFERENCE_ID) is None and os.path.exists(REFERENCE_DEFAULT_OEL_FILE):
+        ingest_file(index, REFERENCE_DEFAULT_OEL_FILE, document_id=OEL_REFERENCE_ID, title="Operating Environment List")
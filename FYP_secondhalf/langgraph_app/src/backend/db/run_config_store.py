@@ -0,0 +1,320 @@
+"""
+run_config_store.py
+
+Shared store for pending run configurations (and other small per-thread records).
+
+POST /graph/stream/create (or /resume) stores a run config and GET /graph/stream/{thread_id}
+picks it up. With several uvicorn workers those two requests can land on different
+processes, so the configs cannot live in a module-level dict.
+
+Backends:
+- "sqlite": a SQLite file in WAL mode shared by every worker on the host (default)
+- "memory": an in-process dict, a stand-in for single-worker runs and tests
+
+Every record has an optional TTL. claim() gives a worker exclusive use of a record for
+a lease period (atomic across processes for the SQLite backend), so two workers can
+never execute the same pending run.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from backend.path_global_file import (
+    RUN_CONFIG_BACKEND,
+    RUN_CONFIG_DB,
+    RUN_CONFIG_TTL_SECONDS,
+    RUN_CONFIG_LEASE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RunConfigStore(ABC):
+    """
+    Key-value records (JSON-serializable dicts) scoped to a namespace.
+
+    Subclasses implement the storage (every abstract method); every method is safe to call
+    from any thread.
+
+    Args:
+        namespace: Separates record kinds sharing one backend (e.g. "run_configs", "session_threads")
+        ttl_seconds: Default time-to-live of a record, 0/None for records that never expire
+        lease_seconds: Default claim lease
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: Optional[float] = RUN_CONFIG_TTL_SECONDS,
+                 lease_seconds: float = RUN_CONFIG_LEASE_SECONDS):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+
+    def _expires_at(self, ttl_seconds: Optional[float]) -> Optional[float]:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        return time.time() + ttl if ttl else None
+
+    @abstractmethod
+    def put(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        """Create or replace a record (any existing claim is dropped)."""
+
+    @abstractmethod
+    def add(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Create the record unless a live one exists (atomic across processes for the SQLite backend).
+
+        Returns:
+            None if the record was created, otherwise the existing record
+        """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the record, or None if missing or expired."""
+
+    @abstractmethod
+    def claim(self, key: str, owner: str, lease_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the record for `owner` until the lease expires.
+
+        Returns:
+            The record if it exists and is unclaimed, its lease has expired, or it is
+            already held by `owner`; None otherwise.
+        """
+
+    @abstractmethod
+    def release(self, key: str, owner: str, value: Optional[Dict[str, Any]] = None) -> None:
+        """Drop `owner`'s claim, keeping the record (with `value` as its new value, if given)."""
+
+    @abstractmethod
+    def delete(self, key: str, owner: Optional[str] = None) -> None:
+        """Remove the record (only while `owner` holds its claim, if given)."""
+
+    @abstractmethod
+    def keys(self) -> List[str]:
+        """Keys of all live records."""
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+
+class InMemoryRunConfigStore(RunConfigStore):
+    """Process-local stand-in: only correct with a single worker."""
+
+    _shared: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, namespace: str, **kwargs):
+        super().__init__(namespace, **kwargs)
+        self._records = self._shared.setdefault(namespace, {})
+
+    def _live(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        record = self._records.get(key)
+        if record and record["expires_at"] is not None and record["expires_at"] <= now:
+            del self._records[key]
+            return None
+        return record
+
+    def put(self, key, value, ttl_seconds=None):
+        with self._lock:
+            self._records[key] = {
+                "value": json.loads(json.dumps(value)),
+                "expires_at": self._expires_at(ttl_seconds),
+                "claimed_by": None,
+                "claim_expires_at": None,
+            }
+
+    def add(self, key, value, ttl_seconds=None):
+        with self._lock:
+            record = self._live(key, time.time())
+            if record is not None:
+                return json.loads(json.dumps(record["value"]))
+            self._records[key] = {
+                "value": json.loads(json.dumps(value)),
+                "expires_at": self._expires_at(ttl_seconds),
+                "claimed_by": None,
+                "claim_expires_at": None,
+            }
+            return None
+
+    def get(self, key):
+        with self._lock:
+            record = self._live(key, time.time())
+            return json.loads(json.dumps(record["value"])) if record else None
+
+    def claim(self, key, owner, lease_seconds=None):
+        now = time.time()
+        with self._lock:
+            record = self._live(key, now)
+            if record is None:
+                return None
+            if record["claimed_by"] not in (None, owner) and record["claim_expires_at"] > now:
+                return None
+            record["claimed_by"] = owner
+            record["claim_expires_at"] = now + (lease_seconds or self.lease_seconds)
+            return json.loads(json.dumps(record["value"]))
+
+    def release(self, key, owner, value=None):
+        with self._lock:
+            record = self._records.get(key)
+            if record and record["claimed_by"] == owner:
+                if value is not None:
+                    record["value"] = json.loads(json.dumps(value))
+                record["claimed_by"] = None
+                record["claim_expires_at"] = None
+
+    def delete(self, key, owner=None):
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and (owner is None or record["claimed_by"] == owner):
+                del self._records[key]
+
+    def keys(self):
+        now = time.time()
+        with self._lock:
+            return [key for key in list(self._records) if self._live(key, now)]
+
+
+class SqliteRunConfigStore(RunConfigStore):
+    """SQLite (WAL) backed store shared by all worker processes on the host."""
+
+    def __init__(self, namespace: str, db_path: str = RUN_CONFIG_DB, **kwargs):
+        super().__init__(namespace, **kwargs)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # isolation_level=None: we manage transactions explicitly (BEGIN IMMEDIATE for claims)
+        self._conn = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL;")
+        self._conn.execute("PRAGMA synchronous = NORMAL;")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS run_configs (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                claimed_by TEXT,
+                claim_expires_at REAL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_run_configs_expires ON run_configs (expires_at)")
+
+    def _purge_expired(self, now: float) -> None:
+        self._conn.execute(
+            "DELETE FROM run_configs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        )
+
+    def put(self, key, value, ttl_seconds=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO run_configs (namespace, key, value, expires_at, claimed_by, claim_expires_at) "
+                "VALUES (?, ?, ?, ?, NULL, NULL)",
+                (self.namespace, key, json.dumps(value), self._expires_at(ttl_seconds)),
+            )
+
+    def add(self, key, value, ttl_seconds=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value FROM run_configs WHERE namespace = ? AND key = ? "
+                    "AND (expires_at IS NULL OR expires_at > ?)",
+                    (self.namespace, key, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO run_configs (namespace, key, value, expires_at, claimed_by, claim_expires_at) "
+                        "VALUES (?, ?, ?, ?, NULL, NULL)",
+                        (self.namespace, key, json.dumps(value), self._expires_at(ttl_seconds)),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return json.loads(row[0]) if row else None
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM run_configs WHERE namespace = ? AND key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (self.namespace, key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim(self, key, owner, lease_seconds=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "UPDATE run_configs SET claimed_by = ?, claim_expires_at = ? "
+                    "WHERE namespace = ? AND key = ? "
+                    "AND (expires_at IS NULL OR expires_at > ?) "
+                    "AND (claimed_by IS NULL OR claimed_by = ? OR claim_expires_at <= ?)",
+                    (owner, now + (lease_seconds or self.lease_seconds), self.namespace, key, now, owner, now),
+                )
+                row = None
+                if cursor.rowcount == 1:
+                    row = self._conn.execute(
+                        "SELECT value FROM run_configs WHERE namespace = ? AND key = ?",
+                        (self.namespace, key),
+                    ).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return json.loads(row[0]) if row else None
+
+    def release(self, key, owner, value=None):
+        with self._lock:
+            if value is None:
+                self._conn.execute(
+                    "UPDATE run_configs SET claimed_by = NULL, claim_expires_at = NULL "
+                    "WHERE namespace = ? AND key = ? AND claimed_by = ?",
+                    (self.namespace, key, owner),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE run_configs SET value = ?, claimed_by = NULL, claim_expires_at = NULL "
+                    "WHERE namespace = ? AND key = ? AND claimed_by = ?",
+                    (json.dumps(value), self.namespace, key, owner),
+                )
+
+    def delete(self, key, owner=None):
+        with self._lock:
+            if owner is None:
+                self._conn.execute(
+                    "DELETE FROM run_configs WHERE namespace = ? AND key = ?", (self.namespace, key)
+                )
+            else:
+                self._conn.execute(
+                    "DELETE FROM run_configs WHERE namespace = ? AND key = ? AND claimed_by = ?",
+                    (self.namespace, key, owner),
+                )
+
+    def keys(self):
+        with self._lock:
+            self._purge_expired(time.time())
+            rows = self._conn.execute(
+                "SELECT key FROM run_configs WHERE namespace = ?", (self.namespace,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_run_config_store(namespace: str, backend: str = RUN_CONFIG_BACKEND, **kwargs) -> RunConfigStore:
+    """Create the store for `namespace` using the configured backend ("sqlite" or "memory")."""
+    if backend == "sqlite":
+        return SqliteRunConfigStore(namespace, **kwargs)
+    if backend == "memory":
+        return InMemoryRunConfigStore(namespace, **kwargs)
+    raise ValueError(f"Unknown run config backend: {backend}")
@@ -0,0 +1,279 @@
+"""
+search_index.py
+
+Full-text index (SQLite FTS5) over the text of the saved artifacts, for searching all
+threads at once: requirements mentioning "offline mode", or where a requirement_id is.
+
+db_utils feeds it from the artifact write paths, so it is updated incrementally, and it
+keeps the latest version of each (thread_id, artifact_type), split into sections: one per
+requirement (requirement_id, requirement_text / requirement_statement), one per SRS
+section, the UML source and the summary. Base64 diagrams are not indexed.
+
+The sections are rows of an ordinary table (search_sections); the FTS5 table indexes them
+as its external content, kept in sync by triggers. Hits are ranked with bm25, a match in the
+section label (e.g. the requirement id) weighing more than one in its text.
+
+The index lives in its own file (SEARCH_INDEX_DB, WAL mode, shared by all worker processes
+on the host). It is not the source of truth: rebuild_search_index.py rebuilds it from the
+artifacts collection.
+"""
+
+import asyncio
+import re
+import sqlite3
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend.path_global_file import SEARCH_INDEX_DB
+
+logger = logging.getLogger(__name__)
+
+# Content fields holding a list of requirements, and the text field of their items
+REQUIREMENT_LISTS = {"req_class_id": "requirement_text", "srl": "requirement_statement"}
+# Content fields indexed as one section each (SRS sections, UML source, summaries)
+TEXT_SECTIONS = [
+    "brief_introduction",
+    "product_description",
+    "functional_requirements",
+    "non_functional_requirements",
+    "references",
+    "uml_fmt_content",
+    "summary",
+]
+LABEL_WEIGHT = 4.0  # bm25 weight of the label column relative to the text
+SNIPPET_MARKERS = ("**", "**")
+SNIPPET_TOKENS = 16
+
+
+def artifact_sections(content: Any) -> List[Tuple[str, str]]:
+    """
+    The (label, text) sections of an artifact's content.
+
+    Requirements are labelled with their requirement_id, other sections with their field name.
+    """
+    if isinstance(content, str):
+        return [("content", content)] if content.strip() else []
+    if not isinstance(content, dict):
+        return []
+    sections = []
+    for field, text_field in REQUIREMENT_LISTS.items():
+        for item in content.get(field) or []:
+            if isinstance(item, dict) and item.get(text_field):
+                sections.append((str(item.get("requirement_id") or field), str(item[text_field])))
+    for field in TEXT_SECTIONS:
+        if isinstance(content.get(field), str) and content[field].strip():
+            sections.append((field, content[field]))
+    return sections
+
+
+def match_expression(query: str) -> str:
+    """
+    FTS5 MATCH expression of a user query: every word (or "quoted phrase") must occur; a
+    trailing * makes a word a prefix. FTS5 syntax in the query is taken literally.
+
+    Raises:
+        ValueError: No words in the query
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        prefix = not phrase and word.endswith("*") and len(word) > 1
+        text = phrase or (word.rstrip("*") if prefix else word)
+        if text.strip():
+            terms.append('"{}"'.format(text.replace('"', '""')) + ("*" if prefix else ""))
+    if not terms:
+        raise ValueError("Empty search query")
+    return " ".join(terms)
+
+
+def sort_time(artifact_doc: Dict[str, Any]) -> str:
+    """The artifact's time as a sortable string (db_utils' read format: UTC ISO, milliseconds)"""
+    value = artifact_doc.get("timestamp") or artifact_doc.get("saved_at")
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat(timespec="milliseconds")
+    return str(value or "")
+
+
+class ArtifactSearchIndex:
+    """
+    FTS5 index of the latest artifact of each (thread_id, artifact_type).
+
+    Safe to call from any thread (the write-behind workers save artifacts too). The
+    connection is opened on first use.
+
+    Args:
+        db_path: SQLite file of the index
+    """
+
+    def __init__(self, db_path: str = SEARCH_INDEX_DB):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.indexed_artifacts = 0
+        self.searches = 0
+        self._search_seconds = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL;")
+            conn.execute("PRAGMA synchronous = NORMAL;")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS search_sections (
+                    id INTEGER PRIMARY KEY,
+                    thread_id TEXT NOT NULL,
+                    artifact_type TEXT NOT NULL,
+                    artifact_id TEXT,
+                    version TEXT,
+                    sort_time TEXT NOT NULL,
+                    label TEXT NOT NULL,
+                    body TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_search_sections_artifact ON search_sections (thread_id, artifact_type);
+                CREATE INDEX IF NOT EXISTS idx_search_sections_label ON search_sections (label);
+                CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+                    label, body, content='search_sections', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS search_sections_insert AFTER INSERT ON search_sections BEGIN
+                    INSERT INTO search_fts (rowid, label, body) VALUES (new.id, new.label, new.body);
+                END;
+                CREATE TRIGGER IF NOT EXISTS search_sections_delete AFTER DELETE ON search_sections BEGIN
+                    INSERT INTO search_fts (search_fts, rowid, label, body) VALUES ('delete', old.id, old.label, old.body);
+                END;
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def index_artifacts(self, artifact_docs: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index artifact documents (with their full content), replacing the sections of the
+        same (thread_id, artifact_type) unless those come from a newer version.
+
+        Returns:
+            Number of artifacts indexed
+        """
+        latest: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for doc in artifact_docs:
+            key = (doc["thread_id"], doc.get("artifact_type") or "")
+            if key not in latest or sort_time(doc) >= sort_time(latest[key]):
+                latest[key] = doc
+        if not latest:
+            return 0
+        indexed = 0
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for (thread_id, artifact_type), doc in latest.items():
+                    doc_time = sort_time(doc)
+                    newer = conn.execute(
+                        "SELECT 1 FROM search_sections WHERE thread_id = ? AND artifact_type = ? AND sort_time > ? LIMIT 1",
+                        (thread_id, artifact_type, doc_time),
+                    ).fetchone()
+                    if newer:
+                        continue
+                    conn.execute("DELETE FROM search_sections WHERE thread_id = ? AND artifact_type = ?", (thread_id, artifact_type))
+                    conn.executemany(
+                        "INSERT INTO search_sections (thread_id, artifact_type, artifact_id, version, sort_time, label, body) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (thread_id, artifact_type, doc.get("artifact_id"), doc.get("version"), doc_time, label, body)
+                            for label, body in artifact_sections(doc.get("content"))
+                        ],
+                    )
+                    indexed += 1
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self.indexed_artifacts += indexed
+        return indexed
+
+    def remove_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM search_sections WHERE thread_id = ?", (thread_id,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM search_sections")
+
+    def search(self, query: Optional[str] = None, thread_id: Optional[str] = None,
+               artifact_type: Optional[str] = None, requirement_id: Optional[str] = None,
+               limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Ranked sections matching the query (best first), with a snippet of the match.
+
+        Args:
+            query: Words / "phrases" that must all occur (see match_expression)
+            thread_id, artifact_type: Optional filters
+            requirement_id: Only the section of this requirement (exact label match); enough
+                on its own, without a query
+
+        Raises:
+            ValueError: Neither a query nor a requirement_id
+        """
+        if not (query and query.strip()) and not requirement_id:
+            raise ValueError("A search needs a query or a requirement_id")
+        filters, params = [], []
+        for column, value in (("thread_id", thread_id), ("artifact_type", artifact_type), ("label", requirement_id)):
+            if value is not None:
+                filters.append(f"s.{column} = ?")
+                params.append(value)
+
+        if query and query.strip():
+            sql = (
+                "SELECT s.thread_id, s.artifact_type, s.artifact_id, s.version, s.label, "
+                f"snippet(search_fts, 1, ?, ?, '…', {SNIPPET_TOKENS}), bm25(search_fts, {LABEL_WEIGHT}, 1.0) AS rank "
+                "FROM search_fts JOIN search_sections s ON s.id = search_fts.rowid "
+                f"WHERE search_fts MATCH ? {''.join(' AND ' + f for f in filters)} ORDER BY rank LIMIT ?"
+            )
+            params = [*SNIPPET_MARKERS, match_expression(query), *params, limit]
+        else:
+            sql = (
+                "SELECT s.thread_id, s.artifact_type, s.artifact_id, s.version, s.label, s.body, 0.0 "
+                f"FROM search_sections s WHERE {' AND '.join(filters)} ORDER BY s.sort_time DESC LIMIT ?"
+            )
+            params = [*params, limit]
+
+        started = time.perf_counter()
+        with self._lock:
+            rows = self._connection().execute(sql, params).fetchall()
+        self.searches += 1
+        self._search_seconds += time.perf_counter() - started
+        return [
+            {
+                "thread_id": thread_id,
+                "artifact_type": artifact_type,
+                "artifact_id": artifact_id,
+                "version": version,
+                "section": label,
+                "snippet": snippet,
+                "score": round(-rank, 4),  # bm25 is lower for better matches
+            }
+            for thread_id, artifact_type, artifact_id, version, label, snippet, rank in rows
+        ]
+
+    async def aindex_artifacts(self, artifact_docs: Iterable[Dict[str, Any]]) -> int:
+        return await asyncio.to_thread(self.index_artifacts, list(artifact_docs))
+
+    async def asearch(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.search, *args, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "indexed_artifacts": self.indexed_artifacts,
+            "searches": self.searches,
+            "avg_search_ms": round(self._search_seconds / self.searches * 1000, 2) if self.searches else 0.0,
+        }
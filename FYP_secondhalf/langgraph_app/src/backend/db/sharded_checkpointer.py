@@ -0,0 +1,224 @@
+"""
+sharded_checkpointer.py
+
+LangGraph checkpointer that spreads threads over several SQLite files.
+
+AsyncSqliteSaver funnels every operation through one connection guarded by one lock,
+so the checkpoint writes of all concurrent runs queue behind each other. Here each
+thread is pinned to one of CHECKPOINT_SHARDS files by a stable hash of its thread_id
+(crc32, the same in every process and across restarts); every shard has its own writer
+connection and lock, plus CHECKPOINT_READ_POOL_SIZE reader connections (WAL lets them
+read while the writer commits), so runs of different threads write in parallel and
+state reads (aget_state) do not queue behind writes.
+
+Every per-thread operation first awaits `on_thread_access(thread_id)` if it is set: the
+thread archive (thread_archive.py) restores archived threads there.
+
+With one shard the file is SQLITE_DB itself, so existing checkpoints stay readable.
+Changing the shard count moves threads to other files: their old checkpoints are not
+found any more (move them first, or reset).
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import zlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from backend.db.sqlite_profiles import profile_pragmas
+from backend.path_global_file import CHECKPOINT_SHARDS, CHECKPOINT_READ_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def shard_paths(base_path: str, num_shards: int) -> List[str]:
+    """SQLite files of the shards (`base_path` itself when there is only one)"""
+    if num_shards <= 1:
+        return [base_path]
+    root, ext = os.path.splitext(base_path)
+    return [f"{root}.{index}{ext}" for index in range(num_shards)]
+
+
+def shard_index(thread_id: str, num_shards: int) -> int:
+    """Stable shard of a thread (crc32: unlike hash(), not salted per process)"""
+    return zlib.crc32(str(thread_id).encode("utf-8")) % num_shards
+
+
+async def _connect(path: str, pragmas: Sequence[str]) -> aiosqlite.Connection:
+    conn = await aiosqlite.connect(path)
+    for pragma in pragmas:
+        await conn.execute(pragma)
+    return conn
+
+
+class _Shard:
+    """One SQLite file: a writer saver and a round-robin pool of reader savers"""
+
+    def __init__(self, path: str, writer: AsyncSqliteSaver, readers: List[AsyncSqliteSaver]):
+        self.path = path
+        self.writer = writer
+        self.readers = readers
+        self._next_reader = itertools.cycle(readers or [writer])
+        self.writes = 0
+        self.reads = 0
+
+    def reader(self) -> AsyncSqliteSaver:
+        self.reads += 1
+        return next(self._next_reader)
+
+    @property
+    def connections(self) -> List[aiosqlite.Connection]:
+        return [self.writer.conn] + [reader.conn for reader in self.readers]
+
+
+class ShardedAsyncSqliteSaver(BaseCheckpointSaver[str]):
+    """
+    Async checkpointer sharding threads over several AsyncSqliteSaver files.
+
+    Create it with `await ShardedAsyncSqliteSaver.open(path)` and close it with `aclose()`.
+    Like AsyncSqliteSaver it only has the async interface.
+    """
+
+    def __init__(self, shards: List[_Shard], *, serde=None):
+        super().__init__(serde=serde)
+        if not shards:
+            raise ValueError("At least one checkpoint shard is required")
+        self.shards = shards
+        self.on_thread_access: Optional[Callable[[str], Awaitable[None]]] = None
+
+    @classmethod
+    async def open(
+        cls,
+        base_path: str,
+        num_shards: int = CHECKPOINT_SHARDS,
+        readers_per_shard: int = CHECKPOINT_READ_POOL_SIZE,
+        pragmas: Optional[Sequence[str]] = None,
+    ) -> "ShardedAsyncSqliteSaver":
+        """
+        Open (and create the tables of) every shard.
+
+        Args:
+            base_path: Checkpoint database path; shards are `<name>.<i>.sqlite` next to it
+            num_shards: Number of SQLite files
+            readers_per_shard: Reader connections per file (0 = reads use the writer)
+            pragmas: Statements run on every new connection (default: the configured storage profile)
+        """
+        pragmas = profile_pragmas() if pragmas is None else pragmas
+        shards = []
+        for path in shard_paths(base_path, max(1, num_shards)):
+            writer = AsyncSqliteSaver(await _connect(path, pragmas))
+            await writer.setup()  # tables exist before any reader touches the file
+            readers = []
+            for _ in range(max(0, readers_per_shard)):
+                reader = AsyncSqliteSaver(await _connect(path, pragmas))
+                await reader.setup()
+                await reader.conn.execute("PRAGMA query_only = ON;")
+                readers.append(reader)
+            shards.append(_Shard(path, writer, readers))
+        logger.info("Checkpointer: %d SQLite shards, %d readers each", len(shards), max(0, readers_per_shard))
+        return cls(shards)
+
+    @property
+    def connections(self) -> List[aiosqlite.Connection]:
+        """Writer connection of every shard"""
+        return [shard.writer.conn for shard in self.shards]
+
+    def shard_for(self, thread_id: str) -> _Shard:
+        return self.shards[shard_index(thread_id, len(self.shards))]
+
+    def _shard(self, config: RunnableConfig) -> _Shard:
+        return self.shard_for(config["configurable"]["thread_id"])
+
+    async def _accessed(self, thread_id: str) -> None:
+        if self.on_thread_access is not None:
+            await self.on_thread_access(thread_id)
+
+    async def setup(self) -> None:
+        for shard in self.shards:
+            await shard.writer.setup()
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        await self._accessed(config["configurable"]["thread_id"])
+        return await self._shard(config).reader().aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        if config is not None and config.get("configurable", {}).get("thread_id") is not None:
+            await self._accessed(config["configurable"]["thread_id"])
+            async for item in self._shard(config).reader().alist(config, filter=filter, before=before, limit=limit):
+                yield item
+            return
+
+        # No thread: every shard, merged newest first (checkpoint ids are time-ordered)
+        async def collect(shard: _Shard) -> List[CheckpointTuple]:
+            return [item async for item in shard.reader().alist(config, filter=filter, before=before, limit=limit)]
+
+        per_shard = await asyncio.gather(*(collect(shard) for shard in self.shards))
+        merged = heapq.merge(
+            *per_shard, key=lambda item: item.config["configurable"]["checkpoint_id"], reverse=True
+        )
+        for item in itertools.islice(merged, limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        await self._accessed(config["configurable"]["thread_id"])
+        shard = self._shard(config)
+        shard.writes += 1
+        return await shard.writer.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self._accessed(config["configurable"]["thread_id"])
+        shard = self._shard(config)
+        shard.writes += 1
+        await shard.writer.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._accessed(thread_id)
+        await self.shard_for(thread_id).writer.adelete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return self.shards[0].writer.get_next_version(current, channel)
+
+    async def aclose(self) -> None:
+        for shard in self.shards:
+            for conn in shard.connections:
+                await conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "shards": len(self.shards),
+            "readers_per_shard": len(self.shards[0].readers),
+            "writes": [shard.writes for shard in self.shards],
+            "reads": [shard.reads for shard in self.shards],
+        }
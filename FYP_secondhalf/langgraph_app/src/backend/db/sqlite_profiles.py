@@ -0,0 +1,75 @@
+"""
+sqlite_profiles.py
+
+Storage profiles (PRAGMA presets) for the checkpoint SQLite connections.
+
+Every profile keeps WAL with synchronous=NORMAL (durable against an app crash, at most the
+last commits lost on power failure) and differs in how much memory it trades for I/O:
+
+- "low_memory": small page cache, no memory-mapped I/O, temp tables on disk
+- "balanced": moderate cache and mmap, temp tables in memory (the default)
+- "high_throughput": large cache and mmap, larger pages, fewer WAL checkpoints
+
+cache_size is per connection, so a profile costs roughly
+cache_size * CHECKPOINT_SHARDS * (1 + CHECKPOINT_READ_POOL_SIZE). page_size only applies
+to a database created with it (an existing file keeps its page size until a VACUUM).
+Measured with `python -m backend.db.bench_storage_profiles`.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from backend.path_global_file import CHECKPOINT_STORAGE_PROFILE, CHECKPOINT_PRAGMA_OVERRIDES
+
+MB = 1024 * 1024
+
+# Applied to every profile
+BASE_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+}
+
+STORAGE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "low_memory": {
+        "page_size": 4096,
+        "cache_size": -2000,       # negative = KiB: ~2 MB per connection
+        "mmap_size": 0,
+        "temp_store": "FILE",
+        "wal_autocheckpoint": 1000,  # pages (SQLite default)
+    },
+    "balanced": {
+        "page_size": 4096,
+        "cache_size": -8000,       # ~8 MB
+        "mmap_size": 64 * MB,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,
+    },
+    "high_throughput": {
+        "page_size": 8192,         # fewer overflow pages for large checkpoint blobs
+        "cache_size": -32000,      # ~32 MB
+        "mmap_size": 512 * MB,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 4000,  # checkpoint the WAL less often
+    },
+}
+
+
+def profile_settings(profile: str = CHECKPOINT_STORAGE_PROFILE,
+                     overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Merge the base pragmas, a profile and overrides.
+
+    Raises:
+        ValueError: If the profile is unknown
+    """
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown SQLite storage profile: {profile} (expected one of {sorted(STORAGE_PROFILES)})")
+    return {**BASE_PRAGMAS, **STORAGE_PROFILES[profile], **(CHECKPOINT_PRAGMA_OVERRIDES if overrides is None else overrides)}
+
+
+def profile_pragmas(profile: str = CHECKPOINT_STORAGE_PROFILE,
+                    overrides: Optional[Dict[str, Any]] = None) -> List[str]:
+    """PRAGMA statements of a profile, page_size first (it must precede the switch to WAL on a new file)"""
+    settings = profile_settings(profile, overrides)
+    order = sorted(settings, key=lambda name: name != "page_size")
+    return [f"PRAGMA {name} = {settings[name]};" for name in order]
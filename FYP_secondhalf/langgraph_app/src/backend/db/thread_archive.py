@@ -0,0 +1,523 @@
+"""
+thread_archive.py
+
+Moves threads that have been idle for THREAD_ARCHIVE_TTL_SECONDS out of the hot stores (the
+artifacts / conversations collections and the checkpoint files) into one compressed bundle
+per thread on local disk, and restores them transparently on their next access.
+
+A bundle is a directory in THREAD_ARCHIVE_DIR:
+
+- manifest.json: thread id, last archived checkpoint, counts and sizes
+- documents.ndjson.zst: the thread's MongoDB documents, one per line (bson.json_util, so
+  datetimes and ObjectIds round-trip), with the deduplicated bodies its artifacts reference
+  (the thread's conversation counter stays: messages saved later still get new seqs)
+- checkpoints.ndjson.zst: its rows of the checkpoint tables, BLOB columns replaced by
+  references into blobs.zst
+- blobs.zst: the distinct BLOB values, concatenated
+
+zstd comes from the optional `zstandard` package; without it bundles are gzip files (.gz),
+which restore the same way.
+
+Archiving writes the bundle to a temporary directory, publishes it with a rename, then
+deletes exactly the archived rows and documents, so anything a late write added stays hot
+and is merged with the bundle when it is restored. Restoring claims the bundle with a
+rename to the fixed name <bundle>.restoring (another worker restoring the same thread
+waits for it to go), merges it back idempotently and removes it. The checkpointer restores a thread before any operation on it
+(on_thread_access), so graph runs and state reads never see an archived thread; endpoints
+that read MongoDB without the graph call ensure_hot() first.
+"""
+
+import asyncio
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import statistics
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, IO, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+from bson import json_util
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from backend.db import db_utils
+from backend.path_global_file import (
+    THREAD_ARCHIVE_DIR,
+    THREAD_ARCHIVE_TTL_SECONDS,
+    THREAD_ARCHIVE_INTERVAL_SECONDS,
+    THREAD_ARCHIVE_BATCH_SIZE,
+)
+
+try:
+    import zstandard
+except ImportError:  # zstandard is an optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+CHECKPOINT_TABLES = ["checkpoints", "writes"]
+ARCHIVED_COLLECTIONS = ["artifacts", "conversations"]
+RESTORE_WAIT_SECONDS = 30  # how long an access waits for another worker's restore of the thread
+_LATENCY_SAMPLES = 100
+
+# Offset of the uuid6 (checkpoint id) clock, 100 ns steps since 1582-10-15, from the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def checkpoint_time(checkpoint_id: str) -> float:
+    """Unix time a checkpoint was written, from its id (LangGraph's ids are time-based uuid6)"""
+    digits = checkpoint_id.replace("-", "")
+    ticks = (int(digits[0:8], 16) << 28) | (int(digits[8:12], 16) << 12) | int(digits[13:16], 16)
+    return (ticks - _UUID_EPOCH_OFFSET) / 1e7
+
+
+def _compression() -> Tuple[str, str]:
+    return ("zstd", ".zst") if zstandard is not None else ("gzip", ".gz")
+
+
+def _open_compressed(path: str, mode: str, compression: str) -> IO[bytes]:
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed and the zstandard package is not installed")
+        raw = open(path, mode)
+        codec = zstandard.ZstdCompressor(level=10).stream_writer(raw) if mode == "wb" else zstandard.ZstdDecompressor().stream_reader(raw)
+        return codec
+    return gzip.open(path, mode)
+
+
+class _BundleWriter:
+    """Writes the NDJSON streams and the blob stream of one bundle"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.compression, self.extension = _compression()
+        self.raw_bytes = 0
+        self._blobs = _open_compressed(self._path("blobs"), "wb", self.compression)
+        self._blob_offsets: Dict[str, Tuple[int, int]] = {}
+        self._blob_end = 0
+        self._streams: Dict[str, IO[bytes]] = {}
+
+    def _path(self, name: str) -> str:
+        extension = self.extension if name == "blobs" else ".ndjson" + self.extension
+        return os.path.join(self.directory, name + extension)
+
+    def blob(self, value: bytes) -> Dict[str, List[int]]:
+        """Reference to `value` in blobs.zst (identical values are stored once)"""
+        digest = hashlib.sha256(value).hexdigest()
+        if digest not in self._blob_offsets:
+            self._blobs.write(value)
+            self._blob_offsets[digest] = (self._blob_end, len(value))
+            self._blob_end += len(value)
+        self.raw_bytes += len(value)
+        return {"$blob": list(self._blob_offsets[digest])}
+
+    def write(self, stream: str, record: Dict[str, Any]) -> None:
+        if stream not in self._streams:
+            self._streams[stream] = _open_compressed(self._path(stream), "wb", self.compression)
+        line = (json_util.dumps(record) + "\n").encode("utf-8")
+        self.raw_bytes += len(line)
+        self._streams[stream].write(line)
+
+    def close(self) -> None:
+        for stream in [*self._streams.values(), self._blobs]:
+            stream.close()
+
+
+class _BundleReader:
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.compression = self.manifest["compression"]
+        self.extension = ".zst" if self.compression == "zstd" else ".gz"
+        with _open_compressed(os.path.join(directory, "blobs" + self.extension), "rb", self.compression) as f:
+            self._blobs = f.read()
+
+    def records(self, stream: str) -> Iterable[Dict[str, Any]]:
+        path = os.path.join(self.directory, stream + ".ndjson" + self.extension)
+        if not os.path.exists(path):
+            return
+        with _open_compressed(path, "rb", self.compression) as raw:
+            buffered = raw if self.compression == "gzip" else _lines(raw)
+            for line in buffered:
+                if line.strip():
+                    yield json_util.loads(line)
+
+    def blob(self, reference: List[int]) -> bytes:
+        offset, length = reference
+        return self._blobs[offset:offset + length]
+
+
+def _lines(reader) -> Iterable[bytes]:
+    pending = b""
+    while chunk := reader.read(1 << 16):
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        yield from lines
+    if pending:
+        yield pending
+
+
+def _directory_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+class ThreadArchive:
+    """
+    Archives idle threads into bundles and restores them on access.
+
+    Args:
+        checkpointer: The ShardedAsyncSqliteSaver (its on_thread_access is pointed at ensure_hot)
+        directory: Where bundles are kept
+        ttl_seconds: Idle time (since the latest checkpoint) after which a thread is archived
+        is_busy: Optional check for threads that must not be archived now (e.g. running ones)
+    """
+
+    def __init__(self, checkpointer, directory: str = THREAD_ARCHIVE_DIR,
+                 ttl_seconds: float = THREAD_ARCHIVE_TTL_SECONDS,
+                 is_busy: Optional[Callable[[str], bool]] = None):
+        self.checkpointer = checkpointer
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.is_busy = is_busy
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Counter = Counter()  # holders and waiters of each lock, to drop it after use
+        self._task: Optional[asyncio.Task] = None
+        self.archived_threads = 0
+        self.bytes_moved = 0       # uncompressed size of what left the hot stores
+        self.bytes_written = 0     # size of the bundles written
+        self.rehydrations = 0
+        self.rehydrated_bytes = 0
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self.last_run: Dict[str, Any] = {}
+        os.makedirs(directory, exist_ok=True)
+        checkpointer.on_thread_access = self.ensure_hot
+
+    def bundle_path(self, thread_id: str) -> str:
+        return os.path.join(self.directory, quote(str(thread_id), safe="-_.") + ".bundle")
+
+    def is_archived(self, thread_id: str) -> bool:
+        return os.path.isdir(self.bundle_path(thread_id))
+
+    def _restoring_path(self, thread_id: str) -> str:
+        return self.bundle_path(thread_id) + ".restoring"
+
+    @asynccontextmanager
+    async def _lock(self, thread_id: str) -> AsyncIterator[None]:
+        """Serialise archiving and restoring a thread in this worker (the lock goes once nobody uses it)"""
+        lock = self._locks.setdefault(thread_id, asyncio.Lock())
+        self._lock_users[thread_id] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[thread_id] -= 1
+            if not self._lock_users[thread_id]:
+                del self._lock_users[thread_id]
+                del self._locks[thread_id]
+
+    def recover(self) -> None:
+        """
+        Clean up after a crash (call on startup): unpublished bundles are dropped (their
+        threads were never deleted from the hot stores), interrupted restores are put back
+        (restoring merges, so doing it again is harmless).
+        """
+        for path in glob.glob(os.path.join(glob.escape(self.directory), "*.bundle.tmp-*")):
+            shutil.rmtree(path, ignore_errors=True)
+        for path in glob.glob(os.path.join(glob.escape(self.directory), "*.bundle.restoring")):
+            bundle = path[:-len(".restoring")]
+            if os.path.exists(bundle):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.replace(path, bundle)
+
+    # ---------- archiving ----------
+
+    async def idle_threads(self, limit: int = THREAD_ARCHIVE_BATCH_SIZE, now: Optional[float] = None) -> List[str]:
+        """Threads whose latest checkpoint is older than the TTL, longest idle first"""
+        cutoff = (now if now is not None else time.time()) - self.ttl_seconds
+        latest = []
+        for shard in self.checkpointer.shards:
+            async with shard.writer.lock:
+                async with shard.writer.conn.execute(
+                    "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+                ) as cursor:
+                    latest += [tuple(row) async for row in cursor]
+        idle = sorted((checkpoint_id, thread_id) for thread_id, checkpoint_id in latest
+                      if checkpoint_time(checkpoint_id) < cutoff)
+        return [thread_id for _, thread_id in idle[:limit]]
+
+    async def _checkpoint_rows(self, thread_id: str, table: str, last_checkpoint_id: str):
+        writer = self.checkpointer.shard_for(thread_id).writer
+        async with writer.lock:
+            async with writer.conn.execute(
+                f"SELECT * FROM {table} WHERE thread_id = ? AND checkpoint_id <= ?", (thread_id, last_checkpoint_id)
+            ) as cursor:
+                columns = [column[0] for column in cursor.description]
+                return [dict(zip(columns, row)) async for row in cursor]
+
+    async def archive_thread(self, thread_id: str) -> Optional[Dict[str, int]]:
+        """
+        Move one thread into a bundle.
+
+        Returns:
+            {"bytes_moved": ..., "bytes_written": ...}, or None if the thread was skipped
+            (no checkpoints, already archived, or published by another worker first)
+        """
+        async with self._lock(thread_id):
+            if self.is_archived(thread_id):
+                return None
+            writer = self.checkpointer.shard_for(thread_id).writer
+            async with writer.lock:
+                async with writer.conn.execute(
+                    "SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ?", (thread_id,)
+                ) as cursor:
+                    last_checkpoint_id = (await cursor.fetchone())[0]
+            if last_checkpoint_id is None:
+                return None
+
+            db = db_utils.get_async_client()[db_utils.APP_DATABASE_NAME]
+            documents = {name: await db[name].find({"thread_id": thread_id}).to_list() for name in ARCHIVED_COLLECTIONS}
+            refs = await db_utils._athread_content_refs(db, thread_id)
+            bodies = await db[db_utils.CONTENT_COLLECTION].find({"_id": {"$in": list(refs)}}).to_list() if refs else []
+            rows = {table: await self._checkpoint_rows(thread_id, table, last_checkpoint_id) for table in CHECKPOINT_TABLES}
+
+            # Compressing and writing the bundle is CPU and disk work: off the event loop
+            published = await asyncio.to_thread(self._write_bundle, thread_id, last_checkpoint_id, documents, bodies, rows)
+            if published is None:
+                return None  # another worker published it first
+            manifest, written = published
+
+            # Only what went into the bundle: rows and documents written after the snapshot stay
+            for table in CHECKPOINT_TABLES:
+                async with writer.lock:
+                    await writer.conn.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_id <= ?", (thread_id, last_checkpoint_id)
+                    )
+                    await writer.conn.commit()
+            for name, docs in documents.items():
+                if docs:
+                    await db[name].delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+            await db_utils._arelease_content_refs(db, refs)
+            await db_utils.latest_artifact_cache.ainvalidate([(thread_id, None)])
+
+            self.archived_threads += 1
+            self.bytes_moved += manifest["raw_bytes"]
+            self.bytes_written += written
+            logger.info("Archived thread %s: %d bytes moved, %d bytes written", thread_id, manifest["raw_bytes"], written)
+            return {"bytes_moved": manifest["raw_bytes"], "bytes_written": written}
+
+    def _write_bundle(self, thread_id: str, last_checkpoint_id: str, documents: Dict[str, List[Dict[str, Any]]],
+                      bodies: List[Dict[str, Any]], rows: Dict[str, List[Dict[str, Any]]]) -> Optional[Tuple[Dict[str, Any], int]]:
+        """
+        Write the bundle to a temporary directory and publish it with a rename (blocking).
+
+        Returns:
+            (manifest, bytes written), or None if another worker published the bundle first
+        """
+        temporary = f"{self.bundle_path(thread_id)}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(temporary)
+        try:
+            bundle = _BundleWriter(temporary)
+            for name, docs in documents.items():
+                for doc in docs:
+                    bundle.write("documents", {"collection": name, "doc": doc})
+            for body in bodies:
+                bundle.write("documents", {"collection": db_utils.CONTENT_COLLECTION,
+                                           "doc": {"_id": body["_id"], "content": body.get("content"),
+                                                   "saved_at": body.get("saved_at")}})
+            for table, table_rows in rows.items():
+                for row in table_rows:
+                    row = {column: bundle.blob(value) if isinstance(value, bytes) else value for column, value in row.items()}
+                    bundle.write("checkpoints", {"table": table, "row": row})
+            bundle.close()
+            manifest = {
+                "format": BUNDLE_FORMAT,
+                "thread_id": thread_id,
+                "compression": bundle.compression,
+                "archived_at": time.time(),
+                "last_checkpoint_id": last_checkpoint_id,
+                "counts": {**{name: len(docs) for name, docs in documents.items()},
+                           "contents": len(bodies), **{table: len(r) for table, r in rows.items()}},
+                "raw_bytes": bundle.raw_bytes,
+            }
+            with open(os.path.join(temporary, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            written = _directory_size(temporary)
+            os.rename(temporary, self.bundle_path(thread_id))  # publish
+        except OSError:
+            shutil.rmtree(temporary, ignore_errors=True)
+            if self.is_archived(thread_id):
+                return None
+            raise
+        except Exception:
+            shutil.rmtree(temporary, ignore_errors=True)
+            raise
+        return manifest, written
+
+    async def run_once(self, limit: int = THREAD_ARCHIVE_BATCH_SIZE) -> Dict[str, Any]:
+        """Archive the threads idle past the TTL (up to `limit`)"""
+        started = time.monotonic()
+        result = {"archived": 0, "bytes_moved": 0, "bytes_written": 0, "failed": 0}
+        for thread_id in await self.idle_threads(limit):
+            if self.is_busy is not None and self.is_busy(thread_id):
+                continue
+            try:
+                archived = await self.archive_thread(thread_id)
+            except Exception as e:
+                logger.error("Failed to archive thread %s: %s", thread_id, e)
+                result["failed"] += 1
+                continue
+            if archived:
+                result["archived"] += 1
+                result["bytes_moved"] += archived["bytes_moved"]
+                result["bytes_written"] += archived["bytes_written"]
+        result["seconds"] = round(time.monotonic() - started, 3)
+        self.last_run = result
+        if result["archived"] or result["failed"]:
+            logger.info("Archival run: %s", result)
+        return result
+
+    def start(self, interval_seconds: float = THREAD_ARCHIVE_INTERVAL_SECONDS) -> None:
+        """Run the archival job every `interval_seconds` in the background"""
+        if self.ttl_seconds and self._task is None:
+            self._task = asyncio.create_task(self._loop(interval_seconds))
+
+    async def _loop(self, interval_seconds: float) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("Archival run failed: %s", e)
+            await asyncio.sleep(interval_seconds)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ---------- restoring ----------
+
+    async def ensure_hot(self, thread_id: str) -> None:
+        """Restore the thread if it is archived or being restored (two path checks when it is not)"""
+        if self.is_archived(thread_id) or os.path.exists(self._restoring_path(thread_id)):
+            await self.rehydrate(thread_id)
+
+    async def rehydrate(self, thread_id: str) -> bool:
+        """
+        Merge the thread's bundle back into the hot stores and remove it.
+
+        Returns:
+            True if this call restored it, False if there was nothing to restore or
+            another worker restored it meanwhile
+        """
+        async with self._lock(thread_id):
+            bundle = self.bundle_path(thread_id)
+            claimed = self._restoring_path(thread_id)
+            try:
+                os.rename(bundle, claimed)
+            except FileNotFoundError:
+                await self._wait_for_other_restore(claimed)
+                return False
+
+            started = time.perf_counter()
+            try:
+                reader = await asyncio.to_thread(_BundleReader, claimed)
+                await self._restore_checkpoints(thread_id, reader)
+                await self._restore_documents(thread_id, reader)
+            except Exception:
+                os.rename(claimed, bundle)  # the next access tries again
+                raise
+            # Renamed away first so waiters see the restore finish at once (recover() drops leftovers)
+            removed = f"{bundle}.tmp-{uuid.uuid4().hex}"
+            os.rename(claimed, removed)
+            await asyncio.to_thread(shutil.rmtree, removed, ignore_errors=True)
+
+            latency = time.perf_counter() - started
+            self.rehydrations += 1
+            self.rehydrated_bytes += reader.manifest["raw_bytes"]
+            self._latencies.append(latency)
+            logger.info("Restored archived thread %s in %.1f ms", thread_id, latency * 1000)
+            return True
+
+    async def _wait_for_other_restore(self, claimed: str) -> None:
+        deadline = time.monotonic() + RESTORE_WAIT_SECONDS
+        while os.path.exists(claimed):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Restore of {claimed} by another worker did not finish")
+            await asyncio.sleep(0.05)
+
+    async def _restore_checkpoints(self, thread_id: str, reader: _BundleReader) -> None:
+        rows = {table: [] for table in CHECKPOINT_TABLES}
+        for record in reader.records("checkpoints"):
+            rows[record["table"]].append({
+                column: reader.blob(value["$blob"]) if isinstance(value, dict) and "$blob" in value else value
+                for column, value in record["row"].items()
+            })
+        writer = self.checkpointer.shard_for(thread_id).writer
+        async with writer.lock:
+            for table, table_rows in rows.items():
+                if table_rows:
+                    columns = list(table_rows[0])
+                    await writer.conn.executemany(
+                        f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                        [tuple(row[column] for column in columns) for row in table_rows],
+                    )
+            await writer.conn.commit()
+
+    async def _restore_documents(self, thread_id: str, reader: _BundleReader) -> None:
+        documents = {name: [] for name in [*ARCHIVED_COLLECTIONS, db_utils.CONTENT_COLLECTION]}
+        for record in reader.records("documents"):
+            documents[record["collection"]].append(record["doc"])
+        db = db_utils.get_async_client()[db_utils.APP_DATABASE_NAME]
+
+        # Bodies first, with the references of the artifacts that come back
+        refs: Dict[str, List[str]] = {}
+        for artifact in documents["artifacts"]:
+            if artifact.get("content_encoding") == "ref":
+                refs.setdefault(artifact["content_hash"], []).append(artifact["_id"])
+        if documents[db_utils.CONTENT_COLLECTION]:
+            await db[db_utils.CONTENT_COLLECTION].bulk_write([
+                UpdateOne({"_id": body["_id"]},
+                          {"$addToSet": {"refs": {"$each": refs.get(body["_id"], [])}},
+                           "$setOnInsert": {"content": body.get("content"), "saved_at": body.get("saved_at")}},
+                          upsert=True)
+                for body in documents[db_utils.CONTENT_COLLECTION]
+            ], ordered=False)
+        if documents["artifacts"]:
+            await db["artifacts"].bulk_write(
+                [ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in documents["artifacts"]], ordered=False
+            )
+        if documents["conversations"]:
+            try:
+                await db["conversations"].insert_many(documents["conversations"], ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != db_utils.DUPLICATE_KEY_ERROR for error in errors):
+                    raise
+        await db_utils.latest_artifact_cache.ainvalidate([(thread_id, None)])
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "archived_threads": self.archived_threads,
+            "bytes_moved": self.bytes_moved,
+            "bytes_written": self.bytes_written,
+            "rehydrations": self.rehydrations,
+            "rehydrated_bytes": self.rehydrated_bytes,
+            "rehydration_ms_p50": round(statistics.median(latencies) * 1000, 1) if latencies else None,
+            "rehydration_ms_max": round(latencies[-1] * 1000, 1) if latencies else None,
+            "last_run": self.last_run,
+        }
@@ -0,0 +1,722 @@
+"""
+vector_index.py
+
+Local embedding index for the Archivist's retrieval: reference documents and past artifacts
+(the latest VECTOR_INDEX_ARTIFACT_TYPES artifact of every thread) are split into chunks and
+embedded, and write_req_specs puts the top-k chunks for the requirements it is writing up
+into its prompt instead of whole documents.
+
+Storage, in VECTOR_INDEX_DIR:
+
+- vectors.<generation>.f32: the embeddings, one float32 row per chunk, L2-normalised,
+  memory-mapped for searching (the OS pages in what is read; nothing is loaded up front)
+- chunks.sqlite: per row the chunk's source, text and IVF list, and the index metadata
+  (embedder, dimension, row count, IVF centroids). Writes take its write lock, so several
+  worker processes can add to the same index; readers notice other writers' changes by the
+  `version` counter and re-map.
+
+Search is exact ("flat": one matrix-vector product over all rows) or, with
+VECTOR_INDEX_KIND = "ivf" and once there are enough rows to train it, over the
+VECTOR_IVF_PROBES lists (k-means clusters) nearest to the query.
+
+A source added again replaces its chunks; replaced and removed chunks are tombstoned and
+dropped by compact(), which writes the next generation of the vectors file. Reference
+documents (db/reference_ingest.py) are written batch by batch with add_document: their new
+chunks stay pending until the last batch, and the `documents` table records each one's
+content hash, so that an unchanged re-upload can be skipped.
+
+The embedder is pluggable: "hashing" (feature hashing of words and word pairs; needs no
+model or network, deterministic, used by the tests) or "openai" (VECTOR_EMBEDDING_MODEL).
+An index is tied to the embedder it was built with; switching needs a new directory.
+"""
+
+import asyncio
+import functools
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.path_global_file import (
+    VECTOR_INDEX_DIR,
+    VECTOR_EMBEDDER,
+    VECTOR_EMBEDDING_MODEL,
+    VECTOR_HASHING_DIMENSION,
+    VECTOR_INDEX_KIND,
+    VECTOR_IVF_LISTS,
+    VECTOR_IVF_PROBES,
+    VECTOR_CHUNK_WORDS,
+    VECTOR_CHUNK_OVERLAP_WORDS,
+    VECTOR_INDEX_ARTIFACT_TYPES,
+)
+from backend.db.search_index import artifact_sections, sort_time
+
+logger = logging.getLogger(__name__)
+
+IVF_MIN_ROWS_PER_LIST = 39   # rows per list before an IVF index is trained (k-means needs enough points)
+IVF_TRAIN_ITERATIONS = 10
+HASHING_BUCKET_CACHE_SIZE = 1 << 18  # words / word pairs whose hash HashingEmbedder keeps
+COMPACT_DELETED_FRACTION = 0.5  # tombstoned share of the rows that triggers compact() after a write
+# chunks.deleted: live, tombstoned, or written by an add_document that has not finished yet
+LIVE, DELETED, PENDING = 0, 1, 2
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+# ---------- embedders ----------
+
+class Embedder:
+    """Turns texts into L2-normalised float32 vectors (one row per text)."""
+
+    name: str = ""
+    dimension: int = 0
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+class HashingEmbedder(Embedder):
+    """
+    Feature hashing of the words and word pairs of a text (signed, log-scaled counts).
+
+    Deterministic across processes and restarts (blake2b, not hash()), no model needed:
+    retrieval by shared vocabulary, good enough for requirement text and offline tests.
+    """
+
+    def __init__(self, dimension: int = VECTOR_HASHING_DIMENSION):
+        self.dimension = dimension
+        self.name = f"hashing:{dimension}"
+        # feature -> signed bucket (+/-(index + 1)); vocabularies repeat, so most lookups hit
+        self._buckets = functools.lru_cache(maxsize=HASHING_BUCKET_CACHE_SIZE)(self._bucket)
+
+    def _features(self, text: str) -> Counter:
+        words = _TOKEN.findall(text.lower())
+        return Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+    def _bucket(self, feature: str) -> int:
+        digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        return (digest % self.dimension + 1) * (1 if digest >> 63 else -1)
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if not features:
+                continue
+            buckets = np.fromiter((self._buckets(feature) for feature in features), dtype=np.int64, count=len(features))
+            weights = 1.0 + np.log(np.fromiter(features.values(), dtype=np.float64, count=len(features)))
+            np.add.at(vectors[row], np.abs(buckets) - 1, np.sign(buckets) * weights)
+        return _normalise(vectors)
+
+
+class OpenAIEmbedder(Embedder):
+    """OpenAI embeddings (langchain-openai, OPENAI_API_KEY); the dimension is the model's"""
+
+    def __init__(self, model: str = VECTOR_EMBEDDING_MODEL, batch_size: int = 256):
+        from langchain_openai import OpenAIEmbeddings
+
+        self._client = OpenAIEmbeddings(model=model)
+        self.batch_size = batch_size
+        self.name = f"openai:{model}"
+        self.dimension = len(self._client.embed_query("dimension probe"))
+
+    def embed(self, texts):
+        rows = []
+        for start in range(0, len(texts), self.batch_size):
+            rows += self._client.embed_documents(list(texts[start:start + self.batch_size]))
+        return _normalise(np.asarray(rows, dtype=np.float32).reshape(len(texts), self.dimension))
+
+
+def create_embedder(name: str = VECTOR_EMBEDDER) -> Embedder:
+    """Embedder of the configured kind ("hashing" or "openai")."""
+    if name == "hashing":
+        return HashingEmbedder()
+    if name == "openai":
+        return OpenAIEmbedder()
+    raise ValueError(f"Unknown VECTOR_EMBEDDER: {name!r}")
+
+
+class IncrementalChunker:
+    """
+    chunk_text over a text that arrives in pieces: feed() returns the windows completed so
+    far, finish() the last one. Holds at most one window of words plus the current piece,
+    and a word split between two pieces is joined back.
+    """
+
+    def __init__(self, words: int = VECTOR_CHUNK_WORDS, overlap: int = VECTOR_CHUNK_OVERLAP_WORDS):
+        self.words = words
+        self.overlap = min(overlap, words - 1)
+        self._window: List[str] = []
+        self._partial = ""  # trailing word of the last piece, maybe continued by the next
+        self._emitted = False
+
+    def _windows(self, tokens: List[str]) -> Iterator[str]:
+        for token in tokens:
+            self._window.append(token)
+            if len(self._window) == self.words:
+                yield " ".join(self._window)
+                self._emitted = True
+                del self._window[:self.words - self.overlap]
+
+    def feed(self, text: str) -> List[str]:
+        tokens = (self._partial + text).split()
+        self._partial = ""
+        if tokens and text and not text[-1].isspace():
+            self._partial = tokens.pop()
+        return list(self._windows(tokens))
+
+    def finish(self) -> List[str]:
+        chunks = list(self._windows([self._partial] if self._partial else []))
+        self._partial = ""
+        # The rest, unless the previous window already covers it (it is all overlap)
+        if self._window and (not self._emitted or len(self._window) > self.overlap):
+            chunks.append(" ".join(self._window))
+        self._window, self._emitted = [], False
+        return chunks
+
+
+def chunk_text(text: str, words: int = VECTOR_CHUNK_WORDS, overlap: int = VECTOR_CHUNK_OVERLAP_WORDS) -> List[str]:
+    """Split a text into windows of `words` words, consecutive windows sharing `overlap`"""
+    chunker = IncrementalChunker(words, overlap)
+    return chunker.feed(text) + chunker.finish()
+
+
+def artifact_text(content: Any) -> str:
+    """The text of an artifact that is embedded: its sections (search_index.py), labelled"""
+    return "\n".join(f"{label}: {body}" for label, body in artifact_sections(content))
+
+
+# ---------- index ----------
+
+class VectorIndex:
+    """
+    Chunk embeddings on disk with flat or IVF search.
+
+    Safe to call from any thread; opened on first use.
+
+    Args:
+        directory: Where the index files are kept
+        embedder: Embedder to use (default: create_embedder(), made on first use)
+        kind: "flat" or "ivf"
+        nlist: IVF lists (k-means clusters)
+        nprobe: IVF lists searched per query
+    """
+
+    def __init__(self, directory: str = VECTOR_INDEX_DIR, embedder: Optional[Embedder] = None,
+                 kind: str = VECTOR_INDEX_KIND, nlist: int = VECTOR_IVF_LISTS, nprobe: int = VECTOR_IVF_PROBES):
+        if kind not in ("flat", "ivf"):
+            raise ValueError(f"Unknown vector index kind: {kind!r}")
+        self.directory = directory
+        self.kind = kind
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._embedder = embedder
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._loaded_version = -1
+        self._vectors: Optional[np.ndarray] = None
+        self._live = self._kept = self._lists = np.zeros(0)
+        self._source_types: np.ndarray = np.zeros(0, dtype=object)
+        self._thread_ids: np.ndarray = np.zeros(0, dtype=object)
+        self._centroids: Optional[np.ndarray] = None
+        self.searches = 0
+        self.added_chunks = 0
+
+    # ----- storage -----
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = create_embedder()
+        return self._embedder
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, "chunks.sqlite"), timeout=30,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL;")
+            conn.execute("PRAGMA synchronous = NORMAL;")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    row INTEGER PRIMARY KEY,
+                    source_id TEXT NOT NULL,
+                    source_type TEXT NOT NULL,
+                    thread_id TEXT,
+                    title TEXT,
+                    chunk_no INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    list_id INTEGER NOT NULL DEFAULT -1,
+                    deleted INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (source_id);
+                CREATE INDEX IF NOT EXISTS idx_chunks_thread ON chunks (thread_id, source_type);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+                CREATE TABLE IF NOT EXISTS documents (
+                    source_id TEXT PRIMARY KEY,
+                    title TEXT,
+                    thread_id TEXT,
+                    sha256 TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    chunks INTEGER NOT NULL,
+                    ingested_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents (sha256);
+                """
+            )
+            self._conn = conn
+        return self._conn
+
+    def _meta(self, key: str, default: Any = None) -> Any:
+        row = self._connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, **values: Any) -> None:
+        self._connection().executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", list(values.items()))
+
+    def _vectors_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"vectors.{generation}.f32")
+
+    def _check_embedder(self) -> int:
+        """Dimension of the index (set by its first write), checked against the embedder"""
+        built_with = self._meta("embedder")
+        if built_with is None:
+            self._set_meta(embedder=self.embedder.name, dimension=self.embedder.dimension)
+        elif built_with != self.embedder.name:
+            raise ValueError(f"{self.directory} was built with the {built_with} embedder, not {self.embedder.name}")
+        return int(self._meta("dimension"))
+
+    def _refresh(self) -> None:
+        """Re-map the vectors and reload the row metadata if a writer changed them"""
+        version = int(self._meta("version", 0))
+        if version == self._loaded_version:
+            return
+        rows = int(self._meta("rows", 0))
+        dimension = int(self._meta("dimension", 0) or 0)
+        path = self._vectors_path(int(self._meta("generation", 0)))
+        self._vectors = (
+            np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dimension)) if rows and dimension else None
+        )
+        live = np.zeros(rows, dtype=bool)
+        kept = np.zeros(rows, dtype=bool)  # live or pending: not dropped by compact()
+        lists = np.full(rows, -1, dtype=np.int32)
+        source_types = np.empty(rows, dtype=object)
+        thread_ids = np.empty(rows, dtype=object)
+        for row, source_type, thread_id, list_id, deleted in self._connection().execute(
+            "SELECT row, source_type, thread_id, list_id, deleted FROM chunks"
+        ):
+            live[row] = deleted == LIVE
+            kept[row] = deleted != DELETED
+            lists[row] = list_id
+            source_types[row] = source_type
+            thread_ids[row] = thread_id
+        self._live, self._kept, self._lists, self._source_types, self._thread_ids = live, kept, lists, source_types, thread_ids
+        centroids = self._meta("centroids")
+        self._centroids = np.frombuffer(centroids, dtype=np.float32).reshape(-1, dimension) if centroids else None
+        self._loaded_version = version
+
+    def _bump(self) -> None:
+        self._set_meta(version=int(self._meta("version", 0)) + 1)
+
+    # ----- writes -----
+
+    def add_chunks(self, source_id: str, chunks: Sequence[str], source_type: str = "reference",
+                   title: Optional[str] = None, thread_id: Optional[str] = None,
+                   replace: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Add the chunks of a source, replacing the chunks it had.
+
+        Args:
+            source_id: Id of the document / artifact (chunk citations are "<source_id>#<n>")
+            chunks: Chunk texts
+            source_type: "reference" for documents, the artifact type for artifacts
+            title: Shown with the chunks in prompts
+            thread_id: Thread the source belongs to (None: every thread)
+            replace: Also replace the chunks matching these columns (e.g. the previous version
+                of an artifact: {"thread_id": ..., "source_type": ...})
+
+        Returns:
+            Number of chunks added
+        """
+        chunks = [chunk for chunk in chunks if chunk.strip()]
+        vectors = self.embedder.embed(chunks) if chunks else None  # outside the lock: may be a network call
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                dimension = self._check_embedder()
+                conn.execute("UPDATE chunks SET deleted = 1 WHERE source_id = ? AND deleted = 0", (source_id,))
+                conn.execute("DELETE FROM documents WHERE source_id = ?", (source_id,))
+                if replace:
+                    conn.execute(
+                        f"UPDATE chunks SET deleted = 1 WHERE deleted = 0 AND {' AND '.join(f'{column} = ?' for column in replace)}",
+                        list(replace.values()),
+                    )
+                if chunks:
+                    self._append(conn, dimension, vectors, [
+                        (source_id, source_type, thread_id, title, chunk_no, chunk) for chunk_no, chunk in enumerate(chunks)
+                    ])
+                self._bump()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.added_chunks += len(chunks)
+        self._maintain()
+        return len(chunks)
+
+    def add_document(self, source_id: str, chunk_batches: Iterable[Sequence[str]], sha256: str, size: int,
+                     title: Optional[str] = None, thread_id: Optional[str] = None) -> int:
+        """
+        Add a reference document whose chunks come in batches (a large document is never
+        held whole), replacing the document / source with this id. The new chunks are
+        written as they come but only replace the old ones, in one transaction, once the
+        last batch is in: searches meanwhile see the previous version, and a failed ingestion
+        leaves it in place.
+
+        Args:
+            source_id: Id of the document (chunk citations are "<source_id>#<n>")
+            chunk_batches: The chunk texts, in order, in batches
+            sha256: Hash of the uploaded file (find_document() / document() report it)
+            size: Size of the uploaded file in bytes
+            title: Shown with the chunks in prompts
+            thread_id: Thread the document belongs to (None: every thread)
+
+        Returns:
+            Number of chunks added
+        """
+        with self._lock:
+            # What an interrupted ingestion of this document left behind
+            if self._connection().execute("UPDATE chunks SET deleted = ? WHERE source_id = ? AND deleted = ?",
+                                          (DELETED, source_id, PENDING)).rowcount:
+                self._bump()
+        added = 0
+        try:
+            for batch in chunk_batches:
+                batch = [chunk for chunk in batch if chunk.strip()]
+                if not batch:
+                    continue
+                vectors = self.embedder.embed(batch)
+                with self._lock:
+                    conn = self._connection()
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        self._append(conn, self._check_embedder(), vectors, [
+                            (source_id, "reference", thread_id, title, added + offset, chunk) for offset, chunk in enumerate(batch)
+                        ], deleted=PENDING)
+                        self._bump()
+                        conn.execute("COMMIT")
+                    except BaseException:
+                        conn.execute("ROLLBACK")
+                        raise
+                added += len(batch)
+        except BaseException:
+            self._tombstone("source_id = ? AND deleted = ?", (source_id, PENDING), drop_documents=False)
+            raise
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("UPDATE chunks SET deleted = ? WHERE source_id = ? AND deleted = ?", (DELETED, source_id, LIVE))
+                conn.execute("UPDATE chunks SET deleted = ? WHERE source_id = ? AND deleted = ?", (LIVE, source_id, PENDING))
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (source_id, title, thread_id, sha256, bytes, chunks, ingested_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (source_id, title, thread_id, sha256, size, added, datetime.now(timezone.utc).isoformat(timespec="milliseconds")),
+                )
+                self._bump()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.added_chunks += added
+        self._maintain()
+        return added
+
+    def _append(self, conn: sqlite3.Connection, dimension: int, vectors: np.ndarray, rows: List[Tuple],
+                deleted: int = LIVE) -> None:
+        first = int(self._meta("rows", 0))
+        # Written at the committed row count: what a crashed writer left past it is overwritten
+        with open(self._vectors_path(int(self._meta("generation", 0))), "ab+") as f:
+            f.truncate(first * dimension * 4)
+            f.seek(first * dimension * 4)
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        list_ids = self._assign_lists(vectors, dimension)
+        conn.executemany(
+            "INSERT INTO chunks (row, source_id, source_type, thread_id, title, chunk_no, text, list_id, deleted) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(first + offset, *row, int(list_id), deleted) for offset, (row, list_id) in enumerate(zip(rows, list_ids))],
+        )
+        self._set_meta(rows=first + len(rows))
+
+    def _assign_lists(self, vectors: np.ndarray, dimension: int) -> np.ndarray:
+        centroids = self._meta("centroids")
+        if not centroids:
+            return np.full(len(vectors), -1)
+        return np.argmax(vectors @ np.frombuffer(centroids, dtype=np.float32).reshape(-1, dimension).T, axis=1)
+
+    def remove_source(self, source_id: str) -> None:
+        self._tombstone("source_id = ?", (source_id,))
+
+    def remove_thread(self, thread_id: str) -> None:
+        """Drop the chunks of a thread's artifacts and documents"""
+        self._tombstone("thread_id = ?", (thread_id,))
+
+    def _tombstone(self, where: str, params: Tuple, drop_documents: bool = True) -> None:
+        """Tombstone the live and pending chunks matching `where` (and the matching documents)"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute(f"UPDATE chunks SET deleted = {DELETED} WHERE deleted != {DELETED} AND {where}", params).rowcount:
+                    self._bump()
+                if drop_documents:
+                    conn.execute(f"DELETE FROM documents WHERE {where}", params)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self._maintain()
+
+    def index_artifacts(self, artifact_docs: Iterable[Dict[str, Any]]) -> int:
+        """
+        Index the artifacts of VECTOR_INDEX_ARTIFACT_TYPES (stored documents, with full
+        content), each replacing the previous version of its (thread_id, artifact_type).
+        Their source id is the document _id, which is the artifact's embedding_id.
+
+        Returns:
+            Number of artifacts indexed
+        """
+        latest: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for doc in artifact_docs:
+            if doc.get("artifact_type") in VECTOR_INDEX_ARTIFACT_TYPES:
+                key = (doc["thread_id"], doc["artifact_type"])
+                if key not in latest or sort_time(doc) >= sort_time(latest[key]):
+                    latest[key] = doc
+        for (thread_id, artifact_type), doc in latest.items():
+            self.add_chunks(
+                doc.get("_id") or f"{thread_id}_{doc.get('artifact_id')}",
+                chunk_text(artifact_text(doc.get("content"))),
+                source_type=artifact_type,
+                title=f"{doc.get('artifact_id')} (thread {thread_id})",
+                thread_id=thread_id,
+                replace={"thread_id": thread_id, "source_type": artifact_type},
+            )
+        return len(latest)
+
+    # ----- reference documents -----
+
+    def document(self, source_id: str) -> Optional[Dict[str, Any]]:
+        """The record of a document added with add_document, or None"""
+        documents = self._documents("source_id = ?", (source_id,))
+        return documents[0] if documents else None
+
+    def find_document(self, sha256: str, thread_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """A document with this content hash, of the thread or of every thread, or None"""
+        documents = self._documents("sha256 = ? AND (thread_id IS NULL OR thread_id = ?)", (sha256, thread_id))
+        return documents[0] if documents else None
+
+    def documents(self, thread_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The documents of every thread, and of `thread_id` if given, by id"""
+        return self._documents("thread_id IS NULL OR thread_id = ?", (thread_id,))
+
+    def _documents(self, where: str, params: Tuple) -> List[Dict[str, Any]]:
+        columns = ["source_id", "title", "thread_id", "sha256", "bytes", "chunks", "ingested_at"]
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT {', '.join(columns)} FROM documents WHERE {where} ORDER BY source_id", params
+            ).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def document_chunks(self, source_id: str) -> List[Dict[str, Any]]:
+        """The live chunks of a source in order, as {"chunk_id", "text"}"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT chunk_no, text FROM chunks WHERE source_id = ? AND deleted = ? ORDER BY chunk_no", (source_id, LIVE)
+            ).fetchall()
+        return [{"chunk_id": f"{source_id}#{chunk_no}", "text": text} for chunk_no, text in rows]
+
+    # ----- maintenance -----
+
+    def _maintain(self) -> None:
+        """Train the IVF lists once there are enough rows, compact when half the rows are dead"""
+        with self._lock:
+            self._refresh()
+            rows, live, kept = len(self._live), int(self._live.sum()), int(self._kept.sum())
+            train = self.kind == "ivf" and self._centroids is None and live >= self.nlist * IVF_MIN_ROWS_PER_LIST
+            compact = rows and (rows - kept) / rows >= COMPACT_DELETED_FRACTION
+        if train:
+            self.train()
+        elif compact:
+            self.compact()
+
+    def train(self) -> None:
+        """(Re)train the IVF lists with k-means over the live rows and reassign every row"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh()
+                live_rows = np.flatnonzero(self._live)
+                if self._vectors is None or len(live_rows) < self.nlist:
+                    conn.execute("ROLLBACK")
+                    return
+                vectors = np.asarray(self._vectors)
+                centroids = _spherical_kmeans(vectors[live_rows], self.nlist)
+                assignments = np.argmax(vectors @ centroids.T, axis=1)
+                conn.executemany("UPDATE chunks SET list_id = ? WHERE row = ?",
+                                 [(int(list_id), row) for row, list_id in enumerate(assignments)])
+                self._set_meta(centroids=centroids.astype(np.float32).tobytes())
+                self._bump()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        logger.info("Trained %d IVF lists over %d chunks in %s", self.nlist, len(live_rows), self.directory)
+
+    def compact(self) -> None:
+        """Write the live (and pending) rows to the next generation of the vectors file and renumber them"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh()
+                generation = int(self._meta("generation", 0))
+                kept_rows = np.flatnonzero(self._kept)
+                vectors = np.asarray(self._vectors)[kept_rows] if self._vectors is not None else np.zeros((0, 0), np.float32)
+                with open(self._vectors_path(generation + 1), "wb") as f:
+                    f.write(np.ascontiguousarray(vectors).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                conn.execute("DELETE FROM chunks WHERE deleted = ?", (DELETED,))
+                # Ascending: a row only moves down, onto a deleted or already moved row
+                conn.executemany("UPDATE chunks SET row = ? WHERE row = ?",
+                                 [(new, int(old)) for new, old in enumerate(kept_rows) if new != old])
+                self._set_meta(generation=generation + 1, rows=len(kept_rows))
+                self._bump()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._refresh()
+        try:
+            os.remove(self._vectors_path(generation))  # open maps of other processes keep their copy
+        except OSError:
+            pass
+
+    # ----- search -----
+
+    def search(self, query: str, k: int = 5, source_types: Optional[Sequence[str]] = None,
+               thread_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        The k chunks most similar to the query (cosine similarity), best first.
+
+        Args:
+            source_types: Only chunks of these source types ("reference", artifact types)
+            thread_id: The thread searching: its own artifacts are left out (they are in its
+                prompt already), and so are reference documents tied to other threads
+        """
+        query_vector = self.embedder.embed([query])[0]
+        with self._lock:
+            self._refresh()
+            if self._vectors is None or len(self._vectors) == 0:
+                return []
+            if self._vectors.shape[1] != len(query_vector):
+                raise ValueError(f"{self.directory} holds {self._vectors.shape[1]}-dimensional vectors, the query has {len(query_vector)}")
+            mask = self._live.copy()
+            if source_types is not None:
+                mask &= np.isin(self._source_types, list(source_types))
+            if thread_id is not None:
+                own = self._thread_ids == thread_id
+                mask &= np.where(self._source_types == "reference", own | np.equal(self._thread_ids, None), ~own)
+            if self.kind == "ivf" and self._centroids is not None:
+                probes = np.argsort(self._centroids @ query_vector)[::-1][:self.nprobe]
+                mask &= np.isin(self._lists, probes)
+            candidates = np.flatnonzero(mask)
+            if len(candidates) == 0:
+                return []
+            if len(candidates) * 2 > len(mask):  # most rows: one pass over the map, no gathered copy
+                scores = (self._vectors @ query_vector)[candidates]
+            else:
+                scores = self._vectors[candidates] @ query_vector
+            top = np.argsort(scores)[::-1][:k]
+            rows = [int(row) for row in candidates[top]]
+            found = {
+                row: rest for row, *rest in self._connection().execute(
+                    f"SELECT row, source_id, source_type, thread_id, title, chunk_no, text FROM chunks WHERE row IN ({','.join('?' * len(rows))})",
+                    rows,
+                )
+            }
+            self.searches += 1
+        return [
+            {
+                "chunk_id": f"{found[row][0]}#{found[row][4]}",
+                "source_id": found[row][0],
+                "source_type": found[row][1],
+                "thread_id": found[row][2],
+                "title": found[row][3],
+                "text": found[row][5],
+                "score": round(float(score), 4),
+            }
+            for row, score in zip(rows, scores[top]) if row in found
+        ]
+
+    async def aadd_chunks(self, *args, **kwargs) -> int:
+        return await asyncio.to_thread(self.add_chunks, *args, **kwargs)
+
+    async def adocuments(self, thread_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.documents, thread_id)
+
+    async def asearch(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.search, *args, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            self._vectors = None
+            self._loaded_version = -1
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                "kind": self.kind,
+                "embedder": self._meta("embedder"),
+                "rows": len(self._live),
+                "live_chunks": int(self._live.sum()),
+                "documents": self._connection().execute("SELECT COUNT(*) FROM documents").fetchone()[0],
+                "ivf_trained": self._centroids is not None,
+                "added_chunks": self.added_chunks,
+                "searches": self.searches,
+            }
+
+
+def _spherical_kmeans(vectors: np.ndarray, clusters: int, iterations: int = IVF_TRAIN_ITERATIONS) -> np.ndarray:
+    """k-means on the unit sphere (cosine), seeded for a reproducible index"""
+    rng = np.random.default_rng(0)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(clusters):
+            members = vectors[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+            else:  # an empty list takes a random point
+                centroids[cluster] = vectors[rng.integers(len(vectors))]
+        centroids = _normalise(centroids)
+    return centroids
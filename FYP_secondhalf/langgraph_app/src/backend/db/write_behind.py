@@ -0,0 +1,223 @@
+"""
+write_behind.py
+
+Write-behind queue for the MongoDB saves of the stream loop.
+
+The graph run only enqueues the conversation / artifact documents; a background task
+collects them into batches (WRITE_BEHIND_BATCH_SIZE documents, or whatever arrived
+within WRITE_BEHIND_FLUSH_SECONDS of the first one) and writes each batch with one
+insert_many / bulk_write on the async Mongo client, so the run never waits on a
+round-trip.
+
+A failed batch is retried with exponential backoff; after WRITE_BEHIND_MAX_RETRIES it
+is appended to a dead-letter JSONL file (one {"kind", "document", "error"} per line)
+instead of being lost. The lifespan flushes the queue on shutdown.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from backend.db.db_utils import (
+    asave_artifacts_bulk,
+    asave_conversations_bulk,
+    build_artifact_document,
+    build_conversation_document,
+)
+from backend.path_global_file import (
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FLUSH_SECONDS,
+    WRITE_BEHIND_MAX_QUEUE,
+    WRITE_BEHIND_MAX_RETRIES,
+    WRITE_BEHIND_RETRY_BACKOFF_SECONDS,
+    WRITE_BEHIND_DEAD_LETTER_FILE,
+    WRITE_BEHIND_SHUTDOWN_TIMEOUT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingWrite:
+    kind: str  # "conversation" or "artifact"
+    document: Dict[str, Any]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class WriteBehindQueue:
+    """
+    Batches MongoDB writes behind the graph runs.
+
+    Args:
+        writers: {kind: function(list of documents)} raising on failure; coroutine functions are
+            awaited, plain functions run in a worker thread
+        batch_size: Most documents written per batch
+        flush_interval: Seconds a document may wait for its batch to fill up
+        max_queue: Queued documents before enqueue waits (backpressure on the run, not the loop)
+        max_retries: Retries of a failed batch before it is dead-lettered
+        retry_backoff: Delay before the first retry, doubled on every further one
+        dead_letter_path: JSONL file for batches that could not be written (None = log only)
+    """
+
+    def __init__(
+        self,
+        writers: Optional[Dict[str, Callable[[List[Dict[str, Any]]], int]]] = None,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = WRITE_BEHIND_FLUSH_SECONDS,
+        max_queue: int = WRITE_BEHIND_MAX_QUEUE,
+        max_retries: int = WRITE_BEHIND_MAX_RETRIES,
+        retry_backoff: float = WRITE_BEHIND_RETRY_BACKOFF_SECONDS,
+        dead_letter_path: Optional[str] = WRITE_BEHIND_DEAD_LETTER_FILE,
+    ):
+        self.writers = writers or {"conversation": asave_conversations_bulk, "artifact": asave_artifacts_bulk}
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_path = dead_letter_path
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.dead_lettered = 0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self._oldest_in_flight: Optional[float] = None
+        self._queued_at: Deque[float] = deque()  # enqueued_at of the queued documents, oldest first
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop(), name="mongo-write-behind")
+
+    async def enqueue_conversation(self, thread_id: str, conversation_data: Dict[str, Any]) -> None:
+        await self._enqueue(PendingWrite("conversation", build_conversation_document(thread_id, conversation_data)))
+
+    async def enqueue_artifact(self, thread_id: str, artifact_data: Dict[str, Any]) -> None:
+        await self._enqueue(PendingWrite("artifact", build_artifact_document(thread_id, artifact_data)))
+
+    async def _enqueue(self, item: PendingWrite) -> None:
+        if self._closed:
+            # Shutting down: write through rather than lose the document
+            await self._write_with_retry(item.kind, [item])
+            return
+        self.enqueued += 1
+        await self._queue.put(item)
+        self._queued_at.append(item.enqueued_at)
+
+    def _taken(self, item: PendingWrite) -> PendingWrite:
+        """Account for an item taken off the queue (FIFO: the oldest queued one)"""
+        self._queued_at.popleft()
+        return item
+
+    async def flush(self) -> None:
+        """Wait until everything enqueued so far has been written (or dead-lettered)"""
+        await self._queue.join()
+
+    async def close(self, timeout: float = WRITE_BEHIND_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Flush the queue, giving up after `timeout` seconds (what is left is dead-lettered)"""
+        self._closed = True
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("Write-behind flush timed out with %d documents queued", self._queue.qsize())
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        leftover = []
+        while not self._queue.empty():
+            leftover.append(self._taken(self._queue.get_nowait()))
+            self._queue.task_done()
+        if leftover:
+            await asyncio.to_thread(self._dead_letter, leftover, "not flushed before shutdown")
+
+    async def _next_batch(self) -> List[PendingWrite]:
+        batch = [self._taken(await self._queue.get())]
+        deadline = batch[0].enqueued_at + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout <= 0:
+                    # Past the deadline (e.g. queued behind a slow batch): take what is there
+                    batch.append(self._taken(self._queue.get_nowait()))
+                else:
+                    batch.append(self._taken(await asyncio.wait_for(self._queue.get(), timeout)))
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+        return batch
+
+    async def _flush_loop(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            self._oldest_in_flight = batch[0].enqueued_at
+            try:
+                for kind in self.writers:
+                    items = [item for item in batch if item.kind == kind]
+                    if items:
+                        await self._write_with_retry(kind, items)
+                lag = time.monotonic() - batch[0].enqueued_at
+                self.last_lag_seconds = lag
+                self.max_lag_seconds = max(self.max_lag_seconds, lag)
+                self.batches += 1
+            finally:
+                self._oldest_in_flight = None
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write_with_retry(self, kind: str, items: List[PendingWrite]) -> None:
+        documents = [item.document for item in items]
+        for attempt in range(self.max_retries + 1):
+            try:
+                writer = self.writers[kind]
+                if asyncio.iscoroutinefunction(writer):
+                    self.written += await writer(documents)
+                else:
+                    self.written += await asyncio.to_thread(writer, documents)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error("Dead-lettering %d %s documents after %d attempts: %s", len(items), kind, attempt + 1, e)
+                    await asyncio.to_thread(self._dead_letter, items, repr(e))
+                    return
+                self.retries += 1
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning("Writing %d %s documents failed (%s), retrying in %.1fs", len(items), kind, e, delay)
+                await asyncio.sleep(delay)
+
+    def _dead_letter(self, items: List[PendingWrite], error: str) -> None:
+        self.dead_lettered += len(items)
+        if not self.dead_letter_path:
+            return
+        failed_at = datetime.now(timezone.utc).isoformat()
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            for item in items:
+                f.write(json.dumps(
+                    {"kind": item.kind, "document": item.document, "error": error, "failed_at": failed_at},
+                    default=str, ensure_ascii=False,
+                ) + "\n")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        oldest = [self._oldest_in_flight] if self._oldest_in_flight is not None else []
+        oldest += list(self._queued_at)[:1]
+        return {
+            "queued": self._queue.qsize(),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "dead_lettered": self.dead_lettered,
+            "lag_seconds": round(now - min(oldest), 3) if oldest else 0.0,
+            "last_batch_lag_seconds": round(self.last_lag_seconds, 3),
+            "max_lag_seconds": round(self.max_lag_seconds, 3),
+        }
@@ -10,45 +10,10 @@ import sys
 import base64
 
 def setup_minimal_logging():
-    """Setup minimal logging - suppress all LangGraph server noise"""
-    
-    # Configure basic logging first
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            logging.FileHandler('app.log', mode='w')
-        ],
-        force=True
-    )
-    
-    # === SUPPRESS ALL LANGGRAPH SERVER LOGS ===
-    logging.getLogger("langgraph_api").setLevel(logging.CRITICAL)
-    logging.getLogger("langgraph_api.graph").setLevel(logging.CRITICAL)
-    logging.getLogger("langgraph_runtime_inmem").setLevel(logging.CRITICAL)
-    logging.getLogger("langgraph_runtime_inmem.queue").setLevel(logging.CRITICAL)
-    logging.getLogger("langgraph.runtime").setLevel(logging.CRITICAL)
-    logging.getLogger("langgraph.server").setLevel(logging.CRITICAL)
-    
-    # === SUPPRESS FILE WATCHER LOGS ===
-    logging.getLogger("watchfiles").setLevel(logging.CRITICAL)
-    logging.getLogger("watchfiles.main").setLevel(logging.CRITICAL)
-    
-    # === SUPPRESS OTHER NOISY SERVICES ===
-    logging.getLogger("httpcore").setLevel(logging.CRITICAL)
-    logging.getLogger("httpx").setLevel(logging.CRITICAL)
-    logging.getLogger("urllib3").setLevel(logging.CRITICAL)
-    logging.getLogger("uvicorn").setLevel(logging.CRITICAL)
-    logging.getLogger("fastapi").setLevel(logging.CRITICAL)
-    
-    # === KEEP ONLY YOUR APPLICATION LOGS ===
-    logging.getLogger("backend").setLevel(logging.DEBUG)  # Your app
-    logging.getLogger("__main__").setLevel(logging.DEBUG)  # Main script
-    
-    # LangGraph core functionality (not server) - keep important messages only
-    logging.getLogger("langgraph").setLevel(logging.WARNING)
-    logging.getLogger("langchain").setLevel(logging.WARNING)
+    """Setup minimal logging - suppress all LangGraph server noise (see core/logging_config.py)"""
+    from backend.core.logging_config import setup_logging
+    setup_logging()
+
 
 setup_minimal_logging()
 # Get your application logger
@@ -61,7 +26,8 @@ from langgraph.types import Command
 
 
 
-from backend.path_global_file import PROMPT_DIR_ANALYST
+from backend.path_global_file import PROMPT_DIR_ANALYST, ARCHIVIST_RETRIEVAL_TOP_K, OEL_REFERENCE_ID
+from backend.db import db_utils
 from backend.utils.main_utils import (
     load_prompts, generate_plantuml_local, extract_plantuml, pydantic_to_json_text
 )
@@ -144,7 +110,7 @@ def process_user_input(state: ArtifactState, config: dict) -> ArtifactState:
     """
     try:
         thread_id = config["configurable"]["thread_id"]
-        print(f"DEBUG: process_user_input using thread_id: {thread_id}")
+        logger.debug("process_user_input using thread_id: %s", thread_id)
         
         # Check if there's user input
         if not state.human_request or state.human_request.strip() == "":
@@ -173,13 +139,13 @@ def process_user_input(state: ArtifactState, config: dict) -> ArtifactState:
 async def classify_user_requirements(state: ArtifactState, config: dict) -> ArtifactState:
     try:
         thread_id = config["configurable"]["thread_id"]
-        print(f"DEBUG: classify_user_requirements using thread_id: {thread_id}")
-        print(f"DEBUG: Current state before processing has {len(state.artifacts)} existing artifacts")
+        logger.debug("classify_user_requirements using thread_id: %s", thread_id)
+        logger.debug("Current state before processing has %s existing artifacts", len(state.artifacts))
         
         # Debug current state artifacts
-        if state.artifacts:
+        if state.artifacts and logger.isEnabledFor(logging.DEBUG):
             for i, existing_art in enumerate(state.artifacts):
-                print(f"DEBUG: Existing artifact {i}: {existing_art.id} (thread: {getattr(existing_art, 'thread_id', 'NO_THREAD')})")
+                logger.debug("Existing artifact %s: %s (thread: %s)", i, existing_art.id, getattr(existing_art, 'thread_id', 'NO_THREAD'))
         
         llm_with_structured_output = llm.with_structured_output(RequirementsClassificationList)
         system_prompt = PROMPT_LIBRARY.get("classify_user_reqs")
@@ -187,33 +153,33 @@ async def classify_user_requirements(state: ArtifactState, config: dict) -> Arti
         if not system_prompt:
             raise ValueError("Missing 'classify_user_reqs' prompt in prompt library.")
         
-        print(f"DEBUG: About to call LLM for classification")
+        logger.debug("About to call LLM for classification")
         response = await llm_with_structured_output.ainvoke(
         [
             SystemMessage(content=system_prompt),
             HumanMessage(content=state.conversations[-1].content)
         ]
         )
-        print(f"DEBUG: LLM response received successfully")
+        logger.debug("LLM response received successfully")
 
         # Extract summary for conversation
         summary = response.summary
-        print(f"DEBUG: Extracted summary: {summary}")
+        logger.debug("Extracted summary: %s", summary)
 
         # Create artifact content without summary using model_dump and exclude
         artifact_dict = response.model_dump(exclude={'summary'})
         artifact_content = RequirementsClassificationList(**artifact_dict)
-        print(f"DEBUG: Created artifact content without summary")
+        logger.debug("Created artifact content without summary")
 
         # Check for existing artifacts of same type and increment version
         latest_artifact = StateManager.get_latest_artifact_by_type(state, ArtifactType.REQ_CLASS)
         if latest_artifact:
             current_version = latest_artifact.version or "1.0"
             new_version = _increment_version(current_version)
-            print(f"DEBUG: Found existing REQ_CLASS v{current_version}, creating v{new_version}")
+            logger.debug("Found existing REQ_CLASS v%s, creating v%s", current_version, new_version)
         else:
             new_version = "1.0"
-            print(f"DEBUG: No existing REQ_CLASS found, creating v{new_version}")
+            logger.debug("No existing REQ_CLASS found, creating v%s", new_version)
 
         artifact = create_artifact(
             agent=AgentType.ANALYST,
@@ -224,9 +190,9 @@ async def classify_user_requirements(state: ArtifactState, config: dict) -> Arti
 
         )
 
-        print(f"DEBUG: About to return artifact: {artifact.id} with thread_id: {artifact.thread_id}")
-        print(f"DEBUG: Artifact content type: {artifact.content_type}")
-        print(f"DEBUG: Artifact created by: {artifact.created_by}")
+        logger.debug("About to return artifact: %s with thread_id: %s", artifact.id, artifact.thread_id)
+        logger.debug("Artifact content type: %s", artifact.content_type)
+        logger.debug("Artifact created by: %s", artifact.created_by)
 
         # Create conversation entry using summary
         conversation = create_conversation(
@@ -235,29 +201,28 @@ async def classify_user_requirements(state: ArtifactState, config: dict) -> Arti
             content=summary
         )
         
-        print(f"DEBUG: Conversation created with artifact_id: {conversation.artifact_id}")
+        logger.debug("Conversation created with artifact_id: %s", conversation.artifact_id)
         
         result = {
             "artifacts": [artifact],  
             "conversations": [conversation],  
         }
         
-        print(f"DEBUG: Returning result with {len(result['artifacts'])} artifacts and {len(result['conversations'])} conversations")
-        print(f"DEBUG: Result artifact IDs: {[art.id for art in result['artifacts']]}")
+        logger.debug("Returning result with %s artifacts and %s conversations", len(result['artifacts']), len(result['conversations']))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Result artifact IDs: %s", [art.id for art in result['artifacts']])
         
         return result
         
     except Exception as e:
-        print(f"ERROR: Exception in classify_user_requirements: {str(e)}")
-        import traceback
-        print(f"ERROR: Full traceback: {traceback.format_exc()}")
+        logger.exception("Exception in classify_user_requirements: %s", e)
         return {
             "errors": [f"Classification failed: {str(e)}"]
         }
 async def write_system_requirement(state: ArtifactState, config: dict) -> ArtifactState:
     try:
         thread_id = config["configurable"]["thread_id"]
-        print(f"DEBUG: write_system_requirement using thread_id: {thread_id}")
+        logger.debug("write_system_requirement using thread_id: %s", thread_id)
         
         llm_with_structured_output = llm.with_structured_output(SystemRequirementsList)
         system_prompt = PROMPT_LIBRARY.get("write_system_req")
@@ -284,10 +249,10 @@ async def write_system_requirement(state: ArtifactState, config: dict) -> Artifa
         if latest_artifact:
             current_version = latest_artifact.version or "1.0"
             new_version = _increment_version(current_version)
-            print(f"DEBUG: Found existing SYSTEM_REQ v{current_version}, creating v{new_version}")
+            logger.debug("Found existing SYSTEM_REQ v%s, creating v%s", current_version, new_version)
         else:
             new_version = "1.0"
-            print(f"DEBUG: No existing SYSTEM_REQ found, creating v{new_version}")
+            logger.debug("No existing SYSTEM_REQ found, creating v%s", new_version)
 
         # Create artifact with explicit thread_id
         artifact = create_artifact(
@@ -326,7 +291,7 @@ async def generate_use_case_diagram(uml_code: str) -> dict:
         Dict containing path, base64_data, and success status
     """
     try:
-        logger.debug(f"DEBUG: generate_use_case_diagram started")
+        logger.debug("generate_use_case_diagram started")
         result = await generate_plantuml_local(uml_code=uml_code)
         
         if result:
@@ -343,7 +308,7 @@ async def generate_use_case_diagram(uml_code: str) -> dict:
                     "message": f"Use case diagram generated successfully at: {result}"
                 }
             except Exception as e:
-                logger.error(f"Error reading generated image: {str(e)}")
+                logger.error("Error reading generated image: %s", e)
                 return {
                     "success": False,
                     "path": result,
@@ -367,26 +332,26 @@ async def generate_use_case_diagram(uml_code: str) -> dict:
         }
 
 async def build_requirement_model(state: ArtifactState, config: dict) -> ArtifactState:
-    logger.debug("DEBUG: build_requirement_model function started")
+    logger.debug("build_requirement_model function started")
     
     try:
         thread_id = config["configurable"]["thread_id"]
-        print(f"DEBUG: build_requirement_model using thread_id: {thread_id}")
+        logger.debug("build_requirement_model using thread_id: %s", thread_id)
         
-        logger.debug("DEBUG: Attempting to load 'build_req_model' prompt from library")
+        logger.debug("Attempting to load 'build_req_model' prompt from library")
         system_prompt = PROMPT_LIBRARY.get("build_req_model")
 
         if not system_prompt:
-            logger.debug("ERROR: Missing 'build_req_model' prompt in prompt library")
+            logger.error("Missing 'build_req_model' prompt in prompt library")
             raise ValueError("Missing 'build_req_model' prompt in prompt library.")
             
         # Get the LLM response
-        logger.debug("DEBUG: Invoking LLM for requirement model generation")
+        logger.debug("Invoking LLM for requirement model generation")
         response = await llm.ainvoke([
             SystemMessage(content=system_prompt),
             HumanMessage(content=state.conversations[-1].content)
         ])
-        logger.debug("DEBUG: LLM response received successfully")
+        logger.debug("LLM response received successfully")
         
         # Extract PlantUML code from the response
         uml_chunk = None
@@ -394,30 +359,30 @@ async def build_requirement_model(state: ArtifactState, config: dict) -> Artifac
         diagram_generation_message = "No PlantUML code found in response."
         
         if hasattr(response, 'content') and response.content:
-            logger.debug("DEBUG: LLM response has content, attempting UML extraction")
+            logger.debug("LLM response has content, attempting UML extraction")
             try:
                 # Extract the UML chunk using your existing function
-                logger.debug("DEBUG: Calling extract_plantuml function")
+                logger.debug("Calling extract_plantuml function")
                 uml_chunk = extract_plantuml(response.content)
-                logger.debug(f"DEBUG: UML extraction successful, chunk length: {len(uml_chunk)}")
+                logger.debug("UML extraction successful, chunk length: %s", len(uml_chunk))
                 
                 # Generate the diagram using the tool
-                logger.debug("DEBUG: Attempting to generate use case diagram")
+                logger.debug("Attempting to generate use case diagram")
                 diagram_result = await generate_use_case_diagram(uml_code=uml_chunk)
                 diagram_generation_message = diagram_result["message"]
-                logger.debug(f"DEBUG: Diagram generation completed: {diagram_generation_message}")
+                logger.debug("Diagram generation completed: %s", diagram_generation_message)
                 
             except ValueError as ve:
                 # No PlantUML code found
-                logger.debug(f"DEBUG: ValueError during UML extraction: {ve}")
+                logger.debug("ValueError during UML extraction: %s", ve)
                 uml_chunk = None
                 diagram_generation_message = "No PlantUML code found in the LLM response."
             except Exception as e:
                 # Error during diagram generation
-                logger.debug(f"DEBUG: Exception during UML processing: {str(e)}")
+                logger.debug("Exception during UML processing: %s", e)
                 diagram_generation_message = f"Error generating diagram: {str(e)}"
         else:
-            logger.debug("DEBUG: LLM response has no content or content attribute missing")
+            logger.debug("LLM response has no content or content attribute missing")
 
         # Note: For RequirementModel, we don't use structured_output, so we create it manually
         # We'll generate a simple summary for the conversation
@@ -431,7 +396,7 @@ async def build_requirement_model(state: ArtifactState, config: dict) -> Artifac
                 uml_fmt_content = uml_chunk,
                 summary = summary  # Include summary here temporarily
             )
-            logger.debug(f"DEBUG: Added base64 data to artifact content, length: {len(diagram_result['base64_data'])}")
+            logger.debug("Added base64 data to artifact content, length: %s", len(diagram_result['base64_data']))
         else:
             # Create artifact with no diagram if generation failed
             artifact_content = RequirementModel(
@@ -440,23 +405,23 @@ async def build_requirement_model(state: ArtifactState, config: dict) -> Artifac
                 uml_fmt_content = uml_chunk,
                 summary = summary
             )
-            logger.debug(f"DEBUG: Diagram generation failed, creating artifact without diagram")
+            logger.debug("Diagram generation failed, creating artifact without diagram")
 
         # Exclude summary from artifact content using model_dump and exclude
         artifact_dict = artifact_content.model_dump(exclude={'summary'})
         artifact_content_without_summary = RequirementModel(**artifact_dict)
 
-        logger.debug("DEBUG: Creating artifact and conversation objects")
+        logger.debug("Creating artifact and conversation objects")
 
         # Check for existing artifacts of same type and increment version
         latest_artifact = StateManager.get_latest_artifact_by_type(state, ArtifactType.REQ_MODEL)
         if latest_artifact:
             current_version = latest_artifact.version or "1.0"
             new_version = _increment_version(current_version)
-            logger.debug(f"DEBUG: Found existing REQ_MODEL v{current_version}, creating v{new_version}")
+            logger.debug("Found existing REQ_MODEL v%s, creating v%s", current_version, new_version)
         else:
             new_version = "1.0"
-            logger.debug(f"DEBUG: No existing REQ_MODEL found, creating v{new_version}")
+            logger.debug("No existing REQ_MODEL found, creating v%s", new_version)
 
         artifact = create_artifact(
             agent=AgentType.ANALYST,
@@ -468,7 +433,7 @@ async def build_requirement_model(state: ArtifactState, config: dict) -> Artifac
         )
 
 
-        logger.debug(f"DEBUG: Artifact created with ID: {artifact.id}")
+        logger.debug("Artifact created with ID: %s", artifact.id)
 
         # Create conversation entry using summary
         conversation = create_conversation(
@@ -476,65 +441,66 @@ async def build_requirement_model(state: ArtifactState, config: dict) -> Artifac
             artifact_id=artifact.id,
             content=summary,
         )
-        logger.debug(f"DEBUG: Conversation entry created for artifact: {artifact.id}")
+        logger.debug("Conversation entry created for artifact: %s", artifact.id)
 
-        logger.debug("DEBUG: build_requirement_model function completed successfully")
+        logger.debug("build_requirement_model function completed successfully")
         return {
             "artifacts": [artifact],  
             "conversations": [conversation],  
         }
     
     except Exception as e:
-        logger.debug(f"ERROR: Exception in build_requirement_model: {str(e)}")
-        logger.debug(f"ERROR: Exception type: {type(e).__name__}")
-        import traceback
-        logger.debug(f"ERROR: Traceback: {traceback.format_exc()}")
+        logger.exception("Exception in build_requirement_model (%s): %s", type(e).__name__, e)
         return {
             "errors": [f"Requirement model generation failed: {str(e)}"]
         }
 
+async def retrieve_reference_chunks(thread_id: str, query: str, k: int = ARCHIVIST_RETRIEVAL_TOP_K) -> str:
+    """
+    The chunks of the reference documents and earlier projects' artifacts most relevant to
+    `query` (db/vector_index.py), as "[chunk id] title: text" lines for a prompt.
+
+    Returns:
+        The lines, or "None" if nothing was found or the index is unavailable
+    """
+    try:
+        hits = await db_utils.artifact_vector_index.asearch(query, k, thread_id=thread_id)
+    except Exception as e:
+        logger.warning("Reference retrieval failed, continuing without references: %s", e)
+        return "None"
+    return "\n".join(f"[{hit['chunk_id']}] {hit['title'] or hit['source_id']}: {hit['text']}" for hit in hits) or "None"
+
+
+async def operating_environment(state: ArtifactState, thread_id: str):
+    """
+    The operating environment list for the SRS, and its id: the thread's latest OEL
+    artifact, else the OEL_REFERENCE_ID reference document (db/reference_ingest.py) as
+    "[chunk id] text" lines.
+
+    Returns:
+        (content, id), or ("None", "None") if there is neither
+    """
+    latest_oel = StateManager.get_latest_artifact_by_type(state, ArtifactType.OP_ENV_LIST)
+    if latest_oel:
+        return latest_oel.content, latest_oel.id
+    index = db_utils.artifact_vector_index
+    try:
+        document = await asyncio.to_thread(index.document, OEL_REFERENCE_ID)
+        if document and document["thread_id"] in (None, thread_id):
+            chunks = await asyncio.to_thread(index.document_chunks, OEL_REFERENCE_ID)
+            if chunks:
+                return "\n".join(f"[{chunk['chunk_id']}] {chunk['text']}" for chunk in chunks), OEL_REFERENCE_ID
+    except Exception as e:
+        logger.warning("Operating environment list not available: %s", e)
+    return "None", "None"
+
+
 async def write_req_specs(state: ArtifactState, config: dict) -> ArtifactState:
-    logger.debug(f"DEBUG: Running write_req_specs")
+    logger.debug("Running write_req_specs")
     try:
         thread_id = config["configurable"]["thread_id"]
-        print(f"DEBUG: write_req_specs using thread_id: {thread_id}")
+        logger.debug("write_req_specs using thread_id: %s", thread_id)
         
-        oel_input = """
-        1. Device Compatibility
-        Must support smartphones (iOS and Android) and optionally tablets.
-        Minimum device specifications: e.g., Android 8.0+ or iOS 14+.
-        Support both portrait and landscape orientations.
-        2. Operating System
-        Android devices: Android 8.0 and above.
-        iOS devices: iOS 14 and above.
-        Ensure compatibility with upcoming OS updates for at least 2 years.
-        3. Network Requirements
-        Must work on Wi-Fi and mobile data (3G/4G/5G).
-        Minimum bandwidth requirement for loading menus and images.
-        Offline mode: Allow browsing of previously loaded menus when offline.
-        4. Backend and APIs
-        App connects to a backend server via RESTful APIs or GraphQL.
-        Requires secure HTTPS connections.
-        Supports load balancing for at least 10,000 simultaneous users.
-        5. Browser Requirements (if web-based)
-        Support latest versions of Chrome, Safari, Firefox, and Edge.
-        Graceful degradation for unsupported browsers.
-        6. Storage and Memory
-        Local caching for offline use and performance optimization.
-        Minimum RAM usage constraints for smooth operation.
-        """
-
-        # manually input OEL first - create with explicit thread_id
-        oel_artifact = Artifact(
-            id="operating_env_list_Deployer_v1.0",
-            content=oel_input,
-            content_type=ArtifactType.OP_ENV_LIST,
-            created_by=AgentType.DEPLOYER,
-            version="1.0",
-            thread_id=thread_id,  # EXPLICIT thread_id
-            timestamp=datetime.now(timezone.utc)
-        )
-
         # extract latest versions of OEL, SRL and RM
         latest_system_req = StateManager.get_latest_artifact_by_type(state, ArtifactType.SYSTEM_REQ)
         latest_req_model = StateManager.get_latest_artifact_by_type(state, ArtifactType.REQ_MODEL)
@@ -544,17 +510,22 @@ async def write_req_specs(state: ArtifactState, config: dict) -> ArtifactState:
         
         req_model_content = latest_req_model.content
         
-        op_env_list_content = oel_artifact.content
+        op_env_list_content, op_env_list_id = await operating_environment(state, thread_id)
 
         system_req_id = latest_system_req.id
         req_model_id = latest_req_model.id
-        op_env_list_id = oel_artifact.id
+
+        # Top-k reference chunks for these requirements, instead of whole documents
+        reference_chunks = await retrieve_reference_chunks(
+            thread_id, f"{system_req_content}\n{state.conversations[-1].content}"
+        )
 
         llm_with_structured_output = llm.with_structured_output(SoftwareRequirementSpecs)
         system_prompt = PROMPT_LIBRARY.get("write_req_specs")
         prompt_input = system_prompt.format(
             system_req_content=system_req_content, req_model_content=req_model_content, op_env_list_content=op_env_list_content, 
-            system_req_id=system_req_id, req_model_id=req_model_id, op_env_list_id=op_env_list_id)
+            system_req_id=system_req_id, req_model_id=req_model_id, op_env_list_id=op_env_list_id,
+            reference_chunks=reference_chunks)
 
         if not system_prompt:
             raise ValueError("Missing 'write_req_specs' prompt in prompt library.")
@@ -578,10 +549,10 @@ async def write_req_specs(state: ArtifactState, config: dict) -> ArtifactState:
         if latest_artifact:
             current_version = latest_artifact.version or "1.0"
             new_version = _increment_version(current_version)
-            print(f"DEBUG: Found existing SW_REQ_SPECS v{current_version}, creating v{new_version}")
+            logger.debug("Found existing SW_REQ_SPECS v%s, creating v%s", current_version, new_version)
         else:
             new_version = "1.0"
-            print(f"DEBUG: No existing SW_REQ_SPECS found, creating v{new_version}")
+            logger.debug("No existing SW_REQ_SPECS found, creating v%s", new_version)
 
         # Create artifact with explicit thread_id
         artifact = create_artifact(
@@ -606,12 +577,8 @@ async def write_req_specs(state: ArtifactState, config: dict) -> ArtifactState:
         }
 
     except Exception as e:
-        import traceback
         error_msg = f"write_req_specs failed: {str(e)}"
-        logger.error(error_msg)
-        logger.error(f"Full traceback: {traceback.format_exc()}")
-        print(f"ERROR: {error_msg}")
-        print(f"ERROR: Full traceback: {traceback.format_exc()}")
+        logger.exception(error_msg)
         return {
             "errors": [error_msg]
         }
@@ -659,12 +626,12 @@ async def verdict_to_revise_SRS(state: ArtifactState) -> str:
             else: 
                 raise Exception (f"LLM does not return True or False to revise SRS, it returns {response}")
         except Exception as e: 
-            logger.debug(f"Error in verdict_to_revise_SRS: {e}")
+            logger.debug("Error in verdict_to_revise_SRS: %s", e)
 
 async def revise_req_specs(state: ArtifactState, config: dict) -> ArtifactState:
     try:
         thread_id = config["configurable"]["thread_id"]
-        print(f"DEBUG: revise_req_specs using thread_id: {thread_id}")
+        logger.debug("revise_req_specs using thread_id: %s", thread_id)
         
         # 1. retrieve the latest version of validation report
         latest_val_report = StateManager.get_latest_artifact_by_type(state, ArtifactType.VAL_REPORT)    
@@ -723,12 +690,8 @@ async def revise_req_specs(state: ArtifactState, config: dict) -> ArtifactState:
             "conversations": [conversation],
         }
     except Exception as e:
-        import traceback
         error_msg = f"revise_req_specs failed: {str(e)}"
-        logger.error(error_msg)
-        logger.error(f"Full traceback: {traceback.format_exc()}")
-        print(f"ERROR: {error_msg}")
-        print(f"ERROR: Full traceback: {traceback.format_exc()}")
+        logger.exception(error_msg)
         return {
             "errors": [error_msg]
         }
@@ -739,14 +702,14 @@ async def handle_routing_decision(state: ArtifactState, config: dict) -> Artifac
     If no human_request is provided, this will cause an interrupt.
     """
     thread_id = config["configurable"]["thread_id"]
-    print(f"DEBUG: handle_routing_decision using thread_id: {thread_id}")
+    logger.debug("handle_routing_decision using thread_id: %s", thread_id)
 
-    logger.debug("DEBUG: --- Handling routing decision ---")
+    logger.debug("--- Handling routing decision ---")
 
     # Check if we have user input from the resumed state
     if hasattr(state, 'next_routing_node') and state.next_routing_node:
         user_choice = state.next_routing_node
-        print(f"DEBUG: Using user choice from human_request: {user_choice}")
+        logger.debug("Using user choice from human_request: %s", user_choice)
 
         # Validate the choice
         valid_choices = [
@@ -762,13 +725,13 @@ async def handle_routing_decision(state: ArtifactState, config: dict) -> Artifac
             state.next_routing_node = user_choice
             # Clear the human_request after processing
             state.human_request = None
-            logger.debug(f"DEBUG: Set next_routing_node to: {user_choice}")
+            logger.debug("Set next_routing_node to: %s", user_choice)
         else:
-            logger.debug(f"DEBUG: Invalid user choice: {user_choice}, defaulting to no")
+            logger.debug("Invalid user choice: %s, defaulting to no", user_choice)
             state.next_routing_node = "no"  # Changed from build_requirement_model
     else:
         # This should trigger an interrupt since no user input is available
-        logger.debug("DEBUG: No user input available, graph will be interrupted")
+        logger.debug("No user input available, graph will be interrupted")
         # Don't set next_routing_node - let the interrupt happen
         pass
 
@@ -829,7 +792,7 @@ async def process_artifact_feedback_direct(state_dict: dict) -> dict:
             return {"errors": [f"Unknown artifact feedback action: {artifact_feedback_action}"]}
             
     except Exception as e:
-        logger.error(f"Error processing artifact feedback: {str(e)}")
+        logger.error("Error processing artifact feedback: %s", e)
         return {"errors": [f"Failed to process artifact feedback: {str(e)}"]}
 
 async def generate_improved_artifact_direct(original_artifact: Artifact, feedback_text: str, user_input: str) -> dict:
@@ -881,7 +844,7 @@ Please generate an improved version that addresses the user's feedback while mai
             )
             
     except Exception as e:
-        logger.error(f"Error regenerating artifact with feedback: {str(e)}")
+        logger.error("Error regenerating artifact with feedback: %s", e)
         return {"errors": [f"Failed to regenerate artifact: {str(e)}"]}
 
 async def regenerate_standard_artifact_direct(
@@ -912,7 +875,7 @@ async def regenerate_standard_artifact_direct(
         # Get version from original artifact and increment
         current_version = original_artifact.version or "1.0"
         new_version = _increment_version(current_version)
-        logger.debug(f"DEBUG: The new version of regenerated standard artifact is {new_version}")
+        logger.debug("The new version of regenerated standard artifact is %s", new_version)
 
         new_artifact = create_artifact(
             agent=regen_config["agent"],
@@ -921,8 +884,8 @@ async def regenerate_standard_artifact_direct(
             version=new_version,
             thread_id=original_artifact.thread_id,
         )
-        logger.debug(f"DEBUG REGEN: current version is {current_version}, new version is {new_version}")
-        logger.debug(f"DEBUG REGEN: Created artifact with ID={new_artifact.id}, version={new_artifact.version}")
+        logger.debug("current version is %s, new version is %s", current_version, new_version)
+        logger.debug("Created artifact with ID=%s, version=%s", new_artifact.id, new_artifact.version)
 
 
 
@@ -967,7 +930,7 @@ async def regenerate_requirement_model_direct(
             except ValueError:
                 uml_chunk = None
             except Exception as e:
-                logger.error(f"Error generating diagram: {str(e)}")
+                logger.error("Error generating diagram: %s", e)
 
         # Create summary for conversation
         summary = "🔄 Updated requirements model based on user feedback."
@@ -994,7 +957,7 @@ async def regenerate_requirement_model_direct(
 
         current_version = original_artifact.version if hasattr(original_artifact, 'version') else "1.0"
         new_version = _increment_version(current_version)
-        logger.debug(f"DEBUG REGEN: current version is {current_version}, new version is {new_version}")
+        logger.debug("current version is %s, new version is %s", current_version, new_version)
 
         new_artifact = create_artifact(
             agent=AgentType.ANALYST,
@@ -1003,10 +966,10 @@ async def regenerate_requirement_model_direct(
             version=new_version,
             thread_id=original_artifact.thread_id,
         )
-        logger.debug(f"DEBUG REGEN REQ_MODEL: Created artifact with ID={new_artifact.id}, version={new_artifact.version}")
+        logger.debug("Created artifact with ID=%s, version=%s", new_artifact.id, new_artifact.version)
 
 
-        print(f"DEBUG FEEDBACK: Created requirement model {new_artifact.id}, version: {new_artifact.version}, thread_id: {new_artifact.thread_id}")
+        logger.debug("Created requirement model %s, version: %s, thread_id: %s", new_artifact.id, new_artifact.version, new_artifact.thread_id)
 
         # Create conversation entry using summary
         conversation = create_conversation(
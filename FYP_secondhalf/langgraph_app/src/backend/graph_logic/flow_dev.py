@@ -406,7 +406,8 @@ async def write_req_specs(state: ArtifactState) -> ArtifactState:
         system_prompt = PROMPT_LIBRARY.get("write_req_specs")
         prompt_input = system_prompt.format(
             system_req_content=system_req_content, req_model_content=req_model_content, op_env_list_content=op_env_list_content, 
-            system_req_id=system_req_id, req_model_id=req_model_id, op_env_list_id=op_env_list_id)
+            system_req_id=system_req_id, req_model_id=req_model_id, op_env_list_id=op_env_list_id,
+            reference_chunks="None")
 
         if not system_prompt:
             raise ValueError("Missing 'write_req_specs' prompt in prompt library.")
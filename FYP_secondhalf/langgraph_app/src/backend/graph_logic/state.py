@@ -101,6 +101,8 @@ class ResumeRequest(BaseModel):
 class InitialInput(BaseModel):
     thread_id: str
     human_request: str
+    # Idempotency key: a resend with the same id (retry, double click) creates one thread
+    client_request_id: Optional[str] = None
 
 
 class DraftReviewState(MessagesState):
@@ -354,6 +356,8 @@ def create_artifact(
         content=content,
         version=version,
         thread_id=thread_id,
+        # Source id of its chunks in the vector index (db/vector_index.py): its MongoDB _id
+        embedding_id=f"{thread_id}_{artifact_id}" if thread_id else None,
     )
 
 def create_conversation(
@@ -2,6 +2,23 @@ from pathlib import Path
 
 MOCK_LLM = False
 SQLITE_DB = str(Path(__file__).parent / "checkpoints.sqlite")
+# Checkpoints survive restarts; True wipes them on every boot (drops all paused threads)
+CHECKPOINT_RESET_ON_STARTUP = False
+# Checkpoint threads are spread over this many SQLite files next to SQLITE_DB (db/sharded_checkpointer.py);
+# changing it moves threads to other files, so their old checkpoints are no longer found
+CHECKPOINT_SHARDS = 4
+CHECKPOINT_READ_POOL_SIZE = 2  # reader connections per shard (state reads do not wait for writes)
+# PRAGMA preset of the checkpoint connections (db/sqlite_profiles.py): "low_memory", "balanced" or "high_throughput"
+CHECKPOINT_STORAGE_PROFILE = "balanced"
+CHECKPOINT_PRAGMA_OVERRIDES = {}  # e.g. {"mmap_size": 0} on top of the profile
+# Idle-thread archival (db/thread_archive.py): threads without a new checkpoint for THREAD_ARCHIVE_TTL_SECONDS move
+# out of MongoDB and the checkpoint files into compressed bundles, restored on their next access (0 disables the job)
+THREAD_ARCHIVE_DIR = str(Path(__file__).parent / "thread_archive")
+THREAD_ARCHIVE_TTL_SECONDS = 30 * 24 * 60 * 60
+THREAD_ARCHIVE_INTERVAL_SECONDS = 60 * 60  # how often the job looks for idle threads
+THREAD_ARCHIVE_BATCH_SIZE = 100            # threads archived per run at most
+# Startup recovery (core/recovery.py): most recently active threads scanned for resumable state
+RECOVERY_MAX_THREADS = 1000
 DEBUG_MODE = False
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -10,4 +27,113 @@ PROMPT_DIR = BASE_DIR / "prompt_library"
 PROMPT_DIR_DEPLOYER = BASE_DIR / "prompt_library/deployer_prompt.jsonl"
 PROMPT_DIR_END_USER = BASE_DIR / "prompt_library/end_user_prompt.jsonl"
 PROMPT_DIR_INTERVIEWER = BASE_DIR / "prompt_library/interviewer_prompt.jsonl"
-PROMPT_DIR_ANALYST = BASE_DIR / "prompt_library/analyst_prompt.jsonl"
\ No newline at end of file
+PROMPT_DIR_ANALYST = BASE_DIR / "prompt_library/analyst_prompt.jsonl"
+
+# Default artifact event mode for the SSE stream: "full" embeds content, "lite" sends a reference only
+ARTIFACT_EVENT_MODE = "full"
+
+# MongoDB artifact history: "full" stores every version, "delta" stores JSON Patches against the previous version,
+# "dedupe" stores each distinct body once (keyed by its content hash) and has the versions reference it
+ARTIFACT_STORAGE_MODE = "full"
+# Every N-th version is a full snapshot (used by "delta" storage and "delta" event mode)
+ARTIFACT_SNAPSHOT_INTERVAL = 5
+# Latest-artifact read cache (db/artifact_cache.py): LRU entries per worker (0 disables it), and how writes
+# reach the other workers' caches: "sqlite" (invalidation log in RUN_CONFIG_DB) or "memory" (single worker)
+ARTIFACT_CACHE_SIZE = 256
+ARTIFACT_CACHE_INVALIDATION = "sqlite"
+ARTIFACT_CACHE_SYNC_SECONDS = 0.1  # lookups poll the log at most this often (staleness bound across workers)
+# History list endpoints (/threads/{id}/artifacts, /threads/{id}/conversations): default and largest page size
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+# Full-text search over the latest artifacts of all threads (db/search_index.py, GET /search)
+SEARCH_INDEX_DB = str(Path(__file__).parent / "search_index.sqlite")
+SEARCH_RESULTS_LIMIT = 20
+SEARCH_MAX_RESULTS = 100
+# Vector index the Archivist retrieves reference chunks from (db/vector_index.py): reference documents and
+# the latest VECTOR_INDEX_ARTIFACT_TYPES artifacts of all threads, chunked and embedded
+VECTOR_INDEX_DIR = str(Path(__file__).parent / "vector_index")
+VECTOR_EMBEDDER = "hashing"  # "hashing" (local, deterministic) or "openai" (VECTOR_EMBEDDING_MODEL)
+VECTOR_EMBEDDING_MODEL = "text-embedding-3-small"
+VECTOR_HASHING_DIMENSION = 512
+VECTOR_INDEX_KIND = "flat"   # "flat" (exact) or "ivf" (searches the VECTOR_IVF_PROBES nearest of VECTOR_IVF_LISTS clusters)
+VECTOR_IVF_LISTS = 64
+VECTOR_IVF_PROBES = 8
+VECTOR_CHUNK_WORDS = 200
+VECTOR_CHUNK_OVERLAP_WORDS = 40
+VECTOR_INDEX_ARTIFACT_TYPES = ["system_requirements", "software_requirement_specs"]
+ARCHIVIST_RETRIEVAL_TOP_K = 6  # chunks write_req_specs puts into its prompt
+# Reference documents (db/reference_ingest.py, /references): text, Markdown or PDF uploads are streamed to a
+# temporary file, then read and chunked piece by piece into the vector index; re-uploading an unchanged file
+# (same SHA-256) is a no-op
+REFERENCE_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+REFERENCE_READ_BLOCK_BYTES = 64 * 1024
+REFERENCE_SPOOL_BUFFER_BYTES = 1024 * 1024  # upload bytes gathered before one write to the temporary file
+REFERENCE_EMBED_BATCH_CHUNKS = 32  # chunks embedded and written at a time
+# The operating environment list write_req_specs is given: this reference document, seeded at startup from
+# REFERENCE_DEFAULT_OEL_FILE if it does not exist yet (upload another with this document_id to replace it)
+OEL_REFERENCE_ID = "operating-environment"
+REFERENCE_DEFAULT_OEL_FILE = str(BASE_DIR / "reference_docs" / "operating_environment.md")
+
+# Response compression (gzip, or brotli if installed); smaller non-streaming bodies are sent as-is
+COMPRESSION_MINIMUM_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+
+# Pending run configs shared between API workers: "sqlite" (all workers on the host) or "memory" (single worker)
+RUN_CONFIG_BACKEND = "sqlite"
+RUN_CONFIG_DB = str(Path(__file__).parent / "run_configs.sqlite")
+RUN_CONFIG_TTL_SECONDS = 24 * 60 * 60  # pending configs expire after a day (0/None = never)
+RUN_CONFIG_LEASE_SECONDS = 30 * 60     # how long a streaming worker holds a claimed config
+
+# Background graph runs (run_supervisor.py) and their per-thread event channels (event_bus.py)
+RUN_REPLAY_BUFFER_SIZE = 1000           # events kept per run for late / reconnecting subscribers
+RUN_CHANNEL_RETENTION_SECONDS = 10 * 60  # finished runs stay replayable this long
+RUN_SHUTDOWN_TIMEOUT_SECONDS = 30        # on shutdown, running graphs get this long to drain before being cancelled
+MULTIPLEX_MAX_THREADS = 100              # thread ids one multiplexed stream (/graph/stream?thread_ids=...) may watch
+
+# Slow SSE clients: events queued per subscriber before the overflow policy applies
+# ("drop" status events, "coalesce" superseded artifact versions too, or "disconnect")
+SUBSCRIBER_QUEUE_SIZE = 256
+SUBSCRIBER_OVERFLOW_POLICY = "coalesce"
+SSE_PING_SECONDS = 15  # heartbeat comment interval so proxies do not close idle streams
+
+# Logging (core/logging_config.py); env vars LOG_LEVEL, LOG_MODULE_LEVELS and LOG_FORMAT override these
+LOG_LEVEL = "INFO"           # level of the app loggers when DEBUG_MODE is off
+LOG_MODULE_LEVELS = {}       # per-module overrides, e.g. {"backend.graph_logic.flow": "DEBUG"}
+LOG_DEBUG_SAMPLE_EVERY = 1   # write every N-th DEBUG record per call site (1 = all)
+LOG_FORMAT = "text"          # "text" or "json" (one object per line)
+LOG_FILE = "app.log"         # None disables the file handler
+
+# Write-behind queue for the MongoDB saves of the stream loop (db/write_behind.py)
+WRITE_BEHIND_BATCH_SIZE = 100            # documents per insert_many / bulk_write
+WRITE_BEHIND_FLUSH_SECONDS = 0.5         # longest a document waits for its batch to fill
+WRITE_BEHIND_MAX_QUEUE = 10_000          # queued documents before runs wait for the writer
+WRITE_BEHIND_MAX_RETRIES = 5             # retries of a failed batch (exponential backoff) before dead-lettering
+WRITE_BEHIND_RETRY_BACKOFF_SECONDS = 0.5
+WRITE_BEHIND_DEAD_LETTER_FILE = str(Path(__file__).parent / "mongo_dead_letter.jsonl")
+WRITE_BEHIND_SHUTDOWN_TIMEOUT_SECONDS = 15
+
+# Where artifacts, conversations and thread mappings are kept (db_utils.py): "mongo" (MONGODB_URI) or
+# "sqlite", an embedded local file for single-node / edge deployments (db/embedded_store.py)
+PERSISTENCE_BACKEND = "mongo"
+EMBEDDED_DB = str(Path(__file__).parent / "app_data.sqlite")
+
+# MongoDB clients (db_utils.py): pool, timeouts and read preference
+MONGO_MAX_POOL_SIZE = 50
+MONGO_MIN_POOL_SIZE = 0
+MONGO_CONNECT_TIMEOUT_MS = 5_000
+MONGO_SERVER_SELECTION_TIMEOUT_MS = 5_000  # how long an operation waits for a reachable server
+MONGO_SOCKET_TIMEOUT_MS = 20_000
+MONGO_READ_PREFERENCE = "primaryPreferred"  # history reads may go to a secondary when the primary is down
+
+# Admission control for graph runs (core/admission.py)
+RUN_MAX_CONCURRENT = 8              # graph runs executing at once on this worker
+RUN_MAX_QUEUED = 64                 # runs waiting for a slot; more are rejected with 429
+RUN_MAX_QUEUE_WAIT_SECONDS = 120    # a queued run gives up (error event) after this long
+ADMISSION_QUEUE_POLICY = "priority"  # "priority" (resumes before new runs, then arrival) or "fifo"
+ADMISSION_DEFAULT_RETRY_AFTER_SECONDS = 10  # Retry-After before any run duration is known
+
+# Runs of one thread are serialised (run_supervisor.py): commands arriving during a run queue behind it
+THREAD_MAX_PENDING_RUNS = 5
+# Resume/create requests carrying the same client_request_id within this window are handled once
+CLIENT_REQUEST_TTL_SECONDS = 10 * 60
@@ -0,0 +1,128 @@
+"""
+artifact_delta.py
+
+RFC 6902 (JSON Patch) deltas between versions of the same artifact type.
+
+Feedback rounds produce v1.1, v1.2, ... of an artifact where usually only a few
+requirements change. Instead of sending/storing a full copy every time we can send
+a patch against the previous version of the same content_type, with a full
+snapshot every N versions so replay chains stay short.
+
+Every delta is verified before use: applying it to the base must reproduce the
+new content exactly (compared on canonical JSON), otherwise a full snapshot is used.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import jsonpatch
+
+from backend.utils.artifact_utils import canonical_json, content_hash, EVENT_MODE_FULL, EVENT_MODE_DELTA
+
+
+VERSION_RANK_MINOR_SPAN = 1_000_000  # minor versions per major version in version_rank
+
+
+def parse_version(version_str: str) -> tuple:
+    """Parse version string ("1.2") into a comparable tuple, defaulting to (1, 0)"""
+    try:
+        major, minor = map(int, str(version_str).split('.'))
+        return (major, minor)
+    except (ValueError, AttributeError):
+        return (1, 0)
+
+
+def version_rank(version_str: str) -> int:
+    """parse_version as one sortable number (stored with artifacts to query the previous version)"""
+    major, minor = parse_version(version_str)
+    return major * VERSION_RANK_MINOR_SPAN + minor
+
+
+def is_snapshot_version(version_str: str, snapshot_interval: int) -> bool:
+    """Every N-th minor version (x.0, x.N, x.2N, ...) is sent/stored as a full snapshot"""
+    if snapshot_interval <= 1:
+        return True
+    return parse_version(version_str)[1] % snapshot_interval == 0
+
+
+def make_delta(base_content: Any, new_content: Any) -> List[Dict[str, Any]]:
+    """Build the JSON Patch operations turning base_content into new_content"""
+    return jsonpatch.make_patch(base_content, new_content).patch
+
+
+def apply_delta(base_content: Any, patch: List[Dict[str, Any]]) -> Any:
+    """Apply JSON Patch operations to base_content (base_content is not modified)"""
+    return jsonpatch.apply_patch(base_content, patch, in_place=False)
+
+
+def make_verified_delta(base_content: Any, new_content: Any) -> Optional[List[Dict[str, Any]]]:
+    """
+    Build a delta and check that replaying it reproduces new_content exactly.
+
+    Returns:
+        The patch operations, or None if a full snapshot should be used instead
+        (replay mismatch, or the patch is not smaller than the content itself)
+    """
+    if base_content is None or new_content is None:
+        return None
+
+    try:
+        patch = make_delta(base_content, new_content)
+        replayed = apply_delta(base_content, patch)
+    except (jsonpatch.JsonPatchException, jsonpatch.JsonPointerException, TypeError):
+        return None
+
+    if canonical_json(replayed) != canonical_json(new_content):
+        return None
+
+    if len(canonical_json(patch)) >= len(canonical_json(new_content)):
+        return None
+
+    return patch
+
+
+def find_previous_version(artifacts: list, artifact) -> Optional[Any]:
+    """Find the latest artifact of the same content_type with a lower version than `artifact`"""
+    current = parse_version(artifact.version)
+    candidates = [
+        a for a in artifacts
+        if a.content_type == artifact.content_type
+        and a.id != artifact.id
+        and parse_version(a.version) < current
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda a: parse_version(a.version))
+
+
+def to_delta_event_payload(
+    artifact_payload: Dict[str, Any],
+    base_artifact_id: Optional[str],
+    base_content: Any,
+    snapshot_interval: int,
+) -> Dict[str, Any]:
+    """
+    Convert a full artifact payload into a delta event payload.
+
+    Falls back to a full payload (content_encoding="full") for snapshot versions,
+    when there is no previous version, or when the delta fails verification.
+    Both forms carry content_hash so the client can check its replayed result.
+    """
+    new_content = artifact_payload.get("content")
+    new_hash = content_hash(new_content)
+
+    patch = None
+    if base_artifact_id and not is_snapshot_version(artifact_payload.get("version"), snapshot_interval):
+        patch = make_verified_delta(base_content, new_content)
+
+    if patch is None:
+        return {**artifact_payload, "content_encoding": EVENT_MODE_FULL, "content_hash": new_hash}
+
+    delta_payload = {key: value for key, value in artifact_payload.items() if key != "content"}
+    delta_payload.update({
+        "content_encoding": EVENT_MODE_DELTA,
+        "base_artifact_id": base_artifact_id,
+        "base_content_hash": content_hash(base_content),
+        "content_patch": patch,
+        "content_hash": new_hash,
+    })
+    return delta_payload
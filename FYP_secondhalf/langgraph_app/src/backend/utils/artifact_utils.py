@@ -0,0 +1,93 @@
+"""
+artifact_utils.py
+
+Helpers for turning Artifact objects into the payloads sent over SSE and saved to the DB.
+
+Event modes:
+- "full": the artifact event embeds the whole serialized content (original behaviour)
+- "lite": the artifact event only carries id / type / version / size / content hash,
+          the body is fetched separately from GET /threads/{thread_id}/artifacts/{artifact_id}
+- "delta": the artifact event carries a JSON Patch against the previous version (see artifact_delta.py)
+"""
+
+import json
+import hashlib
+from typing import Any, Dict, Optional
+
+EVENT_MODE_FULL = "full"
+EVENT_MODE_LITE = "lite"
+EVENT_MODE_DELTA = "delta"
+VALID_EVENT_MODES = {EVENT_MODE_FULL, EVENT_MODE_LITE, EVENT_MODE_DELTA}
+
+
+def serialize_artifact_content(content: Any) -> Any:
+    """Serialize artifact content (Pydantic model or string) into JSON-compatible data"""
+    if not content:
+        return None
+    if hasattr(content, 'model_dump'):  # Pydantic v2
+        return content.model_dump(mode="json")
+    return str(content)  # Fallback for strings
+
+
+def canonical_json(data: Any) -> str:
+    """Dump data to a stable JSON string (sorted keys, no whitespace) so equal content hashes equally"""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def content_hash(content_data: Any) -> str:
+    """SHA-256 hex digest of the canonical JSON form of the content"""
+    return hashlib.sha256(canonical_json(content_data).encode("utf-8")).hexdigest()
+
+
+def artifact_content_url(thread_id: str, artifact_id: str) -> str:
+    """URL the client uses to fetch the body of a lite artifact event"""
+    return f"/threads/{thread_id}/artifacts/{artifact_id}"
+
+
+def build_artifact_payload(artifact, node: str, content_data: Any = None) -> Dict[str, Any]:
+    """
+    Build the full artifact payload dict (used for the SSE event and for saving to MongoDB).
+
+    Args:
+        artifact: Artifact object from graph state
+        node: Node that produced the artifact
+        content_data: Already-serialized content, serialized from the artifact if not given
+
+    Returns:
+        Dict with the artifact metadata and its full content
+    """
+    if content_data is None:
+        content_data = serialize_artifact_content(artifact.content)
+
+    return {
+        "chat_type": "artifact",
+        "artifact_id": artifact.id,
+        "artifact_type": artifact.content_type.value if hasattr(artifact.content_type, 'value') else str(artifact.content_type),
+        "agent": artifact.created_by.value if hasattr(artifact.created_by, 'value') else str(artifact.created_by),
+        "content": content_data,
+        "node": node,
+        "version": artifact.version,
+        "timestamp": artifact.timestamp.isoformat() if hasattr(artifact.timestamp, 'isoformat') else str(artifact.timestamp),
+        "status": "completed"
+    }
+
+
+def to_event_payload(thread_id: str, artifact_payload: Dict[str, Any], event_mode: Optional[str] = EVENT_MODE_FULL) -> Dict[str, Any]:
+    """
+    Convert a full artifact payload into the payload sent on the stream for the given event mode.
+
+    In "lite" mode the content is replaced by its size, hash and the URL to fetch it from.
+    "delta" payloads need the previous version and are built by artifact_delta.to_delta_event_payload.
+    """
+    if event_mode != EVENT_MODE_LITE:
+        return artifact_payload
+
+    encoded_content = canonical_json(artifact_payload.get("content")).encode("utf-8")
+    lite_payload = {key: value for key, value in artifact_payload.items() if key != "content"}
+    lite_payload.update({
+        "content_encoding": EVENT_MODE_LITE,
+        "content_size": len(encoded_content),
+        "content_hash": hashlib.sha256(encoded_content).hexdigest(),
+        "content_url": artifact_content_url(thread_id, artifact_payload["artifact_id"]),
+    })
+    return lite_payload
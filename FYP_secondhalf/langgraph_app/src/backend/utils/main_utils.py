@@ -15,6 +15,9 @@ from typing import Any, Dict, List, Union
 from pydantic import BaseModel
 import json
 import base64
+import logging
+
+logger = logging.getLogger(__name__)
 
 async def generate_plantuml_local(uml_code, plantuml_jar_name="plantuml-1-2025-4.jar"):
     """Generate PlantUML diagram using local PlantUML installation (async-safe)"""
@@ -50,7 +53,7 @@ async def generate_plantuml_local(uml_code, plantuml_jar_name="plantuml-1-2025-4
             temp_puml_path
         ]
         
-        print("Using jar:", plantuml_jar_path, "Exists?", os.path.exists(plantuml_jar_path))
+        logger.debug("Using jar: %s Exists? %s", plantuml_jar_path, os.path.exists(plantuml_jar_path))
 
         result = await asyncio.to_thread(
             subprocess.run, cmd, capture_output=True, text=True, timeout=30
@@ -65,17 +68,17 @@ async def generate_plantuml_local(uml_code, plantuml_jar_name="plantuml-1-2025-4
                 # Rename to our desired timestamped filename (offload to thread)
                 await asyncio.to_thread(os.rename, generated_file, output_file)
 
-                print(f"PlantUML diagram generated successfully: {output_file}")
+                logger.info("PlantUML diagram generated successfully: %s", output_file)
 
                 # Clean up temp file (offload to thread)
                 await asyncio.to_thread(os.unlink, temp_puml_path)
 
                 return output_file
             else:
-                print(f"Expected output file not found: {generated_file}")
+                logger.warning("Expected output file not found: %s", generated_file)
 
         else:
-            print(f"PlantUML error: {result.stderr}")
+            logger.error("PlantUML error: %s", result.stderr)
 
         # Clean up temp file in case of error
         if os.path.exists(temp_puml_path):
@@ -84,10 +87,10 @@ async def generate_plantuml_local(uml_code, plantuml_jar_name="plantuml-1-2025-4
         return None
 
     except FileNotFoundError:
-        print("Java or plantuml.jar not found. Please install Java and download plantuml.jar")
+        logger.error("Java or plantuml.jar not found. Please install Java and download plantuml.jar")
         return None
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error("Error: %s", e)
         return None
 
 
@@ -156,7 +159,7 @@ async def pydantic_to_json_text(model: BaseModel, indent: int = 2) -> str:
     try: 
         dumped_text = model.model_dump_json(indent=indent)
     except Exception as e: 
-        print(f"Error with: {model}")
+        logger.error("Error with: %s", model)
     return dumped_text
 
 
@@ -222,14 +225,14 @@ async def generate_plantuml_bytes(uml_code, plantuml_jar_name="plantuml-1-2025-4
         if result.returncode == 0:
             return result.stdout  # PNG bytes
         else:
-            print(f"PlantUML error: {result.stderr.decode()}")
+            logger.error("PlantUML error: %s", result.stderr.decode())
             return None
 
     except FileNotFoundError:
-        print("Java or plantuml.jar not found. Please install Java and download plantuml.jar")
+        logger.error("Java or plantuml.jar not found. Please install Java and download plantuml.jar")
         return None
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error("Error: %s", e)
         return None
 
 
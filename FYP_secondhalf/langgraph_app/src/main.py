@@ -2,6 +2,8 @@ from fastapi import FastAPI
 from backend.core.startup import lifespan
 from backend.api.routes import register_routes
 from fastapi.middleware.cors import CORSMiddleware
+from backend.core.compression import CompressionMiddleware
+from backend.path_global_file import COMPRESSION_MINIMUM_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
 
 app = FastAPI(title="KGMAF", lifespan=lifespan)
 
@@ -11,6 +13,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Thread-Id", "Retry-After"],  # read by clients of POST /graph/run
+)
+
+# gzip/brotli negotiated from Accept-Encoding, SSE events are flushed one by one
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MINIMUM_SIZE,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
 )
 
 # The routes to for initiation will be tied to the app!
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db import db_utils
+from backend.db.search_index import ArtifactSearchIndex
+from backend.db.vector_index import HashingEmbedder, VectorIndex
+
+
+@pytest.fixture(autouse=True)
+def search_index(tmp_path, monkeypatch):
+    """Artifact saves index into a temporary search index, not SEARCH_INDEX_DB"""
+    index = ArtifactSearchIndex(str(tmp_path / "search_index.sqlite"))
+    monkeypatch.setattr(db_utils, "artifact_search_index", index)
+    yield index
+    index.close()
+
+
+@pytest.fixture(autouse=True)
+def vector_index(tmp_path, monkeypatch):
+    """Artifact saves index into a temporary vector index (hashing embedder), not VECTOR_INDEX_DIR"""
+    index = VectorIndex(str(tmp_path / "vector_index"), embedder=HashingEmbedder(256))
+    monkeypatch.setattr(db_utils, "artifact_vector_index", index)
+    yield index
+    index.close()
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.core.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    AdmissionTimeout,
+    PRIORITY_NEW_RUN,
+    PRIORITY_RESUME,
+)
+
+
+async def _positions(controller, ticket):
+    return [position async for position in controller.wait_turn(ticket)]
+
+
+def test_queue_orders_resumes_first_then_arrival() -> None:
+    async def scenario():
+        controller = AdmissionController(max_running=1, max_waiting=3, max_wait=5)
+        running = controller.admit("t0")
+        new_a = controller.admit("a", PRIORITY_NEW_RUN)
+        new_b = controller.admit("b", PRIORITY_NEW_RUN)
+        resume = controller.admit("c", PRIORITY_RESUME)
+        waiters = {name: asyncio.create_task(_positions(controller, ticket))
+                   for name, ticket in [("a", new_a), ("b", new_b), ("c", resume)]}
+        await asyncio.sleep(0)
+
+        order = []
+        for ticket in (running, resume, new_a, new_b):
+            controller.release(ticket)
+            order.append([name for name, t in [("a", new_a), ("b", new_b), ("c", resume)]
+                          if t.started_at is not None and name not in sum(order, [])])
+            await asyncio.sleep(0.01)
+        return {name: await task for name, task in waiters.items()}, order, controller.stats()
+
+    positions, order, stats = asyncio.run(scenario())
+    assert order == [["c"], ["a"], ["b"], []]
+    assert positions == {"c": [1], "a": [2, 1], "b": [3, 2, 1]}
+    assert stats["running"] == 0 and stats["waiting"] == 0 and stats["admitted"] == 4
+
+
+def test_full_queue_rejects_with_retry_after() -> None:
+    async def scenario():
+        controller = AdmissionController(max_running=1, max_waiting=1, max_wait=30)
+        controller.admit("t0")
+        controller.admit("t1")
+        assert not controller.has_capacity()
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.admit("t2")
+        return rejected.value.retry_after, controller.stats()
+
+    retry_after, stats = asyncio.run(scenario())
+    assert retry_after >= 1
+    assert stats["rejected"] == 1
+
+
+def test_queued_run_gives_up_after_max_wait() -> None:
+    async def scenario():
+        controller = AdmissionController(max_running=1, max_waiting=1, max_wait=0.05)
+        controller.admit("t0")
+        ticket = controller.admit("t1")
+        with pytest.raises(AdmissionTimeout):
+            await _positions(controller, ticket)
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["timed_out"] == 1 and stats["waiting"] == 0 and stats["running"] == 1
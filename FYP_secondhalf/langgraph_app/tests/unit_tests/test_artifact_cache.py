@@ -0,0 +1,91 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db import db_utils
+from backend.db.artifact_cache import LatestArtifactCache, SqliteInvalidationChannel
+
+
+@pytest.fixture
+def embedded_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "PERSISTENCE_BACKEND", "sqlite")
+    monkeypatch.setattr(db_utils, "EMBEDDED_DB", str(tmp_path / "app_data.sqlite"))
+    monkeypatch.setattr(db_utils, "latest_artifact_cache", LatestArtifactCache(capacity=8))
+    yield db_utils.latest_artifact_cache
+    asyncio.run(db_utils.close_clients())
+
+
+def _artifact(version, minute):
+    return {
+        "artifact_id": f"system_requirements_Analyst_v{version}",
+        "artifact_type": "system_requirements",
+        "agent": "Analyst",
+        "content": {"srs": [version]},
+        "version": version,
+        "timestamp": f"2025-01-01T00:{minute:02d}:00+00:00",
+    }
+
+
+def test_lru_eviction_copies_and_racing_reads() -> None:
+    cache = LatestArtifactCache(capacity=2)
+    for i, thread_id in enumerate(["t1", "t2", "t3"]):
+        cache.put(thread_id, "srs", {"n": i}, cache.generation())
+    assert cache.get("t1", "srs") == (False, None)  # least recently used, evicted
+    hit, doc = cache.get("t2", "srs")
+    doc["n"] = 99
+    assert hit and cache.get("t2", "srs") == (True, {"n": 1})
+
+    # A read that started before a write must not put its stale result back
+    generation = cache.generation()
+    cache.invalidate([("t3", "srs")])
+    cache.put("t3", "srs", {"n": 2}, generation)
+    assert cache.get("t3", "srs") == (False, None)
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2 and cache.stats()["evictions"] == 1
+
+
+def test_invalidations_reach_the_other_workers(tmp_path) -> None:
+    db_path = str(tmp_path / "run_configs.sqlite")
+    workers = [LatestArtifactCache(channel=SqliteInvalidationChannel(db_path), sync_seconds=0) for _ in range(2)]
+    for cache in workers:
+        cache.put("t1", "srs", {"v": "1.0"}, cache.generation())
+        cache.put("t2", "srs", {"v": "1.0"}, cache.generation())
+
+    workers[0].invalidate([("t1", "srs")])
+    assert workers[1].get("t1", "srs") == (False, None)
+    assert workers[1].get("t2", "srs")[0]
+    assert workers[1].stats()["remote_invalidations"] == 1
+
+    # The async lookup polls from a worker thread and applies the same invalidations
+    workers[0].invalidate([("t2", "srs")])
+    assert asyncio.run(workers[1].aget("t2", "srs")) == (False, None)
+    workers[1].put("t2", "srs", {"v": "1.1"}, workers[1].generation())
+    assert asyncio.run(workers[1].aget("t2", "srs")) == (True, {"v": "1.1"})
+
+    # Log rows pruned before a worker polled them: it cannot tell what changed and starts over
+    workers[0].channel.publish([("t9", "srs")])
+    workers[0].channel._conn.execute("DELETE FROM cache_invalidations")
+    workers[0].channel.publish([("t8", "srs")])
+    assert workers[1].get("t2", "srs") == (False, None)
+    for cache in workers:
+        cache.close()
+
+
+def test_latest_artifact_lookups_are_served_from_the_cache_until_a_write(embedded_backend) -> None:
+    cache = embedded_backend
+    assert db_utils.save_artifact_to_db("t1", _artifact("1.0", 1))
+    assert db_utils.get_latest_artifact_version("t1", "system_requirements")["version"] == "1.0"
+    assert db_utils.get_latest_artifact_version("t1", "system_requirements")["version"] == "1.0"
+    assert cache.stats()["hits"] == 1
+
+    async def scenario():
+        await db_utils.asave_artifacts_bulk([db_utils.build_artifact_document("t1", _artifact("1.1", 2))])
+        return await db_utils.aget_latest_artifact_version("t1", "system_requirements")
+
+    assert asyncio.run(scenario())["version"] == "1.1"
+    assert db_utils.delete_thread_data("t1")
+    assert db_utils.get_latest_artifact_version("t1", "system_requirements") is None
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db import db_utils
+
+
+@pytest.fixture
+def dedupe_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "PERSISTENCE_BACKEND", "sqlite")
+    monkeypatch.setattr(db_utils, "EMBEDDED_DB", str(tmp_path / "app_data.sqlite"))
+    monkeypatch.setattr(db_utils, "ARTIFACT_STORAGE_MODE", "dedupe")
+    yield db_utils.get_client()[db_utils.APP_DATABASE_NAME]
+    asyncio.run(db_utils.close_clients())
+
+
+def _artifact(version, content):
+    return {
+        "artifact_id": f"system_requirements_Analyst_v{version}",
+        "artifact_type": "system_requirements",
+        "agent": "Analyst",
+        "content": content,
+        "version": version,
+        "timestamp": f"2025-01-01T00:00:0{version[-1]}+00:00",
+    }
+
+
+SPEC = {"srs": [{"id": "SR-1", "text": "Log meals"}]}
+
+
+def test_identical_bodies_are_stored_once_and_released_with_their_last_reference(dedupe_storage) -> None:
+    # An accept-without-change round (v1.1 == v1.0) and a forked thread
+    assert db_utils.save_artifact_to_db("t1", _artifact("1.0", SPEC))
+    assert db_utils.save_artifact_to_db("t1", _artifact("1.1", SPEC))
+    assert db_utils.save_artifact_to_db("t2", _artifact("1.0", SPEC))
+
+    contents = dedupe_storage[db_utils.CONTENT_COLLECTION]
+    bodies = list(contents.find())
+    assert len(bodies) == 1 and len(bodies[0]["refs"]) == 3
+    stored = dedupe_storage["artifacts"].find_one({"_id": "t1_system_requirements_Analyst_v1.1"})
+    assert stored["content"] is None and stored["content_encoding"] == "ref"
+    assert [a["content"] for a in db_utils.get_artifacts_from_db("t1")] == [SPEC, SPEC]
+    assert db_utils.get_artifact_from_db("t2", "system_requirements_Analyst_v1.0")["content"] == SPEC
+
+    assert db_utils.delete_thread_data("t1")
+    assert contents.find_one({})["refs"] == ["t2_system_requirements_Analyst_v1.0"]
+    assert db_utils.delete_thread_data("t2")
+    assert contents.count_documents({}) == 0
+
+
+def test_retried_batches_do_not_count_twice_and_replaced_bodies_are_released(dedupe_storage) -> None:
+    docs = [db_utils.build_artifact_document("t1", _artifact(version, SPEC)) for version in ("1.0", "1.1")]
+
+    async def scenario():
+        await db_utils.asave_artifacts_bulk(docs)
+        await db_utils.asave_artifacts_bulk(docs)  # write-behind retry of the same batch
+        refs = (await db_utils.get_async_client()[db_utils.APP_DATABASE_NAME][db_utils.CONTENT_COLLECTION].find_one({}))["refs"]
+        # The same artifact id saved again with another body
+        await db_utils.asave_artifact_to_db("t1", _artifact("1.1", {"srs": []}))
+        return refs, await db_utils.aget_artifacts_from_db("t1")
+
+    refs, artifacts = asyncio.run(scenario())
+    assert sorted(refs) == [doc["_id"] for doc in docs]
+    assert [a["content"] for a in artifacts] == [{"srs": []}, SPEC]
+    bodies = {body["content"] == SPEC: body["refs"] for body in dedupe_storage[db_utils.CONTENT_COLLECTION].find()}
+    assert bodies == {True: ["t1_system_requirements_Analyst_v1.0"], False: ["t1_system_requirements_Analyst_v1.1"]}
@@ -0,0 +1,75 @@
+import copy
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.utils.artifact_delta import (
+    apply_delta,
+    is_snapshot_version,
+    make_verified_delta,
+    to_delta_event_payload,
+)
+from backend.utils.artifact_utils import canonical_json, content_hash
+
+
+def _srl(n, changed=None):
+    return {
+        "srl": [
+            {
+                "requirement_id": f"SR-{i}",
+                "requirement_statement": changed if changed and i == 3 else f"The system shall do thing {i} reliably.",
+                "category": "Functional",
+                "priority": "High",
+            }
+            for i in range(n)
+        ]
+    }
+
+
+def test_delta_replay_reproduces_every_version() -> None:
+    versions = [_srl(20)]
+    for round_no in range(1, 6):
+        nxt = copy.deepcopy(versions[-1])
+        nxt["srl"][round_no]["requirement_statement"] = f"Revised in round {round_no}"
+        if round_no % 2 == 0:
+            nxt["srl"].append({"requirement_id": f"SR-new-{round_no}", "requirement_statement": "Added",
+                               "category": "Non-functional", "priority": "Low"})
+        versions.append(nxt)
+
+    # Replay the whole chain from the first snapshot
+    replayed = versions[0]
+    for previous, current in zip(versions, versions[1:]):
+        patch = make_verified_delta(previous, current)
+        assert patch is not None
+        replayed = apply_delta(replayed, patch)
+        assert canonical_json(replayed) == canonical_json(current)
+
+
+def test_delta_falls_back_when_not_smaller() -> None:
+    assert make_verified_delta({"a": "x"}, {"b": "y"}) is None
+    assert make_verified_delta(None, {"a": 1}) is None
+
+
+def test_snapshot_every_n_versions() -> None:
+    assert is_snapshot_version("1.0", 5)
+    assert not is_snapshot_version("1.3", 5)
+    assert is_snapshot_version("1.5", 5)
+    assert is_snapshot_version("1.3", 1)
+
+
+def test_delta_event_payload() -> None:
+    base = _srl(30)
+    new = _srl(30, changed="Only this one changed")
+    payload = {"chat_type": "artifact", "artifact_id": "system_requirements_Analyst_v1.1",
+               "version": "1.1", "content": new}
+
+    event = to_delta_event_payload(payload, "system_requirements_Analyst_v1.0", base, 5)
+    assert event["content_encoding"] == "delta"
+    assert "content" not in event
+    assert event["base_content_hash"] == content_hash(base)
+    assert content_hash(apply_delta(base, event["content_patch"])) == event["content_hash"]
+
+    snapshot = to_delta_event_payload({**payload, "version": "1.5"}, "system_requirements_Analyst_v1.4", base, 5)
+    assert snapshot["content_encoding"] == "full"
+    assert snapshot["content"] == new
@@ -0,0 +1,41 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.utils.artifact_utils import canonical_json, content_hash, to_event_payload
+
+
+def _payload(content):
+    return {
+        "chat_type": "artifact",
+        "artifact_id": "requirements_model_Analyst_v1.0",
+        "artifact_type": "requirements_model",
+        "agent": "Analyst",
+        "content": content,
+        "node": "build_requirement_model",
+        "version": "1.0",
+        "timestamp": "2025-01-01T00:00:00+00:00",
+        "status": "completed",
+    }
+
+
+def test_content_hash_ignores_key_order() -> None:
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 2})
+
+
+def test_full_mode_keeps_content() -> None:
+    payload = _payload({"diagram_base64": "abc"})
+    assert to_event_payload("t1", payload, "full") is payload
+
+
+def test_lite_mode_sends_reference_only() -> None:
+    content = {"diagram_base64": "x" * 5000, "uml_fmt_content": "@startuml\n@enduml"}
+    lite = to_event_payload("t1", _payload(content), "lite")
+
+    assert "content" not in lite
+    assert lite["content_encoding"] == "lite"
+    assert lite["content_hash"] == content_hash(content)
+    assert lite["content_size"] == len(canonical_json(content).encode("utf-8"))
+    assert lite["content_url"] == "/threads/t1/artifacts/requirements_model_Analyst_v1.0"
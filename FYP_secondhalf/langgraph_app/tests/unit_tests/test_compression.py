@@ -0,0 +1,106 @@
+import asyncio
+import gzip
+import os
+import sys
+import zlib
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.core.compression import CompressionMiddleware, choose_encoding
+
+
+def _run(app, accept_encoding="gzip"):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=100)(scope, receive, send))
+    headers = dict(messages[0]["headers"])
+    return headers, [m.get("body", b"") for m in messages[1:]]
+
+
+def _streaming_app(chunks, content_type=b"text/event-stream"):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    return app
+
+
+def test_choose_encoding() -> None:
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("") is None
+    assert choose_encoding("*") in ("gzip", "br")
+
+
+def test_sse_events_are_flushed_one_by_one() -> None:
+    events = [f"data: {{\"n\": {i}, \"text\": \"{'x' * 200}\"}}\r\n\r\n".encode() for i in range(5)]
+    headers, bodies = _run(_streaming_app(events))
+
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+
+    # Every event must be decodable as soon as its own chunk arrives
+    decoder = zlib.decompressobj(31)
+    for event, body in zip(events, bodies):
+        assert decoder.decompress(body) == event
+    assert decoder.decompress(bodies[-1]) + decoder.flush() == b""
+
+
+def test_small_response_is_not_compressed() -> None:
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"status": "ok"}'})
+
+    headers, bodies = _run(app)
+    assert b"content-encoding" not in headers
+    assert bodies == [b'{"status": "ok"}']
+
+
+def test_large_response_is_compressed() -> None:
+    payload = b'{"content": "' + b"requirement " * 500 + b'"}'
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]})
+        await send({"type": "http.response.body", "body": payload})
+
+    headers, bodies = _run(app)
+    assert headers[b"content-encoding"] == b"gzip"
+    assert int(headers[b"content-length"]) == len(bodies[0])
+    assert gzip.decompress(bodies[0]) == payload
+
+
+def _app(status, body, content_type=b"application/json"):
+    async def app(scope, receive, send):
+        headers = [(b"content-type", content_type), (b"etag", b'"abc"')]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+
+def test_validators_and_vary_follow_the_encoding() -> None:
+    large = b'{"content": "' + b"requirement " * 500 + b'"}'
+    headers, _ = _run(_app(200, large))
+    assert headers[b"content-encoding"] == b"gzip" and headers[b"etag"] == b'W/"abc"'
+    assert headers[b"vary"] == b"Accept-Encoding"
+
+    # Sent as-is: the strong ETag stays, but caches must still key the response on Accept-Encoding
+    for app, accept_encoding in [(_app(200, large), ""), (_app(200, b"{}"), "gzip")]:
+        headers, _ = _run(app, accept_encoding)
+        assert b"content-encoding" not in headers and headers[b"etag"] == b'"abc"'
+        assert headers[b"vary"] == b"Accept-Encoding"
+
+    # A 304 validates the encoded representation the client holds
+    headers, _ = _run(_app(304, b""))
+    assert headers[b"etag"] == b'W/"abc"' and headers[b"vary"] == b"Accept-Encoding"
+
+    headers, _ = _run(_app(200, large, content_type=b"image/png"))
+    assert b"vary" not in headers and headers[b"etag"] == b'"abc"'
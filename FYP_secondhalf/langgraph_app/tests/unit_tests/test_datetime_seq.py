@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db import db_utils
+from backend.db.migrate_datetime_seq import migrate_seqs, migrate_times
+
+
+@pytest.fixture
+def embedded_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "PERSISTENCE_BACKEND", "sqlite")
+    monkeypatch.setattr(db_utils, "EMBEDDED_DB", str(tmp_path / "app_data.sqlite"))
+    yield db_utils.get_client()[db_utils.APP_DATABASE_NAME]
+    asyncio.run(db_utils.close_clients())
+
+
+def test_documents_store_utc_datetimes_and_conversations_keep_their_write_order(embedded_db) -> None:
+    artifact = db_utils.build_artifact_document("t1", {"artifact_id": "a_v1.0", "timestamp": "2025-01-01T08:00:00.123456+08:00"})
+    assert artifact["timestamp"] == datetime(2025, 1, 1, 0, 0, 0, 123000, tzinfo=timezone.utc)
+    assert isinstance(artifact["saved_at"], datetime)
+
+    # Same millisecond: the write order decides, for single saves and write-behind batches alike
+    same_time = "2025-01-01T00:00:00.000+00:00"
+    docs = [db_utils.build_conversation_document("t1", {"content": f"m{i}", "timestamp": same_time}) for i in (1, 2)]
+    assert db_utils.save_conversation_to_db("t1", {"content": "m0", "timestamp": same_time})
+
+    async def scenario():
+        await db_utils.asave_conversations_bulk(docs)
+        await db_utils.asave_conversations_bulk(docs)  # a retried batch keeps its numbers
+        return await db_utils.aget_conversations_from_db("t1")
+
+    conversations = asyncio.run(scenario())
+    assert [(c["seq"], c["content"]) for c in conversations] == [(1, "m0"), (2, "m1"), (3, "m2")]
+    assert conversations[0]["timestamp"] == same_time
+    page = db_utils.get_conversations_page("t1", ["content"], limit=2, newest_first=True)
+    assert [c["content"] for c in page["items"]] == ["m2", "m1"]
+
+
+def test_migration_converts_old_documents_once(embedded_db) -> None:
+    embedded_db["conversations"].insert_many([
+        {"thread_id": "t1", "content": "second", "timestamp": "2025-01-01T00:00:02"},
+        {"thread_id": "t1", "content": "first", "timestamp": "2025-01-01T00:00:01", "saved_at": "2025-01-01T00:00:01+00:00"},
+        {"thread_id": "t1", "content": "bad", "timestamp": "yesterday"},
+    ])
+    # Saved after the upgrade, before the migration ran
+    assert db_utils.save_conversation_to_db("t1", {"content": "after upgrade", "timestamp": "2025-01-01T00:00:03"})
+
+    times = migrate_times(embedded_db, embedded=True, dry_run=False)
+    assert times["conversations"] == {"converted": 2, "unparseable": 1}
+    assert migrate_seqs(embedded_db, dry_run=False) == {"threads": 1, "conversations": 4}
+
+    contents = [c["content"] for c in db_utils.get_conversations_from_db("t1")]
+    assert contents == ["bad", "first", "second", "after upgrade"]
+    assert embedded_db["conversations"].find_one({"content": "first"})["timestamp"] == "2025-01-01T00:00:01.000+00:00"
+    assert db_utils.save_conversation_to_db("t1", {"content": "next"})
+    assert db_utils.get_conversations_from_db("t1")[-1]["seq"] == 5
+
+    # A second run finds nothing to do
+    assert migrate_times(embedded_db, embedded=True, dry_run=False)["conversations"] == {"converted": 0, "unparseable": 1}
+    assert migrate_seqs(embedded_db, dry_run=False) == {"threads": 0, "conversations": 0}
@@ -0,0 +1,22 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db import db_utils
+
+
+def test_clients_share_pool_settings_and_close_cleanly() -> None:
+    async def scenario():
+        client = await db_utils.open_async_client()
+        same = db_utils.get_async_client() is client
+        options = client.options.pool_options
+        await db_utils.close_clients()
+        return same, options, db_utils._async_client
+
+    same, pool_options, after_close = asyncio.run(scenario())
+    assert same
+    assert pool_options.max_pool_size == db_utils.MONGO_MAX_POOL_SIZE
+    assert pool_options.connect_timeout == db_utils.MONGO_CONNECT_TIMEOUT_MS / 1000
+    assert after_close is None
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db import db_utils
+from backend.db.embedded_store import EmbeddedClient
+
+
+@pytest.fixture
+def embedded_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "PERSISTENCE_BACKEND", "sqlite")
+    monkeypatch.setattr(db_utils, "EMBEDDED_DB", str(tmp_path / "app_data.sqlite"))
+    yield
+    asyncio.run(db_utils.close_clients())
+
+
+def _artifact(version, content, minute):
+    return {
+        "artifact_id": f"system_requirements_Analyst_v{version}",
+        "artifact_type": "system_requirements",
+        "agent": "Analyst",
+        "content": content,
+        "version": version,
+        "timestamp": f"2025-01-01T00:{minute:02d}:00+00:00",
+    }
+
+
+def test_db_utils_round_trip_on_the_embedded_store(embedded_backend, monkeypatch) -> None:
+    monkeypatch.setattr(db_utils, "ARTIFACT_STORAGE_MODE", "delta")
+    db_utils.create_indexes()
+    contents = [{"srs": [{"id": "SR-1", "text": "Log meals"}]},
+                {"srs": [{"id": "SR-1", "text": "Log meals"}, {"id": "SR-2", "text": "Export data"}]}]
+    assert db_utils.save_artifact_to_db("t1", _artifact("1.0", contents[0], 1))
+    assert db_utils.save_artifact_to_db("t1", _artifact("1.1", contents[1], 2))
+    assert db_utils.save_artifact_to_db("t2", _artifact("1.0", contents[0], 3))
+    for minute in (5, 4):
+        assert db_utils.save_conversation_to_db("t1", {"content": f"at {minute}", "timestamp": f"2025-01-01T00:0{minute}:00"})
+
+    artifacts = db_utils.get_artifacts_from_db("t1")
+    assert [a["version"] for a in artifacts] == ["1.1", "1.0"]  # newest first
+    # The second version was stored as a delta and is rebuilt on read
+    stored = db_utils.get_client()[db_utils.APP_DATABASE_NAME]["artifacts"].find_one({"_id": "t1_system_requirements_Analyst_v1.1"})
+    assert stored["content_encoding"] == "delta" and artifacts[0]["content"] == contents[1]
+    assert db_utils.get_latest_artifact_version("t1", "system_requirements")["version"] == "1.1"
+    # Conversations come back in the order they were saved (seq), times as UTC ISO strings
+    conversations = db_utils.get_conversations_from_db("t1")
+    assert [(c["seq"], c["content"]) for c in conversations] == [(1, "at 5"), (2, "at 4")]
+    assert conversations[1]["timestamp"] == "2025-01-01T00:04:00.000+00:00"
+
+    assert db_utils.delete_thread_data("t1")
+    assert db_utils.get_artifacts_from_db("t1") == [] and len(db_utils.get_artifacts_from_db("t2")) == 1
+
+
+def test_deltas_use_the_previous_version_and_report_a_broken_chain(embedded_backend, monkeypatch, caplog) -> None:
+    monkeypatch.setattr(db_utils, "ARTIFACT_STORAGE_MODE", "delta")
+    monkeypatch.setattr(db_utils, "ARTIFACT_SNAPSHOT_INTERVAL", 100)
+    db_utils.create_indexes()
+    srs = [{"id": f"SR-{i}", "text": "Log meals offline and sync them later"} for i in range(8)]
+    for minor in (9, 2, 10):  # saved out of order; "1.10" sorts before "1.9" as a string
+        assert db_utils.save_artifact_to_db("t1", _artifact(f"1.{minor}", {"srs": srs + [{"id": f"v{minor}"}]}, minor))
+    collection = db_utils.get_client()[db_utils.APP_DATABASE_NAME]["artifacts"]
+    stored = collection.find_one({"_id": "t1_system_requirements_Analyst_v1.10"})
+    assert stored["content_encoding"] == "delta" and stored["base_artifact_id"] == "system_requirements_Analyst_v1.9"
+    assert "version_rank" not in db_utils.get_artifact_from_db("t1", "system_requirements_Analyst_v1.10")
+
+    # Overwriting the base with other content breaks the chain: reported with the whole chain
+    assert db_utils.save_artifact_to_db("t1", _artifact("1.9", {"srs": []}, 9))
+    with caplog.at_level("ERROR", logger="backend.db.db_utils"):
+        assert db_utils.get_artifact_from_db("t1", "system_requirements_Analyst_v1.10")["content"] is None
+    assert "system_requirements_Analyst_v1.10 -> system_requirements_Analyst_v1.9" in caplog.text
+    assert "was overwritten" in caplog.text
+
+
+def test_async_bulk_writes_tolerate_retried_batches(embedded_backend) -> None:
+    docs = [db_utils.build_conversation_document("t1", {"content": f"m{i}", "timestamp": f"2025-01-01T00:00:0{i}"})
+            for i in range(3)]
+
+    async def scenario():
+        await db_utils.acreate_indexes()
+        assert await db_utils.asave_conversations_bulk(docs[:2]) == 2
+        # A retry of the whole batch only hits duplicates for the documents already stored
+        assert await db_utils.asave_conversations_bulk(docs) == 3
+        artifact_docs = [db_utils.build_artifact_document("t1", _artifact("1.0", {"a": 1}, 1))]
+        assert await db_utils.asave_artifacts_bulk(artifact_docs) == 1
+        return (await db_utils.aget_conversations_from_db("t1"),
+                await db_utils.aget_artifact_from_db("t1", "system_requirements_Analyst_v1.0"))
+
+    conversations, artifact = asyncio.run(scenario())
+    assert [c["content"] for c in conversations] == ["m0", "m1", "m2"]
+    assert artifact["content"] == {"a": 1}
+
+
+def test_mongo_indexes_serve_the_history_queries(tmp_path) -> None:
+    client = EmbeddedClient(str(tmp_path / "app_data.sqlite"))
+    collection = client["app"]["artifacts"]
+    for keys in db_utils.MONGO_INDEXES["artifacts"]:
+        collection.create_index(keys)
+    plan = client.execute(
+        f"EXPLAIN QUERY PLAN SELECT _id, doc FROM {collection.table} "
+        "WHERE json_extract(doc, '$.thread_id') = ? "
+        "ORDER BY json_extract(doc, '$.timestamp') DESC, _id DESC", ("t1",)
+    ).fetchall()
+    client.close()
+    details = " ".join(row[-1] for row in plan)
+    assert "idx_app_artifacts_thread_id_timestamp_desc__id_desc" in details and "TEMP B-TREE" not in details
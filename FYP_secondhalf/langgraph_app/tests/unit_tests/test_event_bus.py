@@ -0,0 +1,232 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.core.event_bus import BusEvent, EventBus, SubscriberOverflow
+from backend.core.run_supervisor import RunSupervisor, ThreadQueueFull
+
+
+async def _collect(bus, thread_id, after_seq=None):
+    return [event.data async for event in bus.subscribe(thread_id, after_seq)]
+
+
+async def _run(n, release):
+    for i in range(n):
+        if i == 1:
+            await release.wait()
+        yield f'{{"n": {i}}}'
+
+
+def test_late_subscriber_gets_replay_and_live_events() -> None:
+    async def scenario():
+        bus = EventBus()
+        supervisor = RunSupervisor(bus)
+        release = asyncio.Event()
+        assert supervisor.start("t1", _run(3, release), run_id="r1")
+        await asyncio.sleep(0)  # first event published, run waits on `release`
+
+        early, late = asyncio.create_task(_collect(bus, "t1")), None
+        await asyncio.sleep(0)
+        late = asyncio.create_task(_collect(bus, "t1", after_seq=1))
+        release.set()
+        return await early, await late
+
+    early, late = asyncio.run(scenario())
+    assert early == ['{"n": 0}', '{"n": 1}', '{"n": 2}']
+    assert late == ['{"n": 1}', '{"n": 2}']
+
+
+def test_run_continues_when_subscriber_disconnects() -> None:
+    async def scenario():
+        bus = EventBus()
+        supervisor = RunSupervisor(bus)
+        release = asyncio.Event()
+        supervisor.start("t1", _run(3, release))
+        subscriber = asyncio.create_task(_collect(bus, "t1"))
+        await asyncio.sleep(0.01)
+        subscriber.cancel()
+        release.set()
+        await supervisor.wait("t1")
+        return bus.channel("t1")
+
+    channel = asyncio.run(scenario())
+    assert channel.closed
+    assert not channel.subscribers
+    assert [event.data for event in channel.events] == ['{"n": 0}', '{"n": 1}', '{"n": 2}']
+
+
+def test_one_run_per_thread() -> None:
+    async def scenario():
+        supervisor = RunSupervisor(EventBus())
+        release = asyncio.Event()
+        first = supervisor.start("t1", _run(2, release))
+        second = supervisor.start("t1", _run(2, release))
+        release.set()
+        await supervisor.shutdown(timeout=1)
+        return first, second
+
+    assert asyncio.run(scenario()) == (True, False)
+
+
+def test_runs_of_a_thread_are_serialised_in_order() -> None:
+    async def scenario():
+        bus = EventBus()
+        supervisor = RunSupervisor(bus, max_pending=2)
+        log = []
+
+        async def run(name, release=None):
+            log.append(f"{name}:start")
+            if release is not None:
+                await release.wait()
+            log.append(f"{name}:end")
+            yield f'{{"run": "{name}"}}'
+
+        release = asyncio.Event()
+        positions = [
+            supervisor.submit("t1", run("a", release), run_id="a"),
+            supervisor.submit("t1", run("b"), run_id="b"),
+            supervisor.submit("t1", run("c"), run_id="c"),
+        ]
+        with pytest.raises(ThreadQueueFull):
+            supervisor.submit("t1", run("d"), run_id="d")
+        assert supervisor.is_pending("t1", "c") and supervisor.pending_runs("t1") == ["b", "c"]
+
+        # A subscriber of a queued run only sees that run's events
+        queued = asyncio.create_task(_collect_run(bus, "t1", "c"))
+        # Another thread is not held up by t1's queue
+        assert supervisor.submit("t2", run("x"), run_id="x") == 0
+        await supervisor.wait("t2")
+        release.set()
+        await supervisor.wait("t1")
+        return positions, log, await queued, supervisor.stats()
+
+    positions, log, queued, stats = asyncio.run(scenario())
+    assert positions == [0, 1, 2]
+    assert log == ["a:start", "x:start", "x:end", "a:end", "b:start", "b:end", "c:start", "c:end"]
+    assert queued == ['{"run": "c"}']
+    assert stats["pending_runs"] == 0 and stats["queued_runs"] == 2 and stats["started_runs"] == 4
+
+
+async def _collect_run(bus, thread_id, run_id):
+    return [event.data async for event in bus.subscribe(thread_id, run_id=run_id)]
+
+
+def test_event_rendered_once_per_mode() -> None:
+    calls = []
+
+    def render(mode):
+        calls.append(mode)
+        return f'{{"mode": "{mode}"}}'
+
+    event = BusEvent('{"mode": "full"}', render=render)
+    assert event.for_mode("lite") == '{"mode": "lite"}'
+    assert event.for_mode("lite") == '{"mode": "lite"}'
+    assert BusEvent("{}").for_mode("lite") == "{}"
+    assert calls == ["lite"]
+
+
+def test_watch_follows_thread_across_runs() -> None:
+    async def scenario():
+        bus = EventBus()
+        seen = []
+
+        async def watcher():
+            async for run_id, event in bus.watch("t1"):
+                seen.append((run_id, event.data))
+
+        task = asyncio.create_task(watcher())
+        await asyncio.sleep(0)  # waits for a first run
+        for run_id in ("r1", "r2"):
+            bus.open("t1", run_id)
+            bus.publish("t1", f'"{run_id}-a"')
+            bus.publish("t1", f'"{run_id}-b"')
+            bus.close("t1")
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return seen, bus._open_waiters
+
+    seen, waiters = asyncio.run(scenario())
+    assert seen == [("r1", '"r1-a"'), ("r1", '"r1-b"'), ("r2", '"r2-a"'), ("r2", '"r2-b"')]
+    assert waiters == {}
+
+
+def _artifact(artifact_type, version):
+    return f'{{"chat_type": "artifact", "artifact_type": "{artifact_type}", "version": "{version}"}}'
+
+
+def _slow_subscriber(policy, payloads, queue_size=3):
+    """Publish everything before the subscriber reads, then drain it"""
+    async def scenario():
+        bus = EventBus(queue_size=queue_size, overflow_policy=policy)
+        bus.open("t1")
+        received = []
+
+        async def consume():
+            async for event in bus.subscribe("t1", after_seq=0):
+                received.append(event.for_mode("delta"))
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0)  # subscribed, backlog empty
+        for payload in payloads:
+            bus.publish("t1", payload)
+        bus.close("t1")
+        try:
+            await task
+            overflowed = False
+        except SubscriberOverflow:
+            overflowed = True
+        return received, overflowed, bus.stats()
+
+    return asyncio.run(scenario())
+
+
+def test_drop_policy_discards_status_events_first() -> None:
+    payloads = ['{"status": "processing"}', _artifact("srs", "1.0"), '{"chat_type": "conversation"}', _artifact("srs", "1.1")]
+    received, overflowed, stats = _slow_subscriber("drop", payloads)
+    assert not overflowed
+    assert received == payloads[1:]
+    assert stats["dropped_events"] == 1
+    assert stats["queue_high_watermark"] == 3
+
+
+def test_coalesce_policy_skips_superseded_artifact_version() -> None:
+    def versioned(version):
+        return BusEvent(_artifact("srs", version), render=lambda mode: f'"{version}-{mode}"')
+
+    payloads = [versioned("1.0"), versioned("1.1"), '{"chat_type": "conversation"}', versioned("1.2")]
+    received, overflowed, stats = _slow_subscriber("coalesce", payloads)
+    assert not overflowed
+    # v1.0 was skipped, so v1.1 (whose patch base is v1.0) is resent in full; v1.2 patches v1.1 again
+    assert received == ['"1.1-full"', '{"chat_type": "conversation"}', '"1.2-delta"']
+    assert stats["coalesced_events"] == 1
+
+
+def test_disconnect_policy_ends_subscription() -> None:
+    payloads = ['{"status": "processing"}'] * 4
+    received, overflowed, stats = _slow_subscriber("disconnect", payloads)
+    assert overflowed
+    assert stats["overflow_disconnects"] == 1
+    assert stats["subscribers"] == 0
+
+
+def test_shutdown_drains_and_hands_back_queued_runs() -> None:
+    async def scenario():
+        supervisor = RunSupervisor(EventBus())
+        discarded = []
+        supervisor.submit("t1", _run(2, asyncio.Event()), run_id="stuck")
+        supervisor.submit("t1", _run(1, asyncio.Event()), run_id="queued", on_discard=lambda: discarded.append("queued"))
+        # A callback returning an awaitable (a store call in a worker thread) is awaited
+        supervisor.submit("t1", _run(1, asyncio.Event()), run_id="queued-async",
+                          on_discard=lambda: asyncio.to_thread(discarded.append, "queued-async"))
+        await asyncio.sleep(0)
+        await supervisor.shutdown(timeout=0.05)
+        return supervisor.draining, discarded, supervisor.stats()
+
+    draining, discarded, stats = asyncio.run(scenario())
+    assert draining and discarded == ["queued", "queued-async"]
+    assert stats["cancelled_runs"] == 1 and stats["pending_runs"] == 0
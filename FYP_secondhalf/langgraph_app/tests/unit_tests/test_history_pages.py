@@ -0,0 +1,82 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db import db_utils
+
+
+@pytest.fixture
+def embedded_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "PERSISTENCE_BACKEND", "sqlite")
+    monkeypatch.setattr(db_utils, "EMBEDDED_DB", str(tmp_path / "app_data.sqlite"))
+    db_utils.create_indexes()
+    yield
+    asyncio.run(db_utils.close_clients())
+
+
+def _artifact(artifact_type, version, minute):
+    return {
+        "artifact_id": f"{artifact_type}_Analyst_v{version}",
+        "artifact_type": artifact_type,
+        "agent": "Analyst",
+        "content": {"diagram": "iVBORw0KGgo" * 200, "version": version},
+        "version": version,
+        # Two artifacts per minute: pages must not lose or repeat timestamp ties
+        "timestamp": f"2025-01-01T00:{minute:02d}:00+00:00",
+    }
+
+
+def _read_all(read_page, **kwargs):
+    items, cursor, pages = [], None, 0
+    while True:
+        page = read_page("t1", cursor=cursor, **kwargs)
+        items.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+def test_artifact_pages_cover_the_thread_once_with_metadata_only(embedded_backend, monkeypatch) -> None:
+    monkeypatch.setattr(db_utils, "ARTIFACT_STORAGE_MODE", "delta")
+    for i in range(7):
+        for artifact_type in ("system_requirements", "requirements_model"):
+            assert db_utils.save_artifact_to_db("t1", _artifact(artifact_type, f"1.{i}", i // 2))
+
+    items, pages = _read_all(db_utils.get_artifacts_page, fields=db_utils.ARTIFACT_METADATA_FIELDS, limit=3)
+    assert pages == 5
+    assert [item["artifact_id"] for item in items] == [a["artifact_id"] for a in db_utils.get_artifacts_from_db("t1")]
+    assert all("content" not in item and "_id" not in item for item in items)
+
+    # Requested content is rebuilt from the deltas, filtered pages only hold their type
+    page = db_utils.get_artifacts_page("t1", "requirements_model", ["version", "content"], limit=2)
+    assert [item["content"]["version"] for item in page["items"]] == ["1.6", "1.5"]
+    assert set(page["items"][0]) == {"version", "content"}
+
+
+def test_conversation_pages_in_both_orders(embedded_backend) -> None:
+    docs = [db_utils.build_conversation_document("t1", {"content": f"m{i}", "timestamp": f"2025-01-01T00:00:0{i // 2}"})
+            for i in range(5)]
+
+    async def scenario():
+        await db_utils.asave_conversations_bulk(docs)
+        first = await db_utils.aget_conversations_page("t1", limit=2)
+        second = await db_utils.aget_conversations_page("t1", ["content"], limit=2, cursor=first["next_cursor"])
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert [c["content"] for c in first["items"] + second["items"]] == ["m0", "m1", "m2", "m3"]
+    assert second["items"][0] == {"content": "m2"}
+    newest, _ = _read_all(db_utils.get_conversations_page, fields=["content"], limit=2, newest_first=True)
+    assert [c["content"] for c in newest] == ["m4", "m3", "m2", "m1", "m0"]
+
+
+def test_invalid_cursors_and_fields_are_rejected(embedded_backend) -> None:
+    with pytest.raises(ValueError):
+        db_utils.get_artifacts_page("t1", cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        db_utils.get_conversations_page("t1", fields=["password"])
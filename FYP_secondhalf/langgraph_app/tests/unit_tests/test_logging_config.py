@@ -0,0 +1,46 @@
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.core.logging_config import (
+    ContextFilter,
+    DebugSampler,
+    KeyValueFormatter,
+    bind_log_context,
+    parse_module_levels,
+    reset_log_context,
+    setup_logging,
+)
+
+
+def _record(level, lineno=10):
+    return logging.LogRecord("backend.x", level, "x.py", lineno, "msg %s", ("a",), None)
+
+
+def test_debug_sampler_keeps_one_in_n_per_call_site() -> None:
+    sampler = DebugSampler(3)
+    kept = [sampler.filter(_record(logging.DEBUG)) for _ in range(6)]
+    assert kept == [True, False, False, True, False, False]
+    assert sampler.filter(_record(logging.DEBUG, lineno=11))  # another call site has its own count
+    assert all(sampler.filter(_record(logging.INFO)) for _ in range(3))
+
+
+def test_bound_context_is_appended_to_lines() -> None:
+    record = _record(logging.INFO)
+    token = bind_log_context(thread_id="t1")
+    ContextFilter().filter(record)
+    reset_log_context(token)
+    assert KeyValueFormatter("%(message)s").format(record) == "msg a thread_id=t1"
+
+
+def test_module_levels_override_app_level(monkeypatch) -> None:
+    monkeypatch.setenv("LOG_MODULE_LEVELS", "backend.db=WARNING")
+    assert parse_module_levels("backend.graph_logic.flow=debug, ,bad") == {"backend.graph_logic.flow": "DEBUG"}
+
+    setup_logging(debug_mode=False, level="INFO", module_levels={"backend.graph_logic.flow": "DEBUG"}, log_file=None)
+    assert logging.getLogger("backend.api").getEffectiveLevel() == logging.INFO
+    assert logging.getLogger("backend.graph_logic.flow").isEnabledFor(logging.DEBUG)
+    assert logging.getLogger("backend.db.db_utils").getEffectiveLevel() == logging.WARNING
+    assert logging.getLogger("httpx").getEffectiveLevel() == logging.CRITICAL
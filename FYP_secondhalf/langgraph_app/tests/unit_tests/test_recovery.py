@@ -0,0 +1,77 @@
+import asyncio
+import os
+import sys
+from typing import TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.core.recovery import AWAITING_INPUT, INTERRUPTED, ResumableThreadRegistry
+from backend.db.run_config_store import InMemoryRunConfigStore
+from backend.db.sharded_checkpointer import ShardedAsyncSqliteSaver
+
+
+class _State(TypedDict, total=False):
+    mode: str
+    paused_for_feedback: bool
+
+
+def _work(state: _State) -> _State:
+    if state["mode"].startswith("crash"):
+        raise RuntimeError("worker died mid-run")
+    return {"paused_for_feedback": state["mode"] == "feedback"}
+
+
+def _route(state: _State) -> str:
+    return "handle_routing_decision" if state["mode"] == "route" else END
+
+
+def _graph(checkpointer):
+    workflow = StateGraph(_State)
+    workflow.add_node("work", _work)
+    workflow.add_node("handle_routing_decision", lambda state: {})
+    workflow.add_edge(START, "work")
+    workflow.add_conditional_edges("work", _route)
+    workflow.add_edge("handle_routing_decision", END)
+    return workflow.compile(checkpointer=checkpointer, interrupt_before=["handle_routing_decision"])
+
+
+def test_rebuild_finds_paused_and_interrupted_threads(tmp_path) -> None:
+    modes = ("route", "feedback", "done", "crash", "crash-resumed")
+
+    async def scenario():
+        base_path = str(tmp_path / "checkpoints.sqlite")
+        # Previous boot: threads in every state, one of which died mid-run
+        saver = await ShardedAsyncSqliteSaver.open(base_path, num_shards=2, readers_per_shard=1)
+        graph = _graph(saver)
+        for mode in modes:
+            try:
+                await graph.ainvoke({"mode": mode}, {"configurable": {"thread_id": mode}})
+            except RuntimeError:
+                pass
+        await saver.aclose()
+
+        # Next boot on the kept checkpoint files
+        saver = await ShardedAsyncSqliteSaver.open(base_path, num_shards=2, readers_per_shard=1)
+        run_configs = InMemoryRunConfigStore("run_configs")
+        # A resume the client stored before the restart is kept
+        run_configs.put("crash-resumed", {"type": "routing_choice", "run_id": "r1"})
+        registry = ResumableThreadRegistry()
+        await registry.rebuild(_graph(saver), saver.connections, run_configs)
+        await saver.aclose()
+        return registry, run_configs
+
+    registry, run_configs = asyncio.run(scenario())
+    assert {entry.thread_id: entry.status for entry in registry.list()} == {
+        "route": AWAITING_INPUT,
+        "feedback": AWAITING_INPUT,
+        "crash": INTERRUPTED,
+        "crash-resumed": INTERRUPTED,
+    }
+    assert registry.get("route").next_nodes == ["handle_routing_decision"]
+    # Only the run cut off mid-graph gets a config that continues it on the next stream
+    assert run_configs.get("crash")["type"] == "recover"
+    assert run_configs.get("crash-resumed") == {"type": "routing_choice", "run_id": "r1"}
+    assert registry.stats()["recovered_runs"] == 1
+
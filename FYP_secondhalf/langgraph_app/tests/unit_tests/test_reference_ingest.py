@@ -0,0 +1,127 @@
+import asyncio
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db import reference_ingest
+from backend.db.reference_ingest import (
+    DocumentIdConflict, UploadTooLarge, aingest_stream, document_id_for, ingest_file, iter_chunk_batches, iter_text,
+)
+from backend.db.vector_index import IncrementalChunker, chunk_text
+
+
+def _words(count, seed=0):
+    rng = random.Random(seed)
+    vocabulary = ["offline", "sync", "meal", "log", "café", "naïve", "encryption", "tablet", "latency", "export"]
+    return " ".join(rng.choice(vocabulary) for _ in range(count))
+
+
+async def _blocks(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _ingest(index, data, filename, block_size=1000, **kwargs):
+    return asyncio.run(aingest_stream(index, _blocks(data, block_size), filename, **kwargs))
+
+
+def test_incremental_chunking_matches_chunk_text(tmp_path) -> None:
+    text = _words(1003) + "\n\n" + _words(50, seed=1)
+    path = tmp_path / "doc.md"
+    path.write_text(text, encoding="utf-8")
+
+    # Pieces cut mid-word and mid-character (7-byte blocks split the UTF-8 of "é" and "ï")
+    chunker = IncrementalChunker(words=50, overlap=10)
+    chunks = [chunk for piece in iter_text(str(path), block_bytes=7) for chunk in chunker.feed(piece)] + chunker.finish()
+    assert chunks == chunk_text(text, words=50, overlap=10)
+    assert all(len(chunk.split()) <= 50 for chunk in chunks)
+
+    batches = list(iter_chunk_batches(iter_text(str(path), block_bytes=7), batch_size=4, words=50, overlap=10))
+    assert [chunk for batch in batches for chunk in batch] == chunks
+    assert all(len(batch) == 4 for batch in batches[:-1])
+    assert document_id_for("Operating Environment v2.PDF") == "operating-environment-v2"
+
+
+def test_uploads_are_chunked_deduped_and_replaced(vector_index, monkeypatch) -> None:
+    monkeypatch.setattr(reference_ingest, "REFERENCE_SPOOL_BUFFER_BYTES", 256)  # spooled in many writes
+    document = ("# Offline operation\n\n" + _words(900)).encode("utf-8")
+    first = _ingest(vector_index, document, "Offline Guide.md", thread_id="t1")
+    assert first["status"] == "ingested" and first["document_id"] == "offline-guide"
+    assert first["chunks"] == len(chunk_text(document.decode("utf-8"))) and first["bytes"] == len(document)
+
+    hits = vector_index.search("offline operation", k=3, thread_id="t1")
+    assert hits[0]["chunk_id"].startswith("offline-guide#") and hits[0]["title"] == "Offline Guide.md"
+    assert vector_index.search("offline operation", k=3, thread_id="t2") == []  # t1's document
+
+    # The same bytes again, in other blocks or under another name: nothing is re-embedded
+    added = vector_index.stats()["added_chunks"]
+    assert _ingest(vector_index, document, "Offline Guide.md", block_size=4096, thread_id="t1")["status"] == "unchanged"
+    renamed = _ingest(vector_index, document, "copy.md", thread_id="t1")
+    assert renamed["status"] == "unchanged" and renamed["document_id"] == "offline-guide"
+    assert vector_index.stats()["added_chunks"] == added
+
+    # A changed file replaces the chunks of the document
+    changed = _ingest(vector_index, b"Payments use card tokenisation.", "Offline Guide.md", thread_id="t1")
+    assert changed["status"] == "ingested" and changed["chunks"] == 1
+    assert vector_index.document_chunks("offline-guide") == [{"chunk_id": "offline-guide#0", "text": "Payments use card tokenisation."}]
+    assert [doc["source_id"] for doc in vector_index.documents("t1")] == ["offline-guide"]
+
+    # Content another document already has: an explicit or existing id still gets its own copy
+    payments = b"Payments use card tokenisation."
+    pinned = _ingest(vector_index, payments, "payments.txt", document_id="payments", thread_id="t1")
+    assert pinned["status"] == "ingested" and pinned["document_id"] == "payments"
+    _ingest(vector_index, b"Meals are logged offline.", "Meal Log.md", thread_id="t1")
+    replaced = _ingest(vector_index, payments, "Meal Log.md", thread_id="t1")
+    assert replaced["status"] == "ingested" and replaced["document_id"] == "meal-log"
+    assert vector_index.document_chunks("meal-log")[0]["text"] == "Payments use card tokenisation."
+    for document_id in ["payments", "meal-log"]:
+        vector_index.remove_source(document_id)
+
+    with pytest.raises(DocumentIdConflict):
+        _ingest(vector_index, b"shared", "Offline Guide.md")  # the id is t1's
+    with pytest.raises(UploadTooLarge):
+        _ingest(vector_index, document, "big.txt", max_bytes=100)
+    with pytest.raises(ValueError):
+        _ingest(vector_index, document, "slides.pptx")
+    vector_index.remove_thread("t1")
+    assert vector_index.documents("t1") == [] and vector_index.stats()["live_chunks"] == 0
+
+
+def test_failed_ingestion_keeps_the_previous_version(vector_index, monkeypatch, tmp_path) -> None:
+    _ingest(vector_index, b"Data is encrypted at rest.", "privacy.txt")
+
+    def failing_batches(pieces, **kwargs):
+        yield ["Data is kept forever."]
+        raise OSError("disk error")
+
+    monkeypatch.setattr(reference_ingest, "iter_chunk_batches", failing_batches)
+    with pytest.raises(OSError):
+        _ingest(vector_index, b"A new privacy policy.", "privacy.txt")
+    assert vector_index.document_chunks("privacy") == [{"chunk_id": "privacy#0", "text": "Data is encrypted at rest."}]
+    assert [hit["text"] for hit in vector_index.search("data kept", k=5)] == ["Data is encrypted at rest."]
+
+
+def test_pdf_documents_are_read_page_by_page(vector_index, tmp_path) -> None:
+    pytest.importorskip("pypdf")
+    canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+    path = tmp_path / "environment.pdf"
+    pdf = canvas.Canvas(str(path))
+    for line in ["The app runs on Android 8.0 and iOS 14.", "All traffic uses HTTPS."]:
+        pdf.drawString(72, 720, line)
+        pdf.showPage()
+    pdf.save()
+
+    result = ingest_file(vector_index, str(path), document_id="oel", title="OEL")
+    assert result["status"] == "ingested"
+    assert vector_index.document_chunks("oel")[0]["text"] == "The app runs on Android 8.0 and iOS 14. All traffic uses HTTPS."
+
+    # The seeded default OEL is only ingested once, and not over an uploaded one
+    reference_ingest.seed_default_documents(vector_index)
+    seeded = vector_index.document(reference_ingest.OEL_REFERENCE_ID)
+    assert seeded["chunks"] >= 1 and "Android 8.0 and above" in vector_index.document_chunks(seeded["source_id"])[0]["text"]
+    reference_ingest.seed_default_documents(vector_index)
+    assert vector_index.document(reference_ingest.OEL_REFERENCE_ID)["ingested_at"] == seeded["ingested_at"]
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db.run_config_store import InMemoryRunConfigStore, RunConfigStore, SqliteRunConfigStore
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path) -> None:
+    db_path = str(tmp_path / "run_configs.sqlite")
+    # Two connections stand in for two uvicorn worker processes
+    worker_a = SqliteRunConfigStore("run_configs", db_path=db_path)
+    worker_b = SqliteRunConfigStore("run_configs", db_path=db_path)
+
+    worker_a.put("thread-1", {"type": "start", "human_request": "food diary app"})
+    assert worker_b.get("thread-1") == {"type": "start", "human_request": "food diary app"}
+    assert "thread-1" in worker_b.keys()
+
+    # Only one worker can claim the pending run
+    assert worker_b.claim("thread-1", "worker-b") is not None
+    assert worker_a.claim("thread-1", "worker-a") is None
+
+    worker_b.release("thread-1", "worker-b")
+    assert worker_a.claim("thread-1", "worker-a") is not None
+
+    worker_a.delete("thread-1")
+    assert worker_b.get("thread-1") is None
+
+
+def test_expired_claim_can_be_taken_over(tmp_path) -> None:
+    store = SqliteRunConfigStore("run_configs", db_path=str(tmp_path / "rc.sqlite"))
+    store.put("thread-1", {"type": "start"})
+    assert store.claim("thread-1", "crashed-worker", lease_seconds=0.01) is not None
+    time.sleep(0.02)
+    assert store.claim("thread-1", "other-worker") == {"type": "start"}
+
+
+def test_ttl_expiry() -> None:
+    store = InMemoryRunConfigStore("test_ttl_expiry", ttl_seconds=0.01)
+    store.put("thread-1", {"type": "start"})
+    assert store.get("thread-1") is not None
+    time.sleep(0.02)
+    assert store.get("thread-1") is None
+    assert store.claim("thread-1", "worker") is None
+
+
+def test_namespaces_are_separate(tmp_path) -> None:
+    db_path = str(tmp_path / "rc.sqlite")
+    SqliteRunConfigStore("run_configs", db_path=db_path).put("key", {"a": 1})
+    assert SqliteRunConfigStore("session_threads", db_path=db_path).get("key") is None
+
+
+def test_add_keeps_the_first_record_and_delete_respects_the_claim(tmp_path) -> None:
+    db_path = str(tmp_path / "run_configs.sqlite")
+    for store in (InMemoryRunConfigStore("requests"), SqliteRunConfigStore("requests", db_path=db_path)):
+        assert store.add("resume:t1:req-1", {"run_id": "r1"}) is None
+        assert store.add("resume:t1:req-1", {"run_id": "r2"}) == {"run_id": "r1"}
+
+        # A newer run stored while the old one ran must survive the old run's cleanup
+        store.put("t1", {"run_id": "r1"})
+        assert store.claim("t1", "run-1") is not None
+        store.put("t1", {"run_id": "r2"})
+        store.delete("t1", "run-1")
+        assert store.get("t1") == {"run_id": "r2"}
+        assert store.claim("t1", "run-2") is not None
+        store.delete("t1", "run-2")
+        assert store.get("t1") is None
+
+
+def test_incomplete_backend_fails_on_construction() -> None:
+    class PutOnlyStore(RunConfigStore):
+        def put(self, key, value, ttl_seconds=None):
+            pass
+
+    with pytest.raises(TypeError):
+        PutOnlyStore("run_configs")
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db import db_utils
+from backend.db.rebuild_search_index import rebuild
+from backend.db.search_index import artifact_sections, match_expression
+
+
+@pytest.fixture
+def embedded_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "PERSISTENCE_BACKEND", "sqlite")
+    monkeypatch.setattr(db_utils, "EMBEDDED_DB", str(tmp_path / "app_data.sqlite"))
+    monkeypatch.setattr(db_utils, "ARTIFACT_STORAGE_MODE", "delta")
+    yield
+    asyncio.run(db_utils.close_clients())
+
+
+def _requirements(version, minute, statements):
+    return {
+        "artifact_id": f"system_requirements_Analyst_v{version}",
+        "artifact_type": "system_requirements",
+        "agent": "Analyst",
+        "content": {"srl": [
+            {"requirement_id": f"SR-{i}", "requirement_statement": text, "category": "Functional", "priority": "High"}
+            for i, text in enumerate(statements, start=1)
+        ]},
+        "version": version,
+        "timestamp": f"2025-01-01T00:{minute:02d}:00+00:00",
+    }
+
+
+SRS = {
+    "artifact_id": "software_requirement_specs_Archivist_v1.0",
+    "artifact_type": "software_requirement_specs",
+    "agent": "Archivist",
+    "content": {
+        "brief_introduction": "A meal planner for students.",
+        "product_description": "Works in offline mode and syncs when the network returns.",
+        "functional_requirements": "Users log meals.",
+        "non_functional_requirements": "Pages load within two seconds.",
+        "reference_documents_id": [],
+        "references": "",
+    },
+    "version": "1.0",
+    "timestamp": "2025-01-01T00:05:00+00:00",
+}
+
+
+def test_sections_and_query_syntax() -> None:
+    assert artifact_sections({"uml_fmt_content": "@startuml\nUser -> App\n@enduml", "diagram_base64": "iVBORw0K"}) == [
+        ("uml_fmt_content", "@startuml\nUser -> App\n@enduml")
+    ]
+    assert artifact_sections({"req_class_id": [{"requirement_id": "R-1", "requirement_text": "Log meals"}]}) == [("R-1", "Log meals")]
+    # FTS5 operators in user input are searched for literally instead of raising syntax errors
+    assert match_expression('offline "sync conflict" notif* AND (x') == '"offline" "sync conflict" "notif"* "AND" "(x"'
+    with pytest.raises(ValueError):
+        match_expression('  "" ')
+
+
+def test_saves_are_indexed_latest_version_only(embedded_backend, search_index) -> None:
+    async def scenario():
+        await db_utils.asave_artifact_to_db("t1", _requirements("1.0", 1, ["Log meals offline", "Export reports"]))
+        await db_utils.asave_artifact_to_db("t1", _requirements("1.1", 2, ["Log meals while in offline mode", "Share plans"]))
+        await db_utils.asave_artifacts_bulk([db_utils.build_artifact_document("t2", SRS)])
+
+    asyncio.run(scenario())
+    # An older version written late does not replace the newer one
+    assert db_utils.save_artifact_to_db("t1", _requirements("1.0", 1, ["Log meals offline", "Export reports"]))
+
+    hits = search_index.search("offline mode")
+    assert [(hit["thread_id"], hit["section"], hit["version"]) for hit in hits] == [
+        ("t1", "SR-1", "1.1"), ("t2", "product_description", "1.0"),  # the shorter section ranks first
+    ]
+    assert "**offline**" in hits[0]["snippet"] and hits[0]["score"] > 0
+    assert search_index.search("export") == []  # only in v1.0
+    assert [hit["section"] for hit in search_index.search("offli*", thread_id="t2")] == ["product_description"]
+    assert search_index.search(requirement_id="SR-2")[0]["snippet"] == "Share plans"
+
+    # The index is not the source of truth: rebuilt from the collection it has the same content
+    db = db_utils.get_client()[db_utils.APP_DATABASE_NAME]
+    assert rebuild(db) == 2
+    assert len(search_index.search("offline mode")) == 2
+    assert db_utils.delete_thread_data("t1")
+    assert [hit["thread_id"] for hit in search_index.search("offline")] == ["t2"]
+    with pytest.raises(ValueError):
+        search_index.search("")
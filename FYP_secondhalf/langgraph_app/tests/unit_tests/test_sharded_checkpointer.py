@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+from typing import TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db.sharded_checkpointer import ShardedAsyncSqliteSaver, shard_index, shard_paths
+
+
+class _State(TypedDict):
+    count: int
+
+
+def _graph(checkpointer):
+    workflow = StateGraph(_State)
+    workflow.add_node("step", lambda state: {"count": state["count"] + 1})
+    workflow.add_edge(START, "step")
+    workflow.add_edge("step", END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+def test_shard_layout_is_stable() -> None:
+    assert shard_paths("/data/checkpoints.sqlite", 1) == ["/data/checkpoints.sqlite"]
+    assert shard_paths("/data/checkpoints.sqlite", 2) == ["/data/checkpoints.0.sqlite", "/data/checkpoints.1.sqlite"]
+    # crc32, not the per-process salted hash(): the same in every worker and after restarts
+    assert [shard_index(f"thread-{i}", 4) for i in range(6)] == [shard_index(f"thread-{i}", 4) for i in range(6)]
+    assert len({shard_index(f"thread-{i}", 4) for i in range(100)}) == 4
+
+
+def test_threads_are_spread_over_shards_and_survive_reopen(tmp_path) -> None:
+    base_path = str(tmp_path / "checkpoints.sqlite")
+    thread_ids = [f"thread-{i}" for i in range(8)]
+
+    async def scenario():
+        saver = await ShardedAsyncSqliteSaver.open(base_path, num_shards=3, readers_per_shard=2)
+        graph = _graph(saver)
+        await asyncio.gather(*(
+            graph.ainvoke({"count": i}, {"configurable": {"thread_id": thread_id}})
+            for i, thread_id in enumerate(thread_ids)
+        ))
+        stats = saver.stats()
+        await saver.aclose()
+
+        saver = await ShardedAsyncSqliteSaver.open(base_path, num_shards=3, readers_per_shard=2)
+        graph = _graph(saver)
+        counts = [
+            (await graph.aget_state({"configurable": {"thread_id": thread_id}})).values["count"]
+            for thread_id in thread_ids
+        ]
+        listed = [item async for item in saver.alist(None, limit=5)]
+        await saver.adelete_thread("thread-0")
+        deleted = await saver.aget_tuple({"configurable": {"thread_id": "thread-0"}})
+        await saver.aclose()
+        return stats, counts, listed, deleted
+
+    stats, counts, listed, deleted = asyncio.run(scenario())
+    assert counts == [i + 1 for i in range(8)]
+    assert all(writes > 0 for writes in stats["writes"])
+    # Listing without a thread merges the shards newest first
+    checkpoint_ids = [item.config["configurable"]["checkpoint_id"] for item in listed]
+    assert len(listed) == 5 and checkpoint_ids == sorted(checkpoint_ids, reverse=True)
+    assert deleted is None
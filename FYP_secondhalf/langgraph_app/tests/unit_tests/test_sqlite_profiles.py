@@ -0,0 +1,48 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db.sharded_checkpointer import ShardedAsyncSqliteSaver
+from backend.db.sqlite_profiles import MB, STORAGE_PROFILES, profile_pragmas, profile_settings
+
+
+def test_profiles_merge_base_pragmas_and_overrides() -> None:
+    for profile in STORAGE_PROFILES:
+        pragmas = profile_pragmas(profile, overrides={})
+        # page_size has to come before journal_mode=WAL to apply to a new file
+        assert pragmas[0].startswith("PRAGMA page_size")
+        assert "PRAGMA journal_mode = WAL;" in pragmas
+
+    settings = profile_settings("low_memory", overrides={"cache_size": -4000})
+    assert settings["cache_size"] == -4000 and settings["mmap_size"] == 0
+    with pytest.raises(ValueError):
+        profile_settings("turbo")
+
+
+def test_profile_is_applied_to_checkpoint_connections(tmp_path) -> None:
+    async def scenario():
+        saver = await ShardedAsyncSqliteSaver.open(
+            str(tmp_path / "checkpoints.sqlite"), num_shards=2, readers_per_shard=1,
+            pragmas=profile_pragmas("high_throughput", overrides={}),
+        )
+        values = {}
+        for conn in saver.shards[0].connections:
+            for name in ("page_size", "cache_size", "mmap_size", "temp_store", "wal_autocheckpoint"):
+                async with conn.execute(f"PRAGMA {name}") as cursor:
+                    values.setdefault(name, set()).add((await cursor.fetchone())[0])
+        await saver.aclose()
+        return values
+
+    values = asyncio.run(scenario())
+    # Writer and reader connections agree
+    assert values == {
+        "page_size": {8192},
+        "cache_size": {-32000},
+        "mmap_size": {512 * MB},
+        "temp_store": {2},  # MEMORY
+        "wal_autocheckpoint": {4000},
+    }
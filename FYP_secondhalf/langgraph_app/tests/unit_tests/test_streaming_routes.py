@@ -0,0 +1,123 @@
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+os.environ.setdefault("OPENAI_API_KEY", "test")  # graph_logic.flow asks for one on import; no model is called
+
+from backend.api.routes import start
+from backend.core.event_bus import EventBus
+from backend.core.run_supervisor import RunSupervisor, ThreadQueueFull
+from backend.db.run_config_store import SqliteRunConfigStore
+
+
+@pytest.fixture
+def runs(tmp_path, monkeypatch):
+    """The streaming routes on a stub graph: every run yields "connected" then "finished" """
+    db_path = str(tmp_path / "run_configs.sqlite")
+    monkeypatch.setattr(start, "run_configs", SqliteRunConfigStore("run_configs", db_path=db_path))
+    monkeypatch.setattr(start, "client_requests", SqliteRunConfigStore("client_requests", db_path=db_path))
+    bus = EventBus()
+    monkeypatch.setitem(start.shared_resources, "graph", object())
+    monkeypatch.setitem(start.shared_resources, "event_bus", bus)
+    monkeypatch.setitem(start.shared_resources, "run_supervisor", RunSupervisor(bus))
+    monkeypatch.setitem(start.shared_resources, "admission", None)
+    started = []
+
+    async def produce_run_events(graph, thread_id, run_data, claim_owner):
+        started.append(run_data)
+        yield json.dumps({"status": "connected", "thread_id": thread_id})
+        yield json.dumps({"status": "finished", "thread_id": thread_id})
+        start.run_configs.delete(thread_id, claim_owner)
+
+    monkeypatch.setattr(start, "produce_run_events", produce_run_events)
+    app = FastAPI()
+    app.include_router(start.router)
+    with TestClient(app) as client:
+        yield SimpleNamespace(client=client, started=started)
+
+
+def _events(response):
+    return [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+
+def _create(client, client_request_id=None):
+    body = {"thread_id": "", "human_request": "food diary app", "client_request_id": client_request_id}
+    return client.post("/graph/run", json=body)
+
+
+def test_run_streams_on_the_post_response(runs) -> None:
+    response = _create(runs.client)
+    assert response.status_code == 200
+    thread_id = response.headers["x-thread-id"]
+    assert _events(response) == [{"status": "connected", "thread_id": thread_id},
+                                 {"status": "finished", "thread_id": thread_id}]
+    assert runs.started[0]["human_request"] == "food diary app"
+    assert start.run_configs.get(thread_id) is None
+
+    resumed = runs.client.post("/graph/run/resume", json={"thread_id": thread_id, "review_action": "approved"})
+    assert resumed.headers["x-thread-id"] == thread_id
+    assert [event["status"] for event in _events(resumed)] == ["connected", "finished"]
+    assert runs.started[1]["type"] == "resume" and runs.started[1]["review_action"] == "approved"
+
+
+def test_duplicate_request_attaches_to_the_same_run(runs) -> None:
+    first = _create(runs.client, client_request_id="c1")
+    second = _create(runs.client, client_request_id="c1")
+    assert second.headers["x-thread-id"] == first.headers["x-thread-id"]
+    assert _events(second) == _events(first)  # replayed from the run's channel, not run again
+    assert len(runs.started) == 1
+
+    resume = {"thread_id": first.headers["x-thread-id"], "review_action": "approved", "client_request_id": "r1"}
+    runs.client.post("/graph/run/resume", json=resume)
+    runs.client.post("/graph/run/resume", json=resume)
+    assert len(runs.started) == 2
+
+
+def test_busy_and_unavailable_runs_are_rejected(runs, monkeypatch) -> None:
+    full = SimpleNamespace(has_capacity=lambda: False, retry_after=lambda: 7)
+    monkeypatch.setitem(start.shared_resources, "admission", full)
+    response = _create(runs.client)
+    assert response.status_code == 429 and response.headers["retry-after"] == "7"
+    monkeypatch.setitem(start.shared_resources, "admission", None)
+
+    # The thread's run queue is full: the claimed config is released for a later attempt
+    supervisor = start.shared_resources["run_supervisor"]
+
+    def submit(thread_id, events, run_id=None, on_discard=None):
+        raise ThreadQueueFull(f"Thread {thread_id} already has runs queued")
+
+    monkeypatch.setattr(supervisor, "submit", submit)
+    response = _create(runs.client)
+    assert response.status_code == 429 and runs.started == []
+    [thread_id] = start.run_configs.keys()
+    assert start.run_configs.claim(thread_id, "next-attempt") is not None
+
+
+def test_duplicate_of_a_run_streaming_elsewhere_conflicts(runs) -> None:
+    # The first request's run is claimed by another worker
+    thread_id = "t1"
+    start.client_requests.add(f"resume:{thread_id}:r1", {"run_id": "run-1"})
+    start.run_configs.put(thread_id, {"type": "resume", "review_action": "approved", "run_id": "run-1"})
+    assert start.run_configs.claim(thread_id, "other-worker") is not None
+
+    resume = {"thread_id": thread_id, "review_action": "approved", "client_request_id": "r1"}
+    response = runs.client.post("/graph/run/resume", json=resume)
+    assert response.status_code == 409
+    assert runs.started == []
+
+
+def test_streaming_needs_the_graph_and_a_running_supervisor(runs, monkeypatch) -> None:
+    monkeypatch.setitem(start.shared_resources, "graph", None)
+    assert _create(runs.client).status_code == 503
+
+    monkeypatch.setitem(start.shared_resources, "graph", object())
+    start.shared_resources["run_supervisor"].draining = True
+    response = _create(runs.client)
+    assert response.status_code == 503 and "retry-after" in response.headers
+    assert runs.started == []
@@ -0,0 +1,147 @@
+import asyncio
+import os
+import sys
+import time
+from typing import TypedDict
+
+import pytest
+from langgraph.graph import END, START, StateGraph
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db import db_utils
+from backend.db.sharded_checkpointer import ShardedAsyncSqliteSaver
+from backend.db.thread_archive import ThreadArchive, checkpoint_time
+
+
+class _State(TypedDict):
+    count: int
+
+
+def _graph(checkpointer):
+    workflow = StateGraph(_State)
+    workflow.add_node("step", lambda state: {"count": state["count"] + 1})
+    workflow.add_edge(START, "step")
+    workflow.add_edge("step", END)
+    return workflow.compile(checkpointer=checkpointer)
+
+
+@pytest.fixture
+def archive_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "PERSISTENCE_BACKEND", "sqlite")
+    monkeypatch.setattr(db_utils, "EMBEDDED_DB", str(tmp_path / "app_data.sqlite"))
+    monkeypatch.setattr(db_utils, "ARTIFACT_STORAGE_MODE", "dedupe")
+    yield tmp_path
+    asyncio.run(db_utils.close_clients())
+
+
+SPEC = {"srs": [{"id": "SR-1", "text": "Log meals"}]}
+
+
+def _artifact(version):
+    return {
+        "artifact_id": f"system_requirements_Analyst_v{version}",
+        "artifact_type": "system_requirements",
+        "agent": "Analyst",
+        "content": SPEC,
+        "version": version,
+        "timestamp": f"2025-01-01T00:00:0{version[-1]}+00:00",
+    }
+
+
+async def _populate(graph, thread_id):
+    config = {"configurable": {"thread_id": thread_id}}
+    await graph.ainvoke({"count": 0}, config)
+    await graph.ainvoke({"count": 10}, config)
+    await db_utils.asave_artifact_to_db(thread_id, _artifact("1.0"))
+    await db_utils.asave_artifact_to_db(thread_id, _artifact("1.1"))
+    for i in range(3):
+        await db_utils.asave_conversation_to_db(thread_id, {"agent": "Analyst", "content": f"message {i}"})
+
+
+def test_idle_threads_are_archived_and_restored_on_access(archive_storage) -> None:
+    async def scenario():
+        saver = await ShardedAsyncSqliteSaver.open(str(archive_storage / "checkpoints.sqlite"), num_shards=2)
+        archive = ThreadArchive(saver, str(archive_storage / "archive"), ttl_seconds=60)
+        graph = _graph(saver)
+        for thread_id in ["t1", "t2"]:
+            await _populate(graph, thread_id)
+
+        assert await archive.idle_threads() == []  # written just now
+        assert sorted(await archive.idle_threads(now=time.time() + 3600)) == ["t1", "t2"]
+        archived = await archive.archive_thread("t1")
+        assert await archive.archive_thread("t1") is None  # already archived
+
+        db = db_utils.get_async_client()[db_utils.APP_DATABASE_NAME]
+        cold = {
+            "artifacts": await db["artifacts"].count_documents({"thread_id": "t1"}),
+            "conversations": await db["conversations"].count_documents({"thread_id": "t1"}),
+            "checkpoints": await (await saver.shard_for("t1").writer.conn.execute(
+                "SELECT COUNT(*) FROM checkpoints WHERE thread_id = 't1'")).fetchone(),
+            # t2 still references the shared body
+            "contents": [doc["refs"] for doc in await db[db_utils.CONTENT_COLLECTION].find({}).to_list()],
+        }
+
+        # The graph restores the thread on access; the history endpoints call ensure_hot
+        state = await graph.aget_state({"configurable": {"thread_id": "t1"}})
+        restored_conversations = await db_utils.aget_conversations_page("t1", limit=10)
+        await db_utils.asave_conversation_to_db("t1", {"agent": "Analyst", "content": "after restore"})
+        latest = await db_utils.aget_latest_artifact_version("t1", "system_requirements")
+        contents = await db[db_utils.CONTENT_COLLECTION].find({}).to_list()
+        await saver.aclose()
+        return archive, archived, cold, state, restored_conversations, latest, contents
+
+    archive, archived, cold, state, conversations, latest, contents = asyncio.run(scenario())
+    assert archived["bytes_moved"] > 0 and 0 < archived["bytes_written"]
+    assert cold["artifacts"] == 0 and cold["conversations"] == 0 and cold["checkpoints"] == (0,)
+    assert len(cold["contents"]) == 1 and len(cold["contents"][0]) == 2
+
+    assert not archive.is_archived("t1")
+    assert state.values["count"] == 11
+    assert [doc["seq"] for doc in conversations["items"]] == [1, 2, 3]
+    assert latest["version"] == "1.1" and latest["content"] == SPEC
+    assert len(contents) == 1 and len(contents[0]["refs"]) == 4
+    stats = archive.stats()
+    assert stats["archived_threads"] == 1 and stats["rehydrations"] == 1
+    assert stats["bytes_moved"] == archived["bytes_moved"] and stats["rehydration_ms_p50"] is not None
+
+
+def test_concurrent_accesses_restore_once_and_crashes_recover(archive_storage) -> None:
+    async def scenario():
+        saver = await ShardedAsyncSqliteSaver.open(str(archive_storage / "checkpoints.sqlite"), num_shards=1)
+        directory = str(archive_storage / "archive")
+        archive = ThreadArchive(saver, directory, ttl_seconds=60)
+        graph = _graph(saver)
+        await _populate(graph, "t1")
+        await archive.archive_thread("t1")
+
+        restored = await asyncio.gather(*(archive.rehydrate("t1") for _ in range(4)))
+        assert archive._locks == {}  # per-thread locks are dropped once nobody waits on them
+        conversations = await db_utils.aget_conversations_page("t1", limit=10)
+
+        # A crash mid-restore leaves a claimed bundle: recover() puts it back, restoring again merges
+        await archive.archive_thread("t1")
+        bundle = archive.bundle_path("t1")
+        os.rename(bundle, bundle + ".restoring")
+        os.makedirs(bundle + ".tmp-crashed")
+        await db_utils.asave_conversation_to_db("t1", {"agent": "Analyst", "content": "written meanwhile"})
+        archive.recover()
+        recovered = archive.is_archived("t1") and not os.path.exists(bundle + ".tmp-crashed")
+        state = await graph.aget_state({"configurable": {"thread_id": "t1"}})
+        after = await db_utils.aget_conversations_page("t1", limit=10)
+        await saver.aclose()
+        return restored, conversations, recovered, state, after
+
+    restored, conversations, recovered, state, after = asyncio.run(scenario())
+    assert sorted(restored) == [False, False, False, True]
+    assert len(conversations["items"]) == 3
+    assert recovered
+    assert state.values["count"] == 11
+    # The counter stayed hot: the message saved while the thread was archived follows the archived ones
+    assert [doc["seq"] for doc in after["items"]] == [1, 2, 3, 4]
+
+
+def test_checkpoint_time_decodes_uuid6_ids() -> None:
+    from langgraph.checkpoint.base.id import uuid6
+
+    assert abs(checkpoint_time(str(uuid6())) - time.time()) < 5
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db import db_utils
+from backend.db.vector_index import HashingEmbedder, VectorIndex, chunk_text
+
+
+OFFLINE = "The app must keep working in offline mode and sync meal logs when the network returns."
+PAYMENTS = "Payments are processed through a PCI compliant provider with card tokenisation."
+PRIVACY = "Personal data is encrypted at rest and users can export or delete their account data."
+
+
+def _index(path, **kwargs):
+    return VectorIndex(str(path), embedder=HashingEmbedder(256), **kwargs)
+
+
+def test_hashing_embedder_is_deterministic_and_chunks_overlap() -> None:
+    embedder = HashingEmbedder(256)
+    vectors = embedder.embed([OFFLINE, OFFLINE.upper(), PAYMENTS])
+    assert np.allclose(vectors[0], vectors[1]) and np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert vectors[0] @ embedder.embed(["offline mode sync"])[0] > vectors[2] @ embedder.embed(["offline mode sync"])[0]
+
+    words = " ".join(f"w{i}" for i in range(25))
+    assert chunk_text(words, words=10, overlap=3) == [
+        " ".join(f"w{i}" for i in range(start, min(start + 10, 25))) for start in (0, 7, 14, 21)
+    ]
+    assert chunk_text("", words=10, overlap=3) == []
+
+
+def test_add_search_replace_and_reopen(tmp_path) -> None:
+    index = _index(tmp_path)
+    index.add_chunks("oel.md", [OFFLINE, PAYMENTS], title="Operating environment")
+    index.add_chunks("privacy.pdf", [PRIVACY], title="Privacy policy", thread_id="t2")
+    index.add_chunks("t1_system_requirements_Analyst_v1.0", ["Users log meals offline."],
+                     source_type="system_requirements", thread_id="t1")
+
+    hits = index.search("offline mode sync", k=2)
+    assert [hit["chunk_id"] for hit in hits] == ["oel.md#0", "t1_system_requirements_Analyst_v1.0#0"]
+    assert hits[0]["title"] == "Operating environment" and hits[0]["score"] > hits[1]["score"]
+    # Searching from t1: its own artifacts and t2's documents are left out
+    assert {hit["source_id"] for hit in index.search("offline data", k=10, thread_id="t1")} == {"oel.md"}
+    assert {hit["source_id"] for hit in index.search("data", k=10, thread_id="t2")} == {"oel.md", "privacy.pdf", "t1_system_requirements_Analyst_v1.0"}
+
+    # Adding a source again replaces its chunks
+    index.add_chunks("oel.md", [PAYMENTS], title="Operating environment v2")
+    assert [hit["chunk_id"] for hit in index.search("offline mode", k=5, source_types=["reference"])] == ["oel.md#0", "privacy.pdf#0"]
+    index.close()
+
+    reopened = _index(tmp_path)
+    assert reopened.search("card tokenisation", k=1)[0]["title"] == "Operating environment v2"
+    reopened.remove_thread("t1")
+    assert reopened.stats()["live_chunks"] == 2
+    with pytest.raises(ValueError):
+        VectorIndex(str(tmp_path), embedder=HashingEmbedder(128)).add_chunks("x", ["text"])
+
+
+def test_compaction_and_ivf_keep_results(tmp_path) -> None:
+    rng = np.random.default_rng(1)
+    vocabulary = [f"term{i}" for i in range(300)]
+    documents = [" ".join(rng.choice(vocabulary, 30)) for _ in range(200)]
+
+    flat = _index(tmp_path / "flat")
+    ivf = _index(tmp_path / "ivf", kind="ivf", nlist=4, nprobe=2)
+    for i, document in enumerate(documents):
+        flat.add_chunks(f"doc-{i}", [document])
+        ivf.add_chunks(f"doc-{i}", [document])
+    assert ivf.stats()["ivf_trained"] and not flat.stats()["ivf_trained"]
+
+    queries = documents[:20]
+    recall = np.mean([flat.search(q, k=1)[0]["source_id"] == ivf.search(q, k=1)[0]["source_id"] for q in queries])
+    assert recall >= 0.9
+
+    # Once half the rows are replaced ones, they are compacted into the next vectors file
+    for i, document in enumerate(documents):
+        flat.add_chunks(f"doc-{i}", [document])
+    stats = flat.stats()
+    assert stats["rows"] == stats["live_chunks"] == 200
+    assert [name for name in os.listdir(tmp_path / "flat") if name.endswith(".f32")] == ["vectors.1.f32"]
+    assert flat.search(documents[150], k=1)[0]["source_id"] == "doc-150"
+
+
+def test_artifact_saves_feed_the_index(tmp_path, monkeypatch, vector_index) -> None:
+    monkeypatch.setattr(db_utils, "PERSISTENCE_BACKEND", "sqlite")
+    monkeypatch.setattr(db_utils, "EMBEDDED_DB", str(tmp_path / "app_data.sqlite"))
+
+    def requirements(version, statement):
+        return {
+            "artifact_id": f"system_requirements_Analyst_v{version}",
+            "artifact_type": "system_requirements",
+            "agent": "Analyst",
+            "content": {"srl": [{"requirement_id": "SR-1", "requirement_statement": statement}]},
+            "version": version,
+            "timestamp": f"2025-01-01T00:0{version[-1]}:00+00:00",
+        }
+
+    async def scenario():
+        await db_utils.asave_artifact_to_db("t1", requirements("1.0", "Log meals offline"))
+        await db_utils.asave_artifact_to_db("t1", requirements("1.1", "Log meals in offline mode and sync later"))
+        await db_utils.asave_artifact_to_db("t1", {"artifact_id": "requirements_model_Analyst_v1.0", "artifact_type": "requirements_model",
+                                                  "content": {"uml_fmt_content": "@startuml\n@enduml"}})
+        hits = await vector_index.asearch("offline sync", k=5)
+        await db_utils.adelete_thread_data("t1")
+        return hits, await vector_index.asearch("offline sync", k=5)
+
+    try:
+        hits, after_delete = asyncio.run(scenario())
+    finally:
+        asyncio.run(db_utils.close_clients())
+    # The latest version only, under the artifact's embedding_id (its document _id)
+    assert [hit["chunk_id"] for hit in hits] == ["t1_system_requirements_Analyst_v1.1#0"]
+    assert "SR-1: Log meals in offline mode" in hits[0]["text"]
+    assert after_delete == []
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+
+from backend.db.write_behind import WriteBehindQueue
+
+
+def _conversation(i):
+    return {"content": f"message {i}", "agent": "Analyst", "timestamp": f"2025-01-01T00:00:{i:02d}"}
+
+
+def test_documents_are_batched_by_size_and_time() -> None:
+    batches = []
+
+    async def scenario():
+        queue = WriteBehindQueue(writers={"conversation": lambda docs: batches.append(len(docs)) or len(docs)},
+                                 batch_size=3, flush_interval=0.05, dead_letter_path=None)
+        queue.start()
+        for i in range(5):
+            await queue.enqueue_conversation("t1", _conversation(i))
+        await queue.flush()
+        await queue.close()
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+    assert batches == [3, 2]
+    assert stats["written"] == 5 and stats["batches"] == 2 and stats["queued"] == 0
+
+
+def test_failed_batch_is_retried_then_dead_lettered(tmp_path) -> None:
+    attempts = []
+    dead_letter = tmp_path / "dead.jsonl"
+
+    def flaky(docs):
+        attempts.append(len(docs))
+        if len(attempts) < 3:
+            raise ConnectionError("mongo down")
+        return len(docs)
+
+    def broken(docs):
+        raise ConnectionError("mongo down")
+
+    async def scenario():
+        queue = WriteBehindQueue(writers={"conversation": flaky, "artifact": broken}, flush_interval=0.01,
+                                 max_retries=2, retry_backoff=0.001, dead_letter_path=str(dead_letter))
+        queue.start()
+        await queue.enqueue_conversation("t1", _conversation(1))
+        await queue.enqueue_artifact("t1", {"artifact_id": "srs_v1.0", "content": {"a": 1}})
+        await queue.close()
+        return queue.stats()
+
+    stats = asyncio.run(scenario())
+    assert attempts == [1, 1, 1]
+    assert stats["written"] == 1 and stats["retries"] == 4 and stats["dead_lettered"] == 1
+    lines = [json.loads(line) for line in dead_letter.read_text().splitlines()]
+    assert [(line["kind"], line["document"]["_id"]) for line in lines] == [("artifact", "t1_srs_v1.0")]
+
+
+def test_lag_counts_from_the_oldest_queued_document() -> None:
+    async def scenario():
+        queue = WriteBehindQueue(writers={"conversation": len}, flush_interval=0.01, dead_letter_path=None)
+        await queue.enqueue_conversation("t1", _conversation(1))
+        await asyncio.sleep(0.05)
+        await queue.enqueue_conversation("t1", _conversation(2))
+        waiting = queue.stats()  # nothing written yet: the flush loop is not started
+        queue.start()
+        await queue.flush()
+        stats = queue.stats()
+        await queue.close()
+        return waiting, stats
+
+    waiting, stats = asyncio.run(scenario())
+    assert waiting["queued"] == 2 and waiting["lag_seconds"] >= 0.05
+    assert stats["queued"] == 0 and stats["lag_seconds"] == 0.0 and stats["written"] == 2